@@ -33,7 +33,7 @@ _api = utils.LazyProxy(service.API)
 @rest.get('')
 def devices_list(req):
     """List all existing devices."""
-    return api_utils.render(devices=_api.get_devices())
+    return api_utils.render_stream('devices', _api.get_devices())
 
 
 @rest.post('')
@@ -78,7 +78,9 @@ def reallocate(req, device_id, data):
 @rest.get('/allocations', query=True)
 def allocations_list(req, query, detail=False):
     """List all allocations on all device segments."""
-    return api_utils.render(allocations=_api.list_allocations(query))
+    etag, allocations = _api.list_allocations(query,
+                                              etags=req.if_none_match)
+    return api_utils.render_with_etag(etag, 'allocations', allocations)
 
 
 @rest.get('/<device_id>/allocation')
@@ -13,6 +13,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from blazar.api.v1 import utils as api_utils
+from blazar import context
+from blazar.db import api as db_api
+from blazar.db import utils as db_utils
 from blazar.manager.service import get_plugins
 from blazar import policy
 from blazar.utils import trusts
@@ -55,3 +59,27 @@ class API(object):
         :type floatingip_id: str
         """
         self.plugin.delete_floatingip(floatingip_id)
+
+    @policy.authorize('floatingips', 'get_allocations')
+    def list_allocations(self, query, etags=()):
+        """List all allocations on all floatingips.
+
+        :param query: parameters to query allocations
+        :type query: dict
+        :param etags: ETags of the allocations known by the client
+        :returns: the ETag of the allocations, and the allocations or None
+                  if the client knows them
+        """
+        ctx = context.current()
+        detail = False
+
+        if policy.enforce(ctx, 'admin', {}, do_raise=False):
+            detail = True
+
+        with db_api.replica_reader():
+            etag = api_utils.etag(
+                db_utils.get_allocation_revision('floatingip'), query,
+                detail)
+            if etag in etags:
+                return etag, None
+            return etag, self.plugin.list_allocations(query, detail=detail)
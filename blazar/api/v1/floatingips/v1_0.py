@@ -50,6 +50,14 @@ def floatingips_get(req, floatingip_id):
     return api_utils.render(floatingip=_api.get_floatingip(floatingip_id))
 
 
+@rest.get('/allocations', query=True)
+def allocations_list(req, query):
+    """List all allocations on all floatingips."""
+    etag, allocations = _api.list_allocations(query,
+                                              etags=req.if_none_match)
+    return api_utils.render_with_etag(etag, 'allocations', allocations)
+
+
 @rest.delete('/<floatingip_id>')
 @validation.check_exists(_api.get_floatingip, floatingip_id='floatingip_id')
 def floatingips_delete(req, floatingip_id):
@@ -31,15 +31,21 @@ class API(object):
     # Leases operations
 
     @policy.authorize('leases', 'get')
-    def get_leases(self, query):
-        """List all existing leases."""
+    def get_leases(self, query, profile='full'):
+        """List all existing leases.
+
+        :param query: Filters, sorting and paging of the leases.
+        :type query: dict
+        :param profile: Loading profile of the leases, see db_api.lease_list.
+        :type profile: str
+        """
         ctx = context.current()
         if policy.enforce(ctx, 'admin', {}, do_raise=False):
             project_id = None
         else:
             project_id = ctx.project_id
         return self.manager_service.list_leases(project_id=project_id,
-                                                query=query)
+                                                query=query, profile=profile)
 
     @policy.authorize('leases', 'post')
     @trusts.use_trust_auth()
@@ -57,13 +63,15 @@ class API(object):
         return self.manager_service.create_lease(data)
 
     @policy.authorize('leases', 'get')
-    def get_lease(self, lease_id):
+    def get_lease(self, lease_id, profile='full'):
         """Get lease by its ID.
 
         :param lease_id: ID of the lease in Blazar DB.
         :type lease_id: str
+        :param profile: Loading profile of the lease, see db_api.lease_get.
+        :type profile: str
         """
-        return self.manager_service.get_lease(lease_id)
+        return self.manager_service.get_lease(lease_id, profile=profile)
 
     @policy.authorize('leases', 'get')
     def hosts_in_lease(self, lease_id):
@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
+
 from oslo_log import log as logging
 
 from blazar.api.v1.leases import service
@@ -30,6 +32,8 @@ def get_rest():
 
 rest = api_utils.Rest('v1_0', __name__, url_prefix='/v1')
 _api = utils.LazyProxy(service.API)
+# Checking that a lease exists only needs its columns.
+_get_lease_summary = functools.partial(_api.get_lease, profile='summary')
 
 
 # Leases operations
@@ -47,21 +51,21 @@ def leases_create(req, data):
 
 
 @rest.get('/leases/<lease_id>')
-@validation.check_exists(_api.get_lease, lease_id='lease_id')
+@validation.check_exists(_get_lease_summary, lease_id='lease_id')
 def leases_get(req, lease_id):
     """Get lease by its ID."""
     return api_utils.render(lease=_api.get_lease(lease_id))
 
 
 @rest.put('/leases/<lease_id>')
-@validation.check_exists(_api.get_lease, lease_id='lease_id')
+@validation.check_exists(_get_lease_summary, lease_id='lease_id')
 def leases_update(req, lease_id, data):
     """Update lease."""
     return api_utils.render(lease=_api.update_lease(lease_id, data))
 
 
 @rest.delete('/leases/<lease_id>')
-@validation.check_exists(_api.get_lease, lease_id='lease_id')
+@validation.check_exists(_get_lease_summary, lease_id='lease_id')
 def leases_delete(req, lease_id):
     """Delete specified lease."""
     _api.delete_lease(lease_id)
@@ -13,7 +13,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from blazar.api.v1 import utils as api_utils
 from blazar import context
+from blazar.db import api as db_api
+from blazar.db import utils as db_utils
 from blazar.manager.service import get_plugins
 from blazar import policy
 from blazar.utils import trusts
@@ -69,11 +72,14 @@ class API(object):
         self.plugin.delete_network(network_id)
 
     @policy.authorize('networks', 'get_allocations')
-    def list_allocations(self, query):
+    def list_allocations(self, query, etags=()):
         """List all allocations on all network segments.
 
         :param query: parameter to query allocations
         :type query: dict
+        :param etags: ETags of the allocations known by the client
+        :returns: the ETag of the allocations, and the allocations or None
+                  if the client knows them
         """
         ctx = context.current()
         detail = False
@@ -81,7 +87,12 @@ class API(object):
         if policy.enforce(ctx, 'admin', {}, do_raise=False):
             detail = True
 
-        return self.plugin.list_allocations(query, detail=detail)
+        with db_api.replica_reader():
+            etag = api_utils.etag(
+                db_utils.get_allocation_revision('network'), query, detail)
+            if etag in etags:
+                return etag, None
+            return etag, self.plugin.list_allocations(query, detail=detail)
 
     @policy.authorize('networks', 'get_allocations')
     def get_allocations(self, network_id, query):
@@ -92,7 +103,8 @@ class API(object):
         :param query: parameters to query allocation
         :type query: dict
         """
-        return self.plugin.get_allocations(network_id, query)
+        with db_api.replica_reader():
+            return self.plugin.get_allocations(network_id, query)
 
     @policy.authorize('networks', 'get_resource_properties')
     def list_resource_properties(self, query):
@@ -33,7 +33,7 @@ _api = utils.LazyProxy(service.API)
 @rest.get('')
 def networks_list(req):
     """List all existing networks."""
-    return api_utils.render(networks=_api.get_networks())
+    return api_utils.render_stream('networks', _api.get_networks())
 
 
 @rest.post('')
@@ -71,7 +71,9 @@ def networks_delete(req, network_id):
 @rest.get('/allocations', query=True)
 def allocations_list(req, query, detail=False):
     """List all allocations on all network segments."""
-    return api_utils.render(allocations=_api.list_allocations(query))
+    etag, allocations = _api.list_allocations(query,
+                                              etags=req.if_none_match)
+    return api_utils.render_with_etag(etag, 'allocations', allocations)
 
 
 @rest.get('/<network_id>/allocation', query=True)
@@ -33,7 +33,7 @@ _api = utils.LazyProxy(service.API)
 @rest.get('', query=True)
 def computehosts_list(req, query=None):
     """List all existing computehosts."""
-    return api_utils.render(hosts=_api.get_computehosts(query))
+    return api_utils.render_stream('hosts', _api.get_computehosts(query))
 
 
 @rest.post('')
@@ -71,7 +71,9 @@ def computehosts_delete(req, host_id):
 @rest.get('/allocations', query=True)
 def allocations_list(req, query):
     """List all allocations on all computehosts."""
-    return api_utils.render(allocations=_api.list_allocations(query))
+    etag, allocations = _api.list_allocations(query,
+                                              etags=req.if_none_match)
+    return api_utils.render_with_etag(etag, 'allocations', allocations)
 
 
 @rest.get('/<host_id>/allocation', query=True)
@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
 import traceback
 
 import flask
@@ -262,6 +263,58 @@ def render(result=None, response_type=None, status=None, **kwargs):
                           mimetype=response_type)
 
 
+def render_stream(key, items, status=None):
+    """Render a response listing items lazily.
+
+    The body is a JSON object whose only member is the array of items. It is
+    serialized item by item while being sent with chunked transfer encoding,
+    so that large listings are never held in memory as a whole.
+    """
+    status_code = status or getattr(flask.request, 'status_code', None) or 200
+    response_type = getattr(flask.request, 'resp_type', RT_JSON)
+    if "application/json" not in response_type:
+        abort_and_log(400,
+                      _("Content type '%s' isn't supported") % response_type)
+        return
+
+    # NOTE: the first item is read before the response is returned, so that
+    # errors of the listing are still rendered as error responses.
+    items = iter(items)
+    end = object()
+    first = next(items, end)
+
+    def generate():
+        yield b'{' + jsonutils.dump_as_bytes(key) + b': ['
+        if first is not end:
+            yield jsonutils.dump_as_bytes(first)
+            for item in items:
+                yield b', ' + jsonutils.dump_as_bytes(item)
+        yield b']}'
+
+    return flask.Response(response=generate(), status=status_code,
+                          mimetype=str(RT_JSON))
+
+
+def etag(*values):
+    """Return a strong ETag of JSON serializable values."""
+    return hashlib.sha256(
+        jsonutils.dump_as_bytes(values, sort_keys=True)).hexdigest()
+
+
+def render_with_etag(etag, key, items):
+    """Render a response listing items lazily, with an ETag.
+
+    The response is 304 Not Modified with an empty body if the request has
+    the ETag in its If-None-Match header.
+    """
+    if flask.request.if_none_match.contains(etag):
+        response = flask.Response(status=304)
+    else:
+        response = render_stream(key, items)
+    response.set_etag(etag)
+    return response
+
+
 def request_data():
     """Method called to process POST and PUT REST methods."""
     if hasattr(flask.request, 'parsed_data'):
@@ -97,11 +97,31 @@ class LeasesController(extensions.BaseController):
         return Lease.convert(lease)
 
     @policy.authorize('leases', 'get')
-    @wsme_pecan.wsexpose([Lease], q=[])
-    def get_all(self):
-        """Returns all leases."""
+    @wsme_pecan.wsexpose([Lease], types.UuidType(), int, wtypes.text,
+                         wtypes.text, wtypes.text, wtypes.text, wtypes.text,
+                         wtypes.text, wtypes.text)
+    def get_all(self, marker=None, limit=None, sort_key=None, sort_dir=None,
+                status=None, name=None, resource_type=None, start_date=None,
+                end_date=None):
+        """Returns leases, optionally filtered and paginated.
+
+        :param marker: ID of the last lease of the previous page
+        :param limit: maximum number of leases to return
+        :param sort_key: created_at, start_date or end_date
+        :param sort_dir: asc or desc
+        :param status: status of the leases
+        :param name: name of the leases
+        :param resource_type: type of a reservation of the leases
+        :param start_date: start of the period the leases overlap
+        :param end_date: end of the period the leases overlap
+        """
+        query = {'marker': marker, 'limit': limit, 'sort_key': sort_key,
+                 'sort_dir': sort_dir, 'status': status, 'name': name,
+                 'resource_type': resource_type, 'start_date': start_date,
+                 'end_date': end_date}
+        query = {k: v for k, v in query.items() if v is not None}
         return [Lease.convert(lease)
-                for lease in pecan.request.rpcapi.list_leases()]
+                for lease in pecan.request.rpcapi.list_leases(query=query)]
 
     @policy.authorize('leases', 'post')
     @wsme_pecan.wsexpose(Lease, body=Lease, status_code=201)
@@ -52,11 +52,21 @@ def main():
     service_utils.prepare_service(sys.argv)
     db_api.setup_db()
     notifier.init()
-    service.launch(
-        cfg.CONF,
-        ManagerServiceSingleton(),
-        restart_method='mutate'
-    ).wait()
+    workers = cfg.CONF.manager.workers
+    if workers > 1:
+        # NOTE: each worker gets its own service so that only the first one
+        # runs the monitors and periodic tasks.
+        launcher = service.ProcessLauncher(cfg.CONF, restart_method='mutate')
+        for worker_index in range(workers):
+            launcher.launch_service(
+                manager_service.ManagerService(worker_index=worker_index))
+        launcher.wait()
+    else:
+        service.launch(
+            cfg.CONF,
+            ManagerServiceSingleton(),
+            restart_method='mutate'
+        ).wait()
 
 
 if __name__ == '__main__':
@@ -17,7 +17,10 @@ import sys
 from oslo_config import cfg
 from oslo_upgradecheck import common_checks
 from oslo_upgradecheck import upgradecheck
+import sqlalchemy as sa
 
+from blazar.db.sqlalchemy import facade_wrapper
+from blazar.db.sqlalchemy import models
 from blazar.i18n import _
 
 
@@ -35,9 +38,34 @@ class Checks(upgradecheck.UpgradeCommands):
     # If the check hits warnings or failures then those should be stored
     # in the returned Result's "details" attribute. The
     # summary will be rolled up at the end of the check() method.
+
+    def _check_database_indexes(self):
+        """Check that the indexes declared by the models exist."""
+        inspector = sa.inspect(facade_wrapper.get_engine())
+        missing = []
+        for table in models.Lease.metadata.sorted_tables:
+            if not table.indexes:
+                continue
+            try:
+                existing = {index['name']
+                            for index in inspector.get_indexes(table.name)}
+            except sa.exc.NoSuchTableError:
+                existing = set()
+            missing.extend('%s.%s' % (table.name, index.name)
+                           for index in table.indexes
+                           if index.name not in existing)
+
+        if missing:
+            return upgradecheck.Result(
+                upgradecheck.Code.WARNING,
+                _('Missing database indexes: %s. Run "blazar-db-manage '
+                  'upgrade head" to create them.') % ', '.join(missing))
+        return upgradecheck.Result(upgradecheck.Code.SUCCESS)
+
     _upgrade_checks = (
         (_("Policy File JSON to YAML Migration"),
          (common_checks.check_policy_json, {'conf': cfg.CONF})),
+        (_("Database Indexes"), _check_database_indexes),
     )
 
 
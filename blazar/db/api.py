@@ -31,11 +31,15 @@ interface.
 
 """
 
+import contextlib
+
 from oslo_config import cfg
 from oslo_db import api as db_api
 from oslo_db import options as db_options
 from oslo_log import log as logging
 
+from blazar.db import availability
+
 
 _BACKEND_MAPPING = {
     'sqlalchemy': 'blazar.db.sqlalchemy.api',
@@ -43,7 +47,8 @@ _BACKEND_MAPPING = {
 
 db_options.set_defaults(cfg.CONF)
 IMPL = db_api.DBAPI(cfg.CONF.database.backend,
-                    backend_mapping=_BACKEND_MAPPING)
+                    backend_mapping=_BACKEND_MAPPING,
+                    lazy=True)
 LOG = logging.getLogger(__name__)
 
 # The maximum value a signed INT type may have
@@ -71,6 +76,31 @@ def drop_db():
     return IMPL.drop_db()
 
 
+@contextlib.contextmanager
+def transaction():
+    """Run the DB API calls of a block in a single transaction.
+
+    The calls made by the current thread in the block are committed together
+    when it exits, or rolled back together if it raises. Calls in the block
+    see the changes of the previous ones.
+    """
+    with availability.transaction():
+        with IMPL.transaction():
+            yield
+
+
+@contextlib.contextmanager
+def replica_reader():
+    """Run the DB API read calls of a block on the replica database.
+
+    The calls made by the current thread in the block read from the replica
+    database when [database]/replica_queries is set, so they may miss the
+    latest changes. No change can be made in the block.
+    """
+    with IMPL.async_reader():
+        yield
+
+
 # Helpers for building constraints / equality checks
 
 
@@ -140,6 +170,7 @@ def reservation_get(reservation_id):
 def reservation_destroy(reservation_id):
     """Delete specific reservation."""
     IMPL.reservation_destroy(reservation_id)
+    availability.reservation_destroyed(reservation_id)
 
 
 def reservation_update(reservation_id, reservation_values):
@@ -173,9 +204,14 @@ def lease_get_all_by_user(user_id):
 
 
 @to_dict
-def lease_get(lease_id):
-    """Return lease."""
-    return IMPL.lease_get(lease_id)
+def lease_get(lease_id, profile='full'):
+    """Return lease.
+
+    :param profile: the relationships to load, one of 'summary' (lease
+                    only), 'with_reservations' or 'full' (reservations,
+                    allocations and events).
+    """
+    return IMPL.lease_get(lease_id, profile=profile)
 
 
 @to_dict
@@ -197,19 +233,36 @@ def devices_in_lease(lease_id):
 
 
 @to_dict
-def lease_list(project_id=None):
-    """Return a list of all existing leases."""
-    return IMPL.lease_list(project_id)
+def lease_list(project_id=None, profile='full', filters=None,
+               sort_key='created_at', sort_dir='asc', limit=None,
+               marker=None):
+    """Return a list of all existing leases.
+
+    :param profile: the relationships to load, see lease_get().
+    :param filters: dict of status, name, resource_type, start_date and
+                    end_date values the leases must match. Leases match
+                    start_date and end_date if they overlap this period.
+    :param sort_key: one of created_at, start_date or end_date.
+    :param sort_dir: asc or desc.
+    :param limit: maximum number of leases to return.
+    :param marker: ID of the last lease of the previous page.
+    """
+    return IMPL.lease_list(project_id, profile=profile, filters=filters,
+                           sort_key=sort_key, sort_dir=sort_dir,
+                           limit=limit, marker=marker)
 
 
 def lease_destroy(lease_id):
     """Delete lease or raise if not exists."""
     IMPL.lease_destroy(lease_id)
+    availability.lease_destroyed(lease_id)
 
 
 def lease_update(lease_id, lease_values):
     """Update lease or raise if not exists."""
     IMPL.lease_update(lease_id, lease_values)
+    if 'start_date' in lease_values or 'end_date' in lease_values:
+        availability.lease_updated(lease_id)
 
 
 # Events
@@ -246,6 +299,25 @@ def event_get_all_sorted_by_filters(sort_key, sort_dir, filters):
                                                 filters)
 
 
+@to_dict
+def event_claim_due(now, limit, worker_id):
+    """Claim up to limit events due at now for a worker.
+
+    The claimed events are set IN_PROGRESS and returned sorted by time.
+    """
+    return IMPL.event_claim_due(now, limit, worker_id)
+
+
+def event_renew_claims(worker_id, now):
+    """Extend the claims of a worker on its events in progress."""
+    return IMPL.event_renew_claims(worker_id, now)
+
+
+def event_release_expired_claims(expiry):
+    """Release the events whose claim was last renewed before expiry."""
+    return IMPL.event_release_expired_claims(expiry)
+
+
 def event_destroy(event_id):
     """Delete event or raise if not exists."""
     IMPL.event_destroy(event_id)
@@ -321,7 +393,9 @@ def instance_reservation_destroy(instance_reservation_id):
 
 def host_allocation_create(allocation_values):
     """Create an allocation from the values."""
-    return IMPL.host_allocation_create(allocation_values)
+    allocation = IMPL.host_allocation_create(allocation_values)
+    availability.allocation_created('host', allocation['id'])
+    return allocation
 
 
 @to_dict
@@ -336,11 +410,27 @@ def host_allocation_get_all_by_values(**kwargs):
 def host_allocation_destroy(allocation_id):
     """Delete specific allocation."""
     IMPL.host_allocation_destroy(allocation_id)
+    availability.allocation_destroyed('host', allocation_id)
+
+
+def host_allocation_bulk_create(values_list):
+    """Create allocations from a list of values in one transaction."""
+    allocations = IMPL.host_allocation_bulk_create(values_list)
+    availability.allocations_created('host',
+                                     [a['id'] for a in allocations])
+    return allocations
+
+
+def host_allocation_bulk_destroy(allocation_ids):
+    """Delete allocations in one transaction."""
+    IMPL.host_allocation_bulk_destroy(allocation_ids)
+    availability.allocations_destroyed('host', allocation_ids)
 
 
 def host_allocation_update(allocation_id, allocation_values):
     """Update allocation."""
     IMPL.host_allocation_update(allocation_id, allocation_values)
+    availability.allocation_updated('host', allocation_id)
 
 
 # Compute Hosts
@@ -396,6 +486,11 @@ def host_update(host_id, values):
     IMPL.host_update(host_id, values)
 
 
+def host_bulk_update(host_ids, values):
+    """Update Compute hosts in one statement."""
+    IMPL.host_bulk_update(host_ids, values)
+
+
 # ComputeHostExtraCapabilities
 
 def host_extra_capability_create(values):
@@ -493,7 +588,9 @@ def required_fip_destroy_by_fip_reservation_id(fip_reservation_id):
 
 def fip_allocation_create(allocation_values):
     """Create a floating ip allocation from the values."""
-    return IMPL.fip_allocation_create(allocation_values)
+    allocation = IMPL.fip_allocation_create(allocation_values)
+    availability.allocation_created('floatingip', allocation['id'])
+    return allocation
 
 
 @to_dict
@@ -505,11 +602,27 @@ def fip_allocation_get_all_by_values(**kwargs):
 def fip_allocation_destroy(allocation_id):
     """Delete specific floating ip allocation."""
     IMPL.fip_allocation_destroy(allocation_id)
+    availability.allocation_destroyed('floatingip', allocation_id)
+
+
+def fip_allocation_bulk_create(values_list):
+    """Create floating ip allocations from values in one transaction."""
+    allocations = IMPL.fip_allocation_bulk_create(values_list)
+    availability.allocations_created('floatingip',
+                                     [a['id'] for a in allocations])
+    return allocations
+
+
+def fip_allocation_bulk_destroy(allocation_ids):
+    """Delete floating ip allocations in one transaction."""
+    IMPL.fip_allocation_bulk_destroy(allocation_ids)
+    availability.allocations_destroyed('floatingip', allocation_ids)
 
 
 def fip_allocation_update(allocation_id, allocation_values):
     """Update floating ip allocation."""
     IMPL.fip_allocation_update(allocation_id, allocation_values)
+    availability.allocation_updated('floatingip', allocation_id)
 
 
 # Floating ip
@@ -611,7 +724,9 @@ def network_update(network_id, values):
 
 def network_allocation_create(allocation_values):
     """Create an allocation from the values."""
-    return IMPL.network_allocation_create(allocation_values)
+    allocation = IMPL.network_allocation_create(allocation_values)
+    availability.allocation_created('network', allocation['id'])
+    return allocation
 
 
 @to_dict
@@ -623,6 +738,21 @@ def network_allocation_get_all_by_values(**kwargs):
 def network_allocation_destroy(allocation_id):
     """Delete specific allocation."""
     IMPL.network_allocation_destroy(allocation_id)
+    availability.allocation_destroyed('network', allocation_id)
+
+
+def network_allocation_bulk_create(values_list):
+    """Create allocations from a list of values in one transaction."""
+    allocations = IMPL.network_allocation_bulk_create(values_list)
+    availability.allocations_created('network',
+                                     [a['id'] for a in allocations])
+    return allocations
+
+
+def network_allocation_bulk_destroy(allocation_ids):
+    """Delete allocations in one transaction."""
+    IMPL.network_allocation_bulk_destroy(allocation_ids)
+    availability.allocations_destroyed('network', allocation_ids)
 
 
 # network reservation
@@ -747,7 +877,9 @@ def device_update(device_id, values):
 @to_dict
 def device_allocation_create(allocation_values):
     """Create an allocation from the values."""
-    return IMPL.device_allocation_create(allocation_values)
+    allocation = IMPL.device_allocation_create(allocation_values)
+    availability.allocation_created('device', allocation['id'])
+    return allocation
 
 
 @to_dict
@@ -759,11 +891,27 @@ def device_allocation_get_all_by_values(**kwargs):
 def device_allocation_destroy(allocation_id):
     """Delete specific allocation."""
     IMPL.device_allocation_destroy(allocation_id)
+    availability.allocation_destroyed('device', allocation_id)
+
+
+def device_allocation_bulk_create(values_list):
+    """Create allocations from a list of values in one transaction."""
+    allocations = IMPL.device_allocation_bulk_create(values_list)
+    availability.allocations_created('device',
+                                     [a['id'] for a in allocations])
+    return allocations
+
+
+def device_allocation_bulk_destroy(allocation_ids):
+    """Delete allocations in one transaction."""
+    IMPL.device_allocation_bulk_destroy(allocation_ids)
+    availability.allocations_destroyed('device', allocation_ids)
 
 
 def device_allocation_update(allocation_id, allocation_values):
     """Update allocation."""
     IMPL.device_allocation_update(allocation_id, allocation_values)
+    availability.allocation_updated('device', allocation_id)
 
 
 # device reservation
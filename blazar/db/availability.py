@@ -0,0 +1,337 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""In-memory index of the time windows during which resources are allocated.
+
+The index is built from the allocation tables when blazar-manager starts and
+is kept up to date by the allocation, reservation and lease write functions
+of blazar.db.api. Resource plugins use it to check whether a resource is free
+during a period without querying the database.
+
+The index is only valid as long as a single blazar-manager process writes
+allocations, hence it is disabled by default.
+"""
+
+import bisect
+import collections
+import contextlib
+import threading
+
+from oslo_config import cfg
+from oslo_log import log as logging
+from oslo_utils import excutils
+
+from blazar.db import utils as db_utils
+
+
+opts = [
+    cfg.BoolOpt('enable_availability_index',
+                default=False,
+                help='Keep an in-memory index of allocated time windows in '
+                     'blazar-manager and use it to find free resources '
+                     'instead of querying allocations of each candidate. '
+                     'Only enable this option when a single blazar-manager '
+                     'process is running.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(opts, 'manager')
+LOG = logging.getLogger(__name__)
+
+RESOURCE_TYPES = ('host', 'device', 'network', 'floatingip')
+
+_INDEX = None
+
+
+class IntervalSet(object):
+    """Time intervals of a single resource.
+
+    Intervals are kept sorted by start date together with the running maximum
+    of their end dates, so that checking whether any interval overlaps a
+    period is a single bisection.
+    """
+
+    def __init__(self):
+        self._intervals = []
+        self._max_ends = []
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def _refresh_max_ends(self, position):
+        del self._max_ends[position:]
+        current = self._max_ends[-1] if self._max_ends else None
+        for interval in self._intervals[position:]:
+            if current is None or interval[1] > current:
+                current = interval[1]
+            self._max_ends.append(current)
+
+    def add(self, key, start_date, end_date):
+        interval = (start_date, end_date, key)
+        position = bisect.bisect_left(self._intervals, interval)
+        self._intervals.insert(position, interval)
+        self._refresh_max_ends(position)
+
+    def remove(self, key, start_date, end_date):
+        interval = (start_date, end_date, key)
+        position = bisect.bisect_left(self._intervals, interval)
+        if (position < len(self._intervals) and
+                self._intervals[position] == interval):
+            del self._intervals[position]
+            self._refresh_max_ends(position)
+
+    def overlaps(self, start_date, end_date):
+        """Return True if an interval overlaps [start_date, end_date].
+
+        Intervals only touching the boundaries of the period do not overlap
+        it, which matches the behaviour of get_free_periods().
+        """
+        position = bisect.bisect_left(self._intervals, (end_date,))
+        return position > 0 and self._max_ends[position - 1] > start_date
+
+
+class AvailabilityIndex(object):
+    """Allocated time windows of every resource, by resource type."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._resources = {
+            resource_type: collections.defaultdict(IntervalSet)
+            for resource_type in RESOURCE_TYPES}
+        # (resource_type, allocation_id) -> (resource_id, reservation_id,
+        #                                    lease_id, start_date, end_date)
+        self._allocations = {}
+        # lease_id -> set of (resource_type, allocation_id)
+        self._leases = collections.defaultdict(set)
+        # reservation_id -> set of (resource_type, allocation_id)
+        self._reservations = collections.defaultdict(set)
+        # Keys of the allocations changed by each thread since
+        # track_changes() was called.
+        self._changes = threading.local()
+
+    def __len__(self):
+        return len(self._allocations)
+
+    def track_changes(self):
+        self._changes.keys = set()
+
+    def tracks_changes(self):
+        return getattr(self._changes, 'keys', None) is not None
+
+    def pop_changes(self):
+        keys = getattr(self._changes, 'keys', None)
+        self._changes.keys = None
+        return keys or set()
+
+    def _changed(self, key):
+        keys = getattr(self._changes, 'keys', None)
+        if keys is not None:
+            keys.add(key)
+
+    def add(self, resource_type, allocation_id, resource_id, reservation_id,
+            lease_id, start_date, end_date):
+        key = (resource_type, allocation_id)
+        with self._lock:
+            self.remove(resource_type, allocation_id)
+            self._changed(key)
+            self._resources[resource_type][resource_id].add(
+                allocation_id, start_date, end_date)
+            self._allocations[key] = (resource_id, reservation_id, lease_id,
+                                      start_date, end_date)
+            self._leases[lease_id].add(key)
+            self._reservations[reservation_id].add(key)
+
+    def load(self, resource_type, rows):
+        """Add rows as returned by db_utils.get_allocation_windows()."""
+        with self._lock:
+            for row in rows:
+                self.add(resource_type, *row)
+
+    def remove(self, resource_type, allocation_id):
+        key = (resource_type, allocation_id)
+        with self._lock:
+            allocation = self._allocations.pop(key, None)
+            if allocation is None:
+                return
+            self._changed(key)
+            resource_id, reservation_id, lease_id, start, end = allocation
+            intervals = self._resources[resource_type][resource_id]
+            intervals.remove(allocation_id, start, end)
+            if not intervals:
+                del self._resources[resource_type][resource_id]
+            self._discard(self._leases, lease_id, key)
+            self._discard(self._reservations, reservation_id, key)
+
+    def remove_reservation(self, reservation_id):
+        with self._lock:
+            for key in list(self._reservations.get(reservation_id, ())):
+                self.remove(*key)
+
+    def remove_lease(self, lease_id):
+        with self._lock:
+            for key in list(self._leases.get(lease_id, ())):
+                self.remove(*key)
+
+    def has_allocations(self, resource_type, resource_id):
+        with self._lock:
+            return resource_id in self._resources[resource_type]
+
+    def is_free(self, resource_type, resource_id, start_date, end_date):
+        with self._lock:
+            intervals = self._resources[resource_type].get(resource_id)
+            return not intervals or not intervals.overlaps(start_date,
+                                                           end_date)
+
+    @staticmethod
+    def _discard(mapping, key, value):
+        values = mapping.get(key)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del mapping[key]
+
+
+def get_index():
+    """Return the availability index, or None if it is not enabled."""
+    return _INDEX
+
+
+def build_index():
+    """Build the availability index from the allocation tables."""
+    global _INDEX
+
+    index = AvailabilityIndex()
+    for resource_type in RESOURCE_TYPES:
+        index.load(resource_type,
+                   db_utils.get_allocation_windows(resource_type))
+    _INDEX = index
+    LOG.info('Built availability index of %d allocations.',
+             len(index))
+    return index
+
+
+def find_free_resources(resource_type, resource_ids, start_date, end_date):
+    """Return the candidate resources free during a period.
+
+    The result is a tuple of two lists, in the order of resource_ids: the
+    resources which have never been allocated and the allocated resources
+    which are free during [start_date, end_date]. The availability index is
+    used when it is enabled, otherwise the allocation tables are queried
+    once for all candidates.
+    """
+    index = get_index()
+    if index is not None:
+        allocated_ids = {
+            resource_id for resource_id in resource_ids
+            if index.has_allocations(resource_type, resource_id)}
+        free_ids = {
+            resource_id for resource_id in allocated_ids
+            if index.is_free(resource_type, resource_id, start_date,
+                             end_date)}
+    else:
+        allocated_ids = set(db_utils.get_allocated_resource_ids(
+            resource_type, resource_ids))
+        free_ids = set(db_utils.get_free_resource_ids(
+            resource_type, list(allocated_ids), start_date, end_date))
+
+    not_allocated = [resource_id for resource_id in resource_ids
+                     if resource_id not in allocated_ids]
+    allocated = [resource_id for resource_id in resource_ids
+                 if resource_id in free_ids]
+    return not_allocated, allocated
+
+
+def clear_index():
+    global _INDEX
+    _INDEX = None
+
+
+def _reload(index, keys):
+    allocation_ids = collections.defaultdict(list)
+    for resource_type, allocation_id in keys:
+        index.remove(resource_type, allocation_id)
+        allocation_ids[resource_type].append(allocation_id)
+    for resource_type, ids in allocation_ids.items():
+        index.load(resource_type, db_utils.get_allocation_windows(
+            resource_type, allocation_ids=ids))
+
+
+@contextlib.contextmanager
+def transaction():
+    """Restore the allocations changed by a block if it raises.
+
+    The index is updated as soon as allocations are written, so that the
+    following calls of a database transaction see them. When the transaction
+    is rolled back, the allocations it changed are reloaded from the
+    database.
+    """
+    index = _INDEX
+    if index is None or index.tracks_changes():
+        yield
+        return
+
+    index.track_changes()
+    try:
+        yield
+    except Exception:
+        with excutils.save_and_reraise_exception():
+            _reload(index, index.pop_changes())
+    finally:
+        index.pop_changes()
+
+
+def allocation_created(resource_type, allocation_id):
+    if _INDEX is not None:
+        _INDEX.load(resource_type, db_utils.get_allocation_windows(
+            resource_type, allocation_id=allocation_id))
+
+
+def allocations_created(resource_type, allocation_ids):
+    if _INDEX is not None and allocation_ids:
+        _INDEX.load(resource_type, db_utils.get_allocation_windows(
+            resource_type, allocation_ids=allocation_ids))
+
+
+def allocation_updated(resource_type, allocation_id):
+    if _INDEX is not None:
+        _INDEX.remove(resource_type, allocation_id)
+        allocation_created(resource_type, allocation_id)
+
+
+def allocation_destroyed(resource_type, allocation_id):
+    if _INDEX is not None:
+        _INDEX.remove(resource_type, allocation_id)
+
+
+def allocations_destroyed(resource_type, allocation_ids):
+    if _INDEX is not None:
+        for allocation_id in allocation_ids:
+            _INDEX.remove(resource_type, allocation_id)
+
+
+def reservation_destroyed(reservation_id):
+    if _INDEX is not None:
+        _INDEX.remove_reservation(reservation_id)
+
+
+def lease_updated(lease_id):
+    if _INDEX is not None:
+        _INDEX.remove_lease(lease_id)
+        for resource_type in RESOURCE_TYPES:
+            _INDEX.load(resource_type, db_utils.get_allocation_windows(
+                resource_type, lease_id=lease_id))
+
+
+def lease_destroyed(lease_id):
+    if _INDEX is not None:
+        _INDEX.remove_lease(lease_id)
@@ -42,6 +42,10 @@ class BlazarDBInvalidFilterOperator(BlazarDBException):
     msg_fmt = _('%(filter_operator)s is invalid')
 
 
+class BlazarDBInvalidLoadingProfile(BlazarDBException):
+    msg_fmt = _('%(profile)s is not a valid loading profile')
+
+
 class BlazarDBExtraCapabilitiesNotEnabled(BlazarDBException):
     msq_fmt = _('%(resource_type)s does not have extra capabilities enabled.')
 
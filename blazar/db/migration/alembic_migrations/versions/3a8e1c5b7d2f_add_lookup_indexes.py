@@ -0,0 +1,63 @@
+# Copyright 2026 OpenStack Foundation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Add composite indexes for lookup paths
+
+Revision ID: 3a8e1c5b7d2f
+Revises: ee3b2513b59f
+Create Date: 2026-10-16 09:12:41.318264
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3a8e1c5b7d2f'
+down_revision = 'ee3b2513b59f'
+
+from alembic import op
+
+INDEXES = (
+    ('ix_leases_project_id_deleted', 'leases',
+     ['project_id', 'deleted']),
+    ('ix_reservations_lease_id_deleted', 'reservations',
+     ['lease_id', 'deleted']),
+    ('ix_events_status_time', 'events',
+     ['status', 'time']),
+    ('ix_computehost_allocations_compute_host_id_deleted',
+     'computehost_allocations', ['compute_host_id', 'deleted']),
+    ('ix_computehost_allocations_reservation_id_deleted',
+     'computehost_allocations', ['reservation_id', 'deleted']),
+    ('ix_floatingip_allocations_floatingip_id_deleted',
+     'floatingip_allocations', ['floatingip_id', 'deleted']),
+    ('ix_floatingip_allocations_reservation_id_deleted',
+     'floatingip_allocations', ['reservation_id', 'deleted']),
+    ('ix_network_allocations_network_id_deleted',
+     'network_allocations', ['network_id', 'deleted']),
+    ('ix_network_allocations_reservation_id_deleted',
+     'network_allocations', ['reservation_id', 'deleted']),
+    ('ix_device_allocations_device_id_deleted',
+     'device_allocations', ['device_id', 'deleted']),
+    ('ix_device_allocations_reservation_id_deleted',
+     'device_allocations', ['reservation_id', 'deleted']),
+)
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade():
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
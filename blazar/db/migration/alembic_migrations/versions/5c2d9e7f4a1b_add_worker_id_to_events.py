@@ -0,0 +1,38 @@
+# Copyright 2026 OpenStack Foundation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Add worker_id to events
+
+Revision ID: 5c2d9e7f4a1b
+Revises: 3a8e1c5b7d2f
+Create Date: 2026-10-16 14:03:27.605918
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5c2d9e7f4a1b'
+down_revision = '3a8e1c5b7d2f'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('events', sa.Column(
+        'worker_id', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    op.drop_column('events', 'worker_id')
@@ -0,0 +1,50 @@
+# Copyright 2026 OpenStack Foundation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Add allocation_revisions
+
+Revision ID: 8e4f0a2c6d3b
+Revises: 5c2d9e7f4a1b
+Create Date: 2026-10-16 16:21:43.118204
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8e4f0a2c6d3b'
+down_revision = '5c2d9e7f4a1b'
+
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    allocation_revisions = op.create_table(
+        'allocation_revisions',
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('resource_type', sa.String(length=36), nullable=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('resource_type'))
+
+    now = datetime.datetime.utcnow()
+    op.bulk_insert(allocation_revisions, [
+        {'resource_type': resource_type, 'revision': 0, 'created_at': now}
+        for resource_type in ('host', 'device', 'network', 'floatingip')])
+
+
+def downgrade():
+    op.drop_table('allocation_revisions')
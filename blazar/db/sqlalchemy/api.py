@@ -15,6 +15,7 @@
 
 """Implementation of SQLAlchemy backend."""
 
+import itertools
 import sys
 
 from oslo_config import cfg
@@ -22,10 +23,15 @@ from oslo_config import cfg
 from blazar.db import exceptions as db_exc
 from blazar.db.sqlalchemy import facade_wrapper
 from blazar.db.sqlalchemy import models
+from blazar import status
 from oslo_db import exception as common_db_exc
-from oslo_db.sqlalchemy import session as db_session
+from oslo_db.sqlalchemy import engines
+from oslo_db.sqlalchemy import utils as db_utils
 from oslo_log import log as logging
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
 import sqlalchemy as sa
+from sqlalchemy import orm
 from sqlalchemy.sql.expression import asc
 from sqlalchemy.sql.expression import desc
 
@@ -41,7 +47,10 @@ FORBIDDEN_RESOURCE_PROPERTY_NAMES = ["id", "reservable"]
 LOG = logging.getLogger(__name__)
 
 get_engine = facade_wrapper.get_engine
-get_session = facade_wrapper.get_session
+reader = facade_wrapper.reader
+async_reader = facade_wrapper.async_reader
+writer = facade_wrapper.writer
+transaction = facade_wrapper.transaction
 
 
 def get_backend():
@@ -59,20 +68,19 @@ def _read_deleted_filter(query, db_model, deleted):
     return query
 
 
-def model_query(model, session=None, deleted=False):
+def model_query(model, session, deleted=False):
     """Query helper.
 
     :param model: base model to query
+    :param session: session of the reader or writer transaction to query
     """
-    session = session or get_session()
-
     return _read_deleted_filter(session.query(model), model, deleted)
 
 
 def setup_db():
     try:
-        engine = db_session.EngineFacade(cfg.CONF.database.connection,
-                                         sqlite_fk=True).get_engine()
+        engine = engines.create_engine(cfg.CONF.database.connection,
+                                       sqlite_fk=True)
         models.Lease.metadata.create_all(engine)
     except sa.exc.OperationalError as e:
         LOG.error("Database registration exception: %s", e)
@@ -82,8 +90,8 @@ def setup_db():
 
 def drop_db():
     try:
-        engine = db_session.EngineFacade(cfg.CONF.database.connection,
-                                         sqlite_fk=True).get_engine()
+        engine = engines.create_engine(cfg.CONF.database.connection,
+                                       sqlite_fk=True)
         models.Lease.metadata.drop_all(engine)
     except Exception as e:
         LOG.error("Database shutdown exception: %s", e)
@@ -91,6 +99,71 @@ def drop_db():
     return True
 
 
+# Allocation revisions
+
+# Allocation revision changed by the changes of each model.
+REVISION_TYPES = {
+    models.ComputeHost: 'host',
+    models.ComputeHostAllocation: 'host',
+    models.Device: 'device',
+    models.DeviceAllocation: 'device',
+    models.NetworkSegment: 'network',
+    models.NetworkAllocation: 'network',
+    models.FloatingIP: 'floatingip',
+    models.FloatingIPAllocation: 'floatingip',
+}
+
+# Allocation revision changed by the changes of each type of reservation.
+RESERVATION_REVISION_TYPES = {
+    'physical:host': 'host',
+    'virtual:instance': 'host',
+    'device': 'device',
+    'network': 'network',
+    'virtual:floatingip': 'floatingip',
+}
+
+
+def _revision_types(obj):
+    if isinstance(obj, models.Lease):
+        reservation_types = {r.resource_type for r in obj.reservations}
+    elif isinstance(obj, models.Reservation):
+        reservation_types = {obj.resource_type}
+    else:
+        return {REVISION_TYPES.get(type(obj))} - {None}
+    return {RESERVATION_REVISION_TYPES.get(t)
+            for t in reservation_types} - {None}
+
+
+def _allocations_changed(session, *resource_types):
+    """Increment the allocation revisions when the transaction commits."""
+    session.info.setdefault('allocation_revisions', set()).update(
+        resource_types)
+
+
+@sa.event.listens_for(orm.Session, 'before_flush')
+def _track_allocation_changes(session, flush_context, instances):
+    dirty = [obj for obj in session.dirty if session.is_modified(obj)]
+    for obj in itertools.chain(session.new, dirty, session.deleted):
+        _allocations_changed(session, *_revision_types(obj))
+
+
+@sa.event.listens_for(orm.Session, 'before_commit')
+def _increment_allocation_revisions(session):
+    session.flush()
+    resource_types = session.info.pop('allocation_revisions', ())
+    # NOTE: the revisions are locked in the same order by all transactions
+    # and only until they commit.
+    revision = models.AllocationRevision.revision
+    for resource_type in sorted(resource_types):
+        updated = (session.query(models.AllocationRevision)
+                   .filter_by(resource_type=resource_type)
+                   .update({'revision': revision + 1},
+                           synchronize_session=False))
+        if not updated:
+            session.add(models.AllocationRevision(
+                resource_type=resource_type, revision=1))
+
+
 # Helpers for building constraints / equality checks
 
 
@@ -140,29 +213,33 @@ def _reservation_get(session, reservation_id):
 
 
 def reservation_get(reservation_id):
-    return _reservation_get(get_session(), reservation_id)
+    with reader() as session:
+        return _reservation_get(session, reservation_id)
 
 
 def reservation_get_all():
-    query = model_query(models.Reservation, get_session())
-    return query.all()
+    with reader() as session:
+        query = model_query(models.Reservation, session)
+        return query.all()
 
 
 def reservation_get_all_by_lease_id(lease_id):
-    reservations = (model_query(models.Reservation,
-                                get_session()).filter_by(lease_id=lease_id))
-    return reservations.all()
+    with reader() as session:
+        reservations = (model_query(models.Reservation,
+                                    session).filter_by(lease_id=lease_id))
+        return reservations.all()
 
 
 def reservation_get_all_by_values(**kwargs):
     """Returns all entries filtered by col=value."""
 
-    reservation_query = model_query(models.Reservation, get_session())
-    for name, value in kwargs.items():
-        column = getattr(models.Reservation, name, None)
-        if column:
-            reservation_query = reservation_query.filter(column == value)
-    return reservation_query.all()
+    with reader() as session:
+        reservation_query = model_query(models.Reservation, session)
+        for name, value in kwargs.items():
+            column = getattr(models.Reservation, name, None)
+            if column:
+                reservation_query = reservation_query.filter(column == value)
+        return reservation_query.all()
 
 
 def reservation_create(values):
@@ -170,8 +247,7 @@ def reservation_create(values):
     reservation = models.Reservation()
     reservation.update(values)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             reservation.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -179,18 +255,16 @@ def reservation_create(values):
             raise db_exc.BlazarDBDuplicateEntry(
                 model=reservation.__class__.__name__, columns=e.columns)
 
-    return reservation_get(reservation.id)
+        return reservation_get(reservation.id)
 
 
 def reservation_update(reservation_id, values):
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         reservation = _reservation_get(session, reservation_id)
         reservation.update(values)
         reservation.save(session=session)
 
-    return reservation_get(reservation_id)
+        return reservation
 
 
 def _reservation_destroy(session, reservation):
@@ -222,8 +296,7 @@ def _reservation_destroy(session, reservation):
 
 
 def reservation_destroy(reservation_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         reservation = _reservation_get(session, reservation_id)
 
         if not reservation:
@@ -235,18 +308,61 @@ def reservation_destroy(reservation_id):
 
 
 # Lease
-def _lease_get(session, lease_id):
+LEASE_PROFILES = ('summary', 'with_reservations', 'full')
+LEASE_SORT_KEYS = ('created_at', 'start_date', 'end_date')
+
+# Relationships of Reservation which are not needed to build its dict.
+_RESERVATION_ALLOCATIONS = (
+    models.Reservation.computehost_allocations,
+    models.Reservation.floatingip_allocations,
+    models.Reservation.network_allocations,
+    models.Reservation.device_allocations,
+)
+
+
+def _lease_loading_options(profile):
+    """Return the query options loading leases with the given profile.
+
+    The summary profile only loads the lease columns. The with_reservations
+    profile also loads the reservations with their plugin specific
+    reservation, and the full profile loads allocations and events too.
+    Collections are loaded with one additional SELECT ... IN query each
+    instead of the LEFT OUTER JOINs declared on the models, which multiply
+    the number of rows returned for every lease.
+    """
+    if profile not in LEASE_PROFILES:
+        raise db_exc.BlazarDBInvalidLoadingProfile(profile=profile)
+
+    if profile == 'summary':
+        return [orm.lazyload(models.Lease.reservations),
+                orm.lazyload(models.Lease.events)]
+
+    reservations = orm.selectinload(models.Lease.reservations)
+    if profile == 'with_reservations':
+        return ([reservations.lazyload(relationship)
+                 for relationship in _RESERVATION_ALLOCATIONS] +
+                [orm.lazyload(models.Lease.events)])
+
+    return ([reservations.selectinload(relationship)
+             for relationship in _RESERVATION_ALLOCATIONS] +
+            [orm.selectinload(models.Lease.events)])
+
+
+def _lease_get(session, lease_id, profile='full'):
     query = model_query(models.Lease, session)
+    query = query.options(*_lease_loading_options(profile))
     return query.filter_by(id=lease_id).first()
 
 
-def lease_get(lease_id):
-    return _lease_get(get_session(), lease_id)
+def lease_get(lease_id, profile='full'):
+    with reader() as session:
+        return _lease_get(session, lease_id, profile=profile)
 
 
 def lease_get_all():
-    query = model_query(models.Lease, get_session())
-    return query.all()
+    with reader() as session:
+        query = model_query(models.Lease, session)
+        return query.all()
 
 
 def lease_get_all_by_project(project_id):
@@ -258,64 +374,107 @@ def lease_get_all_by_user(user_id):
 
 
 def hosts_in_lease(lease_id):
-    query = model_query(models.ComputeHost, get_session())
-    query = query.join(
-        models.ComputeHostAllocation,
-        models.ComputeHostAllocation.compute_host_id == models.ComputeHost.id
-    ).join(
-        models.ComputeHostReservation,
-        models.ComputeHostReservation.reservation_id == models.ComputeHostAllocation.reservation_id
-    ).join(
-        models.Reservation,
-        models.Reservation.id == models.ComputeHostReservation.reservation_id
-    ).join(
-        models.Lease,
-        models.Lease.id == models.Reservation.lease_id
-    ).filter(models.Lease.id == lease_id)
-    return query.all()
+    with reader() as session:
+        query = model_query(models.ComputeHost, session)
+        query = query.join(
+            models.ComputeHostAllocation,
+            models.ComputeHostAllocation.compute_host_id == models.ComputeHost.id
+        ).join(
+            models.ComputeHostReservation,
+            models.ComputeHostReservation.reservation_id == models.ComputeHostAllocation.reservation_id
+        ).join(
+            models.Reservation,
+            models.Reservation.id == models.ComputeHostReservation.reservation_id
+        ).join(
+            models.Lease,
+            models.Lease.id == models.Reservation.lease_id
+        ).filter(models.Lease.id == lease_id)
+        return query.all()
 
 
 def devices_in_lease(lease_id):
-    query = model_query(models.Device, get_session())
-    query = query.join(
-        models.DeviceAllocation,
-        models.DeviceAllocation.device_id == models.Device.id
-    ).join(
-        models.DeviceReservation,
-        models.DeviceReservation.reservation_id == models.DeviceAllocation.reservation_id
-    ).join(
-        models.Reservation,
-        models.Reservation.id == models.DeviceReservation.reservation_id
-    ).join(
-        models.Lease,
-        models.Lease.id == models.Reservation.lease_id
-    ).filter(models.Lease.id == lease_id)
-    return query.all()
+    with reader() as session:
+        query = model_query(models.Device, session)
+        query = query.join(
+            models.DeviceAllocation,
+            models.DeviceAllocation.device_id == models.Device.id
+        ).join(
+            models.DeviceReservation,
+            models.DeviceReservation.reservation_id == models.DeviceAllocation.reservation_id
+        ).join(
+            models.Reservation,
+            models.Reservation.id == models.DeviceReservation.reservation_id
+        ).join(
+            models.Lease,
+            models.Lease.id == models.Reservation.lease_id
+        ).filter(models.Lease.id == lease_id)
+        return query.all()
 
 
 def networks_in_lease(lease_id):
-    query = model_query(models.NetworkSegment, get_session())
-    query = query.join(
-        models.NetworkAllocation,
-        models.NetworkAllocation.network_id == models.NetworkSegment.id
-    ).join(
-        models.NetworkReservation,
-        models.NetworkReservation.reservation_id == models.NetworkAllocation.reservation_id
-    ).join(
-        models.Reservation,
-        models.Reservation.id == models.NetworkReservation.reservation_id
-    ).join(
-        models.Lease,
-        models.Lease.id == models.Reservation.lease_id
-    ).filter(models.Lease.id == lease_id)
-    return query.all()
-
-
-def lease_list(project_id=None):
-    query = model_query(models.Lease, get_session())
-    if project_id is not None:
-        query = query.filter_by(project_id=project_id)
-    return query.all()
+    with reader() as session:
+        query = model_query(models.NetworkSegment, session)
+        query = query.join(
+            models.NetworkAllocation,
+            models.NetworkAllocation.network_id == models.NetworkSegment.id
+        ).join(
+            models.NetworkReservation,
+            models.NetworkReservation.reservation_id == models.NetworkAllocation.reservation_id
+        ).join(
+            models.Reservation,
+            models.Reservation.id == models.NetworkReservation.reservation_id
+        ).join(
+            models.Lease,
+            models.Lease.id == models.Reservation.lease_id
+        ).filter(models.Lease.id == lease_id)
+        return query.all()
+
+
+def _lease_filter(query, filters):
+    if 'status' in filters:
+        query = query.filter(models.Lease.status == filters['status'])
+    if 'name' in filters:
+        query = query.filter(models.Lease.name == filters['name'])
+    if 'resource_type' in filters:
+        query = query.filter(models.Lease.reservations.any(sa.and_(
+            models.Reservation.resource_type == filters['resource_type'],
+            models.Reservation.deleted.is_(None))))
+    # Leases overlapping the [start_date, end_date] period
+    if 'start_date' in filters:
+        query = query.filter(models.Lease.end_date > filters['start_date'])
+    if 'end_date' in filters:
+        query = query.filter(models.Lease.start_date < filters['end_date'])
+    return query
+
+
+def lease_list(project_id=None, profile='full', filters=None,
+               sort_key='created_at', sort_dir='asc', limit=None,
+               marker=None):
+    """Return leases, optionally filtered and paginated.
+
+    Pagination uses the lease given as marker as a keyset cursor: the leases
+    sorted after it are returned, up to limit leases.
+    """
+    if sort_key not in LEASE_SORT_KEYS:
+        raise db_exc.BlazarDBInvalidFilter(query_filter=sort_key)
+
+    with async_reader() as session:
+        query = model_query(models.Lease, session)
+        query = query.options(*_lease_loading_options(profile))
+        if project_id is not None:
+            query = query.filter_by(project_id=project_id)
+        query = _lease_filter(query, filters or {})
+
+        marker_lease = None
+        if marker is not None:
+            marker_lease = _lease_get(session, marker, profile='summary')
+            if marker_lease is None:
+                raise db_exc.BlazarDBNotFound(id=marker, model='Lease')
+
+        query = db_utils.paginate_query(query, models.Lease, limit,
+                                        [sort_key, 'id'], marker=marker_lease,
+                                        sort_dir=sort_dir)
+        return query.all()
 
 
 def lease_create(values):
@@ -325,8 +484,7 @@ def lease_create(values):
     events = values.pop("events", [])
     lease.update(values)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             lease.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -356,23 +514,20 @@ def lease_create(values):
             raise db_exc.BlazarDBDuplicateEntry(
                 model=event.__class__.__name__, columns=e.columns)
 
-    return lease_get(lease.id)
+        return lease_get(lease.id)
 
 
 def lease_update(lease_id, values):
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         lease = _lease_get(session, lease_id)
         lease.update(values)
         lease.save(session=session)
 
-    return lease_get(lease_id)
+        return lease
 
 
 def lease_destroy(lease_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         lease = _lease_get(session, lease_id)
 
         if not lease:
@@ -400,19 +555,21 @@ def _event_get_all(session):
 
 
 def event_get(event_id):
-    return _event_get(get_session(), event_id)
+    with reader() as session:
+        return _event_get(session, event_id)
 
 
 def event_get_all():
-    return _event_get_all(get_session()).all()
+    with reader() as session:
+        return _event_get_all(session).all()
 
 
-def _event_get_sorted_by_filters(sort_key, sort_dir, filters):
+def _event_get_sorted_by_filters(session, sort_key, sort_dir, filters):
     """Return an event query filtered and sorted by name of the field."""
 
     sort_fn = {'desc': desc, 'asc': asc}
 
-    events_query = _event_get_all(get_session())
+    events_query = _event_get_all(session)
 
     if 'status' in filters:
         events_query = (
@@ -450,13 +607,17 @@ def event_get_first_sorted_by_filters(sort_key, sort_dir, filters):
     and sorted by name of the field.
     """
 
-    return _event_get_sorted_by_filters(sort_key, sort_dir, filters).first()
+    with reader() as session:
+        return _event_get_sorted_by_filters(session, sort_key, sort_dir,
+                                            filters).first()
 
 
 def event_get_all_sorted_by_filters(sort_key, sort_dir, filters):
     """Return events filtered and sorted by name of the field."""
 
-    return _event_get_sorted_by_filters(sort_key, sort_dir, filters).all()
+    with reader() as session:
+        return _event_get_sorted_by_filters(session, sort_key, sort_dir,
+                                            filters).all()
 
 
 def event_create(values):
@@ -464,8 +625,7 @@ def event_create(values):
     event = models.Event()
     event.update(values)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             event.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -473,24 +633,102 @@ def event_create(values):
             raise db_exc.BlazarDBDuplicateEntry(
                 model=event.__class__.__name__, columns=e.columns)
 
-    return event_get(event.id)
+        return event_get(event.id)
 
 
 def event_update(event_id, values):
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         # NOTE(jason): Allow updating soft-deleted events
         event = _event_get(session, event_id, deleted=True)
         event.update(values)
         event.save(session=session)
 
-    return event_get(event_id)
+        return event_get(event_id)
+
+
+def _supports_skip_locked(session):
+    dialect = session.get_bind().dialect
+    if dialect.name == 'postgresql':
+        return True
+    if dialect.name == 'mysql':
+        version = dialect.server_version_info or ()
+        if getattr(dialect, 'is_mariadb', False):
+            return version >= (10, 6)
+        return version >= (8, 0, 1)
+    return False
+
+
+def event_claim_due(now, limit, worker_id):
+    """Claim due events for a worker.
+
+    Up to limit undone events due at now, whose lease is in a stable status,
+    are switched to IN_PROGRESS and assigned to worker_id. The candidate
+    rows are locked with SKIP LOCKED when the database supports it and the
+    UPDATE is guarded by the event status, so that concurrent workers never
+    claim the same event.
+    """
+    with writer() as session:
+        query = (session.query(models.Event.id)
+                 .join(models.Lease, models.Lease.id == models.Event.lease_id)
+                 .filter(models.Event.deleted.is_(None),
+                         models.Event.status == status.event.UNDONE,
+                         models.Event.time <= now,
+                         models.Lease.deleted.is_(None),
+                         models.Lease.status.in_(status.lease.STABLE))
+                 .order_by(models.Event.time, models.Event.id))
+        if limit:
+            query = query.limit(limit)
+        if _supports_skip_locked(session):
+            query = query.with_for_update(skip_locked=True, of=models.Event)
+        event_ids = [event_id for event_id, in query]
+        if not event_ids:
+            return []
+
+        (session.query(models.Event)
+         .filter(models.Event.id.in_(event_ids),
+                 models.Event.status == status.event.UNDONE)
+         .update({'status': status.event.IN_PROGRESS,
+                  'worker_id': worker_id,
+                  'updated_at': now},
+                 synchronize_session=False))
+
+        return (model_query(models.Event, session)
+                .filter(models.Event.id.in_(event_ids),
+                        models.Event.status == status.event.IN_PROGRESS,
+                        models.Event.worker_id == worker_id)
+                .order_by(models.Event.time, models.Event.id)
+                .all())
+
+
+def event_renew_claims(worker_id, now):
+    """Extend the claims of a worker on its events in progress."""
+    with writer() as session:
+        return (session.query(models.Event)
+                .filter(models.Event.deleted.is_(None),
+                        models.Event.status == status.event.IN_PROGRESS,
+                        models.Event.worker_id == worker_id)
+                .update({'updated_at': now}, synchronize_session=False))
+
+
+def event_release_expired_claims(expiry):
+    """Set back UNDONE the events claimed by workers which stopped renewing.
+
+    Only events claimed with event_claim_due() are released, events set
+    IN_PROGRESS by other means have no worker_id.
+    """
+    with writer() as session:
+        return (session.query(models.Event)
+                .filter(models.Event.deleted.is_(None),
+                        models.Event.status == status.event.IN_PROGRESS,
+                        models.Event.worker_id.isnot(None),
+                        models.Event.updated_at < expiry)
+                .update({'status': status.event.UNDONE,
+                         'worker_id': None},
+                        synchronize_session=False))
 
 
 def event_destroy(event_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         event = _event_get(session, event_id)
 
         if not event:
@@ -507,13 +745,15 @@ def _host_reservation_get(session, host_reservation_id):
 
 
 def host_reservation_get(host_reservation_id):
-    return _host_reservation_get(get_session(),
-                                 host_reservation_id)
+    with reader() as session:
+        return _host_reservation_get(session,
+                                     host_reservation_id)
 
 
 def host_reservation_get_all():
-    query = model_query(models.ComputeHostReservation, get_session())
-    return query.all()
+    with reader() as session:
+        query = model_query(models.ComputeHostReservation, session)
+        return query.all()
 
 
 def _host_reservation_get_by_reservation_id(session, reservation_id):
@@ -522,8 +762,9 @@ def _host_reservation_get_by_reservation_id(session, reservation_id):
 
 
 def host_reservation_get_by_reservation_id(reservation_id):
-    return _host_reservation_get_by_reservation_id(get_session(),
-                                                   reservation_id)
+    with reader() as session:
+        return _host_reservation_get_by_reservation_id(session,
+                                                       reservation_id)
 
 
 def host_reservation_create(values):
@@ -531,8 +772,7 @@ def host_reservation_create(values):
     host_reservation = models.ComputeHostReservation()
     host_reservation.update(values)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             host_reservation.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -540,24 +780,21 @@ def host_reservation_create(values):
             raise db_exc.BlazarDBDuplicateEntry(
                 model=host_reservation.__class__.__name__, columns=e.columns)
 
-    return host_reservation_get(host_reservation.id)
+        return host_reservation_get(host_reservation.id)
 
 
 def host_reservation_update(host_reservation_id, values):
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         host_reservation = _host_reservation_get(session,
                                                  host_reservation_id)
         host_reservation.update(values)
         host_reservation.save(session=session)
 
-    return host_reservation_get(host_reservation_id)
+        return host_reservation
 
 
 def host_reservation_destroy(host_reservation_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         host_reservation = _host_reservation_get(session,
                                                  host_reservation_id)
 
@@ -575,8 +812,7 @@ def instance_reservation_create(values):
     instance_reservation = models.InstanceReservations()
     instance_reservation.update(value)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             instance_reservation.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -585,22 +821,23 @@ def instance_reservation_create(values):
                 model=instance_reservation.__class__.__name__,
                 columns=e.columns)
 
-    return instance_reservation_get(instance_reservation.id)
+        return instance_reservation_get(instance_reservation.id)
 
 
-def instance_reservation_get(instance_reservation_id, session=None):
-    if not session:
-        session = get_session()
+def _instance_reservation_get(session, instance_reservation_id):
     query = model_query(models.InstanceReservations, session)
     return query.filter_by(id=instance_reservation_id).first()
 
 
-def instance_reservation_update(instance_reservation_id, values):
-    session = get_session()
+def instance_reservation_get(instance_reservation_id):
+    with reader() as session:
+        return _instance_reservation_get(session, instance_reservation_id)
 
-    with session.begin():
-        instance_reservation = instance_reservation_get(
-            instance_reservation_id, session)
+
+def instance_reservation_update(instance_reservation_id, values):
+    with writer() as session:
+        instance_reservation = _instance_reservation_get(
+            session, instance_reservation_id)
 
         if not instance_reservation:
             raise db_exc.BlazarDBNotFound(
@@ -609,13 +846,13 @@ def instance_reservation_update(instance_reservation_id, values):
         instance_reservation.update(values)
         instance_reservation.save(session=session)
 
-    return instance_reservation_get(instance_reservation_id)
+        return instance_reservation
 
 
 def instance_reservation_destroy(instance_reservation_id):
-    session = get_session()
-    with session.begin():
-        instance = instance_reservation_get(instance_reservation_id)
+    with writer() as session:
+        instance = _instance_reservation_get(session,
+                                             instance_reservation_id)
 
         if not instance:
             raise db_exc.BlazarDBNotFound(
@@ -624,6 +861,58 @@ def instance_reservation_destroy(instance_reservation_id):
         instance.soft_delete(session=session)
 
 
+# Allocations
+def _allocation_bulk_create(model, values_list):
+    """Insert allocations with a single INSERT statement.
+
+    Returns the inserted values, with their generated IDs.
+    """
+    rows = []
+    for values in values_list:
+        row = values.copy()
+        row.setdefault('id', uuidutils.generate_uuid())
+        rows.append(row)
+    if not rows:
+        return rows
+
+    with writer() as session:
+        _allocations_changed(session, REVISION_TYPES[model])
+        try:
+            session.execute(model.__table__.insert(), rows)
+        except common_db_exc.DBDuplicateEntry as e:
+            # raise exception about duplicated columns (e.columns)
+            raise db_exc.BlazarDBDuplicateEntry(
+                model=model.__name__, columns=e.columns)
+
+        return rows
+
+
+def _allocation_bulk_destroy(model, allocation_ids, soft_delete=True):
+    """Delete allocations with a single UPDATE or DELETE statement."""
+    allocation_ids = set(allocation_ids)
+    if not allocation_ids:
+        return
+
+    with writer() as session:
+        _allocations_changed(session, REVISION_TYPES[model])
+        query = (model_query(model, session)
+                 .filter(model.id.in_(allocation_ids)))
+        found_ids = {allocation_id for allocation_id,
+                     in query.with_entities(model.id)}
+        missing_ids = allocation_ids - found_ids
+        if missing_ids:
+            # raise not found error
+            raise db_exc.BlazarDBNotFound(
+                id=', '.join(sorted(missing_ids)), model=model.__name__)
+
+        if soft_delete:
+            query.update({'deleted': model.id,
+                          'deleted_at': timeutils.utcnow()},
+                         synchronize_session=False)
+        else:
+            query.delete(synchronize_session=False)
+
+
 # ComputeHostAllocation
 def _host_allocation_get(session, host_allocation_id):
     query = model_query(models.ComputeHostAllocation, session)
@@ -631,23 +920,26 @@ def _host_allocation_get(session, host_allocation_id):
 
 
 def host_allocation_get(host_allocation_id):
-    return _host_allocation_get(get_session(),
-                                host_allocation_id)
+    with reader() as session:
+        return _host_allocation_get(session,
+                                    host_allocation_id)
 
 
 def host_allocation_get_all():
-    query = model_query(models.ComputeHostAllocation, get_session())
-    return query.all()
+    with reader() as session:
+        query = model_query(models.ComputeHostAllocation, session)
+        return query.all()
 
 
 def host_allocation_get_all_by_values(**kwargs):
     """Returns all entries filtered by col=value."""
-    allocation_query = model_query(models.ComputeHostAllocation, get_session())
-    for name, value in kwargs.items():
-        column = getattr(models.ComputeHostAllocation, name, None)
-        if column:
-            allocation_query = allocation_query.filter(column == value)
-    return allocation_query.all()
+    with reader() as session:
+        allocation_query = model_query(models.ComputeHostAllocation, session)
+        for name, value in kwargs.items():
+            column = getattr(models.ComputeHostAllocation, name, None)
+            if column:
+                allocation_query = allocation_query.filter(column == value)
+        return allocation_query.all()
 
 
 def host_allocation_create(values):
@@ -655,8 +947,7 @@ def host_allocation_create(values):
     host_allocation = models.ComputeHostAllocation()
     host_allocation.update(values)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             host_allocation.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -664,24 +955,21 @@ def host_allocation_create(values):
             raise db_exc.BlazarDBDuplicateEntry(
                 model=host_allocation.__class__.__name__, columns=e.columns)
 
-    return host_allocation_get(host_allocation.id)
+        return host_allocation_get(host_allocation.id)
 
 
 def host_allocation_update(host_allocation_id, values):
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         host_allocation = _host_allocation_get(session,
                                                host_allocation_id)
         host_allocation.update(values)
         host_allocation.save(session=session)
 
-    return host_allocation_get(host_allocation_id)
+        return host_allocation
 
 
 def host_allocation_destroy(host_allocation_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         host_allocation = _host_allocation_get(session,
                                                host_allocation_id)
 
@@ -693,6 +981,14 @@ def host_allocation_destroy(host_allocation_id):
         host_allocation.soft_delete(session=session)
 
 
+def host_allocation_bulk_create(values_list):
+    return _allocation_bulk_create(models.ComputeHostAllocation, values_list)
+
+
+def host_allocation_bulk_destroy(host_allocation_ids):
+    _allocation_bulk_destroy(models.ComputeHostAllocation, host_allocation_ids)
+
+
 # ComputeHost
 def _host_get(session, host_id):
     query = model_query(models.ComputeHost, session)
@@ -705,23 +1001,26 @@ def _host_get_all(session):
 
 
 def host_get(host_id):
-    return _host_get(get_session(), host_id)
+    with reader() as session:
+        return _host_get(session, host_id)
 
 
 def host_list():
-    return model_query(models.ComputeHost, get_session()).all()
+    with reader() as session:
+        return model_query(models.ComputeHost, session).all()
 
 
 def host_get_all_by_filters(filters):
     """Returns hosts filtered by name of the field."""
 
-    hosts_query = _host_get_all(get_session())
+    with reader() as session:
+        hosts_query = _host_get_all(session)
 
-    if 'status' in filters:
-        hosts_query = hosts_query.filter(
-            models.ComputeHost.status == filters['status'])
+        if 'status' in filters:
+            hosts_query = hosts_query.filter(
+                models.ComputeHost.status == filters['status'])
 
-    return hosts_query.all()
+        return hosts_query.all()
 
 
 def host_get_all_by_queries(queries):
@@ -732,69 +1031,73 @@ def host_get_all_by_queries(queries):
             #sqlalchemy.sql.operators.ColumnOperators
 
     """
-    hosts_query = model_query(models.ComputeHost, get_session())
-
-    oper = {
-        '<': ['lt', lambda a, b: a >= b],
-        '>': ['gt', lambda a, b: a <= b],
-        '<=': ['le', lambda a, b: a > b],
-        '>=': ['ge', lambda a, b: a < b],
-        '==': ['eq', lambda a, b: a != b],
-        '!=': ['ne', lambda a, b: a == b],
-    }
-
-    hosts = []
-    for query in queries:
-        try:
-            key, op, value = query.split(' ', 2)
-        except ValueError:
-            raise db_exc.BlazarDBInvalidFilter(query_filter=query)
-
-        column = getattr(models.ComputeHost, key, None)
-        if column is not None:
-            if op == 'in':
-                filt = column.in_(value.split(','))
-            else:
-                if op in oper:
-                    op = oper[op][0]
-                try:
-                    attr = [e for e in ['%s', '%s_', '__%s__']
-                            if hasattr(column, e % op)][0] % op
-                except IndexError:
-                    raise db_exc.BlazarDBInvalidFilterOperator(
-                        filter_operator=op)
-
-                if value == 'null':
-                    value = None
-
-                filt = getattr(column, attr)(value)
-
-            hosts_query = hosts_query.filter(filt)
-        else:
-            # looking for resource properties matches
-            extra_filter = (
-                _host_resource_property_query(get_session())
-                .filter(models.ResourceProperty.property_name == key)
-            ).all()
-
-            if not extra_filter:
-                raise db_exc.BlazarDBNotFound(
-                    id=key, model='ComputeHostExtraCapability')
-
-            for host, property_name in extra_filter:
-                if op in oper and oper[op][1](host.capability_value, value):
-                    hosts.append(host.computehost_id)
-                elif op not in oper:
-                    msg = 'Operator %s for resource properties not implemented'
-                    raise NotImplementedError(msg % op)
-
-            # We must also avoid selecting any host which doesn't have the
-            # extra capability present.
-            all_hosts = [h.id for h in hosts_query.all()]
-            extra_filter_hosts = [h.computehost_id for h, _ in extra_filter]
-            hosts += [h for h in all_hosts if h not in extra_filter_hosts]
+    with reader() as session:
+        hosts_query = model_query(models.ComputeHost, session)
+
+        oper = {
+            '<': ['lt', lambda a, b: a >= b],
+            '>': ['gt', lambda a, b: a <= b],
+            '<=': ['le', lambda a, b: a > b],
+            '>=': ['ge', lambda a, b: a < b],
+            '==': ['eq', lambda a, b: a != b],
+            '!=': ['ne', lambda a, b: a == b],
+        }
 
-    return hosts_query.filter(~models.ComputeHost.id.in_(hosts)).all()
+        hosts = []
+        for query in queries:
+            try:
+                key, op, value = query.split(' ', 2)
+            except ValueError:
+                raise db_exc.BlazarDBInvalidFilter(query_filter=query)
+
+            column = getattr(models.ComputeHost, key, None)
+            if column is not None:
+                if op == 'in':
+                    filt = column.in_(value.split(','))
+                else:
+                    if op in oper:
+                        op = oper[op][0]
+                    try:
+                        attr = [e for e in ['%s', '%s_', '__%s__']
+                                if hasattr(column, e % op)][0] % op
+                    except IndexError:
+                        raise db_exc.BlazarDBInvalidFilterOperator(
+                            filter_operator=op)
+
+                    if value == 'null':
+                        value = None
+
+                    filt = getattr(column, attr)(value)
+
+                hosts_query = hosts_query.filter(filt)
+            else:
+                # looking for resource properties matches
+                extra_filter = (
+                    _host_resource_property_query(session)
+                    .filter(models.ResourceProperty.property_name == key)
+                ).all()
+
+                if not extra_filter:
+                    raise db_exc.BlazarDBNotFound(
+                        id=key, model='ComputeHostExtraCapability')
+
+                for host, property_name in extra_filter:
+                    if op in oper and oper[op][1](
+                            host.capability_value, value):
+                        hosts.append(host.computehost_id)
+                    elif op not in oper:
+                        msg = ('Operator %s for resource properties '
+                               'not implemented')
+                        raise NotImplementedError(msg % op)
+
+                # We must also avoid selecting any host which doesn't have the
+                # extra capability present.
+                all_hosts = [h.id for h in hosts_query.all()]
+                extra_filter_hosts = [h.computehost_id
+                                      for h, _ in extra_filter]
+                hosts += [h for h in all_hosts if h not in extra_filter_hosts]
+
+        return hosts_query.filter(~models.ComputeHost.id.in_(hosts)).all()
 
 
 def reservable_host_get_all_by_queries(queries):
@@ -828,8 +1131,7 @@ def host_create(values):
     host = models.ComputeHost()
     host.update(values)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             host.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -837,23 +1139,32 @@ def host_create(values):
             raise db_exc.BlazarDBDuplicateEntry(
                 model=host.__class__.__name__, columns=e.columns)
 
-    return host_get(host.id)
+        return host_get(host.id)
 
 
 def host_update(host_id, values):
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         host = _host_get(session, host_id)
         host.update(values)
         host.save(session=session)
 
-    return host_get(host_id)
+        return host
+
+
+def host_bulk_update(host_ids, values):
+    """Update hosts with a single UPDATE statement."""
+    host_ids = set(host_ids)
+    if not host_ids:
+        return
+
+    with writer() as session:
+        (model_query(models.ComputeHost, session)
+         .filter(models.ComputeHost.id.in_(host_ids))
+         .update(values, synchronize_session=False))
 
 
 def host_destroy(host_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         host = _host_get(session, host_id)
 
         if not host:
@@ -884,8 +1195,9 @@ def _host_extra_capability_get(session, host_extra_capability_id):
 
 
 def host_extra_capability_get(host_extra_capability_id):
-    return _host_extra_capability_get(get_session(),
-                                      host_extra_capability_id)
+    with reader() as session:
+        return _host_extra_capability_get(session,
+                                          host_extra_capability_id)
 
 
 def _host_extra_capability_get_all_per_host(session, host_id):
@@ -896,8 +1208,9 @@ def _host_extra_capability_get_all_per_host(session, host_id):
 
 
 def host_extra_capability_get_all_per_host(host_id):
-    return _host_extra_capability_get_all_per_host(get_session(),
-                                                   host_id).all()
+    with reader() as session:
+        return _host_extra_capability_get_all_per_host(session,
+                                                       host_id).all()
 
 
 def host_extra_capability_create(values):
@@ -912,9 +1225,7 @@ def host_extra_capability_create(values):
     host_extra_capability = models.ComputeHostExtraCapability()
     host_extra_capability.update(values)
 
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         try:
             host_extra_capability.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -923,25 +1234,22 @@ def host_extra_capability_create(values):
                 model=host_extra_capability.__class__.__name__,
                 columns=e.columns)
 
-    return host_extra_capability_get(host_extra_capability.id)
+        return host_extra_capability_get(host_extra_capability.id)
 
 
 def host_extra_capability_update(host_extra_capability_id, values):
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         host_extra_capability, _ = (
             _host_extra_capability_get(session,
                                        host_extra_capability_id))
         host_extra_capability.update(values)
         host_extra_capability.save(session=session)
 
-    return host_extra_capability_get(host_extra_capability_id)
+        return host_extra_capability_get(host_extra_capability_id)
 
 
 def host_extra_capability_destroy(host_extra_capability_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         host_extra_capability = _host_extra_capability_get(
             session, host_extra_capability_id)
 
@@ -955,9 +1263,7 @@ def host_extra_capability_destroy(host_extra_capability_id):
 
 
 def host_extra_capability_get_all_per_name(host_id, property_name):
-    session = get_session()
-
-    with session.begin():
+    with reader() as session:
         query = _host_extra_capability_get_all_per_host(session, host_id)
         return query.filter(
             models.ResourceProperty.property_name == property_name).all()
@@ -970,8 +1276,7 @@ def fip_reservation_create(fip_reservation_values):
     fip_reservation = models.FloatingIPReservation()
     fip_reservation.update(values)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             fip_reservation.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -979,7 +1284,7 @@ def fip_reservation_create(fip_reservation_values):
             raise db_exc.BlazarDBDuplicateEntry(
                 model=fip_reservation.__class__.__name__, columns=e.columns)
 
-    return fip_reservation_get(fip_reservation.id)
+        return fip_reservation_get(fip_reservation.id)
 
 
 def _fip_reservation_get(session, fip_reservation_id):
@@ -988,23 +1293,21 @@ def _fip_reservation_get(session, fip_reservation_id):
 
 
 def fip_reservation_get(fip_reservation_id):
-    return _fip_reservation_get(get_session(), fip_reservation_id)
+    with reader() as session:
+        return _fip_reservation_get(session, fip_reservation_id)
 
 
 def fip_reservation_update(fip_reservation_id, fip_reservation_values):
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         fip_reservation = _fip_reservation_get(session, fip_reservation_id)
         fip_reservation.update(fip_reservation_values)
         fip_reservation.save(session=session)
 
-    return fip_reservation_get(fip_reservation_id)
+        return fip_reservation
 
 
 def fip_reservation_destroy(fip_reservation_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         fip_reservation = _fip_reservation_get(session, fip_reservation_id)
 
         if not fip_reservation:
@@ -1023,8 +1326,7 @@ def required_fip_create(required_fip_values):
     required_fip = models.RequiredFloatingIP()
     required_fip.update(values)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             required_fip.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -1032,7 +1334,7 @@ def required_fip_create(required_fip_values):
             raise db_exc.BlazarDBDuplicateEntry(
                 model=required_fip.__class__.__name__, columns=e.columns)
 
-    return required_fip_get(required_fip.id)
+        return required_fip_get(required_fip.id)
 
 
 def _required_fip_get(session, required_fip_id):
@@ -1041,23 +1343,21 @@ def _required_fip_get(session, required_fip_id):
 
 
 def required_fip_get(required_fip_id):
-    return _required_fip_get(get_session(), required_fip_id)
+    with reader() as session:
+        return _required_fip_get(session, required_fip_id)
 
 
 def required_fip_update(required_fip_id, required_fip_values):
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         required_fip = _required_fip_get(session, required_fip_id)
         required_fip.update(required_fip_values)
         required_fip.save(session=session)
 
-    return required_fip_get(required_fip_id)
+        return required_fip
 
 
 def required_fip_destroy(required_fip_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         required_fip = _required_fip_get(session, required_fip_id)
 
         if not required_fip:
@@ -1070,8 +1370,7 @@ def required_fip_destroy(required_fip_id):
 
 
 def required_fip_destroy_by_fip_reservation_id(fip_reservation_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         required_fips = model_query(
             models.RequiredFloatingIP, session).filter_by(
             floatingip_reservation_id=fip_reservation_id)
@@ -1087,7 +1386,8 @@ def _fip_allocation_get(session, fip_allocation_id):
 
 
 def fip_allocation_get(fip_allocation_id):
-    return _fip_allocation_get(get_session(), fip_allocation_id)
+    with reader() as session:
+        return _fip_allocation_get(session, fip_allocation_id)
 
 
 def fip_allocation_create(allocation_values):
@@ -1095,8 +1395,7 @@ def fip_allocation_create(allocation_values):
     fip_allocation = models.FloatingIPAllocation()
     fip_allocation.update(values)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             fip_allocation.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -1104,22 +1403,22 @@ def fip_allocation_create(allocation_values):
             raise db_exc.BlazarDBDuplicateEntry(
                 model=fip_allocation.__class__.__name__, columns=e.columns)
 
-    return fip_allocation_get(fip_allocation.id)
+        return fip_allocation_get(fip_allocation.id)
 
 
 def fip_allocation_get_all_by_values(**kwargs):
     """Returns all entries filtered by col=value."""
-    allocation_query = model_query(models.FloatingIPAllocation, get_session())
-    for name, value in kwargs.items():
-        column = getattr(models.FloatingIPAllocation, name, None)
-        if column:
-            allocation_query = allocation_query.filter(column == value)
-    return allocation_query.all()
+    with reader() as session:
+        allocation_query = model_query(models.FloatingIPAllocation, session)
+        for name, value in kwargs.items():
+            column = getattr(models.FloatingIPAllocation, name, None)
+            if column:
+                allocation_query = allocation_query.filter(column == value)
+        return allocation_query.all()
 
 
 def fip_allocation_destroy(allocation_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         fip_allocation = _fip_allocation_get(session, allocation_id)
 
         if not fip_allocation:
@@ -1131,15 +1430,24 @@ def fip_allocation_destroy(allocation_id):
         session.delete(fip_allocation)
 
 
-def fip_allocation_update(allocation_id, allocation_values):
-    session = get_session()
+def fip_allocation_bulk_create(values_list):
+    return _allocation_bulk_create(models.FloatingIPAllocation, values_list)
+
 
-    with session.begin():
+def fip_allocation_bulk_destroy(allocation_ids):
+    # Like fip_allocation_destroy(), delete the rows instead of marking them
+    # deleted.
+    _allocation_bulk_destroy(models.FloatingIPAllocation, allocation_ids,
+                             soft_delete=False)
+
+
+def fip_allocation_update(allocation_id, allocation_values):
+    with writer() as session:
         fip_allocation = _fip_allocation_get(session, allocation_id)
         fip_allocation.update(allocation_values)
         fip_allocation.save(session=session)
 
-    return fip_allocation_get(allocation_id)
+        return fip_allocation
 
 
 # Floating IP
@@ -1161,47 +1469,48 @@ def fip_get_all_by_queries(queries):
             #sqlalchemy.sql.operators.ColumnOperators
 
     """
-    fips_query = model_query(models.FloatingIP, get_session())
-
-    oper = {
-        '<': ['lt', lambda a, b: a >= b],
-        '>': ['gt', lambda a, b: a <= b],
-        '<=': ['le', lambda a, b: a > b],
-        '>=': ['ge', lambda a, b: a < b],
-        '==': ['eq', lambda a, b: a != b],
-        '!=': ['ne', lambda a, b: a == b],
-    }
-
-    for query in queries:
-        try:
-            key, op, value = query.split(' ', 2)
-        except ValueError:
-            raise db_exc.BlazarDBInvalidFilter(query_filter=query)
-
-        column = getattr(models.FloatingIP, key, None)
-        if column is not None:
-            if op == 'in':
-                filt = column.in_(value.split(','))
-            else:
-                if op in oper:
-                    op = oper[op][0]
-                try:
-                    attr = [e for e in ['%s', '%s_', '__%s__']
-                            if hasattr(column, e % op)][0] % op
-                except IndexError:
-                    raise db_exc.BlazarDBInvalidFilterOperator(
-                        filter_operator=op)
-
-                if value == 'null':
-                    value = None
-
-                filt = getattr(column, attr)(value)
+    with reader() as session:
+        fips_query = model_query(models.FloatingIP, session)
+
+        oper = {
+            '<': ['lt', lambda a, b: a >= b],
+            '>': ['gt', lambda a, b: a <= b],
+            '<=': ['le', lambda a, b: a > b],
+            '>=': ['ge', lambda a, b: a < b],
+            '==': ['eq', lambda a, b: a != b],
+            '!=': ['ne', lambda a, b: a == b],
+        }
 
-            fips_query = fips_query.filter(filt)
-        else:
-            raise db_exc.BlazarDBInvalidFilter(query_filter=query)
+        for query in queries:
+            try:
+                key, op, value = query.split(' ', 2)
+            except ValueError:
+                raise db_exc.BlazarDBInvalidFilter(query_filter=query)
+
+            column = getattr(models.FloatingIP, key, None)
+            if column is not None:
+                if op == 'in':
+                    filt = column.in_(value.split(','))
+                else:
+                    if op in oper:
+                        op = oper[op][0]
+                    try:
+                        attr = [e for e in ['%s', '%s_', '__%s__']
+                                if hasattr(column, e % op)][0] % op
+                    except IndexError:
+                        raise db_exc.BlazarDBInvalidFilterOperator(
+                            filter_operator=op)
+
+                    if value == 'null':
+                        value = None
+
+                    filt = getattr(column, attr)(value)
+
+                fips_query = fips_query.filter(filt)
+            else:
+                raise db_exc.BlazarDBInvalidFilter(query_filter=query)
 
-    return fips_query.all()
+        return fips_query.all()
 
 
 def reservable_fip_get_all_by_queries(queries):
@@ -1223,11 +1532,13 @@ def unreservable_fip_get_all_by_queries(queries):
 
 
 def floatingip_get(floatingip_id):
-    return _floatingip_get(get_session(), floatingip_id)
+    with reader() as session:
+        return _floatingip_get(session, floatingip_id)
 
 
 def floatingip_list():
-    return model_query(models.FloatingIP, get_session()).all()
+    with reader() as session:
+        return model_query(models.FloatingIP, session).all()
 
 
 def floatingip_create(values):
@@ -1235,8 +1546,7 @@ def floatingip_create(values):
     floatingip = models.FloatingIP()
     floatingip.update(values)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             floatingip.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -1244,12 +1554,11 @@ def floatingip_create(values):
             raise db_exc.BlazarDBDuplicateEntry(
                 model=floatingip.__class__.__name__, columns=e.columns)
 
-    return floatingip_get(floatingip.id)
+        return floatingip_get(floatingip.id)
 
 
 def floatingip_destroy(floatingip_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         floatingip = _floatingip_get(session, floatingip_id)
 
         if not floatingip:
@@ -1260,14 +1569,12 @@ def floatingip_destroy(floatingip_id):
 
 
 def floatingip_update(fip_id, values):
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         fip = _floatingip_get(session, fip_id)
         fip.update(values)
         fip.save(session=session)
 
-    return floatingip_get(fip_id)
+        return fip
 
 # Networks
 
@@ -1282,11 +1589,13 @@ def _network_get_all(session):
 
 
 def network_get(network_id):
-    return _network_get(get_session(), network_id)
+    with reader() as session:
+        return _network_get(session, network_id)
 
 
 def network_list():
-    return model_query(models.NetworkSegment, get_session()).all()
+    with reader() as session:
+        return model_query(models.NetworkSegment, session).all()
 
 
 def network_create(values):
@@ -1294,8 +1603,7 @@ def network_create(values):
     network = models.NetworkSegment()
     network.update(values)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             network.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -1303,23 +1611,20 @@ def network_create(values):
             raise db_exc.BlazarDBDuplicateEntry(
                 model=network.__class__.__name__, columns=e.columns)
 
-    return network_get(network.id)
+        return network_get(network.id)
 
 
 def network_update(network_id, values):
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         network = _network_get(session, network_id)
         network.update(values)
         network.save(session=session)
 
-    return network_get(network_id)
+        return network
 
 
 def network_destroy(network_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         network = _network_get(session, network_id)
 
         if not network:
@@ -1342,13 +1647,15 @@ def _network_allocation_get(session, network_allocation_id):
 
 
 def network_allocation_get(network_allocation_id):
-    return _network_allocation_get(get_session(),
-                                   network_allocation_id)
+    with reader() as session:
+        return _network_allocation_get(session,
+                                       network_allocation_id)
 
 
 def network_allocation_get_all():
-    query = model_query(models.NetworkAllocation, get_session())
-    return query.all()
+    with reader() as session:
+        query = model_query(models.NetworkAllocation, session)
+        return query.all()
 
 
 def network_allocation_create(values):
@@ -1356,8 +1663,7 @@ def network_allocation_create(values):
     network_allocation = models.NetworkAllocation()
     network_allocation.update(values)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             network_allocation.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -1365,22 +1671,22 @@ def network_allocation_create(values):
             raise db_exc.BlazarDBDuplicateEntry(
                 model=network_allocation.__class__.__name__, columns=e.columns)
 
-    return network_allocation_get(network_allocation.id)
+        return network_allocation_get(network_allocation.id)
 
 
 def network_allocation_get_all_by_values(**kwargs):
     """Returns all entries filtered by col=value."""
-    allocation_query = model_query(models.NetworkAllocation, get_session())
-    for name, value in kwargs.items():
-        column = getattr(models.NetworkAllocation, name, None)
-        if column:
-            allocation_query = allocation_query.filter(column == value)
-    return allocation_query.all()
+    with reader() as session:
+        allocation_query = model_query(models.NetworkAllocation, session)
+        for name, value in kwargs.items():
+            column = getattr(models.NetworkAllocation, name, None)
+            if column:
+                allocation_query = allocation_query.filter(column == value)
+        return allocation_query.all()
 
 
 def network_allocation_destroy(network_allocation_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         network_allocation = _network_allocation_get(session,
                                                      network_allocation_id)
 
@@ -1392,6 +1698,14 @@ def network_allocation_destroy(network_allocation_id):
         network_allocation.soft_delete(session=session)
 
 
+def network_allocation_bulk_create(values_list):
+    return _allocation_bulk_create(models.NetworkAllocation, values_list)
+
+
+def network_allocation_bulk_destroy(network_allocation_ids):
+    _allocation_bulk_destroy(models.NetworkAllocation, network_allocation_ids)
+
+
 # NetworkReservation
 
 def network_reservation_create(values):
@@ -1399,8 +1713,7 @@ def network_reservation_create(values):
     network_reservation = models.NetworkReservation()
     network_reservation.update(value)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             network_reservation.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -1409,22 +1722,23 @@ def network_reservation_create(values):
                 model=network_reservation.__class__.__name__,
                 columns=e.columns)
 
-    return network_reservation_get(network_reservation.id)
+        return network_reservation_get(network_reservation.id)
 
 
-def network_reservation_get(network_reservation_id, session=None):
-    if not session:
-        session = get_session()
+def _network_reservation_get(session, network_reservation_id):
     query = model_query(models.NetworkReservation, session)
     return query.filter_by(id=network_reservation_id).first()
 
 
-def network_reservation_update(network_reservation_id, values):
-    session = get_session()
+def network_reservation_get(network_reservation_id):
+    with reader() as session:
+        return _network_reservation_get(session, network_reservation_id)
 
-    with session.begin():
-        network_reservation = network_reservation_get(
-            network_reservation_id, session)
+
+def network_reservation_update(network_reservation_id, values):
+    with writer() as session:
+        network_reservation = _network_reservation_get(
+            session, network_reservation_id)
 
         if not network_reservation:
             raise db_exc.BlazarDBNotFound(
@@ -1433,13 +1747,12 @@ def network_reservation_update(network_reservation_id, values):
         network_reservation.update(values)
         network_reservation.save(session=session)
 
-    return network_reservation_get(network_reservation_id)
+        return network_reservation
 
 
 def network_reservation_destroy(network_reservation_id):
-    session = get_session()
-    with session.begin():
-        network = network_reservation_get(network_reservation_id)
+    with writer() as session:
+        network = _network_reservation_get(session, network_reservation_id)
 
         if not network:
             raise db_exc.BlazarDBNotFound(
@@ -1451,13 +1764,14 @@ def network_reservation_destroy(network_reservation_id):
 def network_get_all_by_filters(filters):
     """Returns networks filtered by name of the field."""
 
-    networks_query = _network_get_all(get_session())
+    with reader() as session:
+        networks_query = _network_get_all(session)
 
-    if 'status' in filters:
-        networks_query = networks_query.filter(
-            models.NetworkSegment.status == filters['status'])
+        if 'status' in filters:
+            networks_query = networks_query.filter(
+                models.NetworkSegment.status == filters['status'])
 
-    return networks_query.all()
+        return networks_query.all()
 
 
 def network_get_all_by_queries(queries):
@@ -1467,68 +1781,72 @@ def network_get_all_by_queries(queries):
     http://docs.sqlalchemy.org/en/rel_0_7/core/expression_api.html
             #sqlalchemy.sql.operators.ColumnOperators
     """
-    networks_query = model_query(models.NetworkSegment, get_session())
-
-    oper = {
-        '<': ['lt', lambda a, b: a >= b],
-        '>': ['gt', lambda a, b: a <= b],
-        '<=': ['le', lambda a, b: a > b],
-        '>=': ['ge', lambda a, b: a < b],
-        '==': ['eq', lambda a, b: a != b],
-        '!=': ['ne', lambda a, b: a == b],
-    }
-
-    networks = []
-    for query in queries:
-        try:
-            key, op, value = query.split(' ', 2)
-        except ValueError:
-            raise db_exc.BlazarDBInvalidFilter(query_filter=query)
-
-        column = getattr(models.NetworkSegment, key, None)
-        if column is not None:
-            if op == 'in':
-                filt = column.in_(value.split(','))
-            else:
-                if op in oper:
-                    op = oper[op][0]
-                try:
-                    attr = [e for e in ['%s', '%s_', '__%s__']
-                            if hasattr(column, e % op)][0] % op
-                except IndexError:
-                    raise db_exc.BlazarDBInvalidFilterOperator(
-                        filter_operator=op)
-
-                if value == 'null':
-                    value = None
-
-                filt = getattr(column, attr)(value)
+    with reader() as session:
+        networks_query = model_query(models.NetworkSegment, session)
+
+        oper = {
+            '<': ['lt', lambda a, b: a >= b],
+            '>': ['gt', lambda a, b: a <= b],
+            '<=': ['le', lambda a, b: a > b],
+            '>=': ['ge', lambda a, b: a < b],
+            '==': ['eq', lambda a, b: a != b],
+            '!=': ['ne', lambda a, b: a == b],
+        }
 
-            networks_query = networks_query.filter(filt)
-        else:
-            # looking for extra capabilities matches
-            extra_filter = (
-                _network_extra_capability_query(get_session())
-                .filter(models.ResourceProperty.property_name == key)
-            ).all()
-            if not extra_filter:
-                raise db_exc.BlazarDBNotFound(
-                    id=key, model='NetworkSegmentExtraCapability')
-            for network, capability_name in extra_filter:
-                if op in oper and oper[op][1](network.capability_value, value):
-                    networks.append(network.network_id)
-                elif op not in oper:
-                    msg = 'Operator %s for extra capabilities not implemented'
-                    raise NotImplementedError(msg % op)
-
-            # We must also avoid selecting any network which doesn't have the
-            # extra capability present.
-            all_networks = [h.id for h in networks_query.all()]
-            extra_filter_networks = [h.network_id for h, _ in extra_filter]
-            networks += [h for h in all_networks if h not in
-                         extra_filter_networks]
-
-    return networks_query.filter(~models.NetworkSegment.id.in_(networks)).all()
+        networks = []
+        for query in queries:
+            try:
+                key, op, value = query.split(' ', 2)
+            except ValueError:
+                raise db_exc.BlazarDBInvalidFilter(query_filter=query)
+
+            column = getattr(models.NetworkSegment, key, None)
+            if column is not None:
+                if op == 'in':
+                    filt = column.in_(value.split(','))
+                else:
+                    if op in oper:
+                        op = oper[op][0]
+                    try:
+                        attr = [e for e in ['%s', '%s_', '__%s__']
+                                if hasattr(column, e % op)][0] % op
+                    except IndexError:
+                        raise db_exc.BlazarDBInvalidFilterOperator(
+                            filter_operator=op)
+
+                    if value == 'null':
+                        value = None
+
+                    filt = getattr(column, attr)(value)
+
+                networks_query = networks_query.filter(filt)
+            else:
+                # looking for extra capabilities matches
+                extra_filter = (
+                    _network_extra_capability_query(session)
+                    .filter(models.ResourceProperty.property_name == key)
+                ).all()
+                if not extra_filter:
+                    raise db_exc.BlazarDBNotFound(
+                        id=key, model='NetworkSegmentExtraCapability')
+                for network, capability_name in extra_filter:
+                    if op in oper and oper[op][1](
+                            network.capability_value, value):
+                        networks.append(network.network_id)
+                    elif op not in oper:
+                        msg = ('Operator %s for extra capabilities '
+                               'not implemented')
+                        raise NotImplementedError(msg % op)
+
+                # We must also avoid selecting any network which doesn't have
+                # the extra capability present.
+                all_networks = [h.id for h in networks_query.all()]
+                extra_filter_networks = [h.network_id for h, _ in extra_filter]
+                networks += [h for h in all_networks if h not in
+                             extra_filter_networks]
+
+        return networks_query.filter(
+            ~models.NetworkSegment.id.in_(networks)).all()
 
 
 def reservable_network_get_all_by_queries(queries):
@@ -1571,8 +1889,9 @@ def _network_extra_capability_get(session, network_extra_capability_id):
 
 
 def network_extra_capability_get(network_extra_capability_id):
-    return _network_extra_capability_get(get_session(),
-                                         network_extra_capability_id)
+    with reader() as session:
+        return _network_extra_capability_get(session,
+                                             network_extra_capability_id)
 
 
 def _network_extra_capability_get_all_per_network(session, network_id):
@@ -1583,25 +1902,24 @@ def _network_extra_capability_get_all_per_network(session, network_id):
 
 
 def network_extra_capability_get_all_per_network(network_id):
-    return _network_extra_capability_get_all_per_network(get_session(),
-                                                         network_id).all()
+    with reader() as session:
+        return _network_extra_capability_get_all_per_network(session,
+                                                             network_id).all()
 
 
 def network_extra_capability_create(values):
     values = values.copy()
 
-    resource_property = _resource_property_get_or_create(
-        get_session(), 'network', values.get('capability_name'))
+    with writer() as session:
+        resource_property = _resource_property_get_or_create(
+            session, 'network', values.get('capability_name'))
 
-    del values['capability_name']
-    values['property_id'] = resource_property.id
+        del values['capability_name']
+        values['property_id'] = resource_property.id
 
-    network_extra_capability = models.NetworkSegmentExtraCapability()
-    network_extra_capability.update(values)
-
-    session = get_session()
+        network_extra_capability = models.NetworkSegmentExtraCapability()
+        network_extra_capability.update(values)
 
-    with session.begin():
         try:
             network_extra_capability.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -1610,25 +1928,22 @@ def network_extra_capability_create(values):
                 model=network_extra_capability.__class__.__name__,
                 columns=e.columns)
 
-    return network_extra_capability_get(network_extra_capability.id)
+        return network_extra_capability_get(network_extra_capability.id)
 
 
 def network_extra_capability_update(network_extra_capability_id, values):
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         network_extra_capability, _ = (
             _network_extra_capability_get(session,
                                           network_extra_capability_id))
         network_extra_capability.update(values)
         network_extra_capability.save(session=session)
 
-    return network_extra_capability_get(network_extra_capability_id)
+        return network_extra_capability_get(network_extra_capability_id)
 
 
 def network_extra_capability_destroy(network_extra_capability_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         network_extra_capability = _network_extra_capability_get(
             session, network_extra_capability_id)
 
@@ -1642,18 +1957,14 @@ def network_extra_capability_destroy(network_extra_capability_id):
 
 
 def network_extra_capability_get_all_per_name(network_id, capability_name):
-    session = get_session()
-
-    with session.begin():
+    with reader() as session:
         query = _network_extra_capability_get_all_per_network(
             session, network_id)
         return query.filter_by(capability_name=capability_name).all()
 
 
 def network_extra_capability_get_latest_per_name(network_id, capability_name):
-    session = get_session()
-
-    with session.begin():
+    with reader() as session:
         query = _network_extra_capability_get_all_per_network(session,
                                                               network_id)
         return (
@@ -1676,11 +1987,13 @@ def _device_get_all(session):
 
 
 def device_get(device_id):
-    return _device_get(get_session(), device_id)
+    with reader() as session:
+        return _device_get(session, device_id)
 
 
 def device_list():
-    return model_query(models.Device, get_session()).all()
+    with reader() as session:
+        return model_query(models.Device, session).all()
 
 
 def device_create(values):
@@ -1688,8 +2001,7 @@ def device_create(values):
     device = models.Device()
     device.update(values)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             device.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -1697,23 +2009,20 @@ def device_create(values):
             raise db_exc.BlazarDBDuplicateEntry(
                 model=device.__class__.__name__, columns=e.columns)
 
-    return device_get(device.id)
+        return device_get(device.id)
 
 
 def device_update(device_id, values):
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         device = _device_get(session, device_id)
         device.update(values)
         device.save(session=session)
 
-    return device_get(device_id)
+        return device
 
 
 def device_destroy(device_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         device = _device_get(session, device_id)
 
         if not device:
@@ -1736,13 +2045,15 @@ def _device_allocation_get(session, device_allocation_id):
 
 
 def device_allocation_get(device_allocation_id):
-    return _device_allocation_get(get_session(),
-                                  device_allocation_id)
+    with reader() as session:
+        return _device_allocation_get(session,
+                                      device_allocation_id)
 
 
 def device_allocation_get_all():
-    query = model_query(models.DeviceAllocation, get_session())
-    return query.all()
+    with reader() as session:
+        query = model_query(models.DeviceAllocation, session)
+        return query.all()
 
 
 def device_allocation_create(values):
@@ -1750,8 +2061,7 @@ def device_allocation_create(values):
     device_allocation = models.DeviceAllocation()
     device_allocation.update(values)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             device_allocation.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -1759,34 +2069,32 @@ def device_allocation_create(values):
             raise db_exc.BlazarDBDuplicateEntry(
                 model=device_allocation.__class__.__name__, columns=e.columns)
 
-    return device_allocation_get(device_allocation.id)
+        return device_allocation_get(device_allocation.id)
 
 
 def device_allocation_get_all_by_values(**kwargs):
     """Returns all entries filtered by col=value."""
-    allocation_query = model_query(models.DeviceAllocation, get_session())
-    for name, value in kwargs.items():
-        column = getattr(models.DeviceAllocation, name, None)
-        if column:
-            allocation_query = allocation_query.filter(column == value)
-    return allocation_query.all()
+    with reader() as session:
+        allocation_query = model_query(models.DeviceAllocation, session)
+        for name, value in kwargs.items():
+            column = getattr(models.DeviceAllocation, name, None)
+            if column:
+                allocation_query = allocation_query.filter(column == value)
+        return allocation_query.all()
 
 
 def device_allocation_update(device_allocation_id, values):
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         device_allocation = _device_allocation_get(session,
                                                    device_allocation_id)
         device_allocation.update(values)
         device_allocation.save(session=session)
 
-    return device_allocation_get(device_allocation_id)
+        return device_allocation
 
 
 def device_allocation_destroy(device_allocation_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         device_allocation = _device_allocation_get(session,
                                                    device_allocation_id)
 
@@ -1798,6 +2106,14 @@ def device_allocation_destroy(device_allocation_id):
         device_allocation.soft_delete(session=session)
 
 
+def device_allocation_bulk_create(values_list):
+    return _allocation_bulk_create(models.DeviceAllocation, values_list)
+
+
+def device_allocation_bulk_destroy(device_allocation_ids):
+    _allocation_bulk_destroy(models.DeviceAllocation, device_allocation_ids)
+
+
 # DeviceReservation
 
 def device_reservation_create(values):
@@ -1805,8 +2121,7 @@ def device_reservation_create(values):
     device_reservation = models.DeviceReservation()
     device_reservation.update(value)
 
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         try:
             device_reservation.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -1815,22 +2130,23 @@ def device_reservation_create(values):
                 model=device_reservation.__class__.__name__,
                 columns=e.columns)
 
-    return device_reservation_get(device_reservation.id)
+        return device_reservation_get(device_reservation.id)
 
 
-def device_reservation_get(device_reservation_id, session=None):
-    if not session:
-        session = get_session()
+def _device_reservation_get(session, device_reservation_id):
     query = model_query(models.DeviceReservation, session)
     return query.filter_by(id=device_reservation_id).first()
 
 
-def device_reservation_update(device_reservation_id, values):
-    session = get_session()
+def device_reservation_get(device_reservation_id):
+    with reader() as session:
+        return _device_reservation_get(session, device_reservation_id)
 
-    with session.begin():
-        device_reservation = device_reservation_get(
-            device_reservation_id, session)
+
+def device_reservation_update(device_reservation_id, values):
+    with writer() as session:
+        device_reservation = _device_reservation_get(
+            session, device_reservation_id)
 
         if not device_reservation:
             raise db_exc.BlazarDBNotFound(
@@ -1839,13 +2155,12 @@ def device_reservation_update(device_reservation_id, values):
         device_reservation.update(values)
         device_reservation.save(session=session)
 
-    return device_reservation_get(device_reservation_id)
+        return device_reservation
 
 
 def device_reservation_destroy(device_reservation_id):
-    session = get_session()
-    with session.begin():
-        device = device_reservation_get(device_reservation_id)
+    with writer() as session:
+        device = _device_reservation_get(session, device_reservation_id)
 
         if not device:
             raise db_exc.BlazarDBNotFound(
@@ -1857,13 +2172,14 @@ def device_reservation_destroy(device_reservation_id):
 def device_get_all_by_filters(filters):
     """Returns devices filtered by name of the field."""
 
-    devices_query = _device_get_all(get_session())
+    with reader() as session:
+        devices_query = _device_get_all(session)
 
-    if 'status' in filters:
-        devices_query = devices_query.filter(
-            models.Device.status == filters['status'])
+        if 'status' in filters:
+            devices_query = devices_query.filter(
+                models.Device.status == filters['status'])
 
-    return devices_query.all()
+        return devices_query.all()
 
 
 def device_get_all_by_queries(queries):
@@ -1873,70 +2189,73 @@ def device_get_all_by_queries(queries):
     http://docs.sqlalchemy.org/en/rel_0_7/core/expression_api.html
             #sqlalchemy.sql.operators.ColumnOperators
     """
-    devices_query = model_query(models.Device, get_session())
-
-    oper = {
-        '<': ['lt', lambda a, b: a >= b],
-        '>': ['gt', lambda a, b: a <= b],
-        '<=': ['le', lambda a, b: a > b],
-        '>=': ['ge', lambda a, b: a < b],
-        '==': ['eq', lambda a, b: a != b],
-        '!=': ['ne', lambda a, b: a == b],
-    }
-
-    devices = []
-    for query in queries:
-        try:
-            key, op, value = query.split(' ', 2)
-        except ValueError:
-            raise db_exc.BlazarDBInvalidFilter(query_filter=query)
-
-        column = getattr(models.Device, key, None)
-        if column is not None:
-            if op == 'in':
-                filt = column.in_(value.split(','))
-            else:
-                if op in oper:
-                    op = oper[op][0]
-                try:
-                    attr = [e for e in ['%s', '%s_', '__%s__']
-                            if hasattr(column, e % op)][0] % op
-                except IndexError:
-                    raise db_exc.BlazarDBInvalidFilterOperator(
-                        filter_operator=op)
-
-                if value == 'null':
-                    value = None
-
-                filt = getattr(column, attr)(value)
-
-            devices_query = devices_query.filter(filt)
-        else:
-            # looking for extra capabilities matches
-            extra_filter = (
-                _device_extra_capability_query(get_session())
-                .filter(models.ResourceProperty.property_name == key)
-            ).all()
-
-            if not extra_filter:
-                raise db_exc.BlazarDBNotFound(
-                    id=key, model='DeviceExtraCapability')
-
-            for device, capability_name in extra_filter:
-                if op in oper and oper[op][1](device.capability_value, value):
-                    devices.append(device.device_id)
-                elif op not in oper:
-                    msg = 'Operator %s for extra capabilities not implemented'
-                    raise NotImplementedError(msg % op)
-
-            # We must also avoid selecting any device which doesn't have the
-            # extra capability present.
-            all_devices = [h.id for h in devices_query.all()]
-            extra_filter_devices = [h.device_id for h, _ in extra_filter]
-            devices += [h for h in all_devices if h not in
-                        extra_filter_devices]
+    with reader() as session:
+        devices_query = model_query(models.Device, session)
+
+        oper = {
+            '<': ['lt', lambda a, b: a >= b],
+            '>': ['gt', lambda a, b: a <= b],
+            '<=': ['le', lambda a, b: a > b],
+            '>=': ['ge', lambda a, b: a < b],
+            '==': ['eq', lambda a, b: a != b],
+            '!=': ['ne', lambda a, b: a == b],
+        }
 
-    return devices_query.filter(~models.Device.id.in_(devices)).all()
+        devices = []
+        for query in queries:
+            try:
+                key, op, value = query.split(' ', 2)
+            except ValueError:
+                raise db_exc.BlazarDBInvalidFilter(query_filter=query)
+
+            column = getattr(models.Device, key, None)
+            if column is not None:
+                if op == 'in':
+                    filt = column.in_(value.split(','))
+                else:
+                    if op in oper:
+                        op = oper[op][0]
+                    try:
+                        attr = [e for e in ['%s', '%s_', '__%s__']
+                                if hasattr(column, e % op)][0] % op
+                    except IndexError:
+                        raise db_exc.BlazarDBInvalidFilterOperator(
+                            filter_operator=op)
+
+                    if value == 'null':
+                        value = None
+
+                    filt = getattr(column, attr)(value)
+
+                devices_query = devices_query.filter(filt)
+            else:
+                # looking for extra capabilities matches
+                extra_filter = (
+                    _device_extra_capability_query(session)
+                    .filter(models.ResourceProperty.property_name == key)
+                ).all()
+
+                if not extra_filter:
+                    raise db_exc.BlazarDBNotFound(
+                        id=key, model='DeviceExtraCapability')
+
+                for device, capability_name in extra_filter:
+                    if op in oper and oper[op][1](
+                            device.capability_value, value):
+                        devices.append(device.device_id)
+                    elif op not in oper:
+                        msg = ('Operator %s for extra capabilities '
+                               'not implemented')
+                        raise NotImplementedError(msg % op)
+
+                # We must also avoid selecting any device which doesn't have
+                # the extra capability present.
+                all_devices = [h.id for h in devices_query.all()]
+                extra_filter_devices = [h.device_id for h, _ in extra_filter]
+                devices += [h for h in all_devices if h not in
+                            extra_filter_devices]
+
+        return devices_query.filter(~models.Device.id.in_(devices)).all()
 
 
 def reservable_device_get_all_by_queries(queries):
@@ -1979,8 +2298,9 @@ def _device_extra_capability_get(session, device_extra_capability_id):
 
 
 def device_extra_capability_get(device_extra_capability_id):
-    return _device_extra_capability_get(get_session(),
-                                        device_extra_capability_id)
+    with reader() as session:
+        return _device_extra_capability_get(session,
+                                            device_extra_capability_id)
 
 
 def _device_extra_capability_get_all_per_device(session, device_id):
@@ -1991,25 +2311,24 @@ def _device_extra_capability_get_all_per_device(session, device_id):
 
 
 def device_extra_capability_get_all_per_device(device_id):
-    return _device_extra_capability_get_all_per_device(get_session(),
-                                                       device_id).all()
+    with reader() as session:
+        return _device_extra_capability_get_all_per_device(session,
+                                                           device_id).all()
 
 
 def device_extra_capability_create(values):
     values = values.copy()
 
-    resource_property = _resource_property_get_or_create(
-        get_session(), 'device', values.get('capability_name'))
-
-    del values['capability_name']
-    values['property_id'] = resource_property.id
+    with writer() as session:
+        resource_property = _resource_property_get_or_create(
+            session, 'device', values.get('capability_name'))
 
-    device_extra_capability = models.DeviceExtraCapability()
-    device_extra_capability.update(values)
+        del values['capability_name']
+        values['property_id'] = resource_property.id
 
-    session = get_session()
+        device_extra_capability = models.DeviceExtraCapability()
+        device_extra_capability.update(values)
 
-    with session.begin():
         try:
             device_extra_capability.save(session=session)
         except common_db_exc.DBDuplicateEntry as e:
@@ -2018,25 +2337,22 @@ def device_extra_capability_create(values):
                 model=device_extra_capability.__class__.__name__,
                 columns=e.columns)
 
-    return device_extra_capability_get(device_extra_capability.id)
+        return device_extra_capability_get(device_extra_capability.id)
 
 
 def device_extra_capability_update(device_extra_capability_id, values):
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         device_extra_capability, _ = (
             _device_extra_capability_get(session,
                                          device_extra_capability_id))
         device_extra_capability.update(values)
         device_extra_capability.save(session=session)
 
-    return device_extra_capability_get(device_extra_capability_id)
+        return device_extra_capability_get(device_extra_capability_id)
 
 
 def device_extra_capability_destroy(device_extra_capability_id):
-    session = get_session()
-    with session.begin():
+    with writer() as session:
         device_extra_capability = _device_extra_capability_get(
             session, device_extra_capability_id)
 
@@ -2050,18 +2366,14 @@ def device_extra_capability_destroy(device_extra_capability_id):
 
 
 def device_extra_capability_get_all_per_name(device_id, capability_name):
-    session = get_session()
-
-    with session.begin():
+    with reader() as session:
         query = _device_extra_capability_get_all_per_device(
             session, device_id)
         return query.filter_by(capability_name=capability_name).all()
 
 
 def device_extra_capability_get_latest_per_name(device_id, capability_name):
-    session = get_session()
-
-    with session.begin():
+    with reader() as session:
         query = _device_extra_capability_get_all_per_device(session,
                                                             device_id)
         return (
@@ -2083,7 +2395,8 @@ def _resource_property_get(session, resource_type, property_name):
 
 
 def resource_property_get(resource_type, property_name):
-    return _resource_property_get(get_session(), resource_type, property_name)
+    with reader() as session:
+        return _resource_property_get(session, resource_type, property_name)
 
 
 def resource_properties_list(resource_type):
@@ -2091,9 +2404,7 @@ def resource_properties_list(resource_type):
         raise db_exc.BlazarDBResourcePropertiesNotEnabled(
             resource_type=resource_type)
 
-    session = get_session()
-
-    with session.begin():
+    with reader() as session:
 
         resource_model = RESOURCE_PROPERTY_MODELS[resource_type]
         query = _read_deleted_filter(session.query(
@@ -2112,21 +2423,21 @@ def _resource_property_create(session, values):
     resource_property = models.ResourceProperty()
     resource_property.update(values)
 
-    with session.begin():
-        try:
-            resource_property.save(session=session)
-        except common_db_exc.DBDuplicateEntry as e:
-            # raise exception about duplicated columns (e.columns)
-            raise db_exc.BlazarDBDuplicateEntry(
-                model=resource_property.__class__.__name__,
-                columns=e.columns)
+    try:
+        resource_property.save(session=session)
+    except common_db_exc.DBDuplicateEntry as e:
+        # raise exception about duplicated columns (e.columns)
+        raise db_exc.BlazarDBDuplicateEntry(
+            model=resource_property.__class__.__name__,
+            columns=e.columns)
 
-    return resource_property_get(values.get('resource_type'),
-                                 values.get('property_name'))
+    return _resource_property_get(session, values.get('resource_type'),
+                                  values.get('property_name'))
 
 
 def resource_property_create(values):
-    return _resource_property_create(get_session(), values)
+    with writer() as session:
+        return _resource_property_create(session, values)
 
 
 def resource_property_update(resource_type, property_name, values):
@@ -2135,9 +2446,7 @@ def resource_property_update(resource_type, property_name, values):
             resource_type=resource_type)
 
     values = values.copy()
-    session = get_session()
-
-    with session.begin():
+    with writer() as session:
         resource_property = _resource_property_get(
             session, resource_type, property_name)
 
@@ -2149,7 +2458,7 @@ def resource_property_update(resource_type, property_name, values):
         resource_property.update(values)
         resource_property.save(session=session)
 
-    return resource_property_get(resource_type, property_name)
+        return resource_property
 
 
 def _resource_property_get_or_create(session, resource_type, property_name):
@@ -2168,12 +2477,14 @@ def _resource_property_get_or_create(session, resource_type, property_name):
             'property_name': property_name
         }
 
-        return resource_property_create(rp_values)
+        return _resource_property_create(session, rp_values)
 
 
 def resource_property_get_or_create(resource_type, capability_name):
-    return _resource_property_get_or_create(
-        get_session(), resource_type, capability_name)
+    with writer() as session:
+        return _resource_property_get_or_create(
+            session, resource_type, capability_name)
 def resource_property_get_or_create(resource_type, property_name):
-    return _resource_property_get_or_create(
-        get_session(), resource_type, property_name)
+    with writer() as session:
+        return _resource_property_get_or_create(
+            session, resource_type, property_name)
@@ -13,35 +13,155 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import time
+
 from oslo_config import cfg
-from oslo_db.sqlalchemy import session as db_session
+from oslo_db import exception as db_exc
+from oslo_db.sqlalchemy import enginefacade
+from oslo_log import log as logging
+import sqlalchemy as sa
+
 
+opts = [
+    cfg.BoolOpt('replica_queries',
+                default=False,
+                help='Read the allocations listed by the calendar endpoints '
+                     'and the leases listed by the API from the database '
+                     'configured with the slave_connection option. Writes '
+                     'and event claims always use the primary database.'),
+    cfg.IntOpt('replica_max_staleness',
+               default=30,
+               min=0,
+               help='Maximum replication lag of the slave_connection '
+                    'database, in seconds. While the replica lags further '
+                    'behind, or if its lag cannot be measured, queries read '
+                    'from the primary database instead. The lag of MySQL and '
+                    'PostgreSQL replicas is measured every few seconds.'),
+]
 
 CONF = cfg.CONF
+CONF.register_opts(opts, 'database')
+LOG = logging.getLogger(__name__)
 
-_engine_facade = None
+# Number of seconds during which a measure of the replica lag is reused.
+REPLICA_CHECK_INTERVAL = 5
 
+_context_manager = None
+_replica_check = (None, False)
 
-def get_session():
-    return _get_facade().get_session()
 
+class _DBContext(object):
+    """Context of the transactions of the DB API functions.
 
-def get_engine():
-    return _get_facade().get_engine()
+    The DB API functions do not take a request context, their transactions
+    are scoped to the current thread by enginefacade instead.
+    """
 
 
-def _clear_engine():
-    global _engine_facade
-    _engine_facade = None
+_CONTEXT = _DBContext()
+
+
+def _get_context_manager():
+    global _context_manager
+    if _context_manager is None:
+        _context_manager = enginefacade.transaction_context()
+    return _context_manager
+
+
+def reader():
+    """Return a context manager of a read-only transaction.
+
+    It yields a session of the primary database. In a transaction of the
+    current thread, including an async_reader() one, it joins that
+    transaction instead.
+    """
+    return _get_context_manager().reader.allow_async.using(_CONTEXT)
+
+
+def async_reader():
+    """Return a context manager of a read-only transaction which may lag.
+
+    It yields a session of the replica database configured with the
+    [database]/slave_connection option when [database]/replica_queries is
+    set and the replica is fresh enough, or of the primary database
+    otherwise. In a transaction of the current thread, it joins that
+    transaction instead.
+    """
+    if not _replica_usable():
+        return reader()
+    return _get_context_manager().reader.async_.using(_CONTEXT)
+
+
+def _replica_usable():
+    """Return whether queries may read from the replica database."""
+    global _replica_check
+    if not (CONF.database.replica_queries and
+            CONF.database.slave_connection):
+        return False
 
+    checked_at, usable = _replica_check
+    now = time.monotonic()
+    if checked_at is not None and now - checked_at < REPLICA_CHECK_INTERVAL:
+        return usable
 
-def _get_facade():
-    global _engine_facade
-    if not _engine_facade:
-        # FIXME(priteau): Remove autocommit=True (and ideally use of
-        # LegacyEngineFacade) asap since it's not compatible with SQLAlchemy
-        # 2.0.
-        _engine_facade = db_session.EngineFacade.from_config(CONF,
-                                                             autocommit=True)
+    try:
+        # A context of its own keeps the check out of the transaction of
+        # the current thread.
+        with _get_context_manager().reader.async_.using(
+                _DBContext()) as session:
+            lag = _replica_lag(session)
+    except db_exc.DBError:
+        LOG.exception('Failed to measure the lag of the replica database.')
+        lag = None
 
-    return _engine_facade
+    fresh = lag is not None and lag <= CONF.database.replica_max_staleness
+    if usable and not fresh:
+        LOG.warning('The replica database lags behind by more than %d '
+                    'seconds, reading from the primary database.',
+                    CONF.database.replica_max_staleness)
+    _replica_check = (now, fresh)
+    return fresh
+
+
+def _replica_lag(session):
+    """Return the replication lag of a session in seconds, None if unknown."""
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return session.execute(sa.text(
+            'SELECT EXTRACT(EPOCH FROM '
+            'now() - pg_last_xact_replay_timestamp())')).scalar()
+    if dialect == 'mysql':
+        result = session.execute(sa.text('SHOW SLAVE STATUS'))
+        row = result.first()
+        if row is not None:
+            return dict(zip(result.keys(), row))['Seconds_Behind_Master']
+    return None
+
+
+def writer():
+    """Return a context manager of a read-write transaction.
+
+    It yields a session of the primary database, whose transaction is
+    committed when the block exits and rolled back if it raises. In a writer
+    transaction of the current thread, it joins that transaction instead.
+    """
+    return _get_context_manager().writer.using(_CONTEXT)
+
+
+def transaction():
+    """Run the DB API calls of a block in a single transaction.
+
+    The DB API functions called by the current thread in the block join the
+    writer transaction of the block.
+    """
+    return writer()
+
+
+def get_engine():
+    return _get_context_manager().writer.get_engine()
+
+
+def _clear_engine():
+    global _context_manager, _replica_check
+    _context_manager = None
+    _replica_check = (None, False)
@@ -44,6 +44,10 @@ class Lease(mb.BlazarBase, mb.SoftDeleteMixinWithUuid):
 
     __tablename__ = 'leases'
 
+    __table_args__ = (
+        sa.Index('ix_leases_project_id_deleted', 'project_id', 'deleted'),
+    )
+
     id = _id_column()
     name = sa.Column(sa.String(80), nullable=False)
     user_id = sa.Column(sa.String(255), nullable=True)
@@ -61,8 +65,14 @@ class Lease(mb.BlazarBase, mb.SoftDeleteMixinWithUuid):
 
     def to_dict(self):
         d = super(Lease, self).to_dict()
-        d['reservations'] = [r.to_dict() for r in self.reservations]
-        d['events'] = [e.to_dict() for e in self.events]
+
+        # Relationships left unloaded by the loading profile of the query
+        # are not part of the result.
+        unloaded = sa.inspect(self).unloaded
+        if 'reservations' not in unloaded:
+            d['reservations'] = [r.to_dict() for r in self.reservations]
+        if 'events' not in unloaded:
+            d['events'] = [e.to_dict() for e in self.events]
         return d
 
 
@@ -71,6 +81,10 @@ class Reservation(mb.BlazarBase, mb.SoftDeleteMixinWithUuid):
 
     __tablename__ = 'reservations'
 
+    __table_args__ = (
+        sa.Index('ix_reservations_lease_id_deleted', 'lease_id', 'deleted'),
+    )
+
     id = _id_column()
     lease_id = sa.Column(sa.String(36),
                          sa.ForeignKey('leases.id'),
@@ -178,16 +192,38 @@ class Event(mb.BlazarBase, mb.SoftDeleteMixinWithUuid):
 
     __tablename__ = 'events'
 
+    __table_args__ = (
+        sa.Index('ix_events_status_time', 'status', 'time'),
+    )
+
     id = _id_column()
     lease_id = sa.Column(sa.String(36), sa.ForeignKey('leases.id'))
     event_type = sa.Column(sa.String(66))
     time = sa.Column(sa.DateTime)
     status = sa.Column(sa.String(13))
+    worker_id = sa.Column(sa.String(255))
 
     def to_dict(self):
         return super(Event, self).to_dict()
 
 
+class AllocationRevision(mb.BlazarBase):
+    """Revision of the allocations of a resource type.
+
+    It is incremented by the transactions changing the allocations of the
+    resource type, the reservations and leases they belong to or the
+    resources themselves.
+    """
+
+    __tablename__ = 'allocation_revisions'
+
+    resource_type = sa.Column(sa.String(36), primary_key=True)
+    revision = sa.Column(sa.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return super(AllocationRevision, self).to_dict()
+
+
 class ResourceProperty(mb.BlazarBase, mb.SoftDeleteMixinWithUuid):
     """Defines an resource property by resource type."""
 
@@ -252,6 +288,13 @@ class ComputeHostAllocation(mb.BlazarBase, mb.SoftDeleteMixinWithUuid):
 
     __tablename__ = 'computehost_allocations'
 
+    __table_args__ = (
+        sa.Index('ix_computehost_allocations_compute_host_id_deleted',
+                 'compute_host_id', 'deleted'),
+        sa.Index('ix_computehost_allocations_reservation_id_deleted',
+                 'reservation_id', 'deleted'),
+    )
+
     id = _id_column()
     compute_host_id = sa.Column(sa.String(36))
     reservation_id = sa.Column(sa.String(36),
@@ -337,30 +380,30 @@ class ComputeHostExtraCapability(mb.BlazarBase, mb.SoftDeleteMixinWithUuid):
             str
         """
         from blazar.db.sqlalchemy import facade_wrapper
-        session = facade_wrapper.get_session()
-
-        # Determine the property ID and value to validate based on the key
-        property_id = value if key == "property_id" else self.property_id
-        capability_value = value if key == "capability_value" else self.capability_value
-
-        resource_property = session.query(ResourceProperty).filter_by(id=property_id).first()
-        if resource_property and resource_property.is_unique:
-            # exclude the current compute_host
-            # we should allow updating the node_name with current name
-            existing_capability = (
-                session.query(ComputeHostExtraCapability).filter(
-                       ComputeHostExtraCapability.computehost_id!=self.computehost_id,
-                       ComputeHostExtraCapability.property_id==resource_property.id,
-                       ComputeHostExtraCapability.capability_value==capability_value,
-                       ComputeHostExtraCapability.deleted==None
-                )
-            ).first()
-            if existing_capability:
-                raise ValueError(
-                    f"{resource_property.capability_name} must be unique. "
-                    f"Please select unique {resource_property.capability_name} for "
-                    f"{self.computehost_id}"
-                )
+
+        with facade_wrapper.reader() as session:
+            # Determine the property ID and value to validate based on the key
+            property_id = value if key == "property_id" else self.property_id
+            capability_value = value if key == "capability_value" else self.capability_value
+
+            resource_property = session.query(ResourceProperty).filter_by(id=property_id).first()
+            if resource_property and resource_property.is_unique:
+                # exclude the current compute_host
+                # we should allow updating the node_name with current name
+                existing_capability = (
+                    session.query(ComputeHostExtraCapability).filter(
+                           ComputeHostExtraCapability.computehost_id!=self.computehost_id,
+                           ComputeHostExtraCapability.property_id==resource_property.id,
+                           ComputeHostExtraCapability.capability_value==capability_value,
+                           ComputeHostExtraCapability.deleted==None
+                    )
+                ).first()
+                if existing_capability:
+                    raise ValueError(
+                        f"{resource_property.capability_name} must be unique. "
+                        f"Please select unique {resource_property.capability_name} for "
+                        f"{self.computehost_id}"
+                    )
         return value
 
 
@@ -408,6 +451,13 @@ class FloatingIPAllocation(mb.BlazarBase, mb.SoftDeleteMixinWithUuid):
 
     __tablename__ = 'floatingip_allocations'
 
+    __table_args__ = (
+        sa.Index('ix_floatingip_allocations_floatingip_id_deleted',
+                 'floatingip_id', 'deleted'),
+        sa.Index('ix_floatingip_allocations_reservation_id_deleted',
+                 'reservation_id', 'deleted'),
+    )
+
     id = _id_column()
     floatingip_id = sa.Column(sa.String(36),
                               sa.ForeignKey('floatingips.id'))
@@ -478,6 +528,13 @@ class NetworkAllocation(mb.BlazarBase, mb.SoftDeleteMixinWithUuid):
 
     __tablename__ = 'network_allocations'
 
+    __table_args__ = (
+        sa.Index('ix_network_allocations_network_id_deleted',
+                 'network_id', 'deleted'),
+        sa.Index('ix_network_allocations_reservation_id_deleted',
+                 'reservation_id', 'deleted'),
+    )
+
     id = _id_column()
     network_id = sa.Column(sa.String(36),
                            sa.ForeignKey('network_segments.id'))
@@ -563,6 +620,13 @@ class DeviceAllocation(mb.BlazarBase, mb.SoftDeleteMixinWithUuid):
 
     __tablename__ = 'device_allocations'
 
+    __table_args__ = (
+        sa.Index('ix_device_allocations_device_id_deleted',
+                 'device_id', 'deleted'),
+        sa.Index('ix_device_allocations_reservation_id_deleted',
+                 'reservation_id', 'deleted'),
+    )
+
     id = _id_column()
     device_id = sa.Column(sa.String(36),
                           sa.ForeignKey('devices.id'))
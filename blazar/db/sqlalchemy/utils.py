@@ -14,8 +14,10 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import itertools
 import sys
 from datetime import datetime, timedelta
+from blazar.db import exceptions as db_exc
 from blazar.db.sqlalchemy import api
 from blazar.db.sqlalchemy import facade_wrapper
 from blazar.db.sqlalchemy import models
@@ -27,7 +29,24 @@ from collections import defaultdict
 import sqlalchemy as sa
 
 
-get_session = facade_wrapper.get_session
+reader = facade_wrapper.reader
+
+# Resource model per resource type, as used by get_free_resource_ids().
+RESOURCE_MODELS = {
+    'host': models.ComputeHost,
+    'device': models.Device,
+    'network': models.NetworkSegment,
+    'floatingip': models.FloatingIP,
+}
+
+# Allocation model and resource column per resource type, as used by
+# get_free_periods() and get_reserved_periods().
+ALLOCATION_MODELS = {
+    'host': (models.ComputeHostAllocation, 'compute_host_id'),
+    'device': (models.DeviceAllocation, 'device_id'),
+    'network': (models.NetworkAllocation, 'network_id'),
+    'floatingip': (models.FloatingIPAllocation, 'floatingip_id'),
+}
 
 
 def get_backend():
@@ -36,150 +55,199 @@ def get_backend():
 
 
 def _get_leases_from_network_id(network_id, start_date, end_date):
-    session = get_session()
-    border0 = sa.and_(models.Lease.start_date < start_date,
-                      models.Lease.end_date < start_date)
-    border1 = sa.and_(models.Lease.start_date > end_date,
-                      models.Lease.end_date > end_date)
-    query = (api.model_query(models.Lease, session=session)
-             .join(models.Reservation)
-             .join(models.NetworkAllocation)
-             .filter(models.NetworkAllocation.deleted.is_(None))
-             .filter(models.NetworkAllocation.network_id == network_id)
-             .filter(~sa.or_(border0, border1)))
-    for lease in query:
+    with reader() as session:
+        border0 = sa.and_(models.Lease.start_date < start_date,
+                          models.Lease.end_date < start_date)
+        border1 = sa.and_(models.Lease.start_date > end_date,
+                          models.Lease.end_date > end_date)
+        query = (api.model_query(models.Lease, session=session)
+                 .join(models.Reservation)
+                 .join(models.NetworkAllocation)
+                 .filter(models.NetworkAllocation.deleted.is_(None))
+                 .filter(models.NetworkAllocation.network_id == network_id)
+                 .filter(~sa.or_(border0, border1)))
+        leases = query.all()
+    for lease in leases:
         yield lease
 
 
 def _get_leases_from_host_id(host_id, start_date, end_date):
-    session = get_session()
-    border0 = start_date <= models.Lease.end_date
-    border1 = models.Lease.start_date <= end_date
-    query = (session.query(models.Lease).join(models.Reservation)
-             .join(models.ComputeHostAllocation)
-             .filter(models.ComputeHostAllocation.deleted.is_(None))
-             .filter(models.ComputeHostAllocation.compute_host_id == host_id)
-             .filter(sa.and_(border0, border1)))
-    for lease in query:
+    with reader() as session:
+        border0 = start_date <= models.Lease.end_date
+        border1 = models.Lease.start_date <= end_date
+        query = (session.query(models.Lease).join(models.Reservation)
+                 .join(models.ComputeHostAllocation)
+                 .filter(models.ComputeHostAllocation.deleted.is_(None))
+                 .filter(models.ComputeHostAllocation.compute_host_id ==
+                         host_id)
+                 .filter(sa.and_(border0, border1)))
+        leases = query.all()
+    for lease in leases:
         yield lease
 
 
 def _get_leases_from_fip_id(fip_id, start_date, end_date):
-    session = get_session()
-    border0 = sa.and_(models.Lease.start_date < start_date,
-                      models.Lease.end_date < start_date)
-    border1 = sa.and_(models.Lease.start_date > end_date,
-                      models.Lease.end_date > end_date)
-    query = (session.query(models.Lease).join(models.Reservation)
-             .join(models.FloatingIPAllocation)
-             .filter(models.FloatingIPAllocation.deleted.is_(None))
-             .filter(models.FloatingIPAllocation.floatingip_id == fip_id)
-             .filter(~sa.or_(border0, border1)))
-    for lease in query:
+    with reader() as session:
+        border0 = sa.and_(models.Lease.start_date < start_date,
+                          models.Lease.end_date < start_date)
+        border1 = sa.and_(models.Lease.start_date > end_date,
+                          models.Lease.end_date > end_date)
+        query = (session.query(models.Lease).join(models.Reservation)
+                 .join(models.FloatingIPAllocation)
+                 .filter(models.FloatingIPAllocation.deleted.is_(None))
+                 .filter(models.FloatingIPAllocation.floatingip_id == fip_id)
+                 .filter(~sa.or_(border0, border1)))
+        leases = query.all()
+    for lease in leases:
         yield lease
 
 
 def _get_leases_from_device_id(device_id, start_date, end_date):
-    session = get_session()
-    border0 = start_date <= models.Lease.end_date
-    border1 = models.Lease.start_date <= end_date
-    query = (session.query(models.Lease).join(models.Reservation)
-             .join(models.DeviceAllocation)
-             .filter(models.DeviceAllocation.deleted.is_(None))
-             .filter(models.DeviceAllocation.device_id == device_id)
-             .filter(sa.and_(border0, border1)))
-    for lease in query:
+    with reader() as session:
+        border0 = start_date <= models.Lease.end_date
+        border1 = models.Lease.start_date <= end_date
+        query = (session.query(models.Lease).join(models.Reservation)
+                 .join(models.DeviceAllocation)
+                 .filter(models.DeviceAllocation.deleted.is_(None))
+                 .filter(models.DeviceAllocation.device_id == device_id)
+                 .filter(sa.and_(border0, border1)))
+        leases = query.all()
+    for lease in leases:
         yield lease
 
 
 def get_reservations_by_host_id(host_id, start_date, end_date):
-    session = get_session()
-    border0 = start_date <= models.Lease.end_date
-    border1 = models.Lease.start_date <= end_date
-    query = (session.query(models.Reservation).join(models.Lease)
-             .join(models.ComputeHostAllocation)
-             .filter(models.ComputeHostAllocation.deleted.is_(None))
-             .filter(models.ComputeHostAllocation.compute_host_id == host_id)
-             .filter(sa.and_(border0, border1)))
-    return query.all()
+    with reader() as session:
+        border0 = start_date <= models.Lease.end_date
+        border1 = models.Lease.start_date <= end_date
+        query = (session.query(models.Reservation).join(models.Lease)
+                 .join(models.ComputeHostAllocation)
+                 .filter(models.ComputeHostAllocation.deleted.is_(None))
+                 .filter(models.ComputeHostAllocation.compute_host_id ==
+                         host_id)
+                 .filter(sa.and_(border0, border1)))
+        return query.all()
 
 
 def get_reservations_by_host_ids(host_ids, start_date, end_date):
-    session = get_session()
-    border0 = start_date <= models.Lease.end_date
-    border1 = models.Lease.start_date <= end_date
-    query = (session.query(models.Reservation).join(models.Lease)
-             .join(models.ComputeHostAllocation)
-             .filter(models.ComputeHostAllocation.deleted.is_(None))
-             .filter(models.ComputeHostAllocation.compute_host_id
-                     .in_(host_ids))
-             .filter(sa.and_(border0, border1)))
-    return query.all()
+    with reader() as session:
+        border0 = start_date <= models.Lease.end_date
+        border1 = models.Lease.start_date <= end_date
+        query = (session.query(models.Reservation).join(models.Lease)
+                 .join(models.ComputeHostAllocation)
+                 .filter(models.ComputeHostAllocation.deleted.is_(None))
+                 .filter(models.ComputeHostAllocation.compute_host_id
+                         .in_(host_ids))
+                 .filter(sa.and_(border0, border1)))
+        return query.all()
+
+
+def get_reservation_usages_by_host_ids(host_ids, start_date, end_date):
+    """Return the reservations of hosts with their time frame and usage.
+
+    Each element is a dict with the host ID, the reservation ID, lease ID
+    and resource type, the lease start and end dates and, for instance
+    reservations, the vcpus, memory_mb and disk_gb of a slot. There is one
+    element per allocation, so an instance reservation with several slots
+    on a host is listed once per slot. All the hosts are queried at once.
+    """
+    with reader() as session:
+        fields = ['host_id', 'id', 'lease_id', 'resource_type', 'start_date',
+                  'end_date', 'vcpus', 'memory_mb', 'disk_gb']
+        border0 = start_date <= models.Lease.end_date
+        border1 = models.Lease.start_date <= end_date
+        query = (session.query(models.ComputeHostAllocation.compute_host_id,
+                               models.Reservation.id,
+                               models.Reservation.lease_id,
+                               models.Reservation.resource_type,
+                               models.Lease.start_date,
+                               models.Lease.end_date,
+                               models.InstanceReservations.vcpus,
+                               models.InstanceReservations.memory_mb,
+                               models.InstanceReservations.disk_gb)
+                 .select_from(models.Reservation)
+                 .join(models.Lease)
+                 .join(models.ComputeHostAllocation)
+                 .outerjoin(models.InstanceReservations)
+                 .filter(models.ComputeHostAllocation.deleted.is_(None))
+                 .filter(models.ComputeHostAllocation.compute_host_id
+                         .in_(host_ids))
+                 .filter(sa.and_(border0, border1)))
+        return [dict(zip(fields, r)) for r in query.all()]
 
 
 def get_reservations_by_network_id(network_id, start_date, end_date):
-    session = get_session()
-    border0 = sa.and_(models.Lease.start_date < start_date,
-                      models.Lease.end_date < start_date)
-    border1 = sa.and_(models.Lease.start_date > end_date,
-                      models.Lease.end_date > end_date)
-    query = (api.model_query(models.Reservation, session=session)
-             .join(models.Lease)
-             .join(models.NetworkAllocation)
-             .filter(models.NetworkAllocation.deleted.is_(None))
-             .filter(models.NetworkAllocation.network_id == network_id)
-             .filter(~sa.or_(border0, border1)))
-    return query.all()
+    with reader() as session:
+        border0 = sa.and_(models.Lease.start_date < start_date,
+                          models.Lease.end_date < start_date)
+        border1 = sa.and_(models.Lease.start_date > end_date,
+                          models.Lease.end_date > end_date)
+        query = (api.model_query(models.Reservation, session=session)
+                 .join(models.Lease)
+                 .join(models.NetworkAllocation)
+                 .filter(models.NetworkAllocation.deleted.is_(None))
+                 .filter(models.NetworkAllocation.network_id == network_id)
+                 .filter(~sa.or_(border0, border1)))
+        return query.all()
 
 
 def get_reservations_by_device_id(device_id, start_date, end_date):
-    session = get_session()
-    border0 = start_date <= models.Lease.end_date
-    border1 = models.Lease.start_date <= end_date
-    query = (session.query(models.Reservation).join(models.Lease)
-             .join(models.DeviceAllocation)
-             .filter(models.DeviceAllocation.deleted.is_(None))
-             .filter(models.DeviceAllocation.device_id == device_id)
-             .filter(sa.and_(border0, border1)))
-    return query.all()
+    with reader() as session:
+        border0 = start_date <= models.Lease.end_date
+        border1 = models.Lease.start_date <= end_date
+        query = (session.query(models.Reservation).join(models.Lease)
+                 .join(models.DeviceAllocation)
+                 .filter(models.DeviceAllocation.deleted.is_(None))
+                 .filter(models.DeviceAllocation.device_id == device_id)
+                 .filter(sa.and_(border0, border1)))
+        return query.all()
 
 
 def get_reservations_by_device_ids(device_ids, start_date, end_date):
-    session = get_session()
-    border0 = start_date <= models.Lease.end_date
-    border1 = models.Lease.start_date <= end_date
-    query = (session.query(models.Reservation).join(models.Lease)
-             .join(models.DeviceAllocation)
-             .filter(models.DeviceAllocation.deleted.is_(None))
-             .filter(models.DeviceAllocation.device_id
-                     .in_(device_ids))
-             .filter(sa.and_(border0, border1)))
-    return query.all()
+    with reader() as session:
+        border0 = start_date <= models.Lease.end_date
+        border1 = models.Lease.start_date <= end_date
+        query = (session.query(models.Reservation).join(models.Lease)
+                 .join(models.DeviceAllocation)
+                 .filter(models.DeviceAllocation.deleted.is_(None))
+                 .filter(models.DeviceAllocation.device_id
+                         .in_(device_ids))
+                 .filter(sa.and_(border0, border1)))
+        return query.all()
 
 
 def get_reservations_by_floatingip_ids(floatingip_ids, start_date, end_date):
-    session = get_session()
-    border0 = sa.and_(models.Lease.start_date < start_date,
-                      models.Lease.end_date < start_date)
-    border1 = sa.and_(models.Lease.start_date > end_date,
-                      models.Lease.end_date > end_date)
-    query = (api.model_query(models.Reservation, session=session)
-             .join(
-                models.Lease,
-                models.Lease.id == models.Reservation.lease_id
-             )
-             .join(
-                models.FloatingIPAllocation,
-                models.FloatingIPAllocation.reservation_id == models.Reservation.lease_id
-             )
-             .filter(models.FloatingIPAllocation.deleted.is_(None))
-             .filter(models.FloatingIPAllocation.floatingip_id.in_(floatingip_ids))
-             .filter(~sa.or_(border0, border1)))
-    return query.all()
+    with reader() as session:
+        border0 = sa.and_(models.Lease.start_date < start_date,
+                          models.Lease.end_date < start_date)
+        border1 = sa.and_(models.Lease.start_date > end_date,
+                          models.Lease.end_date > end_date)
+        query = (api.model_query(models.Reservation, session=session)
+                 .join(
+                    models.Lease,
+                    models.Lease.id == models.Reservation.lease_id
+                 )
+                 .join(
+                    models.FloatingIPAllocation,
+                    models.FloatingIPAllocation.reservation_id == models.Reservation.lease_id
+                 )
+                 .filter(models.FloatingIPAllocation.deleted.is_(None))
+                 .filter(models.FloatingIPAllocation.floatingip_id.in_(floatingip_ids))
+                 .filter(~sa.or_(border0, border1)))
+        return query.all()
 
 
 def get_reservations_for_allocations(session, start_date, end_date,
-                                     lease_id=None, reservation_id=None):
+                                     lease_id=None, reservation_id=None,
+                                     marker=None, limit=None,
+                                     resource_column=None, resource_ids=None):
+    """Returns the reservations of an allocation query.
+
+    They are ordered by the start date of their lease, and only those after
+    the reservation given as marker are returned. When a limit is given, only
+    the first limit reservations having an allocation whose resource_column
+    is in resource_ids are returned.
+    """
     fields = ['id', 'status', 'lease_id', 'start_date',
               'end_date', 'lease_name', 'project_id']
 
@@ -209,83 +277,188 @@ def get_reservations_for_allocations(session, start_date, end_date,
         reservations_query = reservations_query.filter(
             sa.and_(border0, border1))
 
+    if marker is not None:
+        marker_reservation = (session.query(models.Reservation.id,
+                                            models.Lease.start_date)
+                              .join(models.Lease)
+                              .filter(models.Reservation.id == marker)
+                              .first())
+        if marker_reservation is None:
+            raise db_exc.BlazarDBNotFound(id=marker, model='Reservation')
+        reservations_query = reservations_query.filter(sa.or_(
+            models.Lease.start_date > marker_reservation.start_date,
+            sa.and_(models.Lease.start_date == marker_reservation.start_date,
+                    models.Reservation.id > marker_reservation.id)))
+
+    if limit is not None:
+        allocation_model = resource_column.class_
+        reservations_query = (
+            reservations_query
+            .join(allocation_model,
+                  allocation_model.reservation_id == models.Reservation.id)
+            .filter(allocation_model.deleted.is_(None))
+            .filter(resource_column.in_(resource_ids))
+            .distinct())
+
+    reservations_query = reservations_query.order_by(
+        models.Lease.start_date, models.Reservation.id)
+    if limit is not None:
+        reservations_query = reservations_query.limit(limit)
     return [dict(zip(fields, r)) for r in reservations_query.all()]
 
 
 def get_reservation_allocations_by_host_ids(host_ids, start_date, end_date,
                                             lease_id=None,
-                                            reservation_id=None):
-    session = get_session()
-    reservations = get_reservations_for_allocations(
-        session, start_date, end_date, lease_id, reservation_id)
+                                            reservation_id=None,
+                                            marker=None, limit=None):
+    with reader() as session:
+        reservations = get_reservations_for_allocations(
+            session, start_date, end_date, lease_id, reservation_id,
+            marker, limit,
+            resource_column=models.ComputeHostAllocation.compute_host_id,
+            resource_ids=host_ids)
 
-    allocations_query = (session.query(
-        models.ComputeHostAllocation.reservation_id,
-        models.ComputeHostAllocation.compute_host_id)
-        .filter(models.ComputeHostAllocation.deleted.is_(None))
-        .filter(models.ComputeHostAllocation.compute_host_id.in_(host_ids))
-        .filter(models.ComputeHostAllocation.reservation_id.in_(
-            list(set([x['id'] for x in reservations])))))
+        allocations_query = (session.query(
+            models.ComputeHostAllocation.reservation_id,
+            models.ComputeHostAllocation.compute_host_id)
+            .filter(models.ComputeHostAllocation.deleted.is_(None))
+            .filter(models.ComputeHostAllocation.compute_host_id.in_(host_ids))
+            .filter(models.ComputeHostAllocation.reservation_id.in_(
+                list(set([x['id'] for x in reservations])))))
 
-    allocations = defaultdict(list)
+        allocations = defaultdict(list)
 
-    for row in allocations_query.all():
-        allocations[row[0]].append(row[1])
+        for row in allocations_query.all():
+            allocations[row[0]].append(row[1])
 
-    for r in reservations:
-        r['host_ids'] = allocations[r['id']]
-    return reservations
+        for r in reservations:
+            r['host_ids'] = allocations[r['id']]
+        return reservations
 
 
 def get_reservation_allocations_by_fip_ids(fip_ids, start_date, end_date,
-                                           lease_id=None, reservation_id=None):
-    session = get_session()
-    reservations = get_reservations_for_allocations(
-        session, start_date, end_date, lease_id, reservation_id)
+                                           lease_id=None, reservation_id=None,
+                                           marker=None, limit=None):
+    with reader() as session:
+        reservations = get_reservations_for_allocations(
+            session, start_date, end_date, lease_id, reservation_id,
+            marker, limit,
+            resource_column=models.FloatingIPAllocation.floatingip_id,
+            resource_ids=fip_ids)
 
-    allocations_query = (session.query(
-        models.FloatingIPAllocation.reservation_id,
-        models.FloatingIPAllocation.floatingip_id)
-        .filter(models.FloatingIPAllocation.deleted.is_(None))
-        .filter(models.FloatingIPAllocation.floatingip_id.in_(fip_ids))
-        .filter(models.FloatingIPAllocation.reservation_id.in_(
-            list(set([x['id'] for x in reservations])))))
+        allocations_query = (session.query(
+            models.FloatingIPAllocation.reservation_id,
+            models.FloatingIPAllocation.floatingip_id)
+            .filter(models.FloatingIPAllocation.deleted.is_(None))
+            .filter(models.FloatingIPAllocation.floatingip_id.in_(fip_ids))
+            .filter(models.FloatingIPAllocation.reservation_id.in_(
+                list(set([x['id'] for x in reservations])))))
 
-    allocations = defaultdict(list)
+        allocations = defaultdict(list)
 
-    for row in allocations_query.all():
-        allocations[row[0]].append(row[1])
+        for row in allocations_query.all():
+            allocations[row[0]].append(row[1])
 
-    for r in reservations:
-        r['floatingip_ids'] = allocations[r['id']]
+        for r in reservations:
+            r['floatingip_ids'] = allocations[r['id']]
 
-    return reservations
+        return reservations
 
 
 def get_reservation_allocations_by_network_ids(network_ids, start_date,
                                                end_date, lease_id=None,
-                                               reservation_id=None):
-    session = get_session()
-    reservations = get_reservations_for_allocations(
-        session, start_date, end_date, lease_id, reservation_id)
+                                               reservation_id=None,
+                                               marker=None, limit=None):
+    with reader() as session:
+        reservations = get_reservations_for_allocations(
+            session, start_date, end_date, lease_id, reservation_id,
+            marker, limit,
+            resource_column=models.NetworkAllocation.network_id,
+            resource_ids=network_ids)
 
-    allocations_query = (session.query(
-        models.NetworkAllocation.reservation_id,
-        models.NetworkAllocation.network_id)
-        .filter(models.NetworkAllocation.deleted.is_(None))
-        .filter(models.NetworkAllocation.network_id.in_(network_ids))
-        .filter(models.NetworkAllocation.reservation_id.in_(
-            list(set([x['id'] for x in reservations])))))
+        allocations_query = (session.query(
+            models.NetworkAllocation.reservation_id,
+            models.NetworkAllocation.network_id)
+            .filter(models.NetworkAllocation.deleted.is_(None))
+            .filter(models.NetworkAllocation.network_id.in_(network_ids))
+            .filter(models.NetworkAllocation.reservation_id.in_(
+                list(set([x['id'] for x in reservations])))))
 
-    allocations = defaultdict(list)
+        allocations = defaultdict(list)
 
-    for row in allocations_query.all():
-        allocations[row[0]].append(row[1])
+        for row in allocations_query.all():
+            allocations[row[0]].append(row[1])
 
-    for r in reservations:
-        r['network_ids'] = allocations[r['id']]
+        for r in reservations:
+            r['network_ids'] = allocations[r['id']]
 
-    return reservations
+        return reservations
+
+
+def _most_recent_reservation_rows(query, resource_id):
+    """Keep the rows of query of the most recent lease of each resource.
+
+    query must select resource_id first and join the Lease model. The rows
+    are returned in a dict keyed by resource id, with a single row per
+    resource when several of its leases start at the same time.
+    """
+    latest = (query.with_entities(
+        resource_id.label('resource_id'),
+        sa.func.max(models.Lease.start_date).label('start_date'))
+        .group_by(resource_id)
+        .subquery())
+    query = query.join(
+        latest,
+        sa.and_(latest.c.resource_id == resource_id,
+                latest.c.start_date == models.Lease.start_date))
+
+    rows = {}
+    for row in query.all():
+        rows.setdefault(row[0], row)
+    return rows
+
+
+def get_most_recent_reservation_info_by_network_ids(network_ids):
+    """returns the recent network reservation of each network, which is not
+    in pending status and start_date of the reservation is less than current
+    date
+
+    Args:
+        network_ids (): network ids - primary keys of NetworkSegment table
+    Returns:
+        a dict of reservations keyed by network id, without the networks
+        having no such reservation
+    """
+    if not network_ids:
+        return {}
+    with reader() as session:
+        curr_date = datetime.utcnow() + timedelta(seconds=300)
+        query = (
+            session.query(
+                models.NetworkSegment.id.label('network_id'),
+                models.NetworkSegment.segment_id,
+                models.Lease.start_date,
+                models.Lease.end_date,
+                models.Reservation.status.label('status'),
+                models.Reservation.id,
+            )
+            .filter(models.NetworkSegment.id.in_(network_ids))
+            .join(
+                models.NetworkAllocation,
+                models.NetworkAllocation.network_id == models.NetworkSegment.id
+            )
+            .join(
+                models.Reservation,
+                models.Reservation.id == models.NetworkAllocation.reservation_id
+            )
+            .join(
+                models.Lease,
+                models.Lease.id == models.Reservation.lease_id
+            )
+            .filter(models.Lease.start_date < curr_date)
+            .filter(models.Reservation.status != status.reservation.PENDING)
+        )
+        return _most_recent_reservation_rows(query, models.NetworkSegment.id)
 
 
 def get_most_recent_reservation_info_by_network_id(network_id):
@@ -295,61 +468,86 @@ def get_most_recent_reservation_info_by_network_id(network_id):
     Args:
         network_id (): network id - primary key of NetworkSegment table
     """
-    session = get_session()
-    curr_date = datetime.utcnow() + timedelta(seconds=300)
-    query = (
-        session.query(
-            models.NetworkSegment.id.label('network_id'),
-            models.NetworkSegment.segment_id,
-            models.Lease.start_date,
-            models.Lease.end_date,
-            models.Reservation.status.label('status'),
-            models.Reservation.id,
-        )
-        .filter(models.NetworkSegment.id == network_id)
-        .join(
-            models.NetworkAllocation,
-            models.NetworkAllocation.network_id == models.NetworkSegment.id
-        )
-        .join(
-            models.Reservation,
-            models.Reservation.id == models.NetworkAllocation.reservation_id
-        )
-        .join(
-            models.Lease,
-            models.Lease.id == models.Reservation.lease_id
-        )
-        .filter(models.Lease.start_date < curr_date)
-        .filter(models.Reservation.status != status.reservation.PENDING)
-        .order_by(models.Lease.start_date.desc())
-    )
-    return query.first()
+    return get_most_recent_reservation_info_by_network_ids(
+        [network_id]).get(network_id)
 
 
 def get_reservation_allocations_by_device_ids(device_ids, start_date, end_date,
                                               lease_id=None,
-                                              reservation_id=None):
-    session = get_session()
-    reservations = get_reservations_for_allocations(
-        session, start_date, end_date, lease_id, reservation_id)
+                                              reservation_id=None,
+                                              marker=None, limit=None):
+    with reader() as session:
+        reservations = get_reservations_for_allocations(
+            session, start_date, end_date, lease_id, reservation_id,
+            marker, limit,
+            resource_column=models.DeviceAllocation.device_id,
+            resource_ids=device_ids)
+
+        allocations_query = (session.query(
+            models.DeviceAllocation.reservation_id,
+            models.DeviceAllocation.device_id)
+            .filter(models.DeviceAllocation.deleted.is_(None))
+            .filter(models.DeviceAllocation.device_id.in_(device_ids))
+            .filter(models.DeviceAllocation.reservation_id.in_(
+                list(set([x['id'] for x in reservations])))))
+
+        allocations = defaultdict(list)
+
+        for row in allocations_query.all():
+            allocations[row[0]].append(row[1])
 
-    allocations_query = (session.query(
-        models.DeviceAllocation.reservation_id,
-        models.DeviceAllocation.device_id)
-        .filter(models.DeviceAllocation.deleted.is_(None))
-        .filter(models.DeviceAllocation.device_id.in_(device_ids))
-        .filter(models.DeviceAllocation.reservation_id.in_(
-            list(set([x['id'] for x in reservations])))))
+        for r in reservations:
+            r['device_ids'] = allocations[r['id']]
 
-    allocations = defaultdict(list)
+        return reservations
 
-    for row in allocations_query.all():
-        allocations[row[0]].append(row[1])
 
-    for r in reservations:
-        r['device_ids'] = allocations[r['id']]
+def get_most_recent_reservation_info_by_host_ids(host_ids):
+    """returns the recent host reservation of each host, which is not in
+    pending status and start_date of the reservation is less than current
+    date
 
-    return reservations
+    Args:
+        host_ids (): Host ids - primary keys of ComputeHost table
+    Returns:
+        a dict of reservations keyed by host id, without the hosts having no
+        such reservation
+    """
+    if not host_ids:
+        return {}
+    with reader() as session:
+        curr_date = datetime.utcnow() + timedelta(seconds=300)
+        query = (
+            session.query(
+                models.ComputeHost.id.label('host_id'),
+                models.ComputeHost.hypervisor_hostname,
+                models.Reservation.status.label('reservation_status'),
+                models.Lease.start_date,
+                models.Lease.end_date,
+                models.ComputeHostReservation.aggregate_id,
+                models.ComputeHostReservation.reservation_id,
+            )
+            .filter(models.ComputeHost.id.in_(host_ids))
+            .join(
+                models.ComputeHostAllocation,
+                models.ComputeHostAllocation.compute_host_id == models.ComputeHost.id
+            )
+            .join(
+                models.ComputeHostReservation,
+                models.ComputeHostReservation.reservation_id == models.ComputeHostAllocation.reservation_id
+            )
+            .join(
+                models.Reservation,
+                models.Reservation.id == models.ComputeHostReservation.reservation_id
+            )
+            .join(
+                models.Lease,
+                models.Lease.id == models.Reservation.lease_id
+            )
+            .filter(models.Lease.start_date < curr_date)
+            .filter(models.Reservation.status != status.reservation.PENDING)
+        )
+        return _most_recent_reservation_rows(query, models.ComputeHost.id)
 
 
 def get_most_recent_reservation_info_by_host_id(host_id):
@@ -359,40 +557,51 @@ def get_most_recent_reservation_info_by_host_id(host_id):
     Args:
         host_id (): Host id - primary key of ComputeHost table
     """
-    session = get_session()
-    curr_date = datetime.utcnow() + timedelta(seconds=300)
-    query = (
-        session.query(
-            models.ComputeHost.id.label('host_id'),
-            models.ComputeHost.hypervisor_hostname,
-            models.Reservation.status.label('reservation_status'),
-            models.Lease.start_date,
-            models.Lease.end_date,
-            models.ComputeHostReservation.aggregate_id,
-            models.ComputeHostReservation.reservation_id,
-        )
-        .filter(models.ComputeHost.id == host_id)
-        .join(
-            models.ComputeHostAllocation,
-            models.ComputeHostAllocation.compute_host_id == models.ComputeHost.id
-        )
-        .join(
-            models.ComputeHostReservation,
-            models.ComputeHostReservation.reservation_id == models.ComputeHostAllocation.reservation_id
-        )
-        .join(
-            models.Reservation,
-            models.Reservation.id == models.ComputeHostReservation.reservation_id
-        )
-        .join(
-            models.Lease,
-            models.Lease.id == models.Reservation.lease_id
+    return get_most_recent_reservation_info_by_host_ids(
+        [host_id]).get(host_id)
+
+
+def get_most_recent_reservation_info_by_fip_ids(fip_ids):
+    """returns the recent FIP reservation of each FIP, which is not in
+    pending status and start_date of the reservation is less than current
+    date
+
+    Args:
+        fip_ids (): FIP ids - primary keys of FloatingIP table
+    Returns:
+        a dict of reservations keyed by FIP id, without the FIPs having no
+        such reservation
+    """
+    if not fip_ids:
+        return {}
+    with reader() as session:
+        curr_date = datetime.utcnow() + timedelta(seconds=300)
+        query = (
+            session.query(
+                models.FloatingIP.id.label('fip_id'),
+                models.FloatingIP.floating_ip_address,
+                models.Lease.start_date,
+                models.Lease.end_date,
+                models.Reservation.status.label('status'),
+                models.Reservation.id,
+            )
+            .filter(models.FloatingIP.id.in_(fip_ids))
+            .join(
+                models.FloatingIPAllocation,
+                models.FloatingIPAllocation.floatingip_id == models.FloatingIP.id
+            )
+            .join(
+                models.Reservation,
+                models.Reservation.id == models.FloatingIPAllocation.reservation_id
+            )
+            .join(
+                models.Lease,
+                models.Lease.id == models.Reservation.lease_id
+            )
+            .filter(models.Lease.start_date < curr_date)
+            .filter(models.Reservation.status != status.reservation.PENDING)
         )
-        .filter(models.Lease.start_date < curr_date)
-        .filter(models.Reservation.status != status.reservation.PENDING)
-        .order_by(models.Lease.start_date.desc())
-    )
-    return query.first()
+        return _most_recent_reservation_rows(query, models.FloatingIP.id)
 
 
 def get_most_recent_reservation_info_by_fip_id(fip_id):
@@ -400,46 +609,164 @@ def get_most_recent_reservation_info_by_fip_id(fip_id):
     pending status and start_date of the reservation is less than current date
 
     Args:
-        host_id (): Host id - primary key of ComputeHost table
+        fip_id (): FIP id - primary key of FloatingIP table
     """
-    session = get_session()
-    curr_date = datetime.utcnow() + timedelta(seconds=300)
-    query = (
-        session.query(
-            models.FloatingIP.id.label('fip_id'),
-            models.FloatingIP.floating_ip_address,
-            models.Lease.start_date,
-            models.Lease.end_date,
-            models.Reservation.status.label('status'),
-            models.Reservation.id,
-        )
-        .filter(models.FloatingIP.id == fip_id)
-        .join(
-            models.FloatingIPAllocation,
-            models.FloatingIPAllocation.floatingip_id == models.FloatingIP.id
-        )
-        .join(
-            models.Reservation,
-            models.Reservation.id == models.FloatingIPAllocation.reservation_id
-        )
-        .join(
-            models.Lease,
-            models.Lease.id == models.Reservation.lease_id
-        )
-        .filter(models.Lease.start_date < curr_date)
-        .filter(models.Reservation.status != status.reservation.PENDING)
-        .order_by(models.Lease.start_date.desc())
-    )
-    return query.first()
+    return get_most_recent_reservation_info_by_fip_ids([fip_id]).get(fip_id)
 
 
 def get_user_ids_for_lease_ids(lease_ids):
-    session = get_session()
+    with reader() as session:
+        leases_query = (session.query(models.Lease.id, models.Lease.user_id)
+                        .filter(models.Lease.id.in_(lease_ids)))
+
+        return leases_query.all()
+
+
+def get_allocation_windows(resource_type, allocation_id=None,
+                           lease_id=None, allocation_ids=None):
+    """Returns the time windows of the allocations of a resource type.
+
+    Each row is a tuple (allocation_id, resource_id, reservation_id,
+    lease_id, start_date, end_date) for a non-deleted allocation.
+    """
+    model, resource_column = _get_allocation_model(resource_type)
+
+    with reader() as session:
+        query = (session.query(
+            model.id,
+            getattr(model, resource_column),
+            model.reservation_id,
+            models.Reservation.lease_id,
+            models.Lease.start_date,
+            models.Lease.end_date)
+            .join(models.Reservation,
+                  models.Reservation.id == model.reservation_id)
+            .join(models.Lease, models.Lease.id == models.Reservation.lease_id)
+            .filter(model.deleted.is_(None)))
+
+        if allocation_id:
+            query = query.filter(model.id == allocation_id)
+        if allocation_ids:
+            query = query.filter(model.id.in_(allocation_ids))
+        if lease_id:
+            query = query.filter(models.Lease.id == lease_id)
+
+        return query.all()
+
+
+def _get_allocation_model(resource_type):
+    try:
+        return ALLOCATION_MODELS[resource_type]
+    except KeyError:
+        raise mgr_exceptions.UnsupportedResourceType(
+            resource_type=resource_type)
 
-    leases_query = (session.query(models.Lease.id, models.Lease.user_id)
-                    .filter(models.Lease.id.in_(lease_ids)))
 
-    return leases_query.all()
+def get_free_resource_ids(resource_type, resource_ids, start_date, end_date):
+    """Returns the resources which are not allocated during a period.
+
+    A single anti-join selects the candidate resources for which no
+    allocation belongs to a lease overlapping [start_date, end_date]. Leases
+    only touching the boundaries of the period do not overlap it, like in
+    get_free_periods().
+
+    :param resource_type: the type of the resources to consider
+    :param resource_ids: the ids of the candidate resources
+    :param start_date: start datetime of the period
+    :param end_date: end datetime of the period
+    :returns: the ids of the free resources, in no particular order
+    """
+    model, resource_column = _get_allocation_model(resource_type)
+    resource_model = RESOURCE_MODELS[resource_type]
+    if not resource_ids:
+        return []
+
+    with reader() as session:
+        overlapping = (session.query(model.id)
+                       .join(models.Reservation,
+                             models.Reservation.id == model.reservation_id)
+                       .join(models.Lease,
+                             models.Lease.id == models.Reservation.lease_id)
+                       .filter(getattr(model, resource_column) ==
+                               resource_model.id)
+                       .filter(model.deleted.is_(None))
+                       .filter(models.Lease.deleted.is_(None))
+                       .filter(models.Lease.start_date < end_date)
+                       .filter(models.Lease.end_date > start_date))
+        query = (session.query(resource_model.id)
+                 .filter(resource_model.id.in_(resource_ids))
+                 .filter(~overlapping.exists()))
+        return [row.id for row in query]
+
+
+def get_allocated_resource_ids(resource_type, resource_ids):
+    """Returns the resources which have at least one allocation."""
+    model, resource_column = _get_allocation_model(resource_type)
+    if not resource_ids:
+        return []
+
+    resource = getattr(model, resource_column)
+    with reader() as session:
+        query = (session.query(resource)
+                 .filter(resource.in_(resource_ids))
+                 .filter(model.deleted.is_(None))
+                 .distinct())
+        return [row[0] for row in query]
+
+
+def get_allocation_revision(resource_type):
+    """Returns the revision of the allocations of a resource type."""
+    with reader() as session:
+        revision = (session.query(models.AllocationRevision.revision)
+                    .filter_by(resource_type=resource_type).scalar())
+    return revision or 0
+
+
+def get_changed_allocation_resource_ids(resource_type, resource_ids,
+                                        changes_since):
+    """Returns the resources whose allocations changed since a time.
+
+    They are the resources created since then, or having allocations which
+    were created, updated or deleted since then or which belong to
+    reservations or leases updated since then. The allocations are not
+    scanned when the revision of the resource type is older.
+
+    :param resource_type: the type of the resources to consider
+    :param resource_ids: the ids of the candidate resources
+    :param changes_since: naive UTC datetime of the oldest change to return
+    :returns: the ids of the changed resources, in no particular order
+    """
+    model, resource_column = _get_allocation_model(resource_type)
+    resource_model = RESOURCE_MODELS[resource_type]
+    if not resource_ids:
+        return []
+
+    # NOTE: some databases store timestamps without their microseconds.
+    since = changes_since.replace(microsecond=0)
+    with reader() as session:
+        revision = (session.query(models.AllocationRevision)
+                    .filter_by(resource_type=resource_type).first())
+        if (revision is not None and
+                (revision.updated_at or revision.created_at) < since):
+            return []
+
+        resource = getattr(model, resource_column)
+        changed = (session.query(resource)
+                   .join(models.Reservation,
+                         models.Reservation.id == model.reservation_id)
+                   .join(models.Lease,
+                         models.Lease.id == models.Reservation.lease_id)
+                   .filter(resource.in_(resource_ids))
+                   .filter(sa.or_(model.created_at >= since,
+                                  model.updated_at >= since,
+                                  model.deleted_at >= since,
+                                  models.Reservation.updated_at >= since,
+                                  models.Lease.updated_at >= since))
+                   .distinct())
+        created = (session.query(resource_model.id)
+                   .filter(resource_model.id.in_(resource_ids))
+                   .filter(resource_model.created_at >= since))
+        return list({row[0] for row in itertools.chain(changed, created)})
 
 
 def get_plugin_reservation(resource_type, resource_id):
@@ -34,6 +34,7 @@ interface.
 
 from oslo_config import cfg
 from oslo_db import api as db_api
+from oslo_db import options as db_options
 from oslo_log import log as logging
 
 
@@ -41,8 +42,10 @@ _BACKEND_MAPPING = {
     'sqlalchemy': 'blazar.db.sqlalchemy.utils',
 }
 
+db_options.set_defaults(cfg.CONF)
 IMPL = db_api.DBAPI(cfg.CONF.database.backend,
-                    backend_mapping=_BACKEND_MAPPING)
+                    backend_mapping=_BACKEND_MAPPING,
+                    lazy=True)
 LOG = logging.getLogger(__name__)
 
 
@@ -111,6 +114,11 @@ def get_reservations_by_host_ids(host_ids, start_date, end_date):
     return IMPL.get_reservations_by_host_ids(host_ids, start_date, end_date)
 
 
+def get_reservation_usages_by_host_ids(host_ids, start_date, end_date):
+    return IMPL.get_reservation_usages_by_host_ids(host_ids, start_date,
+                                                   end_date)
+
+
 def get_reservations_by_network_id(network_id, start_date, end_date):
     return IMPL.get_reservations_by_network_id(
         network_id, start_date, end_date)
@@ -132,43 +140,98 @@ def get_reservations_by_floatingip_ids(floatingip_id, start_date, end_date):
 
 def get_reservation_allocations_by_host_ids(host_ids, start_date, end_date,
                                             lease_id=None,
-                                            reservation_id=None):
+                                            reservation_id=None,
+                                            marker=None, limit=None):
     return IMPL.get_reservation_allocations_by_host_ids(
-        host_ids, start_date, end_date, lease_id, reservation_id)
+        host_ids, start_date, end_date, lease_id, reservation_id, marker,
+        limit)
 
 
 def get_reservation_allocations_by_network_ids(network_ids, start_date,
                                                end_date, lease_id=None,
-                                               reservation_id=None):
+                                               reservation_id=None,
+                                               marker=None, limit=None):
     return IMPL.get_reservation_allocations_by_network_ids(
-        network_ids, start_date, end_date, lease_id, reservation_id)
+        network_ids, start_date, end_date, lease_id, reservation_id, marker,
+        limit)
 
 
 def get_reservation_allocations_by_fip_ids(fip_ids, start_date, end_date,
-                                           lease_id=None, reservation_id=None):
+                                           lease_id=None, reservation_id=None,
+                                           marker=None, limit=None):
     return IMPL.get_reservation_allocations_by_fip_ids(
-        fip_ids, start_date, end_date, lease_id, reservation_id)
+        fip_ids, start_date, end_date, lease_id, reservation_id, marker,
+        limit)
 
 
 def get_reservation_allocations_by_device_ids(device_ids, start_date, end_date,
                                               lease_id=None,
-                                              reservation_id=None):
+                                              reservation_id=None,
+                                              marker=None, limit=None):
     return IMPL.get_reservation_allocations_by_device_ids(
-        device_ids, start_date, end_date, lease_id, reservation_id)
+        device_ids, start_date, end_date, lease_id, reservation_id, marker,
+        limit)
+
+
+def get_allocation_revision(resource_type):
+    """Returns the revision of the allocations of a resource type."""
+    return IMPL.get_allocation_revision(resource_type)
+
+
+def get_changed_allocation_resource_ids(resource_type, resource_ids,
+                                        changes_since):
+    """Returns the resources whose allocations changed since a time."""
+    return IMPL.get_changed_allocation_resource_ids(
+        resource_type, resource_ids, changes_since)
 
 
 def get_most_recent_reservation_info_by_host_id(host_id):
     return IMPL.get_most_recent_reservation_info_by_host_id(host_id)
 
 
+def get_most_recent_reservation_info_by_host_ids(host_ids):
+    """Returns the most recent reservation of each host, keyed by host id."""
+    return IMPL.get_most_recent_reservation_info_by_host_ids(host_ids)
+
+
 def get_most_recent_reservation_info_by_fip_id(host_id):
     return IMPL.get_most_recent_reservation_info_by_fip_id(host_id)
 
 
+def get_most_recent_reservation_info_by_fip_ids(fip_ids):
+    """Returns the most recent reservation of each FIP, keyed by FIP id."""
+    return IMPL.get_most_recent_reservation_info_by_fip_ids(fip_ids)
+
+
 def get_most_recent_reservation_info_by_network_id(host_id):
     return IMPL.get_most_recent_reservation_info_by_network_id(host_id)
 
 
+def get_most_recent_reservation_info_by_network_ids(network_ids):
+    """Returns the most recent reservation of each network, keyed by id."""
+    return IMPL.get_most_recent_reservation_info_by_network_ids(network_ids)
+
+
+def get_allocation_windows(resource_type, allocation_id=None,
+                           lease_id=None, allocation_ids=None):
+    """Returns the lease windows of the allocations of a resource type."""
+    return IMPL.get_allocation_windows(resource_type,
+                                       allocation_id=allocation_id,
+                                       lease_id=lease_id,
+                                       allocation_ids=allocation_ids)
+
+
+def get_free_resource_ids(resource_type, resource_ids, start_date, end_date):
+    """Returns the resources which are not allocated during a period."""
+    return IMPL.get_free_resource_ids(resource_type, resource_ids,
+                                      start_date, end_date)
+
+
+def get_allocated_resource_ids(resource_type, resource_ids):
+    """Returns the resources which have at least one allocation."""
+    return IMPL.get_allocated_resource_ids(resource_type, resource_ids)
+
+
 def get_plugin_reservation(resource_type, resource_id):
     return IMPL.get_plugin_reservation(resource_type, resource_id)
 
@@ -0,0 +1,196 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Scheduler waking blazar-manager up when events are due.
+
+The due times of the UNDONE events are loaded once in a heap and the
+scheduler sleeps until the earliest one. The manager service schedules the
+events it creates or updates, which wakes the scheduler up if they are due
+earlier. Events written by other processes, e.g. by the v1 API, are picked
+up by a low-frequency reconciliation scan which reloads the heap.
+
+Several blazar-manager processes can run the scheduler: due events are
+claimed with db_api.event_claim_due(), and the claims of a process are
+renewed while it is alive, so that the reconciliation scan of the others
+releases the events of a dead process.
+"""
+
+import datetime
+import heapq
+import threading
+
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from blazar.db import api as db_api
+from blazar import status
+
+
+opts = [
+    cfg.IntOpt('event_reconcile_interval',
+               default=60,
+               min=1,
+               help='Interval in seconds at which blazar-manager reloads '
+                    'the undone events from the database, to pick up events '
+                    'which were not created or updated by blazar-manager '
+                    'itself.'),
+    cfg.IntOpt('event_retry_interval',
+               default=10,
+               min=1,
+               help='Interval in seconds after which blazar-manager tries '
+                    'again to execute due events which are still undone.'),
+    cfg.IntOpt('event_claim_timeout',
+               default=300,
+               min=30,
+               help='Number of seconds after which the events claimed by a '
+                    'blazar-manager process which stopped renewing its '
+                    'claims are released, to be executed by another '
+                    'process.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(opts, 'manager')
+LOG = logging.getLogger(__name__)
+
+
+class EventScheduler(object):
+    """Min-heap of the due times of the undone events.
+
+    The heap only decides when the callback is run: the callback still
+    selects the due events from the database, so a stale entry costs at most
+    one query which returns nothing. Entries are invalidated lazily when an
+    event is scheduled again at another time.
+    """
+
+    def __init__(self, callback):
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._heap = []
+        self._due_times = {}
+        self._next_reconcile = None
+        self._running = False
+        self.lag_stats = {'count': 0, 'last': 0.0, 'max': 0.0, 'total': 0.0}
+
+    def schedule(self, event_id, time):
+        """Schedule an event, waking the scheduler up if it is due first."""
+        with self._lock:
+            self._due_times[event_id] = time
+            heapq.heappush(self._heap, (time, event_id))
+            is_first = self._heap[0] == (time, event_id)
+        if is_first:
+            self._wakeup.set()
+
+    def reconcile(self):
+        """Reload the due times of all undone events from the database.
+
+        The events claimed by dead blazar-manager processes are released
+        first, so that they are executed again.
+        """
+        now = datetime.datetime.utcnow()
+        released = db_api.event_release_expired_claims(
+            now - datetime.timedelta(
+                seconds=CONF.manager.event_claim_timeout))
+        if released:
+            LOG.warning('Released %d events whose claim expired.', released)
+        events = db_api.event_get_all_sorted_by_filters(
+            sort_key='time',
+            sort_dir='asc',
+            filters={'status': status.event.UNDONE})
+        with self._lock:
+            self._due_times = {e['id']: e['time'] for e in events or []}
+            self._heap = [(time, event_id)
+                          for event_id, time in self._due_times.items()]
+            heapq.heapify(self._heap)
+        self._next_reconcile = now + datetime.timedelta(
+            seconds=CONF.manager.event_reconcile_interval)
+
+    def next_due_time(self):
+        with self._lock:
+            while self._heap:
+                time, event_id = self._heap[0]
+                if self._due_times.get(event_id) == time:
+                    return time
+                heapq.heappop(self._heap)
+        return None
+
+    def _pop_due(self, now):
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                time, event_id = heapq.heappop(self._heap)
+                if self._due_times.get(event_id) == time:
+                    del self._due_times[event_id]
+                    due.append((event_id, time))
+        return due
+
+    def _record_lag(self, now, due):
+        for event_id, time in due:
+            lag = (now - time).total_seconds()
+            self.lag_stats['count'] += 1
+            self.lag_stats['last'] = lag
+            self.lag_stats['total'] += lag
+            self.lag_stats['max'] = max(self.lag_stats['max'], lag)
+            LOG.debug('Event %s is processed %.3f seconds after its due '
+                      'time.', event_id, lag)
+
+    def _schedule_retry(self, now):
+        # NOTE: events skipped because their lease is in a transitional
+        # status, or set back to UNDONE to be retried, are still due.
+        event = db_api.event_get_first_sorted_by_filters(
+            sort_key='time',
+            sort_dir='asc',
+            filters={'status': status.event.UNDONE,
+                     'time': {'op': 'le', 'border': now}})
+        if event:
+            self.schedule(event['id'], now + datetime.timedelta(
+                seconds=CONF.manager.event_retry_interval))
+
+    def run_once(self):
+        """Run the callback if events are due.
+
+        Returns the number of seconds to wait until the next due event or
+        reconciliation scan.
+        """
+        now = datetime.datetime.utcnow()
+        if self._next_reconcile is None or now >= self._next_reconcile:
+            self.reconcile()
+        due = self._pop_due(now)
+        if due:
+            self._record_lag(now, due)
+            self._callback()
+            self._schedule_retry(now)
+
+        now = datetime.datetime.utcnow()
+        timeout = (self._next_reconcile - now).total_seconds()
+        next_due = self.next_due_time()
+        if next_due is not None:
+            timeout = min(timeout, (next_due - now).total_seconds())
+        return max(timeout, 0)
+
+    def run(self):
+        self._running = True
+        while self._running:
+            self._wakeup.clear()
+            try:
+                timeout = self.run_once()
+            except Exception:
+                LOG.exception('Error occurred while processing events.')
+                # Reload the events which could not be processed.
+                self._next_reconcile = None
+                timeout = CONF.manager.event_retry_interval
+            self._wakeup.wait(timeout)
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
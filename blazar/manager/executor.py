@@ -0,0 +1,188 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Executors running the actions of events in blazar-manager.
+
+The eventlet executor runs each action in a greenthread of the manager
+process. The process executor runs them in a pool of worker processes, so
+that CPU-bound work of plugins runs in parallel instead of on the single
+eventlet hub. In both cases the number of concurrent actions is bounded by a
+green pool, whose spawn blocks when the pool is full, and by per resource type
+limits taken from the ``max_concurrent_actions`` option of the plugins.
+"""
+
+from concurrent import futures
+from concurrent.futures import process
+import multiprocessing
+import sys
+
+import eventlet
+from oslo_config import cfg
+from oslo_log import log as logging
+
+from blazar.db import api as db_api
+from blazar.notification import notifier
+from blazar.plugins import devices
+from blazar.plugins import floatingips
+from blazar.plugins import instances
+from blazar.plugins import networks
+from blazar.plugins import oshosts
+from blazar.utils import service as service_utils
+
+
+opts = [
+    cfg.StrOpt('event_executor',
+               default='eventlet',
+               choices=['eventlet', 'process'],
+               help='Executor running the actions of events: eventlet runs '
+                    'them in greenthreads of blazar-manager, process runs '
+                    'them in a pool of worker processes.'),
+    cfg.IntOpt('event_executor_max_workers',
+               default=64,
+               min=1,
+               help='Maximum number of event actions running at the same '
+                    'time. Claiming more events waits until an action '
+                    'completes.'),
+    cfg.IntOpt('event_executor_processes',
+               min=1,
+               help='Number of worker processes of the process executor. '
+                    'Defaults to the number of CPUs.'),
+]
+
+plugin_opts = [
+    cfg.IntOpt('max_concurrent_actions',
+               default=0,
+               min=0,
+               help='Maximum number of event actions running at the same '
+                    'time for leases with reservations of this resource '
+                    'type. 0 means no limit.'),
+]
+
+RESOURCE_TYPES = (devices.RESOURCE_TYPE, floatingips.RESOURCE_TYPE,
+                  instances.RESOURCE_TYPE, networks.RESOURCE_TYPE,
+                  oshosts.RESOURCE_TYPE)
+
+CONF = cfg.CONF
+CONF.register_opts(opts, 'manager')
+for _resource_type in RESOURCE_TYPES:
+    CONF.register_opts(plugin_opts, group=_resource_type)
+LOG = logging.getLogger(__name__)
+
+
+class ActionFailed(Exception):
+    pass
+
+
+class EventExecutor(object):
+    """Runs event actions within concurrency limits.
+
+    The process executor does not send fn to its workers, which cannot
+    unpickle the manager service it is bound to: each worker runs the events
+    with the _exec_event method of a manager service of its own.
+    """
+
+    def __init__(self):
+        self._pool = eventlet.GreenPool(
+            CONF.manager.event_executor_max_workers)
+        self._limits = {}
+        self._process_pool = None
+
+    def _get_limit(self, resource_type):
+        if resource_type not in self._limits:
+            # NOTE: plugins outside of blazar have no options registered at
+            # import time. Registering them again is a no-op.
+            CONF.register_opts(plugin_opts, group=resource_type)
+            size = CONF[resource_type].max_concurrent_actions
+            self._limits[resource_type] = (
+                eventlet.semaphore.Semaphore(size) if size else None)
+        return self._limits[resource_type]
+
+    def _run(self, fn, event):
+        resource_types = sorted({
+            reservation['resource_type'] for reservation in
+            db_api.reservation_get_all_by_lease_id(event['lease_id'])})
+        # NOTE: limits are always acquired in the same order to avoid
+        # deadlocks between leases with several resource types.
+        limits = [limit for limit in map(self._get_limit, resource_types)
+                  if limit is not None]
+        for limit in limits:
+            limit.acquire()
+        try:
+            if CONF.manager.event_executor == 'process':
+                self._run_in_process(event)
+            else:
+                fn(event)
+        finally:
+            for limit in reversed(limits):
+                limit.release()
+
+    def _get_process_pool(self):
+        if self._process_pool is None:
+            # NOTE: workers are spawned rather than forked, so that they do
+            # not inherit the RPC server, the threads, the connections and
+            # the locks of blazar-manager.
+            self._process_pool = futures.ProcessPoolExecutor(
+                max_workers=CONF.manager.event_executor_processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(sys.argv,))
+        return self._process_pool
+
+    def _run_in_process(self, event):
+        pool = self._get_process_pool()
+        try:
+            pool.submit(_exec_in_worker, event).result()
+        except process.BrokenProcessPool as e:
+            # NOTE: a pool whose worker died does not accept more work, the
+            # next actions run in a new one.
+            if self._process_pool is pool:
+                self._process_pool = None
+            pool.shutdown(wait=False)
+            raise ActionFailed('Worker process running event %s died: %s'
+                               % (event['id'], e))
+
+    def submit(self, fn, event):
+        """Run fn(event), waiting for a free slot if the pool is full.
+
+        Returns a greenthread whose wait() raises if the action failed.
+        """
+        return self._pool.spawn(self._run, fn, event)
+
+    def shutdown(self):
+        """Stop the worker processes once their actions are complete."""
+        if self._process_pool is not None:
+            self._process_pool.shutdown()
+            self._process_pool = None
+
+
+_WORKER_SERVICE = None
+
+
+def _init_worker(argv):
+    global _WORKER_SERVICE
+    eventlet.monkey_patch()
+    # NOTE: imported here as the manager service module imports this one.
+    from blazar.manager import service as manager_service
+
+    cfg.CONF(argv[1:], project='blazar', prog='blazar-manager')
+    service_utils.prepare_service(argv)
+    db_api.setup_db()
+    notifier.init()
+    # NOTE: the service of a worker is never started. It only runs the
+    # actions of events, without serving RPC requests, claiming events or
+    # running the monitors and periodic tasks.
+    _WORKER_SERVICE = manager_service.ManagerService()
+
+
+def _exec_in_worker(event):
+    service_utils.with_empty_context(_WORKER_SERVICE._exec_event)(event)
@@ -26,13 +26,14 @@ class ManagerRPCAPI(service.RPCClient):
         """Initiate RPC API client with needed topic and RPC version."""
         super(ManagerRPCAPI, self).__init__(manager.get_target())
 
-    def get_lease(self, lease_id):
+    def get_lease(self, lease_id, profile='full'):
         """Get detailed info about some lease."""
-        return self.call('get_lease', lease_id=lease_id)
+        return self.call('get_lease', lease_id=lease_id, profile=profile)
 
-    def list_leases(self, project_id=None, query=None):
+    def list_leases(self, project_id=None, query=None, profile='full'):
         """List all leases."""
-        return self.call('list_leases', project_id=project_id, query=query)
+        return self.call('list_leases', project_id=project_id, query=query,
+                         profile=profile)
 
     def create_lease(self, lease_values):
         """Create lease with specified parameters."""
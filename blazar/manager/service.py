@@ -15,28 +15,32 @@
 
 from collections import defaultdict
 import datetime
+import os
 
 from functools import lru_cache
 
 from oslo_config import cfg
 from oslo_utils.excutils import save_and_reraise_exception
 from oslo_service import periodic_task
+from oslo_utils import strutils
 from stevedore import enabled
 
 from blazar import context
 from blazar.db import api as db_api
+from blazar.db import availability
 from blazar.db import exceptions as db_ex
 from blazar import enforcement
 from blazar import exceptions as common_ex
 from blazar import manager
+from blazar.manager import event_scheduler
 from blazar.manager import exceptions
+from blazar.manager import executor
 from blazar import monitor
 from blazar.notification import api as notification_api
 from blazar import status
 from blazar.utils.openstack import placement
 from blazar.utils import service as service_utils
 from blazar.utils import trusts
-import eventlet
 from oslo_log import log as logging
 
 
@@ -56,6 +60,18 @@ manager_opts = [
                min=0,
                max=50,
                help='Number of times to retry an event action.'),
+    cfg.IntOpt('workers',
+               default=1,
+               min=1,
+               help='Number of blazar-manager worker processes. All the '
+                    'workers execute events and serve RPC requests, the '
+                    'monitors and periodic tasks only run in the first '
+                    'one.'),
+    cfg.IntOpt('event_claim_limit',
+               default=100,
+               min=1,
+               help='Maximum number of due events claimed at once by a '
+                    'blazar-manager process.'),
 ]
 
 CONF = cfg.CONF
@@ -64,7 +80,8 @@ LOG = logging.getLogger(__name__)
 
 LEASE_DATE_FORMAT = "%Y-%m-%d %H:%M"
 
-EVENT_INTERVAL = 10
+LEASE_FILTERS = ('status', 'name', 'resource_type', 'start_date', 'end_date')
+LEASE_SORT_KEYS = ('created_at', 'start_date', 'end_date')
 
 
 class PeriodicTaskManager(periodic_task.PeriodicTasks):
@@ -83,23 +100,45 @@ class ManagerService(service_utils.RPCServer):
     working with plugins, etc.
     """
 
-    def __init__(self):
+    def __init__(self, worker_index=0):
         target = manager.get_target()
         super(ManagerService, self).__init__(target)
+        self.worker_index = worker_index
         self.plugins = get_plugins()
         self.resource_actions = self._setup_actions()
         self.monitors = monitor.load_monitors(self.plugins)
         self.enforcement = enforcement.UsageEnforcement()
         self.placement_client = placement.BlazarPlacementClient()
         self.periodic_task_manager = PeriodicTaskManager()
+        self.event_scheduler = event_scheduler.EventScheduler(
+            self._process_events)
+        self.event_executor = executor.EventExecutor()
+
+    @property
+    def worker_id(self):
+        # NOTE: the process ID is only known once worker processes are forked.
+        return '%s:%d' % (CONF.host, os.getpid())
 
     def start(self):
         super(ManagerService, self).start()
-        # NOTE(jakecoll): stop_on_exception=False was added because database
-        # exceptions would prevent threads from being scheduled again.
-        # TODO(jakecoll): Find a way to test this.
-        self.tg.add_timer_args(EVENT_INTERVAL, self._process_events,
+        if CONF.manager.enable_availability_index:
+            if CONF.manager.workers > 1:
+                LOG.warning('The availability index is disabled because '
+                            'several blazar-manager workers are running.')
+            elif CONF.manager.event_executor == 'process':
+                # NOTE: the index would miss the allocations changed by the
+                # actions running in the worker processes.
+                LOG.warning('The availability index is disabled because '
+                            'event actions run in worker processes.')
+            else:
+                availability.build_index()
+        self.tg.add_thread(self.event_scheduler.run)
+        self.tg.add_timer_args(CONF.manager.event_claim_timeout // 3,
+                               self._renew_event_claims,
                                stop_on_exception=False)
+        if self.worker_index > 0:
+            return
+
         for m in self.monitors:
             m.start_monitoring()
 
@@ -110,6 +149,15 @@ class ManagerService(service_utils.RPCServer):
 
         self.tg.add_dynamic_timer(self.periodic_tasks)
 
+    def stop(self):
+        self.event_scheduler.stop()
+        self.event_executor.shutdown()
+        super(ManagerService, self).stop()
+
+    def _renew_event_claims(self):
+        db_api.event_renew_claims(self.worker_id,
+                                  datetime.datetime.utcnow())
+
     def _setup_actions(self):
         """Setup actions for each resource type supported.
 
@@ -139,14 +187,8 @@ class ManagerService(service_utils.RPCServer):
         LOG.info("Trying to execute events: %s", events)
         event_threads = {}
         for event in events:
-            if not status.LeaseStatus.is_stable(event['lease_id']):
-                LOG.info("Skip event %s because the status of the lease %s "
-                         "is still transitional", event, event['lease_id'])
-                continue
-            db_api.event_update(event['id'],
-                                {'status': status.event.IN_PROGRESS})
             try:
-                event_thread = eventlet.spawn(
+                event_thread = self.event_executor.submit(
                     service_utils.with_empty_context(self._exec_event),
                     event)
                 event_threads[event['id']] = event_thread
@@ -218,20 +260,21 @@ class ManagerService(service_utils.RPCServer):
     def _process_events(self):
         """Tries to execute events.
 
-        If there is any event in Blazar DB to be executed, do it and change its
-        status to 'DONE'. Events are executed concurrently if possible.
+        If there is any event in Blazar DB to be executed, claim it, do it and
+        change its status to 'DONE'. Events are executed concurrently if
+        possible. Events of leases in a transitional status are not claimed.
         """
-        LOG.debug('Trying to get events from DB.')
-        events = db_api.event_get_all_sorted_by_filters(
-            sort_key='time',
-            sort_dir='asc',
-            filters={'status': status.event.UNDONE,
-                     'time': {'op': 'le',
-                              'border': datetime.datetime.utcnow()}}
-        )
+        LOG.debug('Trying to claim events from DB.')
+        while True:
+            events = db_api.event_claim_due(datetime.datetime.utcnow(),
+                                            CONF.manager.event_claim_limit,
+                                            self.worker_id)
+
+            for batch in self._select_for_execution(events):
+                self._process_events_concurrently(batch)
 
-        for batch in self._select_for_execution(events):
-            self._process_events_concurrently(batch)
+            if len(events) < CONF.manager.event_claim_limit:
+                break
 
     def _exec_event(self, event):
         """Execute an event function"""
@@ -261,7 +304,7 @@ class ManagerService(service_utils.RPCServer):
             LOG.exception('Error occurred while handling %s event for '
                           'lease %s.', event['event_type'], event['lease_id'])
         else:
-            lease = db_api.lease_get(event['lease_id'])
+            lease = db_api.lease_get(event['lease_id'], profile='summary')
             self._send_notification(
                 lease, events=['event.%s' % event['event_type']])
 
@@ -318,8 +361,8 @@ class ManagerService(service_utils.RPCServer):
         if missing_attr:
             raise exceptions.MissingParameter(param=', '.join(missing_attr))
 
-    def get_lease(self, lease_id):
-        return db_api.lease_get(lease_id)
+    def get_lease(self, lease_id, profile='full'):
+        return db_api.lease_get(lease_id, profile=profile)
 
     def hosts_in_lease(self, lease_id):
         return db_api.hosts_in_lease(lease_id)
@@ -330,8 +373,28 @@ class ManagerService(service_utils.RPCServer):
     def devices_in_lease(self, lease_id):
         return db_api.devices_in_lease(lease_id)
 
-    def list_leases(self, project_id=None, query=None):
-        return db_api.lease_list(project_id)
+    def list_leases(self, project_id=None, query=None, profile='full'):
+        query = query or {}
+        filters = {key: query[key] for key in LEASE_FILTERS if key in query}
+        for key in ('start_date', 'end_date'):
+            if key in filters:
+                filters[key] = self._date_from_string(filters[key])
+
+        sort_key = query.get('sort_key', 'created_at')
+        if sort_key not in LEASE_SORT_KEYS:
+            raise exceptions.MalformedParameter(param='sort_key')
+        sort_dir = query.get('sort_dir', 'asc')
+        if sort_dir not in ('asc', 'desc'):
+            raise exceptions.MalformedParameter(param='sort_dir')
+        limit = query.get('limit')
+        if limit is not None:
+            if not strutils.is_int_like(limit) or int(limit) < 1:
+                raise exceptions.MalformedParameter(param='limit')
+            limit = int(limit)
+
+        return db_api.lease_list(project_id, profile=profile, filters=filters,
+                                 sort_key=sort_key, sort_dir=sort_dir,
+                                 limit=limit, marker=query.get('marker'))
 
     def create_lease(self, lease_values):
         """Create a lease with reservations.
@@ -412,52 +475,57 @@ class ManagerService(service_utils.RPCServer):
                 self._update_before_end_event_date(event, before_end_date,
                                                    lease_values)
 
-            try:
-                if trust_id:
-                    lease_values.update({'trust_id': trust_id})
-                lease = db_api.lease_create(lease_values)
-                lease_id = lease['id']
-            except db_ex.BlazarDBDuplicateEntry:
-                LOG.exception('Cannot create a lease - duplicated lease name')
-                raise exceptions.LeaseNameAlreadyExists(
-                    name=lease_values['name'])
-            except db_ex.BlazarDBException:
-                with save_and_reraise_exception():
-                    LOG.exception('Cannot create a lease')
-            else:
+            if trust_id:
+                lease_values.update({'trust_id': trust_id})
+            # The events are created together with the lease.
+            lease_values['events'] = events
+
+            # The lease, its reservations, allocations and events are
+            # written in a single transaction, rolled back if any of them
+            # cannot be created.
+            # NOTE: the transaction also spans the calls made by the plugins
+            # to external services, e.g. Nova and Placement, while reserving
+            # resources. The objects they create are not rolled back with
+            # the transaction, the plugins delete them before.
+            reserved = []
+            with db_api.transaction():
+                try:
+                    lease = db_api.lease_create(lease_values)
+                    lease_id = lease['id']
+                except db_ex.BlazarDBDuplicateEntry:
+                    LOG.exception('Cannot create a lease - duplicated lease '
+                                  'name')
+                    raise exceptions.LeaseNameAlreadyExists(
+                        name=lease_values['name'])
+                except db_ex.BlazarDBException:
+                    with save_and_reraise_exception():
+                        LOG.exception('Cannot create a lease')
+
                 try:
                     for reservation in reservations:
                         reservation['lease_id'] = lease['id']
                         reservation['start_date'] = lease['start_date']
                         reservation['end_date'] = lease['end_date']
                         reservation['project_id'] = lease['project_id']
-                        self._create_reservation(reservation)
+                        reserved.append(
+                            self._create_reservation(reservation))
+
+                    db_api.lease_update(lease_id,
+                                        {'status': status.lease.PENDING})
                 except Exception:
                     with save_and_reraise_exception():
                         LOG.exception("Failed to create reservation for a "
                                       "lease. Rollback the lease and "
                                       "associated reservations")
-                        db_api.lease_destroy(lease_id)
+                        self._rollback_resources(reserved)
 
-                try:
-                    for event in events:
-                        event['lease_id'] = lease['id']
-                        db_api.event_create(event)
-                except (exceptions.UnsupportedResourceType,
-                        common_ex.BlazarException):
-                    with save_and_reraise_exception():
-                        LOG.exception("Failed to create event for a lease. "
-                                      "Rollback the lease and associated "
-                                      "reservations")
-                        db_api.lease_destroy(lease_id)
-
-                else:
-                    db_api.lease_update(
-                        lease_id,
-                        {'status': status.lease.PENDING})
-                    lease = db_api.lease_get(lease_id)
-                    self._send_notification(lease, events=['create'])
-                    return lease
+            # Events are only scheduled once committed, for the event
+            # scheduler to find them.
+            for event in lease['events']:
+                self.event_scheduler.schedule(event['id'], event['time'])
+            lease = db_api.lease_get(lease_id)
+            self._send_notification(lease, events=['create'])
+            return lease
 
     def _add_resource_type(self, reservations, existing_reservations):
         rsvns_by_id = {}
@@ -602,6 +670,7 @@ class ManagerService(service_utils.RPCServer):
             raise common_ex.BlazarException(
                 'Start lease event not found')
         db_api.event_update(event['id'], {'time': values['start_date']})
+        self.event_scheduler.schedule(event['id'], values['start_date'])
 
         event = db_api.event_get_first_sorted_by_filters(
             'lease_id',
@@ -615,6 +684,7 @@ class ManagerService(service_utils.RPCServer):
             raise common_ex.BlazarException(
                 'End lease event not found')
         db_api.event_update(event['id'], {'time': values['end_date']})
+        self.event_scheduler.schedule(event['id'], values['end_date'])
 
         notifications = ['update']
         self._update_before_end_event(lease, values, notifications,
@@ -704,6 +774,8 @@ class ManagerService(service_utils.RPCServer):
             db_api.event_update(end_event['id'],
                                 {'status': status.event.DONE})
         db_api.lease_destroy(lease_id)
+        if lease.get('trust_id'):
+            trusts.forget_trust(lease['trust_id'])
         self._send_notification(lease, events=['delete'])
 
     @status.lease.lease_status(
@@ -808,6 +880,20 @@ class ManagerService(service_utils.RPCServer):
         )
         db_api.reservation_update(reservation['id'],
                                   {'resource_id': resource_id})
+        return resource_type, resource_id
+
+    def _rollback_resources(self, reserved):
+        """Delete the external resources of reservations rolled back.
+
+        Errors are logged, so that the error of the lease creation is the
+        one raised.
+        """
+        for resource_type, resource_id in reserved:
+            try:
+                self.plugins[resource_type].rollback_resource(resource_id)
+            except Exception:
+                LOG.exception('Failed to delete the resources of %s '
+                              'reservation %s.', resource_type, resource_id)
 
     def _allocation_candidates(self, lease, reservations):
         """Returns dict by resource type of reservation candidates."""
@@ -943,6 +1029,10 @@ class ManagerService(service_utils.RPCServer):
                 notifications.append('event.before_end_lease.stop')
 
             db_api.event_update(event['id'], update_values)
+            if (update_values.get('status', event['status']) ==
+                    status.event.UNDONE):
+                self.event_scheduler.schedule(event['id'],
+                                              update_values['time'])
 
     def periodic_tasks(self, raise_on_error=False):
         """Tasks to be run at a periodic interval."""
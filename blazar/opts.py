@@ -17,11 +17,19 @@ import blazar.api.v2.app
 import blazar.api.v2.controllers
 import blazar.cmd.api
 import blazar.config
+import blazar.db.availability
 import blazar.db.base
 import blazar.db.migration.cli
+import blazar.db.sqlalchemy.facade_wrapper
 import blazar.manager
+import blazar.manager.event_scheduler
+import blazar.manager.executor
 import blazar.manager.service
 import blazar.notification.notifier
+import blazar.plugins.devices
+import blazar.plugins.floatingips
+import blazar.plugins.instances
+import blazar.plugins.networks
 import blazar.plugins.oshosts.host_plugin
 import blazar.utils.openstack.keystone
 import blazar.utils.openstack.nova
@@ -42,8 +50,12 @@ def list_opts():
              blazar.utils.openstack.keystone.opts,
              blazar.utils.openstack.keystone.keystone_opts)),
         ('api', blazar.api.v2.controllers.api_opts),
+        ('database', blazar.db.sqlalchemy.facade_wrapper.opts),
         ('manager', itertools.chain(blazar.manager.opts,
-                                    blazar.manager.service.manager_opts)),
+                                    blazar.manager.service.manager_opts,
+                                    blazar.manager.event_scheduler.opts,
+                                    blazar.manager.executor.opts,
+                                    blazar.db.availability.opts)),
         ('enforcement', itertools.chain(
             blazar.enforcement.filters.external_service_filter
                     .ExternalServiceFilter.enforcement_opts,
@@ -52,5 +64,14 @@ def list_opts():
         ('notifications', blazar.notification.notifier.notification_opts),
         ('nova', blazar.utils.openstack.nova.nova_opts),
         (blazar.plugins.oshosts.RESOURCE_TYPE,
-         blazar.plugins.oshosts.host_plugin.plugin_opts),
+         itertools.chain(blazar.plugins.oshosts.host_plugin.plugin_opts,
+                         blazar.manager.executor.plugin_opts)),
+        (blazar.plugins.devices.RESOURCE_TYPE,
+         blazar.manager.executor.plugin_opts),
+        (blazar.plugins.floatingips.RESOURCE_TYPE,
+         blazar.manager.executor.plugin_opts),
+        (blazar.plugins.instances.RESOURCE_TYPE,
+         blazar.manager.executor.plugin_opts),
+        (blazar.plugins.networks.RESOURCE_TYPE,
+         blazar.manager.executor.plugin_opts),
     ]
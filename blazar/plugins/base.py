@@ -20,9 +20,12 @@ from blazar import context
 from blazar import policy
 from blazar.db import api as db_api
 from blazar.db import utils as db_utils
+from blazar.manager import exceptions as manager_ex
 from blazar.utils.openstack import keystone
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_utils import strutils
+from oslo_utils import timeutils
 
 LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
@@ -149,6 +152,15 @@ class BasePlugin(object, metaclass=abc.ABCMeta):
         """Take actions before the end of a lease"""
         pass
 
+    def rollback_resource(self, resource_id):
+        """Delete the resources created outside of the database.
+
+        Called when the creation of a lease is rolled back, for each of its
+        reservations created by reserve_resource(). The database changes of
+        the lease are still visible, they are rolled back afterwards.
+        """
+        pass
+
     def heal_reservations(self, failed_resources, interval_begin,
                           interval_end):
         """Heal reservations which suffer from resource failures.
@@ -171,6 +183,53 @@ class BasePlugin(object, metaclass=abc.ABCMeta):
                       unsupported)
         return options
 
+    def changed_allocation_resources(self, allocation_type, resource_ids,
+                                     query):
+        """Returns the resources whose allocations changed.
+
+        Only the resources changed since the changes-since time of the query
+        are returned, or all of them if there is none.
+        """
+        changes_since = self._parse_query_time(query, 'changes-since')
+        if changes_since is None:
+            return resource_ids
+        return db_utils.get_changed_allocation_resource_ids(
+            allocation_type, resource_ids, changes_since)
+
+    def parse_allocation_options(self, options, paging=False):
+        """Parses the time window and paging options of allocation queries.
+
+        The start_date and end_date options bound the period whose
+        reservations are returned. The limit and marker options page through
+        the reservations of a single resource, so they are dropped unless
+        paging is set.
+        """
+        if not paging:
+            unsupported = {'limit', 'marker'} & set(options)
+            if unsupported:
+                LOG.debug('Paging is only supported for the allocations of '
+                          'a single resource: %s', unsupported)
+            for key in unsupported:
+                del options[key]
+        for key in ('start_date', 'end_date'):
+            if key in options:
+                options[key] = self._parse_query_time(options, key)
+        if 'limit' in options:
+            limit = options['limit']
+            if not strutils.is_int_like(limit) or int(limit) < 1:
+                raise manager_ex.MalformedParameter(param='limit')
+            options['limit'] = int(limit)
+        return options
+
+    def _parse_query_time(self, query, key):
+        value = query.get(key)
+        if value is None:
+            return None
+        try:
+            return timeutils.normalize_time(timeutils.parse_isotime(value))
+        except ValueError:
+            raise manager_ex.MalformedParameter(param=key)
+
     def is_project_allowed(self, project_id, resource):
         # If this resource has the extra capability "authorized_projects"
         if "authorized_projects" in resource and \
@@ -22,6 +22,7 @@ from oslo_utils import strutils
 from stevedore import named
 
 from blazar.db import api as db_api
+from blazar.db import availability
 from blazar.db import exceptions as db_ex
 from blazar.db import utils as db_utils
 from blazar.manager import exceptions as manager_ex
@@ -110,7 +111,8 @@ class DevicePlugin(base.BasePlugin):
     title = 'Device Plugin'
     description = 'This plugin creates and deletes devices.'
     query_options = {
-        QUERY_TYPE_ALLOCATION: ['lease_id', 'reservation_id']
+        QUERY_TYPE_ALLOCATION: ['lease_id', 'reservation_id', 'start_date',
+                                'end_date', 'limit', 'marker']
     }
 
     def __init__(self):
@@ -135,15 +137,15 @@ class DevicePlugin(base.BasePlugin):
         }
         device_reservation = db_api.device_reservation_create(
             device_rsrv_values)
-        for device_id in device_ids:
-            db_api.device_allocation_create({'device_id': device_id,
-                                             'reservation_id': reservation_id})
+        db_api.device_allocation_bulk_create(
+            [{'device_id': device_id, 'reservation_id': reservation_id}
+             for device_id in device_ids])
         return device_reservation['id']
 
     def update_reservation(self, reservation_id, values):
         """Update reservation."""
         reservation = db_api.reservation_get(reservation_id)
-        lease = db_api.lease_get(reservation['lease_id'])
+        lease = db_api.lease_get(reservation['lease_id'], profile='summary')
 
         if (not [x for x in values.keys() if x in ['min', 'max',
                                                    'resource_properties']]
@@ -213,7 +215,8 @@ class DevicePlugin(base.BasePlugin):
             device = db_api.device_get(allocation['device_id'])
             devices[device["device_driver"]].append(
                 db_api.device_get(allocation['device_id']))
-            db_api.device_allocation_destroy(allocation['id'])
+        db_api.device_allocation_bulk_destroy(
+            [allocation['id'] for allocation in allocations])
 
         for device_driver, devices_list in devices.items():
             self.plugins[device_driver].deallocate(
@@ -247,11 +250,8 @@ class DevicePlugin(base.BasePlugin):
             return device
 
     def list_devices(self):
-        raw_device_list = db_api.device_list()
-        device_list = []
-        for device in raw_device_list:
-            device_list.append(self.get_device(device['id']))
-        return device_list
+        for device in db_api.device_list():
+            yield self.get_device(device['id'])
 
     def create_device(self, values):
         if 'trust_id' in values:
@@ -425,17 +425,21 @@ class DevicePlugin(base.BasePlugin):
             return True
 
     def list_allocations(self, query, detail=False):
-        devices_id_list = [d['id'] for d in db_api.device_list()]
-        options = self.get_query_options(query, QUERY_TYPE_ALLOCATION)
+        devices_id_list = self.changed_allocation_resources(
+            'device', [d['id'] for d in db_api.device_list()], query)
+        options = self.parse_allocation_options(
+            self.get_query_options(query, QUERY_TYPE_ALLOCATION))
         options['detail'] = detail
         devices_allocations = self.query_device_allocations(devices_id_list,
                                                             **options)
         self.add_extra_allocation_info(devices_allocations)
-        return [{"resource_id": device, "reservations": allocs}
-                for device, allocs in devices_allocations.items()]
+        return ({"resource_id": device, "reservations": allocs}
+                for device, allocs in devices_allocations.items())
 
     def get_allocations(self, device_id, query, detail=False):
-        options = self.get_query_options(query, QUERY_TYPE_ALLOCATION)
+        options = self.parse_allocation_options(
+            self.get_query_options(query, QUERY_TYPE_ALLOCATION),
+            paging=True)
         options['detail'] = detail
         device_allocations = self.query_device_allocations(
             [device_id], **options)
@@ -447,7 +451,9 @@ class DevicePlugin(base.BasePlugin):
                                              reservation_id=reservation_id)
 
     def query_device_allocations(self, devices, lease_id=None,
-                                 reservation_id=None, detail=False):
+                                 reservation_id=None, detail=False,
+                                 start_date=None, end_date=None, limit=None,
+                                 marker=None):
         """Return dict of device and its allocations.
 
         The list element forms
@@ -462,11 +468,12 @@ class DevicePlugin(base.BasePlugin):
                      ]
         }.
         """
-        start = datetime.datetime.utcnow()
-        end = datetime.date.max
+        start = start_date or datetime.datetime.utcnow()
+        end = end_date or datetime.date.max
 
         reservations = db_utils.get_reservation_allocations_by_device_ids(
-            devices, start, end, lease_id, reservation_id)
+            devices, start, end, lease_id, reservation_id, marker,
+            limit)
         device_allocations = {d: [] for d in devices}
 
         for reservation in reservations:
@@ -545,8 +552,6 @@ class DevicePlugin(base.BasePlugin):
         count_range = count_range.split('-')
         min_device = count_range[0]
         max_device = count_range[1]
-        allocated_device_ids = []
-        not_allocated_device_ids = []
         filter_array = []
         start_date_with_margin = start_date - datetime.timedelta(
             minutes=CONF.device.cleaning_time)
@@ -556,24 +561,16 @@ class DevicePlugin(base.BasePlugin):
         if resource_properties:
             filter_array += plugins_utils.convert_requirements(
                 resource_properties)
+        device_ids = []
         for device in db_api.reservable_device_get_all_by_queries(
                 filter_array):
             device = self.get_device_with_extra_capabilities(device)
-            if not self.is_project_allowed(project_id, device):
-                continue
-            if not db_api.device_allocation_get_all_by_values(
-                    device_id=device['id']):
-                not_allocated_device_ids.append(device['id'])
-            elif db_utils.get_free_periods(
-                device['id'],
-                start_date_with_margin,
-                end_date_with_margin,
-                end_date_with_margin - start_date_with_margin,
-                resource_type='device'
-            ) == [
-                (start_date_with_margin, end_date_with_margin),
-            ]:
-                allocated_device_ids.append(device['id'])
+            if self.is_project_allowed(project_id, device):
+                device_ids.append(device['id'])
+        not_allocated_device_ids, allocated_device_ids = (
+            availability.find_free_resources('device', device_ids,
+                                             start_date_with_margin,
+                                             end_date_with_margin))
         if len(not_allocated_device_ids) >= int(min_device):
             shuffle(not_allocated_device_ids)
             return not_allocated_device_ids[:int(max_device)]
@@ -617,10 +614,11 @@ class DevicePlugin(base.BasePlugin):
                 dates_after['start_date'], dates_after['end_date'],
                 lease['project_id'])
             if len(device_ids) >= min_devices:
+                db_api.device_allocation_bulk_create(
+                    [{'device_id': device_id,
+                      'reservation_id': reservation_id}
+                     for device_id in device_ids])
                 for device_id in device_ids:
-                    db_api.device_allocation_create(
-                        {'device_id': device_id,
-                         'reservation_id': reservation_id})
                     new_device = db_api.device_get(device_id)
                     if reservation_status == status.reservation.ACTIVE:
                         # Add new device into the trait.
@@ -630,8 +628,8 @@ class DevicePlugin(base.BasePlugin):
             else:
                 raise manager_ex.NotEnoughHostsAvailable()
 
-        for allocation in allocs_to_remove:
-            db_api.device_allocation_destroy(allocation['id'])
+        db_api.device_allocation_bulk_destroy(
+            [allocation['id'] for allocation in allocs_to_remove])
 
     def _allocations_to_remove(self, dates_before, dates_after, max_devices,
                                resource_properties, allocs):
@@ -134,22 +134,22 @@ class K8sPlugin():
         failed_devices = []
         recovered_devices = []
 
-        all_nodes = self.core_v1.list_node().items
+        all_nodes = {}
+        for node in self.core_v1.list_node().items:
+            all_nodes.setdefault(node.metadata.name, node)
         for device in devices:
-            for node in all_nodes:
-                if node.metadata.name == device["name"]:
-                    if not self.is_active(node) and device["reservable"]:
-                        failed_devices.append(device)
-                    elif self.is_active(node) and not device["reservable"]:
-                        recovered_devices.append(device)
-                        # Handle case when node is rebuilt; it will not have the
-                        # "device" label anymore.
-                        if node.metadata.labels.get(LABELS["device"]) != device["id"]:
-                            self.set_device(device["name"], device["id"])
-                    break
-            else:
+            node = all_nodes.get(device["name"])
+            if node is None:
                 # Node is completely missing from k8s
                 failed_devices.append(device)
+            elif not self.is_active(node) and device["reservable"]:
+                failed_devices.append(device)
+            elif self.is_active(node) and not device["reservable"]:
+                recovered_devices.append(device)
+                # Handle case when node is rebuilt; it will not have the
+                # "device" label anymore.
+                if node.metadata.labels.get(LABELS["device"]) != device["id"]:
+                    self.set_device(device["name"], device["id"])
 
         return failed_devices, recovered_devices
 
@@ -22,6 +22,7 @@ from oslo_utils import netutils
 from oslo_utils import strutils
 
 from blazar.db import api as db_api
+from blazar.db import availability
 from blazar.db import exceptions as db_ex
 from blazar.db import utils as db_utils
 from blazar import exceptions
@@ -56,7 +57,8 @@ class FloatingIpPlugin(base.BasePlugin):
     title = 'Floating IP Plugin'
     description = 'This plugin creates and assigns floating IPs.'
     query_options = {
-        QUERY_TYPE_ALLOCATION: ['lease_id', 'reservation_id']
+        QUERY_TYPE_ALLOCATION: ['lease_id', 'reservation_id', 'start_date',
+                                'end_date']
     }
 
     def __init__(self):
@@ -126,12 +128,12 @@ class FloatingIpPlugin(base.BasePlugin):
                     err_msg = 'Failed to create floating IP: {}'.format(str(e))
                     raise manager_ex.NeutronClientError(err_msg)
 
-        for fip_id in fip_ids_to_add:
-            LOG.debug('Adding floating IP {} to reservation {}'.format(
-                fip_id, reservation_id))
-            db_api.fip_allocation_create({
-                'floatingip_id': fip_id,
-                'reservation_id': reservation_id})
+        if fip_ids_to_add:
+            LOG.debug('Adding floating IPs {} to reservation {}'.format(
+                fip_ids_to_add, reservation_id))
+            db_api.fip_allocation_bulk_create(
+                [{'floatingip_id': fip_id, 'reservation_id': reservation_id}
+                 for fip_id in fip_ids_to_add])
         if allocs_to_remove:
             self.deallocate(fip_reservation, allocs_to_remove)
 
@@ -202,9 +204,9 @@ class FloatingIpPlugin(base.BasePlugin):
                 'floatingip_reservation_id': fip_reservation['id']
             }
             db_api.required_fip_create(fip_address_values)
-        for fip_id in floatingip_ids:
-            db_api.fip_allocation_create({'floatingip_id': fip_id,
-                                          'reservation_id': reservation_id})
+        db_api.fip_allocation_bulk_create(
+            [{'floatingip_id': fip_id, 'reservation_id': reservation_id}
+             for fip_id in floatingip_ids])
         return fip_reservation['id']
 
     def update_reservation(self, reservation_id, values):
@@ -277,8 +279,8 @@ class FloatingIpPlugin(base.BasePlugin):
             for alloc in allocations:
                 fip = db_api.floatingip_get(alloc['floatingip_id'])
                 fip_pool.delete_reserved_floatingip(fip['floating_ip_address'])
-        for alloc in allocations:
-            db_api.fip_allocation_destroy(alloc['id'])
+        db_api.fip_allocation_bulk_destroy(
+            [alloc['id'] for alloc in allocations])
 
     def allocation_candidates(self, values):
         self.check_params(values)
@@ -304,29 +306,20 @@ class FloatingIpPlugin(base.BasePlugin):
         fip_query = ["==", "$floating_network_id", network_id]
         filter_array = plugins_utils.convert_requirements(fip_query)
 
-        fip_ids = []
-        not_allocated_fip_ids = []
-        allocated_fip_ids = []
-        for fip in db_api.reservable_fip_get_all_by_queries(filter_array):
-            if not db_api.fip_allocation_get_all_by_values(
-                    floatingip_id=fip['id']):
-                if fip['floating_ip_address'] in fip_addresses:
-                    fip_ids.append(fip['id'])
-                else:
-                    not_allocated_fip_ids.append(fip['id'])
-            elif db_utils.get_free_periods(
-                    fip['id'],
-                    start_date_with_margin,
-                    end_date_with_margin,
-                    end_date_with_margin - start_date_with_margin,
-                    resource_type='floatingip'
-            ) == [
-                (start_date_with_margin, end_date_with_margin),
-            ]:
-                if fip['floating_ip_address'] in fip_addresses:
-                    fip_ids.append(fip['id'])
-                else:
-                    allocated_fip_ids.append(fip['id'])
+        fips = db_api.reservable_fip_get_all_by_queries(filter_array)
+        not_allocated_fip_ids, allocated_fip_ids = (
+            availability.find_free_resources('floatingip',
+                                             [fip['id'] for fip in fips],
+                                             start_date_with_margin,
+                                             end_date_with_margin))
+        free_fip_ids = set(not_allocated_fip_ids + allocated_fip_ids)
+        fip_ids = [fip['id'] for fip in fips
+                   if fip['id'] in free_fip_ids and
+                   fip['floating_ip_address'] in fip_addresses]
+        not_allocated_fip_ids = [fip_id for fip_id in not_allocated_fip_ids
+                                 if fip_id not in fip_ids]
+        allocated_fip_ids = [fip_id for fip_id in allocated_fip_ids
+                             if fip_id not in fip_ids]
 
         if len(fip_ids) != len(fip_addresses):
             raise manager_ex.NotEnoughFloatingIPAvailable()
@@ -407,13 +400,16 @@ class FloatingIpPlugin(base.BasePlugin):
                                                   msg=str(e))
 
     def list_allocations(self, query, detail=False):
-        fip_id_list = [f['id'] for f in db_api.floatingip_list()]
-        options = self.get_query_options(query, QUERY_TYPE_ALLOCATION)
+        fip_id_list = self.changed_allocation_resources(
+            'floatingip', [f['id'] for f in db_api.floatingip_list()],
+            query)
+        options = self.parse_allocation_options(
+            self.get_query_options(query, QUERY_TYPE_ALLOCATION))
         options['detail'] = detail
-        fip_allocations = self.query_allocations(fip_id_list, **options)
+        fip_allocations = self.query_fip_allocations(fip_id_list, **options)
 
-        return [{"resource_id": fip, "reservations": allocs}
-                for fip, allocs in fip_allocations.items()]
+        return ({"resource_id": fip, "reservations": allocs}
+                for fip, allocs in fip_allocations.items())
 
     def query_allocations(self, resource_id_list, detail=None, lease_id=None,
                           reservation_id=None):
@@ -422,7 +418,9 @@ class FloatingIpPlugin(base.BasePlugin):
                                           reservation_id=reservation_id)
 
     def query_fip_allocations(self, fips, detail=None, lease_id=None,
-                              reservation_id=None):
+                              reservation_id=None,
+                              start_date=None, end_date=None, limit=None,
+                              marker=None):
         """Return dict of host and its allocations.
 
         The list element forms
@@ -435,11 +433,12 @@ class FloatingIpPlugin(base.BasePlugin):
                      ]
         }.
         """
-        start = datetime.datetime.utcnow()
-        end = datetime.date.max
+        start = start_date or datetime.datetime.utcnow()
+        end = end_date or datetime.date.max
 
         reservations = db_utils.get_reservation_allocations_by_fip_ids(
-            fips, start, end, lease_id, reservation_id)
+            fips, start, end, lease_id, reservation_id, marker,
+            limit)
         fip_allocations = {fip: [] for fip in fips}
 
         for reservation in reservations:
@@ -499,10 +498,12 @@ class FloatingIpMonitorPlugin(monitor.GeneralMonitorPlugin, neutron.NeutronClien
         recovered = []
         dry_run = CONF[plugin.RESOURCE_TYPE].enable_polling_monitor_dry_run
         fips = db_api.floatingip_list()
+        reservations = db_utils.get_most_recent_reservation_info_by_fip_ids(
+            [fip['id'] for fip in fips])
 
         def process_fip(fip):
             fip_address = fip["floating_ip_address"]
-            fip_curr_reservation = db_utils.get_most_recent_reservation_info_by_fip_id(fip['id'])
+            fip_curr_reservation = reservations.get(fip['id'])
             if fip_curr_reservation and fip_curr_reservation['status'] == status.reservation.ACTIVE:
                 # This means that FIP works fine and no need to recover
                 LOG.debug(f"FIP {fip_address} is in active reservation {fip_curr_reservation['id']} - skipping")
@@ -0,0 +1,61 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Capacity timeline of hosts shared by instance reservations."""
+
+import itertools
+
+RESOURCES = ('vcpus', 'memory_mb', 'disk_gb')
+HOST_CAPACITIES = ('vcpus', 'memory_mb', 'local_gb')
+
+
+def peak_usages(usages):
+    """Return the peak (vcpus, memory_mb, disk_gb) used by reservations.
+
+    usages are dicts with start_date, end_date and the resources used over
+    that period, as returned by get_reservation_usages_by_host_ids(). The
+    breakpoints of all periods are sorted and the usage at each of them is
+    the cumulative sum of the changes so far. A reservation starting when
+    another one ends is counted as overlapping it, like in the DB queries.
+    """
+    breakpoints = []
+    for usage in usages:
+        amounts = tuple(usage[r] or 0 for r in RESOURCES)
+        breakpoints.append((usage['start_date'], 0, amounts))
+        breakpoints.append((usage['end_date'], 1,
+                            tuple(-a for a in amounts)))
+    if not breakpoints:
+        return (0,) * len(RESOURCES)
+
+    breakpoints.sort(key=lambda b: b[:2])
+    deltas = zip(*(b[2] for b in breakpoints))
+    return tuple(max(0, *itertools.accumulate(d)) for d in deltas)
+
+
+def count_slots(host, peaks, cpus, memory, disk):
+    """Return how many instances of a flavor fit on a host.
+
+    peaks is the peak usage of the host, as returned by peak_usages().
+    Resources the flavor does not request only have to be within capacity.
+    """
+    slots = None
+    for capacity, peak, requested in zip(
+            (host[c] for c in HOST_CAPACITIES), peaks, (cpus, memory, disk)):
+        free = capacity - peak
+        if free < 0 or free < requested:
+            return 0
+        if requested > 0:
+            fit = free // requested
+            slots = fit if slots is None else min(slots, fit)
+
+    # A flavor requesting no resources at all fits once.
+    return 1 if slots is None else slots
@@ -25,6 +25,7 @@ from blazar.db import utils as db_utils
 from blazar.manager import exceptions as mgr_exceptions
 from blazar.plugins import base
 from blazar.plugins import instances as plugin
+from blazar.plugins.instances import capacity
 from blazar.plugins import oshosts
 from blazar import status
 from blazar.utils.openstack import exceptions as openstack_ex
@@ -74,11 +75,17 @@ class VirtualInstancePlugin(base.BasePlugin, nova.NovaClientWrapper):
                                     excludes):
         free = []
         non_free = []
+        if not hosts:
+            return free, non_free
+
+        host_reservations = collections.defaultdict(list)
+        usages = db_utils.get_reservation_usages_by_host_ids(
+            [h['id'] for h in hosts], start_date, end_date)
+        for usage in usages:
+            host_reservations[usage['host_id']].append(usage)
 
         for host in hosts:
-            reservations = db_utils.get_reservations_by_host_id(host['id'],
-                                                                start_date,
-                                                                end_date)
+            reservations = host_reservations[host['id']]
 
             if excludes:
                 reservations = [r for r in reservations
@@ -93,55 +100,13 @@ class VirtualInstancePlugin(base.BasePlugin, nova.NovaClientWrapper):
         return free, non_free
 
     def max_usages(self, host, reservations):
-        def resource_usage_by_event(event, resource_type):
-            return event['reservation']['instance_reservation'][resource_type]
-
-        events_list = []
-        for r in reservations:
-            fetched_events = db_api.event_get_all_sorted_by_filters(
-                sort_key='time', sort_dir='asc',
-                filters={'lease_id': r['lease_id']})
-            events_list.extend([{'event': e, 'reservation': r}
-                                for e in fetched_events])
-
-        events_list.sort(key=lambda x: x['event']['time'])
-
-        max_vcpus = max_memory = max_disk = 0
-        current_vcpus = current_memory = current_disk = 0
-
-        for event in events_list:
-            if event['event']['event_type'] == 'start_lease':
-                current_vcpus += resource_usage_by_event(event, 'vcpus')
-                current_memory += resource_usage_by_event(event, 'memory_mb')
-                current_disk += resource_usage_by_event(event, 'disk_gb')
-                if max_vcpus < current_vcpus:
-                    max_vcpus = current_vcpus
-                if max_memory < current_memory:
-                    max_memory = current_memory
-                if max_disk < current_disk:
-                    max_disk = current_disk
-            elif event['event']['event_type'] == 'end_lease':
-                current_vcpus -= resource_usage_by_event(event, 'vcpus')
-                current_memory -= resource_usage_by_event(event, 'memory_mb')
-                current_disk -= resource_usage_by_event(event, 'disk_gb')
-
-        return max_vcpus, max_memory, max_disk
+        return capacity.peak_usages(reservations)
 
     def get_hosts_list(self, host_info, cpus, memory, disk):
-        hosts_list = []
         host = host_info['host']
         reservations = host_info['reservations']
-        max_cpus, max_memory, max_disk = self.max_usages(host,
-                                                         reservations)
-        used_cpus, used_memory, used_disk = (cpus, memory, disk)
-        while (max_cpus + used_cpus <= host['vcpus'] and
-               max_memory + used_memory <= host['memory_mb'] and
-               max_disk + used_disk <= host['local_gb']):
-            hosts_list.append(host)
-            used_cpus += cpus
-            used_memory += memory
-            used_disk += disk
-        return hosts_list
+        peaks = self.max_usages(host, reservations)
+        return [host] * capacity.count_slots(host, peaks, cpus, memory, disk)
 
     def allocation_candidates(self, reservation):
         return self.pickup_hosts(None, reservation)['added']
@@ -468,9 +433,9 @@ class VirtualInstancePlugin(base.BasePlugin, nova.NovaClientWrapper):
         instance_reservation = db_api.instance_reservation_create(
             instance_reservation_val)
 
-        for host_id in hosts['added']:
-            db_api.host_allocation_create({'compute_host_id': host_id,
-                                          'reservation_id': reservation_id})
+        db_api.host_allocation_bulk_create(
+            [{'compute_host_id': host_id, 'reservation_id': reservation_id}
+             for host_id in hosts['added']])
 
         try:
             flavor, group, pool = self._create_resources(
@@ -488,6 +453,12 @@ class VirtualInstancePlugin(base.BasePlugin, nova.NovaClientWrapper):
 
         return instance_reservation['id']
 
+    def rollback_resource(self, resource_id):
+        instance_reservation = db_api.instance_reservation_get(resource_id)
+        self.cleanup_resources(instance_reservation)
+        self.placement_client.delete_reservation_class(
+            instance_reservation['reservation_id'])
+
     def update_host_allocations(self, added, removed, reservation_id):
         allocations = db_api.host_allocation_get_all_by_values(
             reservation_id=reservation_id)
@@ -495,19 +466,18 @@ class VirtualInstancePlugin(base.BasePlugin, nova.NovaClientWrapper):
         removed_allocs = []
         for host_id in removed:
             for allocation in allocations:
-                if allocation['compute_host_id'] == host_id:
+                if (allocation['compute_host_id'] == host_id and
+                        allocation['id'] not in removed_allocs):
                     removed_allocs.append(allocation['id'])
                     break
 
         # TODO(tetsuro): It would be nice to have something like
         # db_api.host_allocation_replace() to process the following
         # deletion and addition in *one* DB transaction.
-        for alloc_id in removed_allocs:
-            db_api.host_allocation_destroy(alloc_id)
-
-        for added_host in added:
-            db_api.host_allocation_create({'compute_host_id': added_host,
-                                           'reservation_id': reservation_id})
+        db_api.host_allocation_bulk_destroy(removed_allocs)
+        db_api.host_allocation_bulk_create(
+            [{'compute_host_id': added_host, 'reservation_id': reservation_id}
+             for added_host in added])
 
     def update_reservation(self, reservation_id, new_values):
         """Updates an instance reservation with requested parameters.
@@ -523,7 +493,7 @@ class VirtualInstancePlugin(base.BasePlugin, nova.NovaClientWrapper):
         self._validate_reservation_params(new_values)
 
         reservation = db_api.reservation_get(reservation_id)
-        lease = db_api.lease_get(reservation['lease_id'])
+        lease = db_api.lease_get(reservation['lease_id'], profile='summary')
 
         updatable = ['vcpus', 'memory_mb', 'disk_gb', 'affinity', 'amount',
                      'resource_properties']
@@ -616,8 +586,8 @@ class VirtualInstancePlugin(base.BasePlugin, nova.NovaClientWrapper):
             reservation_id=reservation_id)
         for allocation in allocations:
             host = db_api.host_get(allocation['compute_host_id'])
-            db_api.host_allocation_destroy(allocation['id'])
             hostnames.append(host['hypervisor_hostname'])
+        db_api.host_allocation_bulk_destroy([a['id'] for a in allocations])
 
         for server in self.nova.servers.list(search_opts={
                 'flavor': reservation_id,
@@ -712,8 +682,8 @@ class VirtualInstancePlugin(base.BasePlugin, nova.NovaClientWrapper):
             self._pre_reallocate(reservation, old_host_id)
 
             if new_host_id is None:
-                for allocation in allocations:
-                    db_api.host_allocation_destroy(allocation['id'])
+                db_api.host_allocation_bulk_destroy(
+                    [allocation['id'] for allocation in allocations])
                 LOG.warn('Could not find alternative host for '
                          'reservation %s (lease: %s).',
                          reservation['id'], lease['name'])
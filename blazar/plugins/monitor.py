@@ -131,6 +131,14 @@ class GeneralMonitorPlugin(base.BaseMonitorPlugin, metaclass=abc.ABCMeta):
         """
         pass
 
+    def set_reservable_bulk(self, resources, is_reservable):
+        """Set resources as reservable or not reservable
+
+        Plugins able to update all the resources at once override this.
+        """
+        for resource in resources:
+            self.set_reservable(resource, is_reservable)
+
     def heal_reservations(self, failed_resources, interval_begin,
                           interval_end):
         """Heal reservations which suffer from resource failures.
@@ -199,11 +207,9 @@ class GeneralMonitorPlugin(base.BaseMonitorPlugin, metaclass=abc.ABCMeta):
 
         failed_resources, recovered_resources = self.poll_resource_failures()
         if failed_resources:
-            for resource in failed_resources:
-                self.set_reservable(resource, False)
+            self.set_reservable_bulk(failed_resources, False)
         if recovered_resources:
-            for resource in recovered_resources:
-                self.set_reservable(resource, True)
+            self.set_reservable_bulk(recovered_resources, True)
 
         return self.heal()
 
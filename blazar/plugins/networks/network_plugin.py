@@ -26,6 +26,7 @@ from oslo_log import log as logging
 from stevedore import named
 
 from blazar.db import api as db_api
+from blazar.db import availability
 from blazar.db import exceptions as db_ex
 from blazar.db import utils as db_utils
 from blazar.manager import exceptions as manager_ex
@@ -101,7 +102,8 @@ class NetworkPlugin(base.BasePlugin):
     title = 'Network Plugin'
     description = 'This plugin creates and deletes networks.'
     query_options = {
-        QUERY_TYPE_ALLOCATION: ['lease_id', 'reservation_id']
+        QUERY_TYPE_ALLOCATION: ['lease_id', 'reservation_id', 'start_date',
+                                'end_date', 'limit', 'marker']
     }
 
     def __init__(self):
@@ -165,7 +167,7 @@ class NetworkPlugin(base.BasePlugin):
     def update_reservation(self, reservation_id, values):
         """Update reservation."""
         reservation = db_api.reservation_get(reservation_id)
-        lease = db_api.lease_get(reservation['lease_id'])
+        lease = db_api.lease_get(reservation['lease_id'], profile='summary')
 
         if (not [x for x in values.keys() if x in ['network_properties',
                                                    'resource_properties']]
@@ -346,8 +348,8 @@ class NetworkPlugin(base.BasePlugin):
                                           {'status': 'completed'})
         allocations = db_api.network_allocation_get_all_by_values(
             reservation_id=reservation_id)
-        for allocation in allocations:
-            db_api.network_allocation_destroy(allocation['id'])
+        db_api.network_allocation_bulk_destroy(
+            [allocation['id'] for allocation in allocations])
         network_id = network_reservation['network_id']
 
         # The call to delete must be done without trust_id so the admin role is
@@ -377,11 +379,8 @@ class NetworkPlugin(base.BasePlugin):
             return network
 
     def list_networks(self):
-        raw_network_list = db_api.network_list()
-        network_list = []
-        for network in raw_network_list:
-            network_list.append(self.get_network(network['id']))
-        return network_list
+        for network in db_api.network_list():
+            yield self.get_network(network['id'])
 
     def validate_network_param(self, values):
         marshall_attributes = set(['network_type', 'physical_network',
@@ -565,18 +564,22 @@ class NetworkPlugin(base.BasePlugin):
             raise manager_ex.CantDeleteNetwork(network=network_id, msg=str(e))
 
     def list_allocations(self, query, detail=False):
-        network_id_list = [n['id'] for n in db_api.network_list()]
-        options = self.get_query_options(query, QUERY_TYPE_ALLOCATION)
+        network_id_list = self.changed_allocation_resources(
+            'network', [n['id'] for n in db_api.network_list()], query)
+        options = self.parse_allocation_options(
+            self.get_query_options(query, QUERY_TYPE_ALLOCATION))
         options['detail'] = detail
 
         network_allocations = self.query_network_allocations(network_id_list,
                                                              **options)
         self.add_extra_allocation_info(network_allocations)
-        return [{"resource_id": network, "reservations": allocs}
-                for network, allocs in network_allocations.items()]
+        return ({"resource_id": network, "reservations": allocs}
+                for network, allocs in network_allocations.items())
 
     def get_allocations(self, network_id, query):
-        options = self.get_query_options(query, QUERY_TYPE_ALLOCATION)
+        options = self.parse_allocation_options(
+            self.get_query_options(query, QUERY_TYPE_ALLOCATION),
+            paging=True)
         network_allocations = self.query_network_allocations([network_id],
                                                              **options)
         allocs = network_allocations.get(network_id, [])
@@ -587,7 +590,9 @@ class NetworkPlugin(base.BasePlugin):
                                               reservation_id=reservation_id)
 
     def query_network_allocations(self, networks, lease_id=None,
-                                  reservation_id=None, detail=False):
+                                  reservation_id=None, detail=False,
+                                  start_date=None, end_date=None, limit=None,
+                                  marker=None):
         """Return dict of network and its allocations
 
         The list element forms
@@ -602,11 +607,12 @@ class NetworkPlugin(base.BasePlugin):
                           ]
         }.
         """
-        start = datetime.datetime.utcnow()
-        end = datetime.date.max
+        start = start_date or datetime.datetime.utcnow()
+        end = end_date or datetime.date.max
 
         reservations = db_utils.get_reservation_allocations_by_network_ids(
-            networks, start, end, lease_id, reservation_id)
+            networks, start, end, lease_id, reservation_id, marker,
+            limit)
         network_allocations = {n: [] for n in networks}
 
         for reservation in reservations:
@@ -644,8 +650,6 @@ class NetworkPlugin(base.BasePlugin):
     def _matching_networks(self, network_properties, resource_properties,
                            start_date, end_date):
         """Return the matching networks (preferably not allocated)"""
-        allocated_network_ids = []
-        not_allocated_network_ids = []
         filter_array = []
         start_date_with_margin = start_date - datetime.timedelta(
             minutes=CONF.cleaning_time)
@@ -659,21 +663,12 @@ class NetworkPlugin(base.BasePlugin):
         if resource_properties:
             filter_array += plugins_utils.convert_requirements(
                 resource_properties)
-        for network in db_api.network_get_all_by_queries(
-                filter_array):
-            if not db_api.network_allocation_get_all_by_values(
-                    network_id=network['id']):
-                not_allocated_network_ids.append(network['id'])
-            elif db_utils.get_free_periods(
-                network['id'],
-                start_date_with_margin,
-                end_date_with_margin,
-                end_date_with_margin - start_date_with_margin,
-                resource_type='network'
-            ) == [
-                (start_date_with_margin, end_date_with_margin),
-            ]:
-                allocated_network_ids.append(network['id'])
+        network_ids = [network['id'] for network in
+                       db_api.network_get_all_by_queries(filter_array)]
+        not_allocated_network_ids, allocated_network_ids = (
+            availability.find_free_resources('network', network_ids,
+                                             start_date_with_margin,
+                                             end_date_with_margin))
 
         if len(not_allocated_network_ids):
             shuffle(not_allocated_network_ids)
@@ -878,11 +873,15 @@ class NetworkMonitorPlugin(monitor.GeneralMonitorPlugin, neutron.NeutronClientWr
         recovered = []
         dry_run = CONF[plugin.RESOURCE_TYPE].enable_polling_monitor_dry_run
         network_segments = db_api.network_list()
+        reservations = (
+            db_utils.get_most_recent_reservation_info_by_network_ids(
+                [network["id"] for network in network_segments]))
+        neutron_networks = {}
 
         def process_network(network):
             """
-            For each blazar network, check if the network is not in use by a reservation
-            and get the neutron network based on segment_id
+            For each blazar network not in use by a reservation, get the neutron
+            network based on segment_id
             Tear down the network, if neutron network is using a vlan when there is no active
             reservation is blazar
 
@@ -895,19 +894,8 @@ class NetworkMonitorPlugin(monitor.GeneralMonitorPlugin, neutron.NeutronClientWr
             """
             network_id_from_blazar = network["id"]
             segment_id = network["segment_id"]
-            # gets the most recent reservation for the blazar network
-            network_curr_reservation = db_utils.get_most_recent_reservation_info_by_network_id(network_id_from_blazar)
-            if network_curr_reservation and network_curr_reservation['status'] == status.reservation.ACTIVE:
-                # This means that network works fine as the reservation started fine
-                LOG.debug(f"Network {network_id_from_blazar} - VLAN {segment_id} is in active reservation {network_curr_reservation['id']} - skipping")
-                return
             neutron_client = neutron.BlazarNeutronClient()
-            networks = neutron_client.list_networks()['networks']
-            network_from_neutron = next((
-                network
-                for network in networks
-                if network.get('provider:segmentation_id') == segment_id
-            ), None)
+            network_from_neutron = neutron_networks.get(segment_id)
             if not network_from_neutron:
                 LOG.debug(f"Blazar network - {network_id_from_blazar} is not found in neutron - skipping")
                 return
@@ -943,9 +931,25 @@ class NetworkMonitorPlugin(monitor.GeneralMonitorPlugin, neutron.NeutronClientWr
             if not dry_run:
                 neutron_client.delete_network(network_id_from_neutron)
 
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = executor.map(process_network, network_segments)
+        stale_networks = []
+        for network in network_segments:
+            network_curr_reservation = reservations.get(network["id"])
+            if network_curr_reservation and network_curr_reservation['status'] == status.reservation.ACTIVE:
+                # This means that network works fine as the reservation started fine
+                LOG.debug(f"Network {network['id']} - VLAN {network['segment_id']} is in active reservation {network_curr_reservation['id']} - skipping")
+                continue
+            stale_networks.append(network)
+        if not stale_networks:
+            return failed, recovered
+
         try:
+            # map the neutron networks by VLAN, keeping the first one listed
+            neutron_client = neutron.BlazarNeutronClient()
+            for network in neutron_client.list_networks()['networks']:
+                neutron_networks.setdefault(
+                    network.get('provider:segmentation_id'), network)
+            with concurrent.futures.ThreadPoolExecutor() as executor:
+                futures = executor.map(process_network, stale_networks)
             results = list(futures)
         except Exception as e:
             LOG.exception('Skipping health check. %s', str(e))
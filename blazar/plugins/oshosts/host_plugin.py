@@ -23,6 +23,7 @@ from oslo_utils import strutils
 
 from blazar import context, policy, exceptions
 from blazar.db import api as db_api
+from blazar.db import availability
 from blazar.db import exceptions as db_ex
 from blazar.db import utils as db_utils
 from blazar.manager import exceptions as manager_ex
@@ -101,7 +102,8 @@ class PhysicalHostPlugin(base.BasePlugin, nova.NovaClientWrapper):
     freepool_name = CONF.nova.aggregate_freepool_name
     pool = None
     query_options = {
-        QUERY_TYPE_ALLOCATION: ['lease_id', 'reservation_id']
+        QUERY_TYPE_ALLOCATION: ['lease_id', 'reservation_id', 'start_date',
+                                'end_date', 'limit', 'marker']
     }
 
     def __init__(self):
@@ -135,15 +137,19 @@ class PhysicalHostPlugin(base.BasePlugin, nova.NovaClientWrapper):
             'on_start': values['on_start']
         }
         host_reservation = db_api.host_reservation_create(host_rsrv_values)
-        for host_id in host_ids:
-            db_api.host_allocation_create({'compute_host_id': host_id,
-                                          'reservation_id': reservation_id})
+        db_api.host_allocation_bulk_create(
+            [{'compute_host_id': host_id, 'reservation_id': reservation_id}
+             for host_id in host_ids])
         return host_reservation['id']
 
+    def rollback_resource(self, resource_id):
+        host_reservation = db_api.host_reservation_get(resource_id)
+        nova.ReservationPool().delete(host_reservation['aggregate_id'])
+
     def update_reservation(self, reservation_id, values):
         """Update reservation."""
         reservation = db_api.reservation_get(reservation_id)
-        lease = db_api.lease_get(reservation['lease_id'])
+        lease = db_api.lease_get(reservation['lease_id'], profile='summary')
 
         if (not [x for x in values.keys() if x in ['min', 'max',
                                                    'hypervisor_properties',
@@ -235,8 +241,7 @@ class PhysicalHostPlugin(base.BasePlugin, nova.NovaClientWrapper):
                                        {'status': 'completed'})
         allocations = db_api.host_allocation_get_all_by_values(
             reservation_id=host_reservation['reservation_id'])
-        for allocation in allocations:
-            db_api.host_allocation_destroy(allocation['id'])
+        db_api.host_allocation_bulk_destroy([a['id'] for a in allocations])
         pool = nova.ReservationPool()
         for host in pool.get_computehosts(host_reservation['aggregate_id']):
             for server in self.nova.servers.list(
@@ -330,11 +335,8 @@ class PhysicalHostPlugin(base.BasePlugin, nova.NovaClientWrapper):
             return host
 
     def list_computehosts(self, query=None):
-        raw_host_list = db_api.host_list()
-        host_list = []
-        for host in raw_host_list:
-            host_list.append(self.get_computehost(host['id']))
-        return host_list
+        for host in db_api.host_list():
+            yield self.get_computehost(host['id'])
 
     def create_computehost(self, host_values):
         # TODO(sbauza):
@@ -558,17 +560,21 @@ class PhysicalHostPlugin(base.BasePlugin, nova.NovaClientWrapper):
         )
 
     def list_allocations(self, query, detail=False):
-        hosts_id_list = [h['id'] for h in db_api.host_list()]
-        options = self.get_query_options(query, QUERY_TYPE_ALLOCATION)
+        hosts_id_list = self.changed_allocation_resources(
+            'host', [h['id'] for h in db_api.host_list()], query)
+        options = self.parse_allocation_options(
+            self.get_query_options(query, QUERY_TYPE_ALLOCATION))
         options['detail'] = detail
         hosts_allocations = self.query_host_allocations(hosts_id_list,
                                                         **options)
         self.add_extra_allocation_info(hosts_allocations)
-        return [{"resource_id": host, "reservations": allocs}
-                for host, allocs in hosts_allocations.items()]
+        return ({"resource_id": host, "reservations": allocs}
+                for host, allocs in hosts_allocations.items())
 
     def get_allocations(self, host_id, query, detail=False):
-        options = self.get_query_options(query, QUERY_TYPE_ALLOCATION)
+        options = self.parse_allocation_options(
+            self.get_query_options(query, QUERY_TYPE_ALLOCATION),
+            paging=True)
         options['detail'] = detail
         host_allocations = self.query_host_allocations([host_id], **options)
         allocs = host_allocations.get(host_id, [])
@@ -580,7 +586,7 @@ class PhysicalHostPlugin(base.BasePlugin, nova.NovaClientWrapper):
             # If we're only reallocating a host for a single lease,
             # then we allow non-admin users to perform this action,
             # but only on leases they own
-            lease = db_api.lease_get(lease_id)
+            lease = db_api.lease_get(lease_id, profile='summary')
             ctx = context.current()
             prid = lease['project_id']
             policy.check_enforcement('leases', action='reallocate', ctx=ctx, target={
@@ -619,7 +625,9 @@ class PhysicalHostPlugin(base.BasePlugin, nova.NovaClientWrapper):
                                            reservation_id=reservation_id)
 
     def query_host_allocations(self, hosts, detail=None, lease_id=None,
-                               reservation_id=None):
+                               reservation_id=None,
+                               start_date=None, end_date=None, limit=None,
+                               marker=None):
         """Return dict of host and its allocations.
 
         The list element forms
@@ -634,11 +642,12 @@ class PhysicalHostPlugin(base.BasePlugin, nova.NovaClientWrapper):
                      ]
         }.
         """
-        start = datetime.datetime.utcnow()
-        end = datetime.date.max
+        start = start_date or datetime.datetime.utcnow()
+        end = end_date or datetime.date.max
 
         reservations = db_utils.get_reservation_allocations_by_host_ids(
-            hosts, start, end, lease_id, reservation_id)
+            hosts, start, end, lease_id, reservation_id, marker,
+            limit)
         host_allocations = {h: [] for h in hosts}
 
         for reservation in reservations:
@@ -696,8 +705,6 @@ class PhysicalHostPlugin(base.BasePlugin, nova.NovaClientWrapper):
         count_range = count_range.split('-')
         min_host = count_range[0]
         max_host = count_range[1]
-        allocated_host_ids = []
-        not_allocated_host_ids = []
         filter_array = []
         start_date_with_margin = start_date - datetime.timedelta(
             minutes=CONF.cleaning_time)
@@ -716,21 +723,13 @@ class PhysicalHostPlugin(base.BasePlugin, nova.NovaClientWrapper):
             hosts = db_api.host_get_all_by_queries(filter_array)
         else:
             hosts = db_api.reservable_host_get_all_by_queries(filter_array)
-        for host in hosts:
-            if not self.is_project_allowed(project_id, resource_properties):
-                continue
-            if not db_api.host_allocation_get_all_by_values(
-                    compute_host_id=host['id']):
-                not_allocated_host_ids.append(host['id'])
-            elif db_utils.get_free_periods(
-                host['id'],
-                start_date_with_margin,
-                end_date_with_margin,
-                end_date_with_margin - start_date_with_margin
-            ) == [
-                (start_date_with_margin, end_date_with_margin),
-            ]:
-                allocated_host_ids.append(host['id'])
+        host_ids = [host['id'] for host in hosts
+                    if self.is_project_allowed(project_id,
+                                               resource_properties)]
+        not_allocated_host_ids, allocated_host_ids = (
+            availability.find_free_resources('host', host_ids,
+                                             start_date_with_margin,
+                                             end_date_with_margin))
         if len(not_allocated_host_ids) >= int(min_host):
             if CONF[self.resource_type].randomize_host_selection:
                 Random.shuffle(not_allocated_host_ids)
@@ -832,10 +831,11 @@ class PhysicalHostPlugin(base.BasePlugin, nova.NovaClientWrapper):
             if len(host_ids) >= min_hosts:
                 new_hosts = []
                 pool = nova.ReservationPool()
+                db_api.host_allocation_bulk_create(
+                    [{'compute_host_id': host_id,
+                      'reservation_id': reservation_id}
+                     for host_id in host_ids])
                 for host_id in host_ids:
-                    db_api.host_allocation_create(
-                        {'compute_host_id': host_id,
-                         'reservation_id': reservation_id})
                     new_host = db_api.host_get(host_id)
                     new_hosts.append(new_host['hypervisor_hostname'])
                 if reservation_status == status.reservation.ACTIVE:
@@ -845,8 +845,9 @@ class PhysicalHostPlugin(base.BasePlugin, nova.NovaClientWrapper):
             else:
                 raise manager_ex.NotEnoughHostsAvailable()
 
-        for allocation in allocs_to_remove:
-            db_api.host_allocation_destroy(allocation['id'])
+        if allocs_to_remove:
+            db_api.host_allocation_bulk_destroy(
+                [allocation['id'] for allocation in allocs_to_remove])
 
     def _allocations_to_remove(self, dates_before, dates_after, max_hosts,
                                hypervisor_properties, resource_properties,
@@ -907,8 +908,13 @@ class PhysicalHostMonitorPlugin(monitor.GeneralMonitorPlugin,
     """Monitor plugin for physical host resource."""
 
     def __new__(cls, *args, **kwargs):
-        return super(PhysicalHostMonitorPlugin, cls).__new__(cls, *args,
-                                                             **kwargs)
+        instance = super(PhysicalHostMonitorPlugin, cls).__new__(cls, *args,
+                                                                 **kwargs)
+        if not hasattr(instance, '_host_states'):
+            # Last seen node state and reservable flag of each host, see
+            # _host_transitions().
+            instance._host_states = {}
+        return instance
 
     def filter_allocations(self, reservation, host_ids):
         return [alloc for alloc
@@ -971,6 +977,47 @@ class PhysicalHostMonitorPlugin(monitor.GeneralMonitorPlugin,
         LOG.warn('%s %s.', resource["hypervisor_hostname"],
                  "recovered" if is_reservable else "failed")
 
+    def set_reservable_bulk(self, resources, is_reservable):
+        host_ids = []
+        for resource in resources:
+            if resource.get('disabled', False):
+                LOG.debug(f"{resource['hypervisor_hostname']} is disabled - cannot set reservable")
+                continue
+            host_ids.append(resource["id"])
+            LOG.warn('%s %s.', resource["hypervisor_hostname"],
+                     "recovered" if is_reservable else "failed")
+        db_api.host_bulk_update(host_ids, {"reservable": is_reservable})
+
+    def _host_transitions(self, hosts, states, is_failed, is_active):
+        """Find the hosts which failed or recovered since the last poll.
+
+        Only the hosts whose node state or reservable flag changed since the
+        previous poll are checked. The reservable flag is remembered as it
+        is expected to be once the failed and recovered hosts are updated,
+        so that hosts are checked again if their update did not happen.
+
+        :param hosts: the hosts to check
+        :param states: the state of the node of each host, keyed by host id
+        :param is_failed: whether a node state makes its host fail
+        :param is_active: whether a node state makes its host recover
+        :return: a list of failed hosts, a list of recovered hosts.
+        """
+        failed_hosts = []
+        recovered_hosts = []
+        for host in hosts:
+            state = states.get(host['id'])
+            reservable = host['reservable']
+            if self._host_states.get(host['id']) == (state, reservable):
+                continue
+            if state is not None and reservable and is_failed(state):
+                failed_hosts.append(host)
+                reservable = False
+            elif state is not None and not reservable and is_active(state):
+                recovered_hosts.append(host)
+                reservable = True
+            self._host_states[host['id']] = (state, reservable)
+        return failed_hosts, recovered_hosts
+
     def poll_resource_failures(self):
         """Check health of hosts by calling Nova Hypervisors API.
 
@@ -988,103 +1035,91 @@ class PhysicalHostMonitorPlugin(monitor.GeneralMonitorPlugin,
 
         failed_hosts = []
         recovered_hosts = []
+        host_ids = {h['id'] for h in hosts}
+        for host_id in set(self._host_states) - host_ids:
+            del self._host_states[host_id]
         try:
             if ironic_hosts:
                 invalid_power_states = ['error']
                 invalid_provision_states = ['error', 'clean failed',
                                             'manageable', 'deploy failed']
-                reservable_hosts = [h for h in ironic_hosts
-                                    if h['reservable'] is True]
-                unreservable_hosts = [h for h in ironic_hosts
-                                      if h['reservable'] is False]
 
                 ironic_client = ironic.BlazarIronicClient()
-                nodes = ironic_client.ironic.node.list()
-                failed_bm_ids = [n.uuid for n in nodes
-                                 if n.maintenance
-                                 or n.power_state in invalid_power_states
-                                 or n.provision_state
-                                 in invalid_provision_states]
-                failed_hosts.extend([host for host in reservable_hosts
-                                     if host['hypervisor_hostname']
-                                     in failed_bm_ids])
-                active_bm_ids = [n.uuid for n in nodes
-                                 if not n.maintenance
-                                 and n.provision_state in ['available', 'active']]
-                recovered_hosts.extend([host for host in unreservable_hosts
-                                        if host['hypervisor_hostname']
-                                        in active_bm_ids])
+                nodes = {n.uuid: (n.maintenance, n.power_state,
+                                  n.provision_state)
+                         for n in ironic_client.ironic.node.list(
+                             fields=['uuid', 'maintenance', 'power_state',
+                                     'provision_state'])}
+
+                def node_failed(state):
+                    maintenance, power_state, provision_state = state
+                    return (maintenance
+                            or power_state in invalid_power_states
+                            or provision_state in invalid_provision_states)
+
+                def node_active(state):
+                    maintenance, power_state, provision_state = state
+                    return (not maintenance
+                            and provision_state in ['available', 'active'])
+
+                failed, recovered = self._host_transitions(
+                    ironic_hosts,
+                    {h['id']: nodes.get(h['hypervisor_hostname'])
+                     for h in ironic_hosts},
+                    node_failed, node_active)
+                failed_hosts.extend(failed)
+                recovered_hosts.extend(recovered)
 
             if nova_hosts:
-                reservable_hosts = [h for h in nova_hosts
-                                    if h['reservable'] is True]
-                unreservable_hosts = [h for h in nova_hosts
-                                      if h['reservable'] is False]
-
-                hvs = self.nova.hypervisors.list()
-
-                failed_hv_ids = [str(hv.id) for hv in hvs
-                                 if hv.state == 'down'
-                                 or hv.status == 'disabled']
-                failed_hosts.extend([host for host in reservable_hosts
-                                     if host['id'] in failed_hv_ids])
-
-                active_hv_ids = [str(hv.id) for hv in hvs
-                                 if hv.state == 'up'
-                                 and hv.status == 'enabled']
-                recovered_hosts.extend([host for host in unreservable_hosts
-                                        if host['id'] in active_hv_ids])
-
-            aggregates = self.nova.aggregates.list()
-            # create a map to get the current aggregate of a host in nova
-            host_to_agg_map = {host: agg for agg in aggregates for host in agg.hosts}
-            # get all physical hosts
-            all_hosts = db_api.host_list()
+                hvs = {str(hv.id): (hv.state, hv.status)
+                       for hv in self.nova.hypervisors.list(detailed=False)}
+                failed, recovered = self._host_transitions(
+                    nova_hosts, hvs,
+                    lambda state: state[0] == 'down' or state[1] == 'disabled',
+                    lambda state: state == ('up', 'enabled'))
+                failed_hosts.extend(failed)
+                recovered_hosts.extend(recovered)
+
             pool = nova.ReservationPool()
+            # only move hosts out of the aggregates of reservations
+            aggregates = [agg.id for agg in pool.get_all()
+                          if pool.config.blazar_owner in agg.metadata]
             freepool = pool.get_aggregate_from_name_or_id(pool.freepool_name)
             if not freepool:
                 raise ValueError("Aggregate list does not contain a freepool!")
+            # hosts not in an active reservation should be in the freepool
+            free_hosts = {}
+            all_hosts = db_api.host_list()
+            reservations = (
+                db_utils.get_most_recent_reservation_info_by_host_ids(
+                    [host['id'] for host in all_hosts]))
             for host in all_hosts:
-                # get the most recent reservation for the host_id and check if we need to move to freepool
-                reservation = db_utils.get_most_recent_reservation_info_by_host_id(host['id'])
-                # ignore the reservation which is active, as the host must already be in the right pool
+                reservation = reservations.get(host['id'])
                 if reservation and reservation["reservation_status"] == status.reservation.ACTIVE:
                     LOG.debug(f"{host['hypervisor_hostname']} is in an active reservation"
-                             f" {reservation['reservation_id']} - skipping aggregate clean up")
-                    continue
-                # host not in 'active' or 'pending' reservation should be in freepool
-                host_uuid = host['hypervisor_hostname']
-                curr_agg = host_to_agg_map.get(host['hypervisor_hostname'])
-                if not curr_agg:
-                    LOG.warning(f"f{host['hypervisor_hostname']} not found in any aggregate - moving to freepool")
-                    # if the host is not in any aggregate and in non-active reservation
-                    # it should be moved to freepool
-                    if not dry_run:
-                        freepool.add_host(host_uuid)
+                              f" {reservation['reservation_id']} - skipping aggregate clean up")
                     continue
-                if curr_agg.name == freepool.name:
-                    # if the host is already in freepool skip it
-                    LOG.debug(f"{host['hypervisor_hostname']} is already in a freepool - skipping aggregate clean up")
+                free_hosts[host['hypervisor_hostname']] = host
+            result = pool.reconcile({freepool.id: list(free_hosts)},
+                                    sources=aggregates, dry_run=dry_run)
+            removed_hosts = {}
+            for agg_id, host in result.removed:
+                LOG.warning(f"Removing host {host} from aggregate {agg_id}")
+                removed_hosts.setdefault(agg_id, set()).add(host)
+            for agg_id, host in result.added:
+                LOG.warning(f"Adding host {host} to freepool")
+            for host, e in result.failed.items():
+                LOG.error(f"Failed to recover host {host}: {e}")
+                failed_hosts.append(free_hosts[host])
+            for agg_id, removed in removed_hosts.items():
+                if set(pool.get_computehosts(agg_id)) - removed:
                     continue
-                try:
-                    LOG.warning(
-                        f"Removing host {host['hypervisor_hostname']} from aggregate"
-                        f" {curr_agg.name} Host {host['hypervisor_hostname']} is currently in reservation"
-                        f" {reservation['reservation_id']} with status {reservation['reservation_status']}"
-                    )
-                    if not dry_run:
-                        curr_agg.remove_host(host_uuid)
-                    LOG.warning(f"Adding host {host['hypervisor_hostname']} to freepool")
-                    if not dry_run:
-                        freepool.add_host(host_uuid)
-                    hosts_in_agg = pool.get_computehosts(curr_agg)
-                    if not hosts_in_agg:
-                        LOG.warning(f"Removing aggregate {curr_agg.name} - No hosts in it")
-                        if not dry_run:
-                            curr_agg.delete()
-                except Exception as e:
-                    LOG.exception(f"Failed to recover host {host}", exc_info=e)
-                    failed_hosts.append(host)
+                LOG.warning(f"Removing aggregate {agg_id} - No hosts in it")
+                if not dry_run:
+                    try:
+                        pool.delete(agg_id, force=False)
+                    except Exception as e:
+                        LOG.exception(f"Failed to remove aggregate {agg_id}", exc_info=e)
         except Exception as e:
             LOG.exception('Skipping health check. %s', str(e))
 
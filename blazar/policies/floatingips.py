@@ -43,6 +43,17 @@ floatingips_policies = [
             }
         ]
     ),
+    policy.DocumentedRuleDefault(
+        name=POLICY_ROOT % 'get_allocations',
+        check_str=base.RULE_ADMIN,
+        description='Policy rule for List FloatingIP Allocations API.',
+        operations=[
+            {
+                'path': '/{api_version}/floatingips/allocations',
+                'method': 'GET'
+            }
+        ]
+    ),
     policy.DocumentedRuleDefault(
         name=POLICY_ROOT % 'delete',
         check_str=base.RULE_ADMIN,
@@ -177,7 +177,7 @@ class LeaseStatus(BaseStatus):
         :param lease_id: Lease ID
         :return: True if the status is in (PENDING, ACTIVE, TERMINATED, ERROR)
         """
-        lease = db_api.lease_get(lease_id)
+        lease = db_api.lease_get(lease_id, profile='summary')
         return (lease['status'] in cls.STABLE)
 
     @classmethod
@@ -203,7 +203,7 @@ class LeaseStatus(BaseStatus):
                     lease_id = kwargs["lease_id"]
                 else:
                     lease_id = args[1]
-                lease = db_api.lease_get(lease_id)
+                lease = db_api.lease_get(lease_id, profile='summary')
                 original_status = lease['status']
                 if cls.is_valid_transition(original_status,
                                            transition,
@@ -240,7 +240,7 @@ class LeaseStatus(BaseStatus):
                     raise e
                 else:
                     # Update a lease status if it exists
-                    if db_api.lease_get(lease_id):
+                    if db_api.lease_get(lease_id, profile='summary'):
                         next_status = cls.derive_stable_status(lease_id)
                         if (next_status in result_in and
                                 cls.is_valid_transition(transition,
@@ -24,6 +24,9 @@ from blazar import config as cfg
 from blazar import context
 from blazar.db.sqlalchemy import api as db_api
 from blazar.db.sqlalchemy import facade_wrapper
+from blazar.utils.openstack import base as openstack_base
+from blazar.utils.openstack import nova
+from blazar.utils import trusts
 
 cfg.CONF.set_override('use_stderr', False)
 
@@ -60,6 +63,9 @@ class TestCase(testscenarios.WithScenarios, base.BaseTestCase):
         super(TestCase, self).setUp()
         self.context_mock = None
         cfg.CONF(args=[], project='blazar')
+        self.addCleanup(openstack_base.clear_session_cache)
+        self.addCleanup(trusts.clear_trust_cache)
+        self.addCleanup(nova.ReservationPool.clear_aggregate_cache)
 
     def patch(self, obj, attr):
         """Returns a Mocked object on the patched attribute."""
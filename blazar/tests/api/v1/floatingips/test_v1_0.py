@@ -0,0 +1,128 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+import flask
+from testtools import matchers
+
+from oslo_middleware import request_id as id
+
+from blazar.api import context as api_context
+from blazar.api.v1 import api_version_request
+from blazar.api.v1.floatingips import service as service_api
+from blazar.api.v1.floatingips import v1_0 as floatingips_api_v1_0
+from blazar.api.v1 import request_id
+from blazar.api.v1 import request_log
+from blazar.api.v1 import utils as api_utils
+from blazar import context
+from blazar.db import api as db_api
+from blazar.db import utils as db_utils
+from blazar import tests
+
+
+def make_app():
+    """App builder (wsgi).
+
+    Entry point for Blazar REST API server.
+    """
+    app = flask.Flask('blazar.api')
+
+    app.register_blueprint(floatingips_api_v1_0.rest,
+                           url_prefix='/v1/floatingips')
+    app.wsgi_app = request_id.BlazarReqIdMiddleware(app.wsgi_app)
+    app.wsgi_app = request_log.RequestLog(app.wsgi_app)
+
+    return app
+
+
+class FloatingIPAPITestCase(tests.TestCase):
+
+    def setUp(self):
+        super(FloatingIPAPITestCase, self).setUp()
+
+        self.plugin = mock.Mock()
+        self.patch(service_api, 'get_plugins').return_value = {
+            'virtual:floatingip': self.plugin}
+        # The API service is built on first use with the patched plugin.
+        patcher = mock.patch.object(floatingips_api_v1_0._api, 'instance',
+                                    None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.app = make_app()
+        self.headers = {'Accept': 'application/json',
+                        'OpenStack-API-Version': 'reservation 1.0'}
+        self.mock_ctx = self.patch(api_context, 'ctx_from_headers')
+        self.mock_ctx.return_value = context.BlazarContext(
+            user_id='fake', project_id='fake', roles=['admin'])
+        self.patch(db_api, 'replica_reader')
+        self.get_allocation_revision = self.patch(
+            db_utils, 'get_allocation_revision')
+        self.get_allocation_revision.return_value = 1
+
+    def _assert_response(self, actual_resp, expected_status_code,
+                         expected_resp_body, key='floatingip',
+                         expected_api_version='reservation 1.0'):
+        res_id = actual_resp.headers.get(id.HTTP_RESP_HEADER_REQUEST_ID)
+        api_version = actual_resp.headers.get(
+            api_version_request.API_VERSION_REQUEST_HEADER)
+        self.assertIn(id.HTTP_RESP_HEADER_REQUEST_ID,
+                      actual_resp.headers)
+        self.assertIn(api_version_request.API_VERSION_REQUEST_HEADER,
+                      actual_resp.headers)
+        self.assertThat(res_id, matchers.StartsWith('req-'))
+        self.assertEqual(expected_status_code, actual_resp.status_code)
+        self.assertEqual(expected_resp_body, actual_resp.get_json()[key])
+        self.assertEqual(expected_api_version, api_version)
+
+    def test_allocation_list(self):
+        allocations = [{'resource_id': 'fip-1', 'reservations': []}]
+        self.plugin.list_allocations.return_value = allocations
+        with self.app.test_client() as c:
+            res = c.get('/v1/floatingips/allocations', headers=self.headers)
+            self._assert_response(res, 200, allocations, key='allocations')
+            self.assertEqual('"%s"' % api_utils.etag(1, {}, True),
+                             res.headers.get('ETag'))
+            self.plugin.list_allocations.assert_called_once_with(
+                {}, detail=True)
+            self.get_allocation_revision.assert_called_once_with(
+                'floatingip')
+
+    def test_allocation_list_not_modified(self):
+        etag = api_utils.etag(1, {}, True)
+        with self.app.test_client() as c:
+            headers = dict(self.headers, **{'If-None-Match': '"%s"' % etag})
+            res = c.get('/v1/floatingips/allocations', headers=headers)
+            self.assertEqual(304, res.status_code)
+            self.assertEqual(b'', res.data)
+            self.assertEqual('"%s"' % etag, res.headers.get('ETag'))
+            self.plugin.list_allocations.assert_not_called()
+
+    def test_allocation_list_modified(self):
+        self.plugin.list_allocations.return_value = []
+        with self.app.test_client() as c:
+            headers = dict(self.headers, **{'If-None-Match': '"old-etag"'})
+            res = c.get('/v1/floatingips/allocations', headers=headers)
+            self._assert_response(res, 200, [], key='allocations')
+            self.plugin.list_allocations.assert_called_once_with(
+                {}, detail=True)
+
+    def test_allocation_list_not_authorized(self):
+        self.mock_ctx.return_value = context.BlazarContext(
+            user_id='fake', project_id='fake', roles=['member'])
+        with self.app.test_client() as c:
+            res = c.get('/v1/floatingips/allocations', headers=self.headers)
+            self.assertEqual(403, res.status_code)
+            self.plugin.list_allocations.assert_not_called()
+            self.get_allocation_revision.assert_not_called()
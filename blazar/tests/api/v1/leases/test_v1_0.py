@@ -13,6 +13,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from unittest import mock
+
 import flask
 from oslo_utils import uuidutils
 from testtools import matchers
@@ -143,6 +145,9 @@ class LeaseAPITestCase(tests.TestCase):
             res = c.get('/v1/leases/{0}'.format(self.lease_uuid),
                         headers=self.headers)
             self._assert_response(res, 200, fake_lease(id=self.lease_uuid))
+            self.get_lease.assert_has_calls([
+                mock.call(lease_id=self.lease_uuid, profile='summary'),
+                mock.call(self.lease_uuid)])
 
     def test_get_with_latest_api_version(self):
         headers = {'Accept': 'application/json',
@@ -194,3 +199,6 @@ class LeaseAPITestCase(tests.TestCase):
             self.assertEqual(200, res.status_code)
             self.assertIn(id.HTTP_RESP_HEADER_REQUEST_ID, res.headers)
             self.assertThat(res_id, matchers.StartsWith('req-'))
+            self.get_lease.assert_called_once_with(lease_id=self.lease_uuid,
+                                                   profile='summary')
+            self.delete_lease.assert_called_once_with(self.lease_uuid)
@@ -145,6 +145,19 @@ class OsHostAPITestCase(tests.TestCase):
             res = c.get('/v1', headers=self.headers)
             self._assert_response(res, 200, [], key='hosts')
 
+    def test_list_streamed(self):
+        def fake_computehosts(query):
+            yield fake_computehost(id='1')
+            yield fake_computehost(id='2')
+
+        with self.app.test_client() as c:
+            self.get_computehosts.side_effect = fake_computehosts
+            res = c.get('/v1', headers=self.headers)
+            self.assertIsNone(res.headers.get('Content-Length'))
+            self._assert_response(
+                res, 200, [fake_computehost(id='1'), fake_computehost(id='2')],
+                key='hosts')
+
     def test_list_with_non_acceptable_version(self):
         headers = {'Accept': 'application/json',
                    'OpenStack-API-Version': 'reservation 1.2'}
@@ -232,9 +245,21 @@ class OsHostAPITestCase(tests.TestCase):
 
     def test_allocation_list(self):
         with self.app.test_client() as c:
-            self.list_allocations.return_value = []
+            self.list_allocations.return_value = ('etag', [])
             res = c.get('/v1/allocations', headers=self.headers)
             self._assert_response(res, 200, [], key='allocations')
+            self.assertEqual('"etag"', res.headers.get('ETag'))
+
+    def test_allocation_list_not_modified(self):
+        with self.app.test_client() as c:
+            self.list_allocations.return_value = ('etag', None)
+            headers = dict(self.headers, **{'If-None-Match': '"etag"'})
+            res = c.get('/v1/allocations', headers=headers)
+            self.assertEqual(304, res.status_code)
+            self.assertEqual(b'', res.data)
+            self.assertEqual('"etag"', res.headers.get('ETag'))
+            self.assertIn('etag',
+                          self.list_allocations.call_args[1]['etags'])
 
     def test_allocation_get(self):
         with self.app.test_client() as c:
@@ -247,9 +272,10 @@ class OsHostAPITestCase(tests.TestCase):
                'reservation_id': str(uuidutils.generate_uuid())})
     def test_allocation_list_with_query_params(self, query_params):
         with self.app.test_client() as c:
+            self.list_allocations.return_value = ('etag', [])
             res = c.get('/v1/allocations?{0}'.format(query_params),
                         headers=self.headers)
-            self._assert_response(res, 200, {}, key='allocations')
+            self._assert_response(res, 200, [], key='allocations')
 
     @ddt.data({'lease_id': str(uuidutils.generate_uuid()),
                'reservation_id': str(uuidutils.generate_uuid())})
@@ -83,6 +83,22 @@ class UtilsTestCase(tests.TestCase):
         self.response.assert_called_once_with(mimetype='application/json',
                                               status='lol', response=b'{}')
 
+    def test_render_stream(self):
+        self.request.status_code = 200
+        self.request.resp_type = self.utils.RT_JSON
+        self.utils.render_stream('hosts', iter([{'id': '1'}, {'id': '2'}]))
+        kwargs = self.response.call_args[1]
+        self.assertEqual(200, kwargs['status'])
+        self.assertEqual(b'{"hosts": [{"id": "1"}, {"id": "2"}]}',
+                         b''.join(kwargs['response']))
+
+    def test_render_stream_empty(self):
+        self.request.status_code = 200
+        self.request.resp_type = self.utils.RT_JSON
+        self.utils.render_stream('hosts', [])
+        kwargs = self.response.call_args[1]
+        self.assertEqual(b'{"hosts": []}', b''.join(kwargs['response']))
+
     def test_request_data_data(self):
         self.request.parsed_data = "data"
         self.assertEqual("data", self.utils.request_data())
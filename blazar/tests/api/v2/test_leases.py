@@ -109,6 +109,15 @@ class TestListLeases(api.APITest):
         response = self.get_json(self.path)
         self.assertEqual([fake_lease(id=id1), fake_lease(id=id2)], response)
 
+    def test_list_with_query(self):
+        list_leases = self.patch(self.rpcapi, 'list_leases')
+        list_leases.return_value = [self.fake_lease]
+        response = self.get_json(self.path + '?limit=2&status=ACTIVE'
+                                 '&sort_key=start_date')
+        self.assertEqual([self.fake_lease], response)
+        list_leases.assert_called_once_with(
+            query={'limit': 2, 'status': 'ACTIVE', 'sort_key': 'start_date'})
+
     def test_rpc_exception_list(self):
         def fake_list_leases(*args, **kwargs):
             raise Exception("Nah...")
@@ -15,16 +15,26 @@
 from oslo_upgradecheck.upgradecheck import Code
 
 from blazar.cmd import status
+from blazar.db.sqlalchemy import facade_wrapper
 from blazar import tests
 
 
-class TestUpgradeChecks(tests.TestCase):
+class TestUpgradeChecks(tests.DBTestCase):
 
     def setUp(self):
         super(TestUpgradeChecks, self).setUp()
         self.cmd = status.Checks()
 
-    def test__check_placeholder(self):
-        check_result = self.cmd._check_placeholder()
+    def test__check_database_indexes(self):
+        check_result = self.cmd._check_database_indexes()
         self.assertEqual(
             Code.SUCCESS, check_result.code)
+
+    def test__check_database_indexes_missing(self):
+        facade_wrapper.get_engine().execute(
+            'DROP INDEX ix_events_status_time')
+
+        check_result = self.cmd._check_database_indexes()
+        self.assertEqual(
+            Code.WARNING, check_result.code)
+        self.assertIn('events.ix_events_status_time', check_result.details)
@@ -181,3 +181,21 @@ class TestMigrations(migration.BaseWalkMigrationTestCase,
                               engine.execute,
                               computehosts_table.insert(),
                               data)
+
+    def _check_3a8e1c5b7d2f(self, engine, data):
+        self.assertIndexMembers(engine, 'events', 'ix_events_status_time',
+                                ['status', 'time'])
+        self.assertIndexMembers(engine, 'reservations',
+                                'ix_reservations_lease_id_deleted',
+                                ['lease_id', 'deleted'])
+        self.assertIndexMembers(
+            engine, 'computehost_allocations',
+            'ix_computehost_allocations_compute_host_id_deleted',
+            ['compute_host_id', 'deleted'])
+
+    def _check_5c2d9e7f4a1b(self, engine, data):
+        self.assertColumnExists(engine, 'events', 'worker_id')
+
+    def _check_8e4f0a2c6d3b(self, engine, data):
+        self.assertColumnsExists(engine, 'allocation_revisions',
+                                 ['resource_type', 'revision'])
@@ -0,0 +1,95 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+import multiprocessing
+import os
+
+import fixtures
+import sqlalchemy as sa
+
+from blazar.db.sqlalchemy import api as db_api
+from blazar.db.sqlalchemy import facade_wrapper
+from blazar import tests
+
+NOW = datetime.datetime(2030, 1, 1, 12, 0)
+WORKERS = 4
+EVENTS = 60
+
+
+def _claim_events(worker_id, path):
+    """Claim due events in a worker process until none are left."""
+    facade_wrapper._clear_engine()
+    claimed = []
+    while True:
+        try:
+            events = db_api.event_claim_due(NOW, 5, worker_id)
+        except sa.exc.OperationalError:
+            # NOTE: SQLite fails instead of waiting when two transactions
+            # try to write at the same time, the claim is just retried.
+            continue
+        claimed.extend(event.id for event in events)
+        if not events and not db_api.event_get_first_sorted_by_filters(
+                'time', 'asc', {'status': 'UNDONE'}):
+            break
+    with open(path, 'w') as f:
+        f.write('\n'.join(claimed))
+
+
+class EventClaimsTestCase(tests.DBTestCase):
+    """Claim events from several processes sharing a SQLite database."""
+
+    def setUp(self):
+        super(EventClaimsTestCase, self).setUp()
+        db_api.lease_create({'id': 'lease1',
+                             'name': 'lease1',
+                             'start_date': NOW,
+                             'end_date': NOW + datetime.timedelta(days=1),
+                             'status': 'ACTIVE',
+                             'reservations': [],
+                             'events': []})
+        for i in range(EVENTS):
+            db_api.event_create({
+                'id': str(i),
+                'lease_id': 'lease1',
+                'event_type': 'start_lease',
+                'time': NOW - datetime.timedelta(seconds=i),
+                'status': 'UNDONE'})
+
+    def test_no_event_claimed_twice(self):
+        # NOTE: processes are used instead of a pool, whose result handler
+        # thread deadlocks when eventlet has monkey patched the test runner.
+        context = multiprocessing.get_context('fork')
+        tmpdir = self.useFixture(fixtures.TempDir()).path
+        processes = {}
+        for i in range(WORKERS):
+            worker_id = 'worker%d' % i
+            process = context.Process(
+                target=_claim_events,
+                args=(worker_id, os.path.join(tmpdir, worker_id)))
+            process.start()
+            processes[worker_id] = process
+
+        claimed = []
+        for worker_id, process in processes.items():
+            process.join(60)
+            self.assertEqual(0, process.exitcode)
+            with open(os.path.join(tmpdir, worker_id)) as f:
+                event_ids = [line for line in f.read().split('\n') if line]
+            for event_id in event_ids:
+                self.assertEqual(worker_id,
+                                 db_api.event_get(event_id).worker_id)
+            claimed.extend(event_ids)
+
+        self.assertEqual(EVENTS, len(claimed))
+        self.assertEqual({str(i) for i in range(EVENTS)}, set(claimed))
@@ -0,0 +1,73 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from oslo_config import cfg
+
+from blazar.db.sqlalchemy import facade_wrapper
+from blazar import tests
+
+
+class ReplicaQueriesTestCase(tests.TestCase):
+
+    def setUp(self):
+        super(ReplicaQueriesTestCase, self).setUp()
+        facade_wrapper._clear_engine()
+        self.addCleanup(facade_wrapper._clear_engine)
+        self._override('connection', 'sqlite://')
+        self._override('slave_connection', 'sqlite://')
+        self._override('replica_queries', True)
+        self._override('replica_max_staleness', 30)
+        self.replica_lag = self.patch(facade_wrapper, '_replica_lag')
+
+    def _override(self, name, value):
+        cfg.CONF.set_override(name, value, group='database')
+        self.addCleanup(cfg.CONF.clear_override, name, group='database')
+
+    def test_replica_queries_disabled(self):
+        self._override('replica_queries', False)
+
+        self.assertFalse(facade_wrapper._replica_usable())
+        self.replica_lag.assert_not_called()
+
+    def test_no_replica(self):
+        self._override('slave_connection', None)
+
+        self.assertFalse(facade_wrapper._replica_usable())
+        self.replica_lag.assert_not_called()
+
+    def test_replica_fresh(self):
+        self.replica_lag.return_value = 10
+
+        self.assertTrue(facade_wrapper._replica_usable())
+
+    def test_replica_stale(self):
+        self.replica_lag.return_value = 60
+
+        self.assertFalse(facade_wrapper._replica_usable())
+
+    def test_replica_lag_unknown(self):
+        self.replica_lag.return_value = None
+
+        self.assertFalse(facade_wrapper._replica_usable())
+
+    def test_replica_lag_reused(self):
+        self.replica_lag.return_value = 10
+
+        self.assertTrue(facade_wrapper._replica_usable())
+        self.replica_lag.return_value = 60
+        self.assertTrue(facade_wrapper._replica_usable())
+        self.replica_lag.assert_called_once()
+
+        checked_at, usable = facade_wrapper._replica_check
+        facade_wrapper._replica_check = (
+            checked_at - facade_wrapper.REPLICA_CHECK_INTERVAL, usable)
+        self.assertFalse(facade_wrapper._replica_usable())
@@ -212,8 +212,18 @@ class SQLAlchemyDBApiTestCase(tests.DBTestCase):
 
     def test_model_query(self):
         lease = db_api.lease_create(_get_fake_phys_lease_values())
-        query = db_api.model_query(models.Lease)
-        self.assertEqual([lease.to_dict()], [l.to_dict() for l in query.all()])
+        with db_api.reader() as session:
+            query = db_api.model_query(models.Lease, session)
+            self.assertEqual([lease.to_dict()],
+                             [l.to_dict() for l in query.all()])
+
+    def test_reader_in_writer(self):
+        lease_values = _get_fake_phys_lease_values()
+        with db_api.writer():
+            db_api.lease_create(lease_values)
+            # Readers within a writer see its uncommitted changes
+            self.assertEqual(lease_values['id'],
+                             db_api.lease_get(lease_values['id'])['id'])
 
     def test_create_phys_lease(self):
         """Check physical lease create
@@ -282,6 +292,32 @@ class SQLAlchemyDBApiTestCase(tests.DBTestCase):
                          _get_fake_phys_lease_values()['name'])
         self.assertEqual(1, len(db_api.event_get_all()))
 
+    def test_transaction(self):
+        lease_values = _get_fake_phys_lease_values()
+        with db_api.transaction():
+            db_api.lease_create(lease_values)
+            db_api.lease_update(lease_values['id'], {'name': 'renamed'})
+            # Nested transactions join the outer one
+            with db_api.transaction():
+                db_api.event_create(
+                    _get_fake_event_values(lease_id=lease_values['id']))
+
+        self.assertEqual('renamed',
+                         db_api.lease_get(lease_values['id'])['name'])
+        self.assertEqual(1, len(db_api.event_get_all()))
+
+    def test_transaction_rollback(self):
+        def create_lease():
+            with db_api.transaction():
+                db_api.lease_create(_get_fake_phys_lease_values())
+                db_api.event_create(_get_fake_event_values())
+                raise RuntimeError()
+
+        self.assertRaises(RuntimeError, create_lease)
+        self.assertEqual([], db_api.lease_get_all())
+        self.assertEqual([], db_api.reservation_get_all())
+        self.assertEqual([], db_api.event_get_all())
+
     def test_delete_wrong_lease(self):
         """Delete a lease that doesn't exist and check that raises an error."""
         self.assertRaises(db_exceptions.BlazarDBNotFound,
@@ -303,6 +339,34 @@ class SQLAlchemyDBApiTestCase(tests.DBTestCase):
         self.assertEqual(res['reservations'][0]['max'],
                          lease['reservations'][0]['max'])
 
+    def test_get_lease_with_profiles(self):
+        """Check the relationships loaded by each lease loading profile."""
+        lease = _get_fake_phys_lease_values()
+        lease['events'].append(_get_fake_event_values(lease_id=lease['id']))
+        _create_physical_lease(values=lease)
+
+        res = db_api.lease_get(lease['id'], profile='summary').to_dict()
+        self.assertEqual(lease['name'], res['name'])
+        self.assertNotIn('reservations', res)
+        self.assertNotIn('events', res)
+
+        res = db_api.lease_get(lease['id'],
+                               profile='with_reservations').to_dict()
+        self.assertEqual(lease['reservations'][0]['hypervisor_properties'],
+                         res['reservations'][0]['hypervisor_properties'])
+        self.assertNotIn('events', res)
+
+        result = db_api.lease_get(lease['id'], profile='full')
+        res = result.to_dict()
+        self.assertEqual(1, len(res['reservations']))
+        self.assertEqual(1, len(res['events']))
+        self.assertEqual(
+            1, len(result.reservations[0].computehost_allocations))
+
+    def test_get_lease_with_invalid_profile(self):
+        self.assertRaises(db_exceptions.BlazarDBInvalidLoadingProfile,
+                          db_api.lease_get, 'fake_id', profile='invalid')
+
     def test_delete_correct_lease(self):
         """Delete a lease and check that deletion has been cascaded to FKs."""
         lease = _get_fake_phys_lease_values()
@@ -331,6 +395,59 @@ class SQLAlchemyDBApiTestCase(tests.DBTestCase):
             values=_get_fake_phys_lease_values(id='2', name='fake2'))
         self.assertEqual(['1', '2'], db_api.lease_list())
 
+    def test_lease_list_with_profile(self):
+        _create_physical_lease(random=True)
+        _create_physical_lease(random=True)
+        leases = [lease.to_dict()
+                  for lease in db_api.lease_list(profile='summary')]
+        self.assertEqual(2, len(leases))
+        self.assertNotIn('reservations', leases[0])
+
+    def test_lease_list_with_filters(self):
+        for i, (start, end) in enumerate([('2030-01-01 00:00',
+                                           '2030-01-02 00:00'),
+                                          ('2030-01-03 00:00',
+                                           '2030-01-04 00:00')]):
+            _create_physical_lease(values=_get_fake_phys_lease_values(
+                id=str(i), name='lease%d' % i,
+                start_date=_get_datetime(start),
+                end_date=_get_datetime(end)))
+
+        leases = db_api.lease_list(filters={'name': 'lease1'})
+        self.assertEqual(['1'], [lease.id for lease in leases])
+        leases = db_api.lease_list(filters={
+            'start_date': _get_datetime('2030-01-01 12:00'),
+            'end_date': _get_datetime('2030-01-03 00:00')})
+        self.assertEqual(['0'], [lease.id for lease in leases])
+        leases = db_api.lease_list(
+            filters={'resource_type': host_plugin.RESOURCE_TYPE})
+        self.assertEqual(2, len(leases))
+        leases = db_api.lease_list(
+            filters={'resource_type': 'virtual:instance'})
+        self.assertEqual([], leases)
+
+    def test_lease_list_paginated(self):
+        for i in range(5):
+            _create_physical_lease(values=_get_fake_phys_lease_values(
+                id=str(i), name='lease%d' % i,
+                start_date=_get_datetime('2030-01-0%d 00:00' % (i + 1)),
+                end_date=_get_datetime('2030-01-0%d 00:00' % (i + 2))))
+
+        leases = db_api.lease_list(sort_key='start_date', sort_dir='desc',
+                                   limit=2)
+        self.assertEqual(['4', '3'], [lease.id for lease in leases])
+        leases = db_api.lease_list(sort_key='start_date', sort_dir='desc',
+                                   limit=2, marker='3')
+        self.assertEqual(['2', '1'], [lease.id for lease in leases])
+        leases = db_api.lease_list(sort_key='start_date', sort_dir='desc',
+                                   limit=2, marker='1')
+        self.assertEqual(['0'], [lease.id for lease in leases])
+
+        self.assertRaises(db_exceptions.BlazarDBNotFound,
+                          db_api.lease_list, marker='unknown')
+        self.assertRaises(db_exceptions.BlazarDBInvalidFilter,
+                          db_api.lease_list, sort_key='name')
+
     def test_lease_update(self):
         """Update both start_date and name and check lease has been updated."""
         result = _create_physical_lease()
@@ -592,6 +709,15 @@ class SQLAlchemyDBApiTestCase(tests.DBTestCase):
         db_api.host_update(1, {'status': 'updated'})
         self.assertEqual('updated', db_api.host_get(1)['status'])
 
+    def test_bulk_update_hosts(self):
+        db_api.host_create(_get_fake_host_values(id=1))
+        db_api.host_create(_get_fake_host_values(id=2))
+        db_api.host_create(_get_fake_host_values(id=3))
+        db_api.host_bulk_update([1, 2], {'reservable': False})
+        self.assertFalse(db_api.host_get(1)['reservable'])
+        self.assertFalse(db_api.host_get(2)['reservable'])
+        self.assertTrue(db_api.host_get(3)['reservable'])
+
     def test_delete_host(self):
         db_api.host_create(_get_fake_host_values(id=1))
         db_api.host_destroy(1)
@@ -769,6 +895,46 @@ class SQLAlchemyDBApiTestCase(tests.DBTestCase):
                           db_api.host_allocation_destroy,
                           host_allocation_id)
 
+    def test_host_allocation_bulk_create(self):
+        allocations = db_api.host_allocation_bulk_create(
+            [_get_fake_host_allocation_values(id='1'),
+             _get_fake_host_allocation_values(compute_host_id='2')])
+
+        self.assertEqual('1', allocations[0]['id'])
+        self.assertIsNotNone(allocations[1]['id'])
+        self.assertEqual(2, len(db_api.host_allocation_get_all()))
+        self.assertEqual('2', db_api.host_allocation_get(
+            allocations[1]['id']).compute_host_id)
+
+    def test_host_allocation_bulk_create_for_duplicated_hosts(self):
+        db_api.host_allocation_create(
+            _get_fake_host_allocation_values(id='1'))
+
+        self.assertRaises(db_exceptions.BlazarDBDuplicateEntry,
+                          db_api.host_allocation_bulk_create,
+                          [_get_fake_host_allocation_values(id='2'),
+                           _get_fake_host_allocation_values(id='1')])
+        self.assertIsNone(db_api.host_allocation_get('2'))
+
+    def test_host_allocation_bulk_destroy(self):
+        for allocation_id in ('1', '2', '3'):
+            db_api.host_allocation_create(
+                _get_fake_host_allocation_values(id=allocation_id))
+
+        db_api.host_allocation_bulk_destroy(['1', '2'])
+
+        self.assertEqual(['3'], [a.id for a in
+                                 db_api.host_allocation_get_all()])
+
+    def test_host_allocation_bulk_destroy_not_found(self):
+        db_api.host_allocation_create(
+            _get_fake_host_allocation_values(id='1'))
+
+        self.assertRaises(db_exceptions.BlazarDBNotFound,
+                          db_api.host_allocation_bulk_destroy,
+                          ['1', 'non-exists'])
+        self.assertIsNotNone(db_api.host_allocation_get('1'))
+
     def test_host_allocation_get_all_by_values(self):
         db_api.host_allocation_create(_get_fake_host_allocation_values(
             compute_host_id="1", reservation_id="1"))
@@ -810,6 +976,56 @@ class SQLAlchemyDBApiTestCase(tests.DBTestCase):
 
         self.assertEqual('changed', test_event.status)
 
+    def test_event_claim_due(self):
+        for lease_id, lease_status in (('lease1', 'ACTIVE'),
+                                       ('lease2', 'STARTING')):
+            values = _get_fake_phys_lease_values(id=lease_id, name=lease_id)
+            values['status'] = lease_status
+            _create_physical_lease(values=values)
+        for event_id, lease_id, time, event_status in (
+                ('1', 'lease1', '2030-01-01 00:00', 'UNDONE'),
+                ('2', 'lease1', '2030-01-02 00:00', 'UNDONE'),
+                ('3', 'lease1', '2030-01-01 00:00', 'DONE'),
+                ('4', 'lease1', '2030-01-05 00:00', 'UNDONE'),
+                ('5', 'lease2', '2030-01-01 00:00', 'UNDONE')):
+            db_api.event_create(_get_fake_event_values(
+                id=event_id, lease_id=lease_id, time=_get_datetime(time),
+                status=event_status))
+        now = _get_datetime('2030-01-03 00:00')
+
+        events = db_api.event_claim_due(now, 1, 'worker1')
+        self.assertEqual(['1'], [event.id for event in events])
+        self.assertEqual('IN_PROGRESS', events[0].status)
+        self.assertEqual('worker1', events[0].worker_id)
+
+        events = db_api.event_claim_due(now, 10, 'worker2')
+        self.assertEqual(['2'], [event.id for event in events])
+        self.assertEqual([], db_api.event_claim_due(now, 10, 'worker1'))
+        self.assertEqual('UNDONE', db_api.event_get('5').status)
+
+    def test_event_renew_and_release_claims(self):
+        values = _get_fake_phys_lease_values(id='lease1', name='lease1')
+        values['status'] = 'ACTIVE'
+        _create_physical_lease(values=values)
+        for event_id in ('1', '2'):
+            db_api.event_create(_get_fake_event_values(
+                id=event_id, lease_id='lease1',
+                time=_get_datetime('2030-01-01 00:00'), status='UNDONE'))
+        db_api.event_claim_due(_get_datetime('2030-01-01 00:00'), 1,
+                               'worker1')
+        db_api.event_claim_due(_get_datetime('2030-01-01 00:00'), 1,
+                               'worker2')
+
+        self.assertEqual(1, db_api.event_renew_claims(
+            'worker1', _get_datetime('2030-01-01 00:10')))
+        self.assertEqual(1, db_api.event_release_expired_claims(
+            _get_datetime('2030-01-01 00:05')))
+
+        self.assertEqual('IN_PROGRESS', db_api.event_get('1').status)
+        event = db_api.event_get('2')
+        self.assertEqual('UNDONE', event.status)
+        self.assertIsNone(event.worker_id)
+
     def test_event_destroy(self):
         self.assertFalse(db_api.event_get('1'))
 
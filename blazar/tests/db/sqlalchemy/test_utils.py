@@ -19,9 +19,11 @@ import datetime
 from oslo_context import context
 from oslo_utils import uuidutils
 
+from blazar.db import exceptions as db_exceptions
 from blazar.db.sqlalchemy import api as db_api
 from blazar.db.sqlalchemy import utils as db_utils
 from blazar.manager import exceptions as mgr_exceptions
+from blazar.plugins.instances import capacity
 from blazar import tests
 
 
@@ -239,6 +241,51 @@ class SQLAlchemyDBUtilsTestCase(tests.DBTestCase):
         self.assertEqual('2030-01-01 14:00',
                          reserved_periods[0][1].strftime('%Y-%m-%d %H:%M'))
 
+    def _setup_hosts(self, host_ids):
+        for host_id in host_ids:
+            db_api.host_create({'id': host_id,
+                                'vcpus': 1,
+                                'cpu_info': 'cpu_info',
+                                'hypervisor_type': 'type',
+                                'hypervisor_version': 1,
+                                'memory_mb': 1,
+                                'local_gb': 1,
+                                'availability_zone': 'zone',
+                                'trust_id': 'trust'})
+
+    def test_get_free_resource_ids(self):
+        self._setup_hosts(['r1', 'r2', 'r3'])
+        self._setup_leases()
+
+        free_ids = db_utils.get_free_resource_ids(
+            'host', ['r1', 'r2', 'r3'], _get_datetime('2030-01-01 10:00'),
+            _get_datetime('2030-01-01 11:30'))
+        self.assertEqual({'r3'}, set(free_ids))
+
+        free_ids = db_utils.get_free_resource_ids(
+            'host', ['r1', 'r2'], _get_datetime('2030-01-01 10:30'),
+            _get_datetime('2030-01-01 11:00'))
+        self.assertEqual({'r1', 'r2'}, set(free_ids))
+
+        # The allocation of the deleted lease is ignored
+        free_ids = db_utils.get_free_resource_ids(
+            'host', ['r1'], _get_datetime('2030-01-01 14:30'),
+            _get_datetime('2030-01-01 15:00'))
+        self.assertEqual(['r1'], free_ids)
+
+    def test_get_free_resource_ids_with_invalid(self):
+        self.assertRaises(mgr_exceptions.UnsupportedResourceType,
+                          db_utils.get_free_resource_ids, 'invalid', ['r1'],
+                          _get_datetime('2030-01-01 10:00'),
+                          _get_datetime('2030-01-01 11:00'))
+
+    def test_get_allocated_resource_ids(self):
+        self._setup_leases()
+
+        allocated_ids = db_utils.get_allocated_resource_ids(
+            'host', ['r1', 'r2', 'r3'])
+        self.assertEqual({'r1', 'r2'}, set(allocated_ids))
+
     def test_get_reservations_by_host_id(self):
         self._setup_leases()
 
@@ -297,6 +344,51 @@ class SQLAlchemyDBUtilsTestCase(tests.DBTestCase):
         self.check_reservation([], ['r4'],
                                '2030-01-01 07:00', '2030-01-01 15:00')
 
+    def test_get_reservation_usages_by_host_ids(self):
+        self._setup_leases()
+
+        ret = db_utils.get_reservation_usages_by_host_ids(
+            ['r1', 'r2'], '2030-01-01 10:00', '2030-01-01 13:30')
+
+        self.assertEqual(
+            [('r1', 'lease1'), ('r1', 'lease3'), ('r2', 'lease2')],
+            sorted((r['host_id'], r['lease_id']) for r in ret))
+        lease1 = [r for r in ret if r['lease_id'] == 'lease1'][0]
+        self.assertEqual('physical:host', lease1['resource_type'])
+        self.assertEqual(_get_datetime('2030-01-01 09:00'),
+                         lease1['start_date'])
+        self.assertEqual(_get_datetime('2030-01-01 10:30'),
+                         lease1['end_date'])
+        self.assertIsNone(lease1['vcpus'])
+
+    def test_get_reservation_usages_by_host_ids_multiple_slots(self):
+        values = _get_fake_phys_lease_values(
+            id='lease_inst',
+            name='fake_inst_lease',
+            start_date=_get_datetime('2030-01-01 09:00'),
+            end_date=_get_datetime('2030-01-01 10:30'))
+        values['reservations'] = [
+            _get_fake_inst_reservation_values(lease_id='lease_inst')]
+        db_api.lease_create(values)
+        reservation = db_api.reservation_get_all_by_lease_id('lease_inst')[0]
+        db_api.instance_reservation_create({
+            'reservation_id': reservation['id'], 'vcpus': 2,
+            'memory_mb': 1024, 'disk_gb': 10, 'amount': 2,
+            'affinity': True})
+        # Both slots of the reservation are allocated to the same host.
+        for _ in range(2):
+            db_api.host_allocation_create({
+                'id': _get_fake_random_uuid(), 'compute_host_id': 'r5',
+                'reservation_id': reservation['id']})
+
+        ret = db_utils.get_reservation_usages_by_host_ids(
+            ['r5'], '2030-01-01 10:00', '2030-01-01 13:30')
+
+        self.assertEqual(
+            [('r5', reservation['id'], 2)] * 2,
+            [(r['host_id'], r['id'], r['vcpus']) for r in ret])
+        self.assertEqual((4, 2048, 20), capacity.peak_usages(ret))
+
     def test_get_reservation_allocations_by_host_ids(self):
         self._setup_leases()
 
@@ -340,6 +432,56 @@ class SQLAlchemyDBUtilsTestCase(tests.DBTestCase):
         self.assertListEqual(
             expected, _filter_dicts_for_keys(['id', 'host_ids'], ret))
 
+    def test_get_reservation_allocations_by_host_ids_with_marker(self):
+        self._setup_leases()
+        reservation1 = db_api.reservation_get_all_by_lease_id('lease1')[0]
+
+        # query allocations after the one of lease1
+        expected = _create_allocation_dicts(['lease2', 'lease3'])
+        ret = db_utils.get_reservation_allocations_by_host_ids(
+            ['r1', 'r2'], '2030-01-01 08:00', '2030-01-01 15:00',
+            marker=reservation1['id'])
+
+        self.assertListEqual(
+            expected, _filter_dicts_for_keys(['id', 'host_ids'], ret))
+
+    def test_get_reservation_allocations_by_host_ids_paged(self):
+        self._setup_leases()
+        reservation1 = db_api.reservation_get_all_by_lease_id('lease1')[0]
+        reservation3 = db_api.reservation_get_all_by_lease_id('lease3')[0]
+
+        # page through the allocations of r1, skipping lease2 on r2
+        pages = []
+        marker = None
+        while True:
+            ret = db_utils.get_reservation_allocations_by_host_ids(
+                ['r1'], '2030-01-01 08:00', '2030-01-01 15:00',
+                marker=marker, limit=1)
+            if not ret:
+                break
+            pages.append(_filter_dicts_for_keys(['id', 'host_ids'], ret))
+            marker = ret[-1]['id']
+
+        self.assertListEqual(
+            [[{'id': reservation1['id'], 'host_ids': ['r1']}],
+             [{'id': reservation3['id'], 'host_ids': ['r1']}]], pages)
+
+        ret = db_utils.get_reservation_allocations_by_host_ids(
+            ['r2'], '2030-01-01 08:00', '2030-01-01 15:00', limit=1)
+
+        self.assertListEqual(
+            _create_allocation_dicts(['lease2']),
+            _filter_dicts_for_keys(['id', 'host_ids'], ret))
+
+    def test_get_reservation_allocations_by_host_ids_with_invalid_marker(
+            self):
+        self._setup_leases()
+
+        self.assertRaises(db_exceptions.BlazarDBNotFound,
+                          db_utils.get_reservation_allocations_by_host_ids,
+                          ['r1', 'r2'], '2030-01-01 08:00',
+                          '2030-01-01 15:00', marker='invalid')
+
     def test_get_plugin_reservation_with_instance(self):
         patch_inst_reservation_get = self.patch(db_api,
                                                 'instance_reservation_get')
@@ -353,3 +495,56 @@ class SQLAlchemyDBUtilsTestCase(tests.DBTestCase):
     def test_get_plugin_reservation_with_invalid(self):
         self.assertRaises(mgr_exceptions.UnsupportedResourceType,
                           db_utils.get_plugin_reservation, 'invalid', 'id1')
+
+    def test_get_allocation_revision(self):
+        self.assertEqual(0, db_utils.get_allocation_revision('host'))
+
+        self._setup_leases()
+        revision = db_utils.get_allocation_revision('host')
+        self.assertGreater(revision, 0)
+
+        db_api.event_create({'lease_id': 'lease1',
+                             'event_type': 'start_lease',
+                             'time': _get_datetime('2030-01-01 09:00'),
+                             'status': 'UNDONE'})
+        self.assertEqual(revision, db_utils.get_allocation_revision('host'))
+        self.assertEqual(0, db_utils.get_allocation_revision('network'))
+
+    def test_get_changed_allocation_resource_ids(self):
+        self._setup_hosts(['r1', 'r2', 'r3'])
+        self._setup_leases()
+
+        changed_ids = db_utils.get_changed_allocation_resource_ids(
+            'host', ['r1', 'r2', 'r3'], datetime.datetime(2000, 1, 1))
+        self.assertEqual({'r1', 'r2', 'r3'}, set(changed_ids))
+
+        changed_ids = db_utils.get_changed_allocation_resource_ids(
+            'host', ['r1', 'r2', 'r3'], datetime.datetime(2100, 1, 1))
+        self.assertEqual([], changed_ids)
+
+    def test_get_most_recent_reservation_info_by_host_ids(self):
+        self._setup_hosts(['r1', 'r2', 'r3'])
+        for lease_id, start, host_id in (('lease1', '2020-01-01 09:00', 'r1'),
+                                         ('lease2', '2020-01-02 09:00', 'r1'),
+                                         ('lease3', '2020-01-01 09:00', 'r2')):
+            _create_physical_lease(values=_get_fake_phys_lease_values(
+                id=lease_id, name=lease_id, start_date=_get_datetime(start),
+                end_date=_get_datetime('2020-01-03 00:00'),
+                resource_id=host_id))
+            for reservation in db_api.reservation_get_all_by_lease_id(
+                    lease_id):
+                db_api.host_reservation_create(
+                    {'reservation_id': reservation['id'], 'aggregate_id': 1})
+
+        reservations = db_utils.get_most_recent_reservation_info_by_host_ids(
+            ['r1', 'r2', 'r3'])
+
+        self.assertEqual({'r1', 'r2'}, set(reservations))
+        self.assertEqual(_get_datetime('2020-01-02 09:00'),
+                         reservations['r1']['start_date'])
+        self.assertEqual('active', reservations['r1']['reservation_status'])
+        self.assertEqual(reservations['r1'],
+                         db_utils.get_most_recent_reservation_info_by_host_id(
+                             'r1'))
+        self.assertEqual(
+            {}, db_utils.get_most_recent_reservation_info_by_host_ids([]))
@@ -0,0 +1,174 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+
+from oslo_context import context
+
+from blazar.db import api as db_api
+from blazar.db import availability
+from blazar import tests
+
+
+def _get_datetime(value):
+    return datetime.datetime.strptime(value, '%Y-%m-%d %H:%M')
+
+
+class IntervalSetTestCase(tests.TestCase):
+
+    def setUp(self):
+        super(IntervalSetTestCase, self).setUp()
+        self.intervals = availability.IntervalSet()
+        self.intervals.add('a1', _get_datetime('2030-01-01 09:00'),
+                           _get_datetime('2030-01-01 18:00'))
+        self.intervals.add('a2', _get_datetime('2030-01-01 10:00'),
+                           _get_datetime('2030-01-01 11:00'))
+        self.intervals.add('a3', _get_datetime('2030-01-02 09:00'),
+                           _get_datetime('2030-01-02 10:00'))
+
+    def test_overlaps(self):
+        self.assertTrue(self.intervals.overlaps(
+            _get_datetime('2030-01-01 12:00'),
+            _get_datetime('2030-01-01 13:00')))
+        self.assertTrue(self.intervals.overlaps(
+            _get_datetime('2029-12-31 00:00'),
+            _get_datetime('2030-01-03 00:00')))
+
+    def test_does_not_overlap(self):
+        self.assertFalse(self.intervals.overlaps(
+            _get_datetime('2030-01-01 18:00'),
+            _get_datetime('2030-01-02 09:00')))
+        self.assertFalse(self.intervals.overlaps(
+            _get_datetime('2029-12-31 00:00'),
+            _get_datetime('2030-01-01 09:00')))
+
+    def test_remove(self):
+        self.intervals.remove('a1', _get_datetime('2030-01-01 09:00'),
+                              _get_datetime('2030-01-01 18:00'))
+
+        self.assertEqual(2, len(self.intervals))
+        self.assertFalse(self.intervals.overlaps(
+            _get_datetime('2030-01-01 12:00'),
+            _get_datetime('2030-01-01 13:00')))
+        self.assertTrue(self.intervals.overlaps(
+            _get_datetime('2030-01-01 10:30'),
+            _get_datetime('2030-01-01 13:00')))
+
+
+class AvailabilityIndexTestCase(tests.DBTestCase):
+
+    def setUp(self):
+        super(AvailabilityIndexTestCase, self).setUp()
+        self.set_context(context.get_admin_context())
+        self.addCleanup(availability.clear_index)
+        self._create_lease('lease1', 'host1', '2030-01-01 09:00',
+                           '2030-01-01 10:00')
+        self._create_lease('lease2', 'host1', '2030-01-01 12:00',
+                           '2030-01-01 13:00')
+
+    def _create_lease(self, lease_id, host_id, start_date, end_date):
+        db_api.lease_create({
+            'id': lease_id,
+            'name': lease_id,
+            'start_date': _get_datetime(start_date),
+            'end_date': _get_datetime(end_date),
+            'project_id': 'fake_project',
+            'reservations': [{'id': lease_id + '-r',
+                              'resource_type': 'physical:host',
+                              'status': 'pending'}],
+            'events': [],
+        })
+        db_api.host_allocation_create({'id': lease_id + '-a',
+                                       'compute_host_id': host_id,
+                                       'reservation_id': lease_id + '-r'})
+
+    def _is_free(self, index, host_id, start_date, end_date):
+        return index.is_free('host', host_id, _get_datetime(start_date),
+                             _get_datetime(end_date))
+
+    def test_build_index(self):
+        index = availability.build_index()
+
+        self.assertEqual(2, len(index))
+        self.assertTrue(index.has_allocations('host', 'host1'))
+        self.assertFalse(index.has_allocations('host', 'host2'))
+        self.assertFalse(self._is_free(index, 'host1', '2030-01-01 09:30',
+                                       '2030-01-01 11:00'))
+        self.assertTrue(self._is_free(index, 'host1', '2030-01-01 10:00',
+                                      '2030-01-01 12:00'))
+
+    def test_allocation_create_and_destroy(self):
+        index = availability.build_index()
+
+        self._create_lease('lease3', 'host2', '2030-01-01 10:00',
+                           '2030-01-01 12:00')
+        self.assertFalse(self._is_free(index, 'host2', '2030-01-01 11:00',
+                                       '2030-01-01 11:30'))
+
+        db_api.host_allocation_destroy('lease3-a')
+        self.assertFalse(index.has_allocations('host', 'host2'))
+
+    def test_allocation_bulk_create_and_destroy(self):
+        index = availability.build_index()
+        self._create_lease('lease3', 'host2', '2030-01-01 10:00',
+                           '2030-01-01 12:00')
+        db_api.host_allocation_destroy('lease3-a')
+
+        allocations = db_api.host_allocation_bulk_create(
+            [{'compute_host_id': 'host2', 'reservation_id': 'lease3-r'},
+             {'compute_host_id': 'host3', 'reservation_id': 'lease3-r'}])
+        self.assertFalse(self._is_free(index, 'host2', '2030-01-01 11:00',
+                                       '2030-01-01 11:30'))
+        self.assertFalse(self._is_free(index, 'host3', '2030-01-01 11:00',
+                                       '2030-01-01 11:30'))
+
+        db_api.host_allocation_bulk_destroy([a['id'] for a in allocations])
+        self.assertFalse(index.has_allocations('host', 'host2'))
+        self.assertFalse(index.has_allocations('host', 'host3'))
+
+    def test_transaction_rollback(self):
+        index = availability.build_index()
+
+        def create_and_destroy():
+            with db_api.transaction():
+                self._create_lease('lease3', 'host2', '2030-01-01 10:00',
+                                   '2030-01-01 12:00')
+                db_api.lease_destroy('lease2')
+                self.assertTrue(index.has_allocations('host', 'host2'))
+                raise RuntimeError()
+
+        self.assertRaises(RuntimeError, create_and_destroy)
+
+        self.assertEqual(2, len(index))
+        self.assertFalse(index.has_allocations('host', 'host2'))
+        self.assertFalse(self._is_free(index, 'host1', '2030-01-01 12:30',
+                                       '2030-01-01 14:00'))
+        self.assertFalse(index.tracks_changes())
+
+    def test_lease_update(self):
+        index = availability.build_index()
+
+        db_api.lease_update('lease1',
+                            {'end_date': _get_datetime('2030-01-01 11:00')})
+
+        self.assertFalse(self._is_free(index, 'host1', '2030-01-01 10:30',
+                                       '2030-01-01 12:00'))
+
+    def test_lease_destroy(self):
+        index = availability.build_index()
+
+        db_api.lease_destroy('lease2')
+
+        self.assertEqual(1, len(index))
+        self.assertTrue(self._is_free(index, 'host1', '2030-01-01 10:00',
+                                      '2030-01-02 00:00'))
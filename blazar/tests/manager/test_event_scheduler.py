@@ -0,0 +1,105 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import datetime
+from unittest import mock
+
+from blazar.db import api as db_api
+from blazar.manager import event_scheduler
+from blazar import tests
+
+
+class EventSchedulerTestCase(tests.TestCase):
+
+    def setUp(self):
+        super(EventSchedulerTestCase, self).setUp()
+        self.callback = mock.Mock()
+        self.scheduler = event_scheduler.EventScheduler(self.callback)
+        self.now = datetime.datetime(2030, 1, 1, 12, 0)
+        utcnow = self.patch(event_scheduler.datetime, 'datetime')
+        utcnow.utcnow.return_value = self.now
+        self.event_get_all = self.patch(db_api,
+                                        'event_get_all_sorted_by_filters')
+        self.event_get_all.return_value = [
+            {'id': '1', 'time': self.now - datetime.timedelta(seconds=5)},
+            {'id': '2', 'time': self.now + datetime.timedelta(seconds=30)},
+        ]
+        self.event_get_first = self.patch(db_api,
+                                          'event_get_first_sorted_by_filters')
+        self.event_get_first.return_value = None
+        self.event_release = self.patch(db_api,
+                                        'event_release_expired_claims')
+        self.event_release.return_value = 0
+
+    def test_run_once_processes_due_events(self):
+        timeout = self.scheduler.run_once()
+
+        self.callback.assert_called_once_with()
+        self.assertEqual(30, timeout)
+        self.assertEqual(1, self.scheduler.lag_stats['count'])
+        self.assertEqual(5, self.scheduler.lag_stats['max'])
+
+    def test_run_once_without_due_events(self):
+        self.event_get_all.return_value = [
+            {'id': '2', 'time': self.now + datetime.timedelta(seconds=30)}]
+
+        timeout = self.scheduler.run_once()
+
+        self.callback.assert_not_called()
+        self.assertEqual(30, timeout)
+
+    def test_run_once_waits_for_reconciliation(self):
+        self.event_get_all.return_value = []
+
+        timeout = self.scheduler.run_once()
+
+        self.callback.assert_not_called()
+        self.assertEqual(60, timeout)
+        self.scheduler.run_once()
+        self.event_get_all.assert_called_once()
+
+    def test_schedule_earlier_event(self):
+        self.scheduler.reconcile()
+        self.scheduler._wakeup.clear()
+
+        self.scheduler.schedule('3', self.now + datetime.timedelta(hours=1))
+        self.assertFalse(self.scheduler._wakeup.is_set())
+        self.scheduler.schedule('2', self.now + datetime.timedelta(hours=2))
+        self.assertFalse(self.scheduler._wakeup.is_set())
+        self.scheduler.schedule('3', self.now - datetime.timedelta(hours=1))
+        self.assertTrue(self.scheduler._wakeup.is_set())
+
+    def test_schedule_moves_event(self):
+        self.scheduler.reconcile()
+
+        self.scheduler.schedule('1', self.now + datetime.timedelta(hours=1))
+
+        self.assertEqual(self.now + datetime.timedelta(seconds=30),
+                         self.scheduler.next_due_time())
+        self.scheduler.run_once()
+        self.callback.assert_not_called()
+
+    def test_run_once_schedules_retry(self):
+        self.event_get_first.return_value = {
+            'id': '1', 'time': self.now - datetime.timedelta(seconds=5)}
+
+        timeout = self.scheduler.run_once()
+
+        self.callback.assert_called_once_with()
+        self.assertEqual(10, timeout)
+
+    def test_reconcile_releases_expired_claims(self):
+        self.scheduler.reconcile()
+
+        self.event_release.assert_called_once_with(
+            self.now - datetime.timedelta(seconds=300))
@@ -0,0 +1,118 @@
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or
+# implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from concurrent.futures import process
+from unittest import mock
+
+import eventlet
+from oslo_config import cfg
+
+from blazar.db import api as db_api
+from blazar.manager import executor
+from blazar import tests
+
+
+class EventExecutorTestCase(tests.TestCase):
+
+    def setUp(self):
+        super(EventExecutorTestCase, self).setUp()
+        self.reservation_get_all = self.patch(
+            db_api, 'reservation_get_all_by_lease_id')
+        self.reservation_get_all.return_value = [
+            {'resource_type': 'physical:host'}]
+        self.event = {'id': '111', 'lease_id': 'lease1'}
+
+    def test_submit(self):
+        calls = []
+
+        executor.EventExecutor().submit(calls.append, self.event).wait()
+
+        self.assertEqual([self.event], calls)
+        self.reservation_get_all.assert_called_once_with('lease1')
+
+    def test_resource_type_limit(self):
+        cfg.CONF.register_opts(executor.plugin_opts, group='physical:host')
+        cfg.CONF.set_override('max_concurrent_actions', 1,
+                              group='physical:host')
+        self.addCleanup(cfg.CONF.clear_override, 'max_concurrent_actions',
+                        group='physical:host')
+        running = []
+        concurrency = []
+
+        def action(event):
+            running.append(event)
+            concurrency.append(len(running))
+            eventlet.sleep(0)
+            running.remove(event)
+
+        event_executor = executor.EventExecutor()
+        threads = [event_executor.submit(action, {'id': str(i),
+                                                  'lease_id': 'lease1'})
+                   for i in range(3)]
+        for thread in threads:
+            thread.wait()
+
+        self.assertEqual([1, 1, 1], concurrency)
+
+    def _use_process_executor(self):
+        cfg.CONF.set_override('event_executor', 'process', group='manager')
+        self.addCleanup(cfg.CONF.clear_override, 'event_executor',
+                        group='manager')
+        return self.patch(executor.futures, 'ProcessPoolExecutor')
+
+    def test_process_executor(self):
+        pool_class = self._use_process_executor()
+        pool = pool_class.return_value
+        fn = mock.Mock()
+        event_executor = executor.EventExecutor()
+
+        event_executor.submit(fn, self.event).wait()
+        event_executor.submit(fn, self.event).wait()
+
+        fn.assert_not_called()
+        pool_class.assert_called_once_with(
+            max_workers=None, mp_context=mock.ANY,
+            initializer=executor._init_worker, initargs=(mock.ANY,))
+        mp_context = pool_class.call_args[1]['mp_context']
+        self.assertEqual('spawn', mp_context.get_start_method())
+        pool.submit.assert_called_with(executor._exec_in_worker, self.event)
+        self.assertEqual(2, pool.submit.call_count)
+
+        event_executor.shutdown()
+
+        pool.shutdown.assert_called_once_with()
+
+    def test_process_executor_broken_pool(self):
+        pool_class = self._use_process_executor()
+        broken_pool, new_pool = mock.Mock(), mock.Mock()
+        pool_class.side_effect = [broken_pool, new_pool]
+        broken_pool.submit.return_value.result.side_effect = (
+            process.BrokenProcessPool)
+        event_executor = executor.EventExecutor()
+
+        thread = event_executor.submit(mock.Mock(), self.event)
+
+        self.assertRaises(executor.ActionFailed, thread.wait)
+        broken_pool.shutdown.assert_called_once_with(wait=False)
+
+        event_executor.submit(mock.Mock(), self.event).wait()
+
+        new_pool.submit.assert_called_once_with(executor._exec_in_worker,
+                                                self.event)
+
+    def test_exec_in_worker(self):
+        service = self.patch(executor, '_WORKER_SERVICE')
+
+        executor._exec_in_worker(self.event)
+
+        service._exec_event.assert_called_once_with(self.event)
@@ -32,12 +32,23 @@ class RPCAPITestCase(tests.TestCase):
 
     def test_get_lease(self):
         self.manager.get_lease(self.fake_id)
-        self.call.assert_called_once_with('get_lease', lease_id=1)
+        self.call.assert_called_once_with('get_lease', lease_id=1,
+                                          profile='full')
+
+    def test_get_lease_summary(self):
+        self.manager.get_lease(self.fake_id, profile='summary')
+        self.call.assert_called_once_with('get_lease', lease_id=1,
+                                          profile='summary')
 
     def test_list_leases(self):
         self.manager.list_leases('fake')
         self.call.assert_called_once_with('list_leases', project_id='fake',
-                                          query=None)
+                                          query=None, profile='full')
+
+    def test_list_leases_summary(self):
+        self.manager.list_leases('fake', profile='summary')
+        self.call.assert_called_once_with('list_leases', project_id='fake',
+                                          query=None, profile='summary')
 
     def test_create_lease(self):
         self.manager.create_lease(self.fake_values)
@@ -201,6 +201,7 @@ class ServiceTestCase(tests.DBTestCase):
         self.lease_get = self.patch(self.db_api, 'lease_get')
         self.lease_get.return_value = self.lease
         self.lease_list = self.patch(self.db_api, 'lease_list')
+        self.transaction = self.patch(self.db_api, 'transaction')
         self.lease_create = self.patch(self.db_api, 'lease_create')
         self.lease_update = self.patch(self.db_api, 'lease_update')
         self.lease_destroy = self.patch(self.db_api, 'lease_destroy')
@@ -263,34 +264,61 @@ class ServiceTestCase(tests.DBTestCase):
                     'before_end': self.fake_plugin.before_end}}
         self.assertEqual(actions, self.manager._setup_actions())
 
+    def test_renew_event_claims(self):
+        event_renew_claims = self.patch(self.db_api, 'event_renew_claims')
+
+        self.manager._renew_event_claims()
+
+        event_renew_claims.assert_called_once_with(self.manager.worker_id,
+                                                   mock.ANY)
+
     def test_no_events(self):
-        events = self.patch(self.db_api, 'event_get_all_sorted_by_filters')
+        event_claim_due = self.patch(self.db_api, 'event_claim_due')
         event_update = self.patch(self.db_api, 'event_update')
-        events.return_value = None
+        event_claim_due.return_value = []
 
         self.manager._process_events()
 
+        event_claim_due.assert_called_once_with(mock.ANY, 100,
+                                                self.manager.worker_id)
         self.assertFalse(event_update.called)
 
     def test_event_success(self):
-        events = self.patch(self.db_api, 'event_get_all_sorted_by_filters')
-        event_update = self.patch(self.db_api, 'event_update')
-        events.return_value = [{'id': '111-222-333', 'time': self.good_date,
-                                'lease_id': 'aaa-bbb-ccc',
-                                'event_type': 'start_lease'},
-                               {'id': '444-555-666', 'time': self.good_date,
-                                'lease_id': 'bbb-ccc-ddd',
-                                'event_type': 'start_lease'}]
-        self.patch(eventlet, 'spawn')
+        event_claim_due = self.patch(self.db_api, 'event_claim_due')
+        events = [{'id': '111-222-333', 'time': self.good_date,
+                   'lease_id': 'aaa-bbb-ccc',
+                   'event_type': 'start_lease'},
+                  {'id': '444-555-666', 'time': self.good_date,
+                   'lease_id': 'bbb-ccc-ddd',
+                   'event_type': 'start_lease'}]
+        event_claim_due.return_value = events
+        spawn = self.patch(self.manager.event_executor, 'submit')
 
         self.manager._process_events()
 
-        event_update.assert_has_calls([
-            mock.call('111-222-333', {'status': status.event.IN_PROGRESS}),
-            mock.call('444-555-666', {'status': status.event.IN_PROGRESS})])
+        spawn.assert_has_calls([mock.call(mock.ANY, events[0]),
+                                mock.call(mock.ANY, events[1])],
+                               any_order=True)
+
+    def test_events_claimed_in_batches(self):
+        self.cfg.CONF.set_override('event_claim_limit', 1, group='manager')
+        self.addCleanup(self.cfg.CONF.clear_override, 'event_claim_limit',
+                        group='manager')
+        event_claim_due = self.patch(self.db_api, 'event_claim_due')
+        event = {'id': '111-222-333', 'time': self.good_date,
+                 'lease_id': 'aaa-bbb-ccc', 'event_type': 'start_lease'}
+        event_claim_due.side_effect = [[event], []]
+        _process_events_concurrently = self.patch(
+            self.manager, '_process_events_concurrently')
+
+        self.manager._process_events()
+
+        self.assertEqual(2, event_claim_due.call_count)
+        _process_events_concurrently.assert_has_calls([mock.call([event])])
+        self.assertEqual(6, _process_events_concurrently.call_count)
 
     def test_concurrent_events(self):
-        events = self.patch(self.db_api, 'event_get_all_sorted_by_filters')
+        events = self.patch(self.db_api, 'event_claim_due')
         self.patch(self.db_api, 'event_update')
         events.return_value = [{'id': '111-222-333', 'time': self.good_date,
                                 'lease_id': 'aaa-bbb-ccc',
@@ -349,7 +377,7 @@ class ServiceTestCase(tests.DBTestCase):
                   {'id': '333-444-555', 'time': self.good_date,
                    'lease_id': 'ccc-ddd-eee',
                    'event_type': 'start_lease'}]
-        spawn = self.patch(eventlet, 'spawn')
+        spawn = self.patch(self.manager.event_executor, 'submit')
 
         self.manager._process_events_concurrently(events)
         spawn.assert_has_calls([
@@ -358,36 +386,18 @@ class ServiceTestCase(tests.DBTestCase):
             mock.call(mock.ANY, events[2])])
 
     def test_event_spawn_fail(self):
-        events = self.patch(self.db_api, 'event_get_all_sorted_by_filters')
+        events = self.patch(self.db_api, 'event_claim_due')
         event_update = self.patch(self.db_api, 'event_update')
-        self.patch(eventlet, 'spawn').side_effect = Exception
+        self.patch(self.manager.event_executor,
+                   'submit').side_effect = Exception
         events.return_value = [{'id': '111-222-333', 'time': self.good_date,
                                 'lease_id': 'aaa-bbb-ccc',
                                 'event_type': 'start_lease'}]
 
         self.manager._process_events()
 
-        event_update.assert_has_calls([
-            mock.call('111-222-333', {'status': status.event.IN_PROGRESS}),
-            mock.call('111-222-333', {'status': status.event.ERROR})])
-
-    def test_event_pass(self):
-        events = self.patch(self.db_api, 'event_get_all_sorted_by_filters')
-        events.return_value = [{'id': '111-222-333',
-                                'lease_id': self.lease_id,
-                                'time': self.good_date,
-                                'event_type': 'start_lease'}]
-
-        self.lease_get = self.patch(self.db_api, 'lease_get')
-        lease = self.lease.copy()
-        lease.update({'status': status.LeaseStatus.CREATING})
-        self.lease_get.return_value = lease
-
-        event_update = self.patch(self.db_api, 'event_update')
-
-        self.manager._process_events()
-
-        event_update.assert_not_called()
+        event_update.assert_called_once_with(
+            '111-222-333', {'status': status.event.ERROR})
 
     def test_exec_event_success(self):
         event = {'id': '111-222-333',
@@ -399,7 +409,8 @@ class ServiceTestCase(tests.DBTestCase):
 
         start_lease.assert_called_once_with(lease_id=event['lease_id'],
                                             event_id=event['id'])
-        self.lease_get.assert_called_once_with(event['lease_id'])
+        self.lease_get.assert_called_once_with(event['lease_id'],
+                                               profile='summary')
         self.fake_notifier.assert_called_once_with(
             {}, notifier_api.format_lease_payload(self.lease),
             'lease.event.start_lease')
@@ -475,7 +486,7 @@ class ServiceTestCase(tests.DBTestCase):
     def test_get_lease(self):
         lease = self.manager.get_lease(self.lease_id)
 
-        self.lease_get.assert_called_once_with('11-22-33')
+        self.lease_get.assert_called_once_with('11-22-33', profile='full')
         self.assertEqual(lease, self.lease)
 
     @testtools.skip('incorrect decorator')
@@ -486,6 +497,30 @@ class ServiceTestCase(tests.DBTestCase):
 
         self.lease_list.assert_called_once_with()
 
+    def test_list_leases_with_query(self):
+        self.manager.list_leases(
+            project_id='fake_project',
+            query={'status': 'ACTIVE', 'start_date': '2030-01-01 00:00',
+                   'sort_key': 'end_date', 'sort_dir': 'desc', 'limit': '10',
+                   'marker': 'fake_marker', 'unknown': 'ignored'})
+
+        self.lease_list.assert_called_once_with(
+            'fake_project', profile='full',
+            filters={'status': 'ACTIVE',
+                     'start_date': datetime.datetime(2030, 1, 1, 0, 0)},
+            sort_key='end_date', sort_dir='desc', limit=10,
+            marker='fake_marker')
+
+    def test_list_leases_with_invalid_query(self):
+        for query in ({'sort_key': 'name'}, {'sort_dir': 'up'},
+                      {'limit': 'ten'}, {'limit': '0'}):
+            self.assertRaises(manager_ex.MalformedParameter,
+                              self.manager.list_leases, query=query)
+        self.assertRaises(manager_ex.InvalidDate,
+                          self.manager.list_leases,
+                          query={'end_date': '2030-01-01'})
+        self.lease_list.assert_not_called()
+
     def test_create_lease_now(self):
         lease_values = self.lease_values
         lease = self.manager.create_lease(lease_values)
@@ -499,6 +534,75 @@ class ServiceTestCase(tests.DBTestCase):
             {}, notifier_api.format_lease_payload(lease),
             'lease.create')
 
+    def test_create_lease_in_transaction(self):
+        lease_values = self.lease_values.copy()
+        self.lease_create.return_value = {
+            'id': self.lease_id,
+            'project_id': self.project_id,
+            'start_date': datetime.datetime(2026, 11, 13, 13, 13),
+            'end_date': datetime.datetime(2026, 12, 13, 13, 13),
+            'events': [{'id': 'event1',
+                        'time': datetime.datetime(2026, 11, 13, 13, 13)}]}
+        schedule = self.patch(self.manager.event_scheduler, 'schedule')
+
+        self.manager.create_lease(lease_values)
+
+        self.transaction.assert_called_once_with()
+        self.assertEqual(3, len(lease_values['events']))
+        self.fake_plugin.reserve_resource.assert_called_once()
+        self.lease_update.assert_called_once_with(
+            self.lease_id, {'status': self.status.LeaseStatus.PENDING})
+        self.event_create.assert_not_called()
+        schedule.assert_called_once_with(
+            'event1', datetime.datetime(2026, 11, 13, 13, 13))
+
+    def test_create_lease_reservation_failure(self):
+        lease_values = self.lease_values.copy()
+        self.fake_plugin.reserve_resource.side_effect = (
+            manager_ex.NotEnoughResourcesAvailable)
+        schedule = self.patch(self.manager.event_scheduler, 'schedule')
+
+        self.assertRaises(manager_ex.NotEnoughResourcesAvailable,
+                          self.manager.create_lease, lease_values)
+
+        # The transaction rolls the lease back
+        exit_args = self.transaction.return_value.__exit__.call_args[0]
+        self.assertIs(manager_ex.NotEnoughResourcesAvailable, exit_args[0])
+        self.lease_destroy.assert_not_called()
+        self.lease_update.assert_not_called()
+        schedule.assert_not_called()
+        self.fake_notifier.assert_not_called()
+
+    def test_create_lease_failure_rolls_back_resources(self):
+        lease_values = self.lease_values.copy()
+        lease_values['reservations'] = [
+            {'id': '111', 'resource_type': 'virtual:instance'},
+            {'id': '222', 'resource_type': 'virtual:instance'}]
+        self.fake_plugin.reserve_resource.side_effect = [
+            'resource1', manager_ex.NotEnoughResourcesAvailable]
+
+        self.assertRaises(manager_ex.NotEnoughResourcesAvailable,
+                          self.manager.create_lease, lease_values)
+
+        self.fake_plugin.rollback_resource.assert_called_once_with(
+            'resource1')
+        exit_args = self.transaction.return_value.__exit__.call_args[0]
+        self.assertIs(manager_ex.NotEnoughResourcesAvailable, exit_args[0])
+
+    def test_create_lease_rollback_resources_failure(self):
+        lease_values = self.lease_values.copy()
+        self.lease_update.side_effect = Exception('update failed')
+        self.fake_plugin.reserve_resource.return_value = 'resource1'
+        self.fake_plugin.rollback_resource.side_effect = Exception(
+            'delete failed')
+
+        exc = self.assertRaises(Exception, self.manager.create_lease,
+                                lease_values)
+
+        self.assertEqual('update failed', str(exc))
+        self.fake_plugin.rollback_resource.assert_called_once_with(
+            'resource1')
+
     def test_create_lease_some_time(self):
         lease_values = self.lease_values.copy()
         self.lease['start_date'] = '2026-11-13 13:13'
@@ -1445,11 +1549,14 @@ class ServiceTestCase(tests.DBTestCase):
         event_get.side_effect = fake_event_get
         enforcement_on_end = self.patch(self.enforcement, 'on_end')
 
+        forget_trust = self.patch(self.trusts, 'forget_trust')
+
         self.manager.delete_lease(self.lease_id)
 
         self.lease_destroy.assert_called_once_with(self.lease_id)
         self.fake_plugin.on_end.assert_called_with('111', lease=self.lease)
         enforcement_on_end.assert_called_once()
+        forget_trust.assert_called_once_with(self.lease['trust_id'])
 
     def test_delete_lease_after_ending(self):
         def fake_event_get(sort_key, sort_dir, filters):
@@ -206,7 +206,7 @@ class FloatingIpPluginTest(tests.TestCase):
         fip_reservation_create = self.patch(self.db_api,
                                             'fip_reservation_create')
         fip_allocation_create = self.patch(
-            self.db_api, 'fip_allocation_create')
+            self.db_api, 'fip_allocation_bulk_create')
         fip_plugin.reserve_resource(
             '441c1476-9f8f-4700-9f30-cd9b6fef3509',
             values)
@@ -216,17 +216,14 @@ class FloatingIpPluginTest(tests.TestCase):
             'amount': 2
         }
         fip_reservation_create.assert_called_once_with(fip_values)
-        calls = [
-            mock.call(
-                {'floatingip_id': 'fip1',
-                 'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
-                 }),
-            mock.call(
-                {'floatingip_id': 'fip2',
-                 'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
-                 }),
-        ]
-        fip_allocation_create.assert_has_calls(calls)
+        fip_allocation_create.assert_called_once_with([
+            {'floatingip_id': 'fip1',
+             'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
+             },
+            {'floatingip_id': 'fip2',
+             'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
+             },
+        ])
 
     def test_create_reservation_fips_with_required(self):
         fip_plugin = floatingip_plugin.FloatingIpPlugin()
@@ -245,7 +242,7 @@ class FloatingIpPluginTest(tests.TestCase):
                                             'fip_reservation_create')
         fip_reservation_create.return_value = {'id': 'fip_resv_id1'}
         fip_allocation_create = self.patch(
-            self.db_api, 'fip_allocation_create')
+            self.db_api, 'fip_allocation_bulk_create')
         required_addr_create = self.patch(self.db_api, 'required_fip_create')
         fip_plugin.reserve_resource(
             '441c1476-9f8f-4700-9f30-cd9b6fef3509',
@@ -261,17 +258,14 @@ class FloatingIpPluginTest(tests.TestCase):
                 'address': '172.24.4.100',
                 'floatingip_reservation_id': 'fip_resv_id1'
             })
-        calls = [
-            mock.call(
-                {'floatingip_id': 'fip1',
-                 'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
-                 }),
-            mock.call(
-                {'floatingip_id': 'fip2',
-                 'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
-                 }),
-        ]
-        fip_allocation_create.assert_has_calls(calls)
+        fip_allocation_create.assert_called_once_with([
+            {'floatingip_id': 'fip1',
+             'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
+             },
+            {'floatingip_id': 'fip2',
+             'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
+             },
+        ])
 
     def test_create_reservation_with_missing_param_network(self):
         values = {
@@ -363,19 +357,17 @@ class FloatingIpPluginTest(tests.TestCase):
         fip_reservation_update = self.patch(self.db_api,
                                             'fip_reservation_update')
         fip_allocation_create = self.patch(
-            self.db_api, 'fip_allocation_create')
+            self.db_api, 'fip_allocation_bulk_create')
         fip_plugin.update_reservation(
             '441c1476-9f8f-4700-9f30-cd9b6fef3509',
             values)
         fip_reservation_update.assert_called_once_with(
             'fip_resv_id1', {'amount': 2})
-        calls = [
-            mock.call(
-                {'floatingip_id': 'fip2',
-                 'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
-                 })
-        ]
-        fip_allocation_create.assert_has_calls(calls)
+        fip_allocation_create.assert_called_once_with([
+            {'floatingip_id': 'fip2',
+             'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
+             }
+        ])
 
     def test_update_active_reservation_increase_amount_fips_available(self):
         fip_plugin = floatingip_plugin.FloatingIpPlugin()
@@ -427,9 +419,9 @@ class FloatingIpPluginTest(tests.TestCase):
         m = mock.MagicMock()
         self.fip_pool.return_value = m
         fip_allocation_create = self.patch(
-            self.db_api, 'fip_allocation_create')
+            self.db_api, 'fip_allocation_bulk_create')
         fip_allocation_destroy = self.patch(
-            self.db_api, 'fip_allocation_destroy')
+            self.db_api, 'fip_allocation_bulk_destroy')
         fip_plugin.update_reservation(
             '441c1476-9f8f-4700-9f30-cd9b6fef3509',
             values)
@@ -441,13 +433,11 @@ class FloatingIpPluginTest(tests.TestCase):
             '172.2.24.100',
             'fake-project-id',
             '441c1476-9f8f-4700-9f30-cd9b6fef3509')
-        calls = [
-            mock.call(
-                {'floatingip_id': 'fip2',
-                 'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
-                 })
-        ]
-        fip_allocation_create.assert_has_calls(calls)
+        fip_allocation_create.assert_called_once_with([
+            {'floatingip_id': 'fip2',
+             'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
+             }
+        ])
         self.assertFalse(fip_allocation_destroy.called)
 
     def test_update_active_reservation_fip_creation_failure(self):
@@ -506,9 +496,9 @@ class FloatingIpPluginTest(tests.TestCase):
         m.create_reserved_floatingip.side_effect = (None, Exception())
         self.fip_pool.return_value = m
         fip_allocation_create = self.patch(
-            self.db_api, 'fip_allocation_create')
+            self.db_api, 'fip_allocation_bulk_create')
         fip_allocation_destroy = self.patch(
-            self.db_api, 'fip_allocation_destroy')
+            self.db_api, 'fip_allocation_bulk_destroy')
         self.assertRaises(mgr_exceptions.NeutronClientError,
                           fip_plugin.update_reservation,
                           '441c1476-9f8f-4700-9f30-cd9b6fef3509', values)
@@ -608,7 +598,7 @@ class FloatingIpPluginTest(tests.TestCase):
             'required_floatingips': [],
         }
         fip_allocation_destroy = self.patch(self.db_api,
-                                            'fip_allocation_destroy')
+                                            'fip_allocation_bulk_destroy')
         fip_reservation_update = self.patch(self.db_api,
                                             'fip_reservation_update')
         fip_plugin.update_reservation(
@@ -616,10 +606,7 @@ class FloatingIpPluginTest(tests.TestCase):
             values)
         fip_reservation_update.assert_called_once_with(
             'fip_resv_id1', {'amount': 1})
-        calls = [
-            mock.call('fip_alloc_1')
-        ]
-        fip_allocation_destroy.assert_has_calls(calls)
+        fip_allocation_destroy.assert_called_once_with(['fip_alloc_1'])
 
     def test_update_reservation_remove_required_fips(self):
         fip_plugin = floatingip_plugin.FloatingIpPlugin()
@@ -790,20 +777,17 @@ class FloatingIpPluginTest(tests.TestCase):
         m = mock.MagicMock()
         self.fip_pool.return_value = m
         patch_fip_allocation_destroy = self.patch(
-            db_api, 'fip_allocation_destroy')
+            db_api, 'fip_allocation_bulk_destroy')
 
         fip_plugin = floatingip_plugin.FloatingIpPlugin()
         fip_plugin.on_end('resource-id1')
 
         self.fip_pool.assert_called_once_with('network-id1')
         m.delete_reserved_floatingip.assert_called_once_with('172.2.24.100')
-        patch_fip_allocation_destroy.assert_called_once_with('alloc-id1')
+        patch_fip_allocation_destroy.assert_called_once_with(
+            ['alloc-id1'])
 
     def test_matching_fips_not_allocated_fips(self):
-        def fip_allocation_get_all_by_values(**kwargs):
-            if kwargs['floatingip_id'] == 'fip1':
-                return [{'id': 'allocation-id1'}]
-
         fip_plugin = floatingip_plugin.FloatingIpPlugin()
         fip_get = self.patch(self.db_api, 'reservable_fip_get_all_by_queries')
         fip_get.return_value = [
@@ -811,13 +795,11 @@ class FloatingIpPluginTest(tests.TestCase):
             {'id': 'fip2', 'floating_ip_address': '172.24.4.102'},
             {'id': 'fip3', 'floating_ip_address': '172.24.4.103'},
         ]
-        fip_get = self.patch(self.db_api, 'fip_allocation_get_all_by_values')
-        fip_get.side_effect = fip_allocation_get_all_by_values
-        fip_get = self.patch(self.db_utils, 'get_free_periods')
-        fip_get.return_value = [
-            (datetime.datetime(2013, 12, 19, 20, 0),
-             datetime.datetime(2013, 12, 19, 21, 0)),
-        ]
+        allocated_get = self.patch(self.db_utils,
+                                   'get_allocated_resource_ids')
+        allocated_get.return_value = ['fip1']
+        free_get = self.patch(self.db_utils, 'get_free_resource_ids')
+        free_get.return_value = ['fip1']
         result = fip_plugin._matching_fips(
             'network-id', [], 2,
             datetime.datetime(2013, 12, 19, 20, 0),
@@ -825,9 +807,6 @@ class FloatingIpPluginTest(tests.TestCase):
         self.assertEqual(['fip2', 'fip3'], result)
 
     def test_matching_fips_allocated_fips(self):
-        def fip_allocation_get_all_by_values(**kwargs):
-            return [{'id': kwargs['floatingip_id']}]
-
         fip_plugin = floatingip_plugin.FloatingIpPlugin()
         fip_get = self.patch(self.db_api, 'reservable_fip_get_all_by_queries')
         fip_get.return_value = [
@@ -835,13 +814,11 @@ class FloatingIpPluginTest(tests.TestCase):
             {'id': 'fip2', 'floating_ip_address': '172.24.4.102'},
             {'id': 'fip3', 'floating_ip_address': '172.24.4.103'},
         ]
-        fip_get = self.patch(self.db_api, 'fip_allocation_get_all_by_values')
-        fip_get.side_effect = fip_allocation_get_all_by_values
-        fip_get = self.patch(self.db_utils, 'get_free_periods')
-        fip_get.return_value = [
-            (datetime.datetime(2013, 12, 19, 20, 0),
-             datetime.datetime(2013, 12, 19, 21, 0)),
-        ]
+        allocated_get = self.patch(self.db_utils,
+                                   'get_allocated_resource_ids')
+        allocated_get.return_value = ['fip1', 'fip2', 'fip3']
+        free_get = self.patch(self.db_utils, 'get_free_resource_ids')
+        free_get.return_value = ['fip1', 'fip2', 'fip3']
         result = fip_plugin._matching_fips(
             'network-id', [], 3,
             datetime.datetime(2013, 12, 19, 20, 0),
@@ -849,10 +826,6 @@ class FloatingIpPluginTest(tests.TestCase):
         self.assertEqual(['fip1', 'fip2', 'fip3'], result)
 
     def test_matching_fips_allocated_fips_with_required(self):
-        def fip_allocation_get_all_by_values(**kwargs):
-            if kwargs['floatingip_id'] == 'fip1':
-                return [{'id': 'allocation-id1'}]
-
         fip_plugin = floatingip_plugin.FloatingIpPlugin()
         fip_get = self.patch(self.db_api, 'reservable_fip_get_all_by_queries')
         fip_get.return_value = [
@@ -861,13 +834,11 @@ class FloatingIpPluginTest(tests.TestCase):
             {'id': 'fip3', 'floating_ip_address': '172.24.4.103'},
             {'id': 'fip4', 'floating_ip_address': '172.24.4.104'},
         ]
-        fip_get = self.patch(self.db_api, 'fip_allocation_get_all_by_values')
-        fip_get.side_effect = fip_allocation_get_all_by_values
-        fip_get = self.patch(self.db_utils, 'get_free_periods')
-        fip_get.return_value = [
-            (datetime.datetime(2013, 12, 19, 20, 0),
-             datetime.datetime(2013, 12, 19, 21, 0)),
-        ]
+        allocated_get = self.patch(self.db_utils,
+                                   'get_allocated_resource_ids')
+        allocated_get.return_value = ['fip1']
+        free_get = self.patch(self.db_utils, 'get_free_resource_ids')
+        free_get.return_value = ['fip1']
         result = fip_plugin._matching_fips(
             'network-id', ['172.24.4.102'], 4,
             datetime.datetime(2013, 12, 19, 20, 0),
@@ -877,9 +848,6 @@ class FloatingIpPluginTest(tests.TestCase):
         self.assertEqual(['fip2', 'fip3', 'fip4', 'fip1'], result)
 
     def test_matching_fips_allocated_fips_with_cleaning_time(self):
-        def fip_allocation_get_all_by_values(**kwargs):
-            return [{'id': kwargs['floatingip_id']}]
-
         self.cfg.CONF.set_override('cleaning_time', '5')
         fip_get = self.patch(
             self.db_api,
@@ -889,19 +857,14 @@ class FloatingIpPluginTest(tests.TestCase):
             {'id': 'fip2', 'floating_ip_address': '172.24.4.102'},
             {'id': 'fip3', 'floating_ip_address': '172.24.4.103'},
         ]
-        fip_get = self.patch(
-            self.db_api,
-            'fip_allocation_get_all_by_values')
-        fip_get.side_effect = fip_allocation_get_all_by_values
-        fip_get = self.patch(
+        allocated_get = self.patch(
             self.db_utils,
-            'get_free_periods')
-        fip_get.return_value = [
-            (datetime.datetime(2013, 12, 19, 20, 0)
-             - datetime.timedelta(minutes=5),
-             datetime.datetime(2013, 12, 19, 21, 0)
-             + datetime.timedelta(minutes=5))
-        ]
+            'get_allocated_resource_ids')
+        allocated_get.return_value = ['fip1', 'fip2', 'fip3']
+        free_get = self.patch(
+            self.db_utils,
+            'get_free_resource_ids')
+        free_get.return_value = ['fip1', 'fip2', 'fip3']
         fip_plugin = floatingip_plugin.FloatingIpPlugin()
         result = fip_plugin._matching_fips(
             'network-id', [], 3,
@@ -912,11 +875,10 @@ class FloatingIpPluginTest(tests.TestCase):
                         - datetime.timedelta(minutes=5))
         end_mergin = (datetime.datetime(2013, 12, 19, 21, 0)
                       + datetime.timedelta(minutes=5))
-        calls = [mock.call(fip, start_mergin, end_mergin,
-                           end_mergin - start_mergin,
-                           resource_type='floatingip')
-                 for fip in ['fip1', 'fip2', 'fip3']]
-        fip_get.assert_has_calls(calls)
+        free_get.assert_called_once_with(
+            'floatingip', mock.ANY, start_mergin, end_mergin)
+        self.assertEqual({'fip1', 'fip2', 'fip3'},
+                         set(free_get.call_args[0][1]))
 
     def test_matching_fips_not_matching(self):
         fip_plugin = floatingip_plugin.FloatingIpPlugin()
@@ -954,11 +916,11 @@ class FloatingIpMonitorPluginTestCase(tests.TestCase):
 
         fip_list = self.patch(db_api, 'floatingip_list')
         fip_list.return_value = fips
-        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_fip_id')
-        get_reservations.side_effect = [
-            {'id': "1", 'status': status.reservation.ERROR},
-            {'id': "2", 'status': status.reservation.ERROR}
-        ]
+        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_fip_ids')
+        get_reservations.return_value = {
+            '1': {'id': "1", 'status': status.reservation.ERROR},
+            '2': {'id': "2", 'status': status.reservation.ERROR}
+        }
         neutron_client_patch = self.patch(neutron.neutron_client.Client, 'show_network')
         neutron_client_patch.show_network.return_value = {"subnets": "1"}
         fetch_subnet = self.patch(neutron.FloatingIPPool, 'fetch_subnet')
@@ -978,10 +940,10 @@ class FloatingIpMonitorPluginTestCase(tests.TestCase):
 
         fip_list = self.patch(db_api, 'floatingip_list')
         fip_list.return_value = fips
-        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_fip_id')
-        get_reservations.side_effect = [
-            {'id': "1", 'status': status.reservation.ACTIVE}
-        ]
+        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_fip_ids')
+        get_reservations.return_value = {
+            '1': {'id': "1", 'status': status.reservation.ACTIVE},
+        }
         result = self.fip_monitor_plugin.poll_resource_failures()
         self.assertEqual(result, ([], []))
 
@@ -997,10 +959,10 @@ class FloatingIpMonitorPluginTestCase(tests.TestCase):
 
         fip_list = self.patch(db_api, 'floatingip_list')
         fip_list.return_value = fips
-        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_fip_id')
-        get_reservations.side_effect = [
-            {'id': "1", 'status': status.reservation.ERROR},
-        ]
+        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_fip_ids')
+        get_reservations.return_value = {
+            '1': {'id': "1", 'status': status.reservation.ERROR},
+        }
         neutron_client_patch = self.patch(neutron.neutron_client.Client, 'show_network')
         neutron_client_patch.show_network.return_value = {"subnets": "1"}
         fetch_subnet = self.patch(neutron.FloatingIPPool, 'fetch_subnet')
@@ -1045,8 +1007,9 @@ class FloatingIpMonitorPluginTestCase(tests.TestCase):
 
         fip_list = self.patch(db_api, 'floatingip_list')
         fip_list.return_value = fips
-        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_fip_id')
-        get_reservations.side_effect = fake_get_reservation
+        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_fip_ids')
+        get_reservations.side_effect = lambda fip_ids: {
+            fip_id: fake_get_reservation(fip_id) for fip_id in fip_ids}
         neutron_client_patch = self.patch(neutron.neutron_client.Client, 'show_network')
         neutron_client_patch.show_network.return_value = {"subnets": "1"}
         fetch_subnet = self.patch(neutron.FloatingIPPool, 'fetch_subnet')
@@ -1096,8 +1059,9 @@ class FloatingIpMonitorPluginTestCase(tests.TestCase):
 
         fip_list = self.patch(db_api, 'floatingip_list')
         fip_list.return_value = fips
-        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_fip_id')
-        get_reservations.side_effect = fake_get_reservation
+        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_fip_ids')
+        get_reservations.side_effect = lambda fip_ids: {
+            fip_id: fake_get_reservation(fip_id) for fip_id in fip_ids}
         neutron_client_patch = self.patch(neutron.neutron_client.Client, 'show_network')
         neutron_client_patch.show_network.return_value = {"subnets": "1"}
         fetch_subnet = self.patch(neutron.FloatingIPPool, 'fetch_subnet')
@@ -0,0 +1,89 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import datetime
+
+from blazar.plugins.instances import capacity
+from blazar import tests
+
+
+def _usage(start_hour, end_hour, vcpus=1, memory_mb=1024, disk_gb=10):
+    return {'start_date': datetime.datetime(2030, 1, 1, start_hour),
+            'end_date': datetime.datetime(2030, 1, 1, end_hour),
+            'vcpus': vcpus, 'memory_mb': memory_mb, 'disk_gb': disk_gb}
+
+
+class PeakUsagesTestCase(tests.TestCase):
+
+    def test_no_usage(self):
+        self.assertEqual((0, 0, 0), capacity.peak_usages([]))
+
+    def test_overlapping(self):
+        usages = [_usage(1, 3, vcpus=2, memory_mb=2048, disk_gb=20),
+                  _usage(2, 4)]
+
+        self.assertEqual((3, 3072, 30), capacity.peak_usages(usages))
+
+    def test_not_overlapping(self):
+        usages = [_usage(1, 2, vcpus=2), _usage(3, 4, memory_mb=4096)]
+
+        self.assertEqual((2, 4096, 10), capacity.peak_usages(usages))
+
+    def test_adjacent(self):
+        # A reservation starting when another one ends overlaps it.
+        usages = [_usage(1, 2), _usage(2, 3)]
+
+        self.assertEqual((2, 2048, 20), capacity.peak_usages(usages))
+
+    def test_multiple_slots(self):
+        # Each slot of a reservation on the host is a usage of its own.
+        usages = [_usage(1, 2, vcpus=2)] * 3
+
+        self.assertEqual((6, 3072, 30), capacity.peak_usages(usages))
+
+    def test_host_reservation(self):
+        usages = [_usage(1, 2, vcpus=None, memory_mb=None, disk_gb=None),
+                  _usage(1, 2)]
+
+        self.assertEqual((1, 1024, 10), capacity.peak_usages(usages))
+
+
+class CountSlotsTestCase(tests.TestCase):
+
+    def setUp(self):
+        super(CountSlotsTestCase, self).setUp()
+        self.host = {'vcpus': 8, 'memory_mb': 8192, 'local_gb': 100}
+
+    def test_count_slots(self):
+        self.assertEqual(3, capacity.count_slots(self.host, (2, 2048, 10),
+                                                 2, 1024, 10))
+
+    def test_count_slots_no_usage(self):
+        self.assertEqual(4, capacity.count_slots(self.host, (0, 0, 0),
+                                                 1, 2048, 10))
+
+    def test_count_slots_full(self):
+        self.assertEqual(0, capacity.count_slots(self.host, (8, 0, 0),
+                                                 1, 1024, 10))
+
+    def test_count_slots_over_capacity(self):
+        # The resources not requested must still be within capacity.
+        self.assertEqual(0, capacity.count_slots(self.host, (0, 0, 200),
+                                                 1, 1024, 0))
+
+    def test_count_slots_not_requested(self):
+        self.assertEqual(8, capacity.count_slots(self.host, (0, 0, 0),
+                                                 1, 0, 0))
+
+    def test_count_slots_nothing_requested(self):
+        self.assertEqual(1, capacity.count_slots(self.host, (0, 0, 0),
+                                                 0, 0, 0))
@@ -52,31 +52,30 @@ class TestVirtualInstancePlugin(tests.TestCase):
         return {'id': id, 'vcpus': vcpus,
                 'memory_mb': memory, 'local_gb': disk}
 
-    def generate_event(self, id, lease_id, event_type, time, status='UNDONE'):
+    def generate_usage(self, lease_id, start, end, vcpus, memory, disk):
         return {
-            'id': id,
+            'id': self.get_uuid(),
             'lease_id': lease_id,
-            'event_type': event_type,
-            'time': time,
-            'status': status
+            'resource_type': instances.RESOURCE_TYPE,
+            'start_date': datetime.datetime.strptime(start, '%Y-%m-%d %H:%M'),
+            'end_date': datetime.datetime.strptime(end, '%Y-%m-%d %H:%M'),
+            'vcpus': vcpus,
+            'memory_mb': memory,
+            'disk_gb': disk,
             }
 
+    def _patch_reservations(self, fake_get_reservation_by_host):
+        def fake_get_usages(host_ids, start, end):
+            return [dict(r, host_id=host_id) for host_id in host_ids
+                    for r in fake_get_reservation_by_host(host_id, start, end)]
+
+        get_usages = self.patch(db_utils, 'get_reservation_usages_by_host_ids')
+        get_usages.side_effect = fake_get_usages
+        return get_usages
+
     def get_uuid(self):
         return str(uuid.uuid4())
 
-    def generate_basic_events(self, lease_id, start, before_end, end):
-        return [
-            self.generate_event(self.get_uuid(), lease_id, 'start_lease',
-                                datetime.datetime.strptime(start,
-                                                           '%Y-%m-%d %H:%M')),
-            self.generate_event(self.get_uuid(), lease_id, 'before_end_lease',
-                                datetime.datetime.strptime(before_end,
-                                                           '%Y-%m-%d %H:%M')),
-            self.generate_event(self.get_uuid(), lease_id, 'end_lease',
-                                datetime.datetime.strptime(end,
-                                                           '%Y-%m-%d %H:%M')),
-            ]
-
     def test_reserve_resource(self):
         plugin = instance_plugin.VirtualInstancePlugin()
         mock_pickup_hosts = self.patch(plugin, 'pickup_hosts')
@@ -87,7 +86,7 @@ class TestVirtualInstancePlugin(tests.TestCase):
         fake_instance_reservation = {'id': 'instance-reservation-id1'}
         mock_inst_create.return_value = fake_instance_reservation
 
-        mock_alloc_create = self.patch(db_api, 'host_allocation_create')
+        mock_alloc_create = self.patch(db_api, 'host_allocation_bulk_create')
 
         mock_create_resources = self.patch(plugin, '_create_resources')
         mock_flavor = mock.MagicMock(id=1)
@@ -117,10 +116,9 @@ class TestVirtualInstancePlugin(tests.TestCase):
         mock_pickup_hosts.assert_called_once_with('res_id1',
                                                   pickup_hosts_value)
 
-        mock_alloc_create.assert_any_call({'compute_host_id': 'host1',
-                                           'reservation_id': 'res_id1'})
-        mock_alloc_create.assert_any_call({'compute_host_id': 'host2',
-                                           'reservation_id': 'res_id1'})
+        mock_alloc_create.assert_called_once_with(
+            [{'compute_host_id': 'host1', 'reservation_id': 'res_id1'},
+             {'compute_host_id': 'host2', 'reservation_id': 'res_id1'}])
         mock_create_resources.assert_called_once_with(
             ctx, fake_instance_reservation)
         mock_inst_update.assert_called_once_with('instance-reservation-id1',
@@ -176,10 +174,7 @@ class TestVirtualInstancePlugin(tests.TestCase):
         hosts_list = [self.generate_host_info('host-1', 4, 4096, 1000),
                       self.generate_host_info('host-2', 4, 4096, 1000),
                       self.generate_host_info('host-3', 4, 4096, 1000)]
-        mock_get_reservations = self.patch(db_utils,
-                                           'get_reservations_by_host_id')
-
-        mock_get_reservations.side_effect = fake_get_reservation_by_host
+        self._patch_reservations(fake_get_reservation_by_host)
         free = [{'host': hosts_list[0], 'reservations': []},
                 {'host': hosts_list[1], 'reservations': []},
                 {'host': hosts_list[2], 'reservations': []}]
@@ -217,10 +212,7 @@ class TestVirtualInstancePlugin(tests.TestCase):
                       self.generate_host_info('host-3', 4, 4096, 1000)]
         mock_host_get_query.return_value = hosts_list
 
-        mock_get_reservations = self.patch(db_utils,
-                                           'get_reservations_by_host_id')
-
-        mock_get_reservations.side_effect = fake_get_reservation_by_host
+        self._patch_reservations(fake_get_reservation_by_host)
         plugin.max_usages = fake_max_usages
 
         mock_reservation_get = self.patch(db_api, 'reservation_get')
@@ -262,9 +254,7 @@ class TestVirtualInstancePlugin(tests.TestCase):
                       self.generate_host_info('host-3', 4, 4096, 1000)]
         mock_host_get_query.return_value = hosts_list
 
-        mock_get_reservations = self.patch(db_utils,
-                                           'get_reservations_by_host_id')
-        mock_get_reservations.side_effect = fake_get_reservation_by_host
+        self._patch_reservations(fake_get_reservation_by_host)
 
         mock_reservation_get = self.patch(db_api, 'reservation_get')
         mock_reservation_get.return_value = {
@@ -313,10 +303,7 @@ class TestVirtualInstancePlugin(tests.TestCase):
                       self.generate_host_info('host-3', 4, 4096, 1000)]
         mock_host_get_query.return_value = hosts_list
 
-        mock_get_reservations = self.patch(db_utils,
-                                           'get_reservations_by_host_id')
-
-        mock_get_reservations.side_effect = fake_get_reservation_by_host
+        self._patch_reservations(fake_get_reservation_by_host)
 
         mock_max_usages = self.patch(plugin, 'max_usages')
         mock_max_usages.return_value = (0, 0, 0)
@@ -369,10 +356,7 @@ class TestVirtualInstancePlugin(tests.TestCase):
                       self.generate_host_info('host-3', 2, 2048, 500)]
         mock_host_get_query.return_value = hosts_list
 
-        mock_get_reservations = self.patch(db_utils,
-                                           'get_reservations_by_host_id')
-
-        mock_get_reservations.side_effect = fake_get_reservation_by_host
+        self._patch_reservations(fake_get_reservation_by_host)
 
         mock_max_usages = self.patch(plugin, 'max_usages')
         mock_max_usages.return_value = (0, 0, 0)
@@ -418,10 +402,7 @@ class TestVirtualInstancePlugin(tests.TestCase):
                       self.generate_host_info('host-3', 2, 2048, 500)]
         mock_host_get_query.return_value = hosts_list
 
-        mock_get_reservations = self.patch(db_utils,
-                                           'get_reservations_by_host_id')
-
-        mock_get_reservations.side_effect = fake_get_reservation_by_host
+        self._patch_reservations(fake_get_reservation_by_host)
 
         mock_max_usages = self.patch(plugin, 'max_usages')
         mock_max_usages.return_value = (0, 0, 0)
@@ -475,10 +456,7 @@ class TestVirtualInstancePlugin(tests.TestCase):
                       self.generate_host_info('host-3', 4, 4096, 1000)]
         mock_host_get_query.return_value = hosts_list
 
-        mock_get_reservations = self.patch(db_utils,
-                                           'get_reservations_by_host_id')
-
-        mock_get_reservations.side_effect = fake_get_reservation_by_host
+        self._patch_reservations(fake_get_reservation_by_host)
         mock_host_allocation_get = self.patch(
             db_api, 'host_allocation_get_all_by_values')
         mock_host_allocation_get.return_value = []
@@ -517,142 +495,102 @@ class TestVirtualInstancePlugin(tests.TestCase):
                           values)
 
     def test_max_usage_with_serial_reservation(self):
-        def fake_event_get(sort_key, sort_dir, filters):
-            if filters['lease_id'] == 'lease-1':
-                return self.generate_basic_events('lease-1',
-                                                  '2030-01-01 08:00',
-                                                  '2030-01-01 10:00',
-                                                  '2030-01-01 11:00')
-            elif filters['lease_id'] == 'lease-2':
-                return self.generate_basic_events('lease-2',
-                                                  '2030-01-01 12:00',
-                                                  '2030-01-01 13:00',
-                                                  '2030-01-01 14:00')
-
         plugin = instance_plugin.VirtualInstancePlugin()
         reservations = [
-            {
-                'lease_id': 'lease-1',
-                'instance_reservation': {
-                    'vcpus': 2, 'memory_mb': 3072, 'disk_gb': 20}},
-            {
-                'lease_id': 'lease-2',
-                'instance_reservation': {
-                    'vcpus': 3, 'memory_mb': 2048, 'disk_gb': 30}}
+            self.generate_usage('lease-1', '2030-01-01 08:00',
+                                '2030-01-01 11:00', 2, 3072, 20),
+            self.generate_usage('lease-2', '2030-01-01 12:00',
+                                '2030-01-01 14:00', 3, 2048, 30),
             ]
 
-        mock_event_get = self.patch(db_api, 'event_get_all_sorted_by_filters')
-        mock_event_get.side_effect = fake_event_get
-
         expected = (3, 3072, 30)
         ret = plugin.max_usages('fake-host', reservations)
 
         self.assertEqual(expected, ret)
 
     def test_max_usage_with_parallel_reservation(self):
-        def fake_event_get(sort_key, sort_dir, filters):
-            if filters['lease_id'] == 'lease-1':
-                return self.generate_basic_events('lease-1',
-                                                  '2030-01-01 08:00',
-                                                  '2030-01-01 10:00',
-                                                  '2030-01-01 11:00')
-            elif filters['lease_id'] == 'lease-2':
-                return self.generate_basic_events('lease-2',
-                                                  '2030-01-01 10:00',
-                                                  '2030-01-01 13:00',
-                                                  '2030-01-01 14:00')
-
         plugin = instance_plugin.VirtualInstancePlugin()
         reservations = [
-            {
-                'lease_id': 'lease-1',
-                'instance_reservation': {
-                    'vcpus': 2, 'memory_mb': 3072, 'disk_gb': 20}},
-            {
-                'lease_id': 'lease-2',
-                'instance_reservation': {
-                    'vcpus': 3, 'memory_mb': 2048, 'disk_gb': 30}},
+            self.generate_usage('lease-1', '2030-01-01 08:00',
+                                '2030-01-01 11:00', 2, 3072, 20),
+            self.generate_usage('lease-2', '2030-01-01 10:00',
+                                '2030-01-01 14:00', 3, 2048, 30),
             ]
 
-        mock_event_get = self.patch(db_api, 'event_get_all_sorted_by_filters')
-        mock_event_get.side_effect = fake_event_get
-
         expected = (5, 5120, 50)
         ret = plugin.max_usages('fake-host', reservations)
 
         self.assertEqual(expected, ret)
 
     def test_max_usage_with_multi_reservation(self):
-        def fake_event_get(sort_key, sort_dir, filters):
-            if filters['lease_id'] == 'lease-1':
-                return self.generate_basic_events('lease-1',
-                                                  '2030-01-01 08:00',
-                                                  '2030-01-01 10:00',
-                                                  '2030-01-01 11:00')
-
         plugin = instance_plugin.VirtualInstancePlugin()
         reservations = [
-            {
-                'lease_id': 'lease-1',
-                'instance_reservation': {
-                    'vcpus': 2, 'memory_mb': 3072, 'disk_gb': 20}},
-            {
-                'lease_id': 'lease-1',
-                'instance_reservation': {
-                    'vcpus': 3, 'memory_mb': 2048, 'disk_gb': 30}},
+            self.generate_usage('lease-1', '2030-01-01 08:00',
+                                '2030-01-01 11:00', 2, 3072, 20),
+            self.generate_usage('lease-1', '2030-01-01 08:00',
+                                '2030-01-01 11:00', 3, 2048, 30),
             ]
 
-        mock_event_get = self.patch(db_api, 'event_get_all_sorted_by_filters')
-        mock_event_get.side_effect = fake_event_get
-
         expected = (5, 5120, 50)
         ret = plugin.max_usages('fake-host', reservations)
 
         self.assertEqual(expected, ret)
 
     def test_max_usage_with_decrease_reservation(self):
-        def fake_event_get(sort_key, sort_dir, filters):
-            if filters['lease_id'] == 'lease-1':
-                return self.generate_basic_events('lease-1',
-                                                  '2030-01-01 08:00',
-                                                  '2030-01-01 10:00',
-                                                  '2030-01-01 11:00')
-            elif filters['lease_id'] == 'lease-2':
-                return self.generate_basic_events('lease-2',
-                                                  '2030-01-01 10:00',
-                                                  '2030-01-01 13:00',
-                                                  '2030-01-01 14:00')
-            elif filters['lease_id'] == 'lease-3':
-                return self.generate_basic_events('lease-3',
-                                                  '2030-01-01 15:00',
-                                                  '2030-01-01 16:00',
-                                                  '2030-01-01 17:00')
-
         plugin = instance_plugin.VirtualInstancePlugin()
         reservations = [
-            {
-                'lease_id': 'lease-1',
-                'instance_reservation': {
-                    'vcpus': 2, 'memory_mb': 3072, 'disk_gb': 20}},
-            {
-                'lease_id': 'lease-2',
-                'instance_reservation': {
-                    'vcpus': 1, 'memory_mb': 1024, 'disk_gb': 10}},
-            {
-                'lease_id': 'lease-3',
-                'instance_reservation': {
-                    'vcpus': 4, 'memory_mb': 2048, 'disk_gb': 40
-                    }},
+            self.generate_usage('lease-1', '2030-01-01 08:00',
+                                '2030-01-01 11:00', 2, 3072, 20),
+            self.generate_usage('lease-2', '2030-01-01 10:00',
+                                '2030-01-01 14:00', 1, 1024, 10),
+            self.generate_usage('lease-3', '2030-01-01 15:00',
+                                '2030-01-01 17:00', 4, 2048, 40),
             ]
 
-        mock_event_get = self.patch(db_api, 'event_get_all_sorted_by_filters')
-        mock_event_get.side_effect = fake_event_get
-
         expected = (4, 4096, 40)
         ret = plugin.max_usages('fake-host', reservations)
 
         self.assertEqual(expected, ret)
 
+    def test_max_usage_with_adjacent_reservation(self):
+        plugin = instance_plugin.VirtualInstancePlugin()
+        reservations = [
+            self.generate_usage('lease-1', '2030-01-01 08:00',
+                                '2030-01-01 11:00', 2, 3072, 20),
+            self.generate_usage('lease-2', '2030-01-01 11:00',
+                                '2030-01-01 14:00', 3, 2048, 30),
+            ]
+
+        expected = (5, 5120, 50)
+        ret = plugin.max_usages('fake-host', reservations)
+
+        self.assertEqual(expected, ret)
+
+    def test_max_usage_with_physical_reservation(self):
+        plugin = instance_plugin.VirtualInstancePlugin()
+        reservations = [
+            self.generate_usage('lease-1', '2030-01-01 08:00',
+                                '2030-01-01 11:00', None, None, None),
+            ]
+
+        ret = plugin.max_usages('fake-host', reservations)
+
+        self.assertEqual((0, 0, 0), ret)
+
+    def test_get_hosts_list(self):
+        plugin = instance_plugin.VirtualInstancePlugin()
+        host = self.generate_host_info('host-1', 8, 8192, 100)
+        host_info = {'host': host, 'reservations': [
+            self.generate_usage('lease-1', '2030-01-01 08:00',
+                                '2030-01-01 11:00', 2, 1024, 20)]}
+
+        self.assertEqual([host] * 3,
+                         plugin.get_hosts_list(host_info, 2, 2048, 10))
+        self.assertEqual([host] * 6,
+                         plugin.get_hosts_list(host_info, 1, 1024, 0))
+        self.assertEqual([],
+                         plugin.get_hosts_list(host_info, 1, 1024, 90))
+
     def test_create_resources(self):
         instance_reservation = {
             'reservation_id': 'reservation-id1',
@@ -723,7 +661,7 @@ class TestVirtualInstancePlugin(tests.TestCase):
         mock_host_get_query.return_value = hosts_list
 
         get_reservations = self.patch(db_utils,
-                                      'get_reservations_by_host_id')
+                                      'get_reservation_usages_by_host_ids')
         get_reservations.return_value = []
 
         plugin = instance_plugin.VirtualInstancePlugin()
@@ -1046,8 +984,9 @@ class TestVirtualInstancePlugin(tests.TestCase):
             {'id': 'id13', 'compute_host_id': 'host-id11'},
             {'id': 'id14', 'compute_host_id': 'host-id12'}]
 
-        mock_alloc_destroy = self.patch(db_api, 'host_allocation_destroy')
-        mock_alloc_create = self.patch(db_api, 'host_allocation_create')
+        mock_alloc_destroy = self.patch(db_api,
+                                        'host_allocation_bulk_destroy')
+        mock_alloc_create = self.patch(db_api, 'host_allocation_bulk_create')
 
         plugin = instance_plugin.VirtualInstancePlugin()
 
@@ -1057,17 +996,14 @@ class TestVirtualInstancePlugin(tests.TestCase):
         plugin.update_host_allocations(added_host, removed_host,
                                        'reservation-id1')
 
-        removed_calls = [mock.call('id10'), mock.call('id11')]
-        mock_alloc_destroy.assert_has_calls(removed_calls)
-        self.assertEqual(3, mock_alloc_destroy.call_count)
-
-        added_calls = [
-            mock.call({'compute_host_id': 'host-id1',
-                       'reservation_id': 'reservation-id1'}),
-            mock.call({'compute_host_id': 'host-id2',
-                       'reservation_id': 'reservation-id1'})]
-        mock_alloc_create.assert_has_calls(added_calls)
-        self.assertEqual(3, mock_alloc_create.call_count)
+        mock_alloc_destroy.assert_called_once_with(['id10', 'id11', 'id12'])
+        mock_alloc_create.assert_called_once_with(
+            [{'compute_host_id': 'host-id1',
+              'reservation_id': 'reservation-id1'},
+             {'compute_host_id': 'host-id1',
+              'reservation_id': 'reservation-id1'},
+             {'compute_host_id': 'host-id2',
+              'reservation_id': 'reservation-id1'}])
 
     def test_on_start(self):
         def fake_host_get(host_id):
@@ -1142,7 +1078,7 @@ class TestVirtualInstancePlugin(tests.TestCase):
         mock_delete_reservation_class = self.patch(
             plugin.placement_client, 'delete_reservation_class')
 
-        self.patch(db_api, 'host_allocation_destroy')
+        mock_alloc_destroy = self.patch(db_api, 'host_allocation_bulk_destroy')
 
         fake_servers = [mock.MagicMock() for i in range(5)]
         mock_nova = mock.MagicMock()
@@ -1169,6 +1105,8 @@ class TestVirtualInstancePlugin(tests.TestCase):
             detailed=False)
         mock_nova.servers.list.call_count = 3
         self.assertEqual(5, mock_nova.servers.delete.call_count)
+        mock_alloc_destroy.assert_called_once_with(
+            ['host-alloc-id1', 'host-alloc-id2'])
         mock_log.info.assert_any_call(
             "Could not find server '%s', may have been deleted concurrently.",
             fake_servers[0].id)
@@ -1182,6 +1120,23 @@ class TestVirtualInstancePlugin(tests.TestCase):
         mock_delete_reservation_class.assert_called_once_with(
             'reservation-id1')
 
+    def test_rollback_resource(self):
+        plugin = instance_plugin.VirtualInstancePlugin()
+        fake_instance_reservation = {'reservation_id': 'reservation-id1'}
+        mock_inst_get = self.patch(db_api, 'instance_reservation_get')
+        mock_inst_get.return_value = fake_instance_reservation
+        mock_cleanup_resources = self.patch(plugin, 'cleanup_resources')
+        mock_delete_reservation_class = self.patch(
+            plugin.placement_client, 'delete_reservation_class')
+
+        plugin.rollback_resource('resource-id1')
+
+        mock_inst_get.assert_called_once_with('resource-id1')
+        mock_cleanup_resources.assert_called_once_with(
+            fake_instance_reservation)
+        mock_delete_reservation_class.assert_called_once_with(
+            'reservation-id1')
+
     def test_heal_reservations_before_start_and_resources_changed(self):
         plugin = instance_plugin.VirtualInstancePlugin()
         failed_host = {'id': '1'}
@@ -1638,7 +1593,7 @@ class TestVirtualInstancePlugin(tests.TestCase):
         lease_get.return_value = dummy_lease
         pickup_hosts = self.patch(plugin, 'pickup_hosts')
         pickup_hosts.side_effect = mgr_exceptions.NotEnoughHostsAvailable
-        alloc_destroy = self.patch(db_api, 'host_allocation_destroy')
+        alloc_destroy = self.patch(db_api, 'host_allocation_bulk_destroy')
 
         with mock.patch.object(datetime, 'datetime',
                                mock.Mock(wraps=datetime.datetime)) as patched:
@@ -1648,6 +1603,5 @@ class TestVirtualInstancePlugin(tests.TestCase):
                 dummy_reservation, list(failed_host.values()))
 
         pickup_hosts.assert_called_once()
-        destroy_calls = [mock.call('alloc-1'), mock.call('alloc-2')]
-        alloc_destroy.assert_has_calls(destroy_calls)
+        alloc_destroy.assert_called_once_with(['alloc-1', 'alloc-2'])
         self.assertEqual(False, result)
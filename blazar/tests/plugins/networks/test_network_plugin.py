@@ -117,7 +117,7 @@ class NetworkPluginTestCase(tests.TestCase):
         self.assertEqual(self.fake_network, network)
 
     def test_list_networks(self):
-        self.fake_network_plugin.list_networks()
+        list(self.fake_network_plugin.list_networks())
         self.db_network_list.assert_called_once_with()
 
     def test_create_network_without_extra_capabilities(self):
@@ -540,7 +540,7 @@ class NetworkPluginTestCase(tests.TestCase):
             'network_allocation_create')
         network_allocation_destroy = self.patch(
             self.db_api,
-            'network_allocation_destroy')
+            'network_allocation_bulk_destroy')
 
         self.fake_network_plugin.update_reservation(
             '706eb3bc-07ed-4383-be93-b32845ece672',
@@ -645,7 +645,7 @@ class NetworkPluginTestCase(tests.TestCase):
             'network_allocation_create')
         network_allocation_destroy = self.patch(
             self.db_api,
-            'network_allocation_destroy')
+            'network_allocation_bulk_destroy')
 
         self.fake_network_plugin.update_reservation(
             '706eb3bc-07ed-4383-be93-b32845ece672',
@@ -967,7 +967,7 @@ class NetworkPluginTestCase(tests.TestCase):
         ]
         network_allocation_destroy = self.patch(
             self.db_api,
-            'network_allocation_destroy')
+            'network_allocation_bulk_destroy')
         delete_network = self.patch(self.neutron_client, 'delete_network')
         delete_network.return_value = None
 
@@ -976,7 +976,7 @@ class NetworkPluginTestCase(tests.TestCase):
         network_reservation_update.assert_called_with(
             u'04de74e8-193a-49d2-9ab8-cba7b49e45e8', {'status': 'completed'})
         network_allocation_destroy.assert_called_with(
-            u'bfa9aa0b-8042-43eb-a4e6-4555838bf64f')
+            [u'bfa9aa0b-8042-43eb-a4e6-4555838bf64f'])
         delete_network.assert_called_with(
             '69cab064-0e60-4efb-a503-b42dde0fb3f2')
 
@@ -1013,7 +1013,7 @@ class NetworkPluginTestCase(tests.TestCase):
         ]
         network_allocation_destroy = self.patch(
             self.db_api,
-            'network_allocation_destroy')
+            'network_allocation_bulk_destroy')
 
         def fake_delete_network(*args, **kwargs):
             raise manager_exceptions.NetworkDeletionFailed
@@ -1026,7 +1026,7 @@ class NetworkPluginTestCase(tests.TestCase):
         network_reservation_update.assert_called_with(
             u'04de74e8-193a-49d2-9ab8-cba7b49e45e8', {'status': 'completed'})
         network_allocation_destroy.assert_called_with(
-            u'bfa9aa0b-8042-43eb-a4e6-4555838bf64f')
+            [u'bfa9aa0b-8042-43eb-a4e6-4555838bf64f'])
         delete_network.assert_called_with(
             '69cab064-0e60-4efb-a503-b42dde0fb3f2')
 
@@ -1127,10 +1127,10 @@ class NetworkMonitorPluginTestCase(tests.TestCase):
         fake_subnets = {'subnets': [{"id": "subnet1"}]}
         network_list = self.patch(db_api, 'network_list')
         network_list.return_value = networks_from_blazar
-        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_network_id')
-        get_reservations.side_effect = [
-            {'id': "1", 'status': status.reservation.ERROR},
-        ]
+        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_network_ids')
+        get_reservations.return_value = {
+            'network1': {'id': "1", 'status': status.reservation.ERROR},
+        }
         neutron_list_networks_patch = self.patch(neutron.neutron_client.Client, 'list_networks')
         neutron_list_networks_patch.return_value = fake_neutron_networks
         neutron_list_ports_patch = self.patch(neutron.neutron_client.Client, 'list_ports')
@@ -1174,10 +1174,10 @@ class NetworkMonitorPluginTestCase(tests.TestCase):
         }
         network_list = self.patch(db_api, 'network_list')
         network_list.return_value = networks_from_blazar
-        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_network_id')
-        get_reservations.side_effect = [
-            {'id': "1", 'status': status.reservation.ACTIVE},
-        ]
+        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_network_ids')
+        get_reservations.return_value = {
+            'network1': {'id': "1", 'status': status.reservation.ACTIVE},
+        }
         neutron_remove_interface_patch = self.patch(neutron.neutron_client.Client, 'remove_interface_router')
         neutron_delete_subnet_patch = self.patch(neutron.neutron_client.Client, 'delete_subnet')
         neutron_delete_network_patch = self.patch(neutron.neutron_client.Client, 'delete_network')
@@ -1202,10 +1202,10 @@ class NetworkMonitorPluginTestCase(tests.TestCase):
         }
         network_list = self.patch(db_api, 'network_list')
         network_list.return_value = networks_from_blazar
-        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_network_id')
-        get_reservations.side_effect = [
-            {'id': "1", 'status': status.reservation.ACTIVE},
-        ]
+        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_network_ids')
+        get_reservations.return_value = {
+            'network1': {'id': "1", 'status': status.reservation.ACTIVE},
+        }
         neutron_remove_interface_patch = self.patch(neutron.neutron_client.Client, 'remove_interface_router')
         neutron_delete_subnet_patch = self.patch(neutron.neutron_client.Client, 'delete_subnet')
         neutron_delete_network_patch = self.patch(neutron.neutron_client.Client, 'delete_network')
@@ -1229,10 +1229,10 @@ class NetworkMonitorPluginTestCase(tests.TestCase):
         }
         network_list = self.patch(db_api, 'network_list')
         network_list.return_value = networks_from_blazar
-        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_network_id')
-        get_reservations.side_effect = [
-            {'id': "1", 'status': status.reservation.ERROR},
-        ]
+        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_network_ids')
+        get_reservations.return_value = {
+            'network1': {'id': "1", 'status': status.reservation.ERROR},
+        }
         neutron_list_networks_patch = self.patch(neutron.neutron_client.Client, 'list_networks')
         neutron_list_networks_patch.return_value = {'networks': []}
         neutron_remove_interface_patch = self.patch(neutron.neutron_client.Client, 'remove_interface_router')
@@ -1262,10 +1262,10 @@ class NetworkMonitorPluginTestCase(tests.TestCase):
         fake_subnets = {'subnets': [{"id": "subnet1"}]}
         network_list = self.patch(db_api, 'network_list')
         network_list.return_value = networks_from_blazar
-        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_network_id')
-        get_reservations.side_effect = [
-            {'id': "1", 'status': status.reservation.ERROR},
-        ]
+        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_network_ids')
+        get_reservations.return_value = {
+            'network1': {'id': "1", 'status': status.reservation.ERROR},
+        }
         neutron_list_networks_patch = self.patch(neutron.neutron_client.Client, 'list_networks')
         neutron_list_networks_patch.return_value = fake_neutron_networks
         neutron_list_ports_patch = self.patch(neutron.neutron_client.Client, 'list_ports')
@@ -1301,10 +1301,10 @@ class NetworkMonitorPluginTestCase(tests.TestCase):
         fake_subnets = {'subnets': [{"id": "subnet1"}]}
         network_list = self.patch(db_api, 'network_list')
         network_list.return_value = networks_from_blazar
-        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_network_id')
-        get_reservations.side_effect = [
-            {'id': "1", 'status': status.reservation.ERROR},
-        ]
+        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_network_ids')
+        get_reservations.return_value = {
+            'network1': {'id': "1", 'status': status.reservation.ERROR},
+        }
         neutron_list_networks_patch = self.patch(neutron.neutron_client.Client, 'list_networks')
         neutron_list_networks_patch.return_value = fake_neutron_networks
         neutron_list_ports_patch = self.patch(neutron.neutron_client.Client, 'list_ports')
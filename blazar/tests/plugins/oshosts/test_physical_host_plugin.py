@@ -29,6 +29,7 @@ import testtools
 from blazar import context, policy
 from blazar import status
 from blazar.db import api as db_api
+from blazar.db import availability
 from blazar.db import exceptions as db_exceptions
 from blazar.db import utils as db_utils
 from blazar.manager import exceptions as manager_exceptions
@@ -203,7 +204,7 @@ class PhysicalHostPluginTestCase(tests.TestCase):
 
     @testtools.skip('incorrect decorator')
     def test_list_hosts(self):
-        self.fake_phys_plugin.list_computehosts({})
+        list(self.fake_phys_plugin.list_computehosts({}))
         self.db_host_list.assert_called_once_with()
         del self.service_utils
 
@@ -498,7 +499,7 @@ class PhysicalHostPluginTestCase(tests.TestCase):
                 ]
             }
         ]
-        ret = self.fake_phys_plugin.list_allocations({})
+        ret = list(self.fake_phys_plugin.list_allocations({}))
 
         # Sort returned value to use assertListEqual
         for r in ret:
@@ -553,7 +554,8 @@ class PhysicalHostPluginTestCase(tests.TestCase):
                 ]
             }
         ]
-        ret = self.fake_phys_plugin.list_allocations({'lease_id': 'lease-1'})
+        ret = list(self.fake_phys_plugin.list_allocations(
+            {'lease_id': 'lease-1'}))
 
         # Sort returned value to use assertListEqual
         for r in ret:
@@ -594,8 +596,8 @@ class PhysicalHostPluginTestCase(tests.TestCase):
                 ]
             },
         ]
-        ret = self.fake_phys_plugin.list_allocations(
-            {'reservation_id': 'reservation-1'})
+        ret = list(self.fake_phys_plugin.list_allocations(
+            {'reservation_id': 'reservation-1'}))
 
         # Sort returned value to use assertListEqual
         for r in ret:
@@ -604,6 +606,63 @@ class PhysicalHostPluginTestCase(tests.TestCase):
 
         self.assertListEqual(expected, ret)
 
+    def test_list_allocations_with_time_window_and_limit(self):
+        self.db_get_reserv_allocs = self.patch(
+            self.db_utils, 'get_reservation_allocations_by_host_ids')
+        self.db_get_reserv_allocs.return_value = [
+            self.reservation_allocation_dict(*r) for r
+            in [
+                ('reservation-1', 'lease-1',
+                 'project-1', ['host-1', 'host-2']),
+                ('reservation-2', 'lease-1',
+                 'project-1', ['host-2'])]]
+
+        self.db_host_list = self.patch(self.db_api, 'host_list')
+        self.db_host_list.return_value = [{'id': 'host-1'}, {'id': 'host-2'}]
+
+        ret = list(self.fake_phys_plugin.list_allocations(
+            {'start_date': '2030-01-01 10:00',
+             'end_date': '2030-01-15T10:00:00Z',
+             'limit': '1', 'marker': 'reservation-0'}))
+
+        # Paging is only supported for the allocations of a single host.
+        self.db_get_reserv_allocs.assert_called_once_with(
+            ['host-1', 'host-2'], datetime.datetime(2030, 1, 1, 10, 0),
+            datetime.datetime(2030, 1, 15, 10, 0), None, None, None, None)
+        ret.sort(key=lambda x: x['resource_id'])
+        self.assertEqual([['reservation-1'],
+                          ['reservation-1', 'reservation-2']],
+                         [[r['id'] for r in x['reservations']] for x in ret])
+
+    def test_get_allocations_paged(self):
+        self.db_get_reserv_allocs = self.patch(
+            self.db_utils, 'get_reservation_allocations_by_host_ids')
+        self.db_get_reserv_allocs.return_value = [
+            self.reservation_allocation_dict('reservation-2', 'lease-1',
+                                             'project-1', ['host-2'])]
+
+        ret = self.fake_phys_plugin.get_allocations(
+            'host-2', {'limit': '1', 'marker': 'reservation-1'})
+
+        self.db_get_reserv_allocs.assert_called_once_with(
+            ['host-2'], mock.ANY, datetime.date.max, None, None,
+            'reservation-1', 1)
+        self.assertEqual(['reservation-2'],
+                         [r['id'] for r in ret['reservations']])
+
+    def test_list_allocations_with_invalid_options(self):
+        self.db_host_list = self.patch(self.db_api, 'host_list')
+        self.db_host_list.return_value = [{'id': 'host-1'}]
+
+        self.assertRaises(manager_exceptions.MalformedParameter,
+                          self.fake_phys_plugin.list_allocations,
+                          {'start_date': 'invalid'})
+        for query in ({'start_date': 'invalid'}, {'limit': '0'},
+                      {'limit': 'invalid'}):
+            self.assertRaises(manager_exceptions.MalformedParameter,
+                              self.fake_phys_plugin.get_allocations,
+                              'host-1', query)
+
     def test_get_allocations(self):
         self.db_get_reserv_allocs = self.patch(
             self.db_utils, 'get_reservation_allocations_by_host_ids')
@@ -757,7 +816,7 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         matching_hosts.return_value = ['host1', 'host2']
         host_allocation_create = self.patch(
             self.db_api,
-            'host_allocation_create')
+            'host_allocation_bulk_create')
         self.fake_phys_plugin.reserve_resource(
             '441c1476-9f8f-4700-9f30-cd9b6fef3509',
             values)
@@ -772,17 +831,14 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             'on_start': 'default'
         }
         host_reservation_create.assert_called_once_with(host_values)
-        calls = [
-            mock.call(
-                {'compute_host_id': 'host1',
-                 'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
-                 }),
-            mock.call(
-                {'compute_host_id': 'host2',
-                 'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
-                 }),
-        ]
-        host_allocation_create.assert_has_calls(calls)
+        host_allocation_create.assert_called_once_with([
+            {'compute_host_id': 'host1',
+             'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
+             },
+            {'compute_host_id': 'host2',
+             'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
+             },
+        ])
 
     def test_create_reservation_hosts_non_reservable(self):
         values = {
@@ -803,7 +859,7 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         matching_hosts.return_value = ['host1', 'host2']
         host_allocation_create = self.patch(
             self.db_api,
-            'host_allocation_create')
+            'host_allocation_bulk_create')
         is_admin = self.patch(
             policy, 'enforce'
         )
@@ -822,17 +878,14 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             'on_start': 'default'
         }
         host_reservation_create.assert_called_once_with(host_values)
-        calls = [
-            mock.call(
-                {'compute_host_id': 'host1',
-                 'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
-                 }),
-            mock.call(
-                {'compute_host_id': 'host2',
-                 'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
-                 }),
-        ]
-        host_allocation_create.assert_has_calls(calls)
+        host_allocation_create.assert_called_once_with([
+            {'compute_host_id': 'host1',
+             'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
+             },
+            {'compute_host_id': 'host2',
+             'reservation_id': '441c1476-9f8f-4700-9f30-cd9b6fef3509',
+             },
+        ])
 
     @ddt.data({"params": {'max': 0}},
               {"params": {'max': -1}},
@@ -994,10 +1047,10 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         ]
         host_allocation_create = self.patch(
             self.db_api,
-            'host_allocation_create')
+            'host_allocation_bulk_create')
         host_allocation_destroy = self.patch(
             self.db_api,
-            'host_allocation_destroy')
+            'host_allocation_bulk_destroy')
 
         self.fake_phys_plugin.update_reservation(
             '706eb3bc-07ed-4383-be93-b32845ece672',
@@ -1106,10 +1159,10 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         ]
         host_allocation_create = self.patch(
             self.db_api,
-            'host_allocation_create')
+            'host_allocation_bulk_create')
         host_allocation_destroy = self.patch(
             self.db_api,
-            'host_allocation_destroy')
+            'host_allocation_bulk_destroy')
 
         self.fake_phys_plugin.update_reservation(
             '706eb3bc-07ed-4383-be93-b32845ece672',
@@ -1158,10 +1211,10 @@ class PhysicalHostPluginTestCase(tests.TestCase):
                                                 {'id': 'host2'}]
         host_allocation_create = self.patch(
             self.db_api,
-            'host_allocation_create')
+            'host_allocation_bulk_create')
         host_allocation_destroy = self.patch(
             self.db_api,
-            'host_allocation_destroy')
+            'host_allocation_bulk_destroy')
         get_reserved_periods = self.patch(self.db_utils,
                                           'get_reserved_periods')
         get_reserved_periods.return_value = [
@@ -1176,12 +1229,12 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         host_reservation_get.assert_called_with(
             '91253650-cc34-4c4f-bbe8-c943aa7d0c9b')
         host_allocation_destroy.assert_called_with(
-            'dd305477-4df8-4547-87f6-69069ee546a6')
+            ['dd305477-4df8-4547-87f6-69069ee546a6'])
         host_allocation_create.assert_called_with(
-            {
+            [{
                 'compute_host_id': 'host2',
                 'reservation_id': '706eb3bc-07ed-4383-be93-b32845ece672'
-            }
+            }]
         )
 
     def test_update_reservation_min_increase_success(self):
@@ -1229,9 +1282,9 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             {'id': 'host3'}
         ]
         host_allocation_destroy = self.patch(self.db_api,
-                                             'host_allocation_destroy')
+                                             'host_allocation_bulk_destroy')
         host_allocation_create = self.patch(self.db_api,
-                                            'host_allocation_create')
+                                            'host_allocation_bulk_create')
         matching_hosts = self.patch(self.fake_phys_plugin, '_matching_hosts')
         matching_hosts.return_value = ['host3']
         host_reservation_update = self.patch(self.db_api,
@@ -1252,10 +1305,10 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         )
         host_allocation_destroy.assert_not_called()
         host_allocation_create.assert_called_with(
-            {
+            [{
                 'compute_host_id': 'host3',
                 'reservation_id': '706eb3bc-07ed-4383-be93-b32845ece672'
-            }
+            }]
         )
         host_reservation_update.assert_called_with(
             '91253650-cc34-4c4f-bbe8-c943aa7d0c9b',
@@ -1367,9 +1420,9 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         ]
         matching_hosts = self.patch(self.fake_phys_plugin, '_matching_hosts')
         host_allocation_destroy = self.patch(self.db_api,
-                                             'host_allocation_destroy')
+                                             'host_allocation_bulk_destroy')
         host_allocation_create = self.patch(self.db_api,
-                                            'host_allocation_create')
+                                            'host_allocation_bulk_create')
         host_reservation_update = self.patch(self.db_api,
                                              'host_reservation_update')
 
@@ -1429,9 +1482,9 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             {'id': 'host3'}
         ]
         host_allocation_destroy = self.patch(self.db_api,
-                                             'host_allocation_destroy')
+                                             'host_allocation_bulk_destroy')
         host_allocation_create = self.patch(self.db_api,
-                                            'host_allocation_create')
+                                            'host_allocation_bulk_create')
         matching_hosts = self.patch(self.fake_phys_plugin, '_matching_hosts')
         matching_hosts.return_value = ['host3']
         host_reservation_update = self.patch(self.db_api,
@@ -1452,10 +1505,10 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         )
         host_allocation_destroy.assert_not_called()
         host_allocation_create.assert_called_with(
-            {
+            [{
                 'compute_host_id': 'host3',
                 'reservation_id': '706eb3bc-07ed-4383-be93-b32845ece672'
-            }
+            }]
         )
         host_reservation_update.assert_called_with(
             '91253650-cc34-4c4f-bbe8-c943aa7d0c9b',
@@ -1509,9 +1562,9 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             {'id': 'host3'}
         ]
         host_allocation_destroy = self.patch(self.db_api,
-                                             'host_allocation_destroy')
+                                             'host_allocation_bulk_destroy')
         host_allocation_create = self.patch(self.db_api,
-                                            'host_allocation_create')
+                                            'host_allocation_bulk_create')
         matching_hosts = self.patch(self.fake_phys_plugin, '_matching_hosts')
         matching_hosts.return_value = ['host3']
         host_get = self.patch(self.db_api, 'host_get')
@@ -1539,10 +1592,10 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         )
         host_allocation_destroy.assert_not_called()
         host_allocation_create.assert_called_with(
-            {
+            [{
                 'compute_host_id': 'host3',
                 'reservation_id': '706eb3bc-07ed-4383-be93-b32845ece672'
-            }
+            }]
         )
         add_computehost.assert_called_with(1, ['host3_hostname'])
         host_reservation_update.assert_called_with(
@@ -1661,7 +1714,7 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             {'id': 'host2'}
         ]
         host_allocation_destroy = self.patch(self.db_api,
-                                             'host_allocation_destroy')
+                                             'host_allocation_bulk_destroy')
         host_reservation_update = self.patch(self.db_api,
                                              'host_reservation_update')
 
@@ -1671,7 +1724,7 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         host_reservation_get.assert_called_with(
             '91253650-cc34-4c4f-bbe8-c943aa7d0c9b')
         host_allocation_destroy.assert_called_with(
-            'dd305477-4df8-4547-87f6-69069ee546a6')
+            ['dd305477-4df8-4547-87f6-69069ee546a6'])
         host_reservation_update.assert_called_with(
             '91253650-cc34-4c4f-bbe8-c943aa7d0c9b',
             {'count_range': '1-1'}
@@ -1716,9 +1769,9 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         matching_hosts = self.patch(self.fake_phys_plugin, '_matching_hosts')
         matching_hosts.return_value = ['host2']
         host_allocation_create = self.patch(self.db_api,
-                                            'host_allocation_create')
+                                            'host_allocation_bulk_create')
         host_allocation_destroy = self.patch(self.db_api,
-                                             'host_allocation_destroy')
+                                             'host_allocation_bulk_destroy')
         host_reservation_update = self.patch(self.db_api,
                                              'host_reservation_update')
 
@@ -1736,13 +1789,13 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             'fake-project'
         )
         host_allocation_create.assert_called_with(
-            {
+            [{
                 'compute_host_id': 'host2',
                 'reservation_id': '706eb3bc-07ed-4383-be93-b32845ece672'
-            }
+            }]
         )
         host_allocation_destroy.assert_called_with(
-            'dd305477-4df8-4547-87f6-69069ee546a6'
+            ['dd305477-4df8-4547-87f6-69069ee546a6']
         )
         host_reservation_update.assert_called_with(
             '91253650-cc34-4c4f-bbe8-c943aa7d0c9b',
@@ -1861,7 +1914,7 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         ]
         host_allocation_destroy = self.patch(
             self.db_api,
-            'host_allocation_destroy')
+            'host_allocation_bulk_destroy')
         get_computehosts = self.patch(self.nova.ReservationPool,
                                       'get_computehosts')
         get_computehosts.return_value = ['host']
@@ -1878,7 +1931,7 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         host_reservation_update.assert_called_with(
             '04de74e8-193a-49d2-9ab8-cba7b49e45e8', {'status': 'completed'})
         host_allocation_destroy.assert_called_with(
-            'bfa9aa0b-8042-43eb-a4e6-4555838bf64f')
+            ['bfa9aa0b-8042-43eb-a4e6-4555838bf64f'])
         list_servers.assert_called_with(search_opts={'node': 'host',
                                                      'all_tenants': 1})
         delete_server.assert_any_call(server='server1')
@@ -1905,7 +1958,7 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         ]
         host_allocation_destroy = self.patch(
             self.db_api,
-            'host_allocation_destroy')
+            'host_allocation_bulk_destroy')
         get_computehosts = self.patch(self.nova.ReservationPool,
                                       'get_computehosts')
         get_computehosts.return_value = ['host']
@@ -1917,10 +1970,26 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         host_reservation_update.assert_called_with(
             '04de74e8-193a-49d2-9ab8-cba7b49e45e8', {'status': 'completed'})
         host_allocation_destroy.assert_called_with(
-            'bfa9aa0b-8042-43eb-a4e6-4555838bf64f')
+            ['bfa9aa0b-8042-43eb-a4e6-4555838bf64f'])
         delete_server.assert_not_called()
         delete_pool.assert_called_with(1)
 
+    def test_rollback_resource(self):
+        host_reservation_get = self.patch(self.db_api, 'host_reservation_get')
+        host_reservation_get.return_value = {
+            'id': '04de74e8-193a-49d2-9ab8-cba7b49e45e8',
+            'reservation_id': '593e7028-c0d1-4d76-8642-2ffd890b324c',
+            'aggregate_id': 1
+        }
+        delete_pool = self.patch(self.nova.ReservationPool, 'delete')
+
+        self.fake_phys_plugin.rollback_resource(
+            '04de74e8-193a-49d2-9ab8-cba7b49e45e8')
+
+        host_reservation_get.assert_called_once_with(
+            '04de74e8-193a-49d2-9ab8-cba7b49e45e8')
+        delete_pool.assert_called_once_with(1)
+
     @skip # these tests pass when ran individually
     def test_heal_reservations_before_start_and_resources_changed(self):
         failed_host = {'id': '1'}
@@ -1960,21 +2029,14 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             {'id': 'host3'},
         ]
 
-        host_get = self.patch(
-            self.db_api,
-            'host_allocation_get_all_by_values')
-
-        def host_allocation_get_all_by_values(**kwargs):
-            if kwargs['compute_host_id'] == 'host1':
-                return True
-        host_get.side_effect = host_allocation_get_all_by_values
-        host_get = self.patch(
+        allocated_get = self.patch(
             self.db_utils,
-            'get_free_periods')
-        host_get.return_value = [
-            (datetime.datetime(2013, 12, 19, 20, 00),
-             datetime.datetime(2013, 12, 19, 21, 00)),
-        ]
+            'get_allocated_resource_ids')
+        allocated_get.return_value = ['host1']
+        free_get = self.patch(
+            self.db_utils,
+            'get_free_resource_ids')
+        free_get.return_value = ['host1']
         dummy_lease = {
             'name': 'lease-name',
             'start_date': datetime.datetime(2020, 1, 1, 12, 00),
@@ -2032,21 +2094,14 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             {'id': 'host3'},
         ]
 
-        host_get = self.patch(
-            self.db_api,
-            'host_allocation_get_all_by_values')
-
-        def host_allocation_get_all_by_values(**kwargs):
-            if kwargs['compute_host_id'] == 'host1':
-                return True
-        host_get.side_effect = host_allocation_get_all_by_values
-        host_get = self.patch(
+        allocated_get = self.patch(
             self.db_utils,
-            'get_free_periods')
-        host_get.return_value = [
-            (datetime.datetime(2013, 12, 19, 20, 00),
-             datetime.datetime(2013, 12, 19, 21, 00)),
-        ]
+            'get_allocated_resource_ids')
+        allocated_get.return_value = ['host1']
+        free_get = self.patch(
+            self.db_utils,
+            'get_free_resource_ids')
+        free_get.return_value = ['host1']
         dummy_lease = {
             'name': 'lease-name',
             'start_date': datetime.datetime(2020, 1, 1, 12, 00),
@@ -2104,21 +2159,14 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             {'id': 'host3'},
         ]
 
-        host_get = self.patch(
-            self.db_api,
-            'host_allocation_get_all_by_values')
-
-        def host_allocation_get_all_by_values(**kwargs):
-            if kwargs['compute_host_id'] == 'host1':
-                return True
-        host_get.side_effect = host_allocation_get_all_by_values
-        host_get = self.patch(
+        allocated_get = self.patch(
             self.db_utils,
-            'get_free_periods')
-        host_get.return_value = [
-            (datetime.datetime(2013, 12, 19, 20, 00),
-             datetime.datetime(2013, 12, 19, 21, 00)),
-        ]
+            'get_allocated_resource_ids')
+        allocated_get.return_value = ['host1']
+        free_get = self.patch(
+            self.db_utils,
+            'get_free_resource_ids')
+        free_get.return_value = ['host1']
 
         dummy_lease = {
             'name': 'lease-name',
@@ -2185,21 +2233,14 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             {'id': 'host2'},
             {'id': 'host3'},
         ]
-        host_get = self.patch(
-            self.db_api,
-            'host_allocation_get_all_by_values')
-
-        def host_allocation_get_all_by_values(**kwargs):
-            if kwargs['compute_host_id'] == 'host1':
-                return True
-        host_get.side_effect = host_allocation_get_all_by_values
-        host_get = self.patch(
+        allocated_get = self.patch(
             self.db_utils,
-            'get_free_periods')
-        host_get.return_value = [
-            (datetime.datetime(2013, 12, 19, 20, 00),
-             datetime.datetime(2013, 12, 19, 21, 00)),
-        ]
+            'get_allocated_resource_ids')
+        allocated_get.return_value = ['host1']
+        free_get = self.patch(
+            self.db_utils,
+            'get_free_resource_ids')
+        free_get.return_value = ['host1']
         self.patch(self.db_api, 'host_allocation_update')
 
         result = self.fake_phys_plugin.monitor.heal_reservations(
@@ -2385,9 +2426,6 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         self.assertEqual(False, result)
 
     def test_matching_hosts_not_allocated_hosts(self):
-        def host_allocation_get_all_by_values(**kwargs):
-            if kwargs['compute_host_id'] == 'host1':
-                return True
         host_get = self.patch(
             self.db_api,
             'reservable_host_get_all_by_queries')
@@ -2396,17 +2434,14 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             {'id': 'host2'},
             {'id': 'host3'},
         ]
-        host_get = self.patch(
-            self.db_api,
-            'host_allocation_get_all_by_values')
-        host_get.side_effect = host_allocation_get_all_by_values
-        host_get = self.patch(
+        allocated_get = self.patch(
             self.db_utils,
-            'get_free_periods')
-        host_get.return_value = [
-            (datetime.datetime(2013, 12, 19, 20, 00),
-             datetime.datetime(2013, 12, 19, 21, 00)),
-        ]
+            'get_allocated_resource_ids')
+        allocated_get.return_value = ['host1']
+        free_get = self.patch(
+            self.db_utils,
+            'get_free_resource_ids')
+        free_get.return_value = ['host1']
         is_admin = self.patch(
             policy, 'enforce'
         )
@@ -2420,9 +2455,6 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         self.assertEqual(set(['host2', 'host3']), set(result))
 
     def test_matching_hosts_allocated_hosts(self):
-        def host_allocation_get_all_by_values(**kwargs):
-            if kwargs['compute_host_id'] == 'host1':
-                return True
         host_get = self.patch(
             self.db_api,
             'reservable_host_get_all_by_queries')
@@ -2431,17 +2463,14 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             {'id': 'host2'},
             {'id': 'host3'},
         ]
-        host_get = self.patch(
-            self.db_api,
-            'host_allocation_get_all_by_values')
-        host_get.side_effect = host_allocation_get_all_by_values
-        host_get = self.patch(
+        allocated_get = self.patch(
             self.db_utils,
-            'get_free_periods')
-        host_get.return_value = [
-            (datetime.datetime(2013, 12, 19, 20, 00),
-             datetime.datetime(2013, 12, 19, 21, 00)),
-        ]
+            'get_allocated_resource_ids')
+        allocated_get.return_value = ['host1']
+        free_get = self.patch(
+            self.db_utils,
+            'get_free_resource_ids')
+        free_get.return_value = ['host1']
         is_admin = self.patch(
             policy, 'enforce'
         )
@@ -2454,11 +2483,15 @@ class PhysicalHostPluginTestCase(tests.TestCase):
         )
         self.assertEqual(set(['host1', 'host2', 'host3']), set(result))
 
-    def test_matching_hosts_allocated_hosts_with_cleaning_time(self):
-        def host_allocation_get_all_by_values(**kwargs):
-            if kwargs['compute_host_id'] == 'host1':
-                return True
-        self.cfg.CONF.set_override('cleaning_time', '5')
+    def test_matching_hosts_with_availability_index(self):
+        index = availability.AvailabilityIndex()
+        index.add('host', 'alloc1', 'host1', 'rsrv1', 'lease1',
+                  datetime.datetime(2013, 12, 19, 20, 30),
+                  datetime.datetime(2013, 12, 19, 22, 00))
+        index.add('host', 'alloc2', 'host2', 'rsrv2', 'lease2',
+                  datetime.datetime(2013, 12, 19, 18, 00),
+                  datetime.datetime(2013, 12, 19, 20, 00))
+        self.patch(availability, 'get_index').return_value = index
         host_get = self.patch(
             self.db_api,
             'reservable_host_get_all_by_queries')
@@ -2467,19 +2500,43 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             {'id': 'host2'},
             {'id': 'host3'},
         ]
+        allocated_get = self.patch(
+            self.db_utils,
+            'get_allocated_resource_ids')
+        free_get = self.patch(
+            self.db_utils,
+            'get_free_resource_ids')
+        is_admin = self.patch(
+            policy, 'enforce'
+        )
+        is_admin.return_value = False
+        result = self.fake_phys_plugin._matching_hosts(
+            '[]', '[]', '2-3',
+            datetime.datetime(2013, 12, 19, 20, 00),
+            datetime.datetime(2013, 12, 19, 21, 00),
+            None)
+        self.assertEqual(['host2', 'host3'], result)
+        allocated_get.assert_not_called()
+        free_get.assert_not_called()
+
+    def test_matching_hosts_allocated_hosts_with_cleaning_time(self):
+        self.cfg.CONF.set_override('cleaning_time', '5')
         host_get = self.patch(
             self.db_api,
-            'host_allocation_get_all_by_values')
-        host_get.side_effect = host_allocation_get_all_by_values
-        host_get = self.patch(
-            self.db_utils,
-            'get_free_periods')
+            'reservable_host_get_all_by_queries')
         host_get.return_value = [
-            (datetime.datetime(2013, 12, 19, 20, 00)
-             - datetime.timedelta(minutes=5),
-             datetime.datetime(2013, 12, 19, 21, 00)
-             + datetime.timedelta(minutes=5))
+            {'id': 'host1'},
+            {'id': 'host2'},
+            {'id': 'host3'},
         ]
+        allocated_get = self.patch(
+            self.db_utils,
+            'get_allocated_resource_ids')
+        allocated_get.return_value = ['host1']
+        free_get = self.patch(
+            self.db_utils,
+            'get_free_resource_ids')
+        free_get.return_value = ['host1']
         is_admin = self.patch(
             policy, 'enforce'
         )
@@ -2491,12 +2548,15 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             None)
         self.addCleanup(CONF.clear_override, 'cleaning_time')
         self.assertEqual(['host1', 'host2', 'host3'], result)
+        free_get.assert_called_once_with(
+            'host', ['host1'],
+            datetime.datetime(2013, 12, 19, 20, 00)
+            - datetime.timedelta(minutes=5),
+            datetime.datetime(2013, 12, 19, 21, 00)
+            + datetime.timedelta(minutes=5))
 
     @mock.patch.object(random.Random, "shuffle")
     def test_random_matching_hosts_not_allocated_hosts(self, mock_shuffle):
-        def host_allocation_get_all_by_values(**kwargs):
-            if kwargs['compute_host_id'] == 'host1':
-                return True
         self.cfg.CONF.set_override('randomize_host_selection', True,
                                    group=plugin.RESOURCE_TYPE)
         host_get = self.patch(
@@ -2507,17 +2567,14 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             {'id': 'host2'},
             {'id': 'host3'},
         ]
-        host_get = self.patch(
-            self.db_api,
-            'host_allocation_get_all_by_values')
-        host_get.side_effect = host_allocation_get_all_by_values
-        host_get = self.patch(
+        allocated_get = self.patch(
             self.db_utils,
-            'get_free_periods')
-        host_get.return_value = [
-            (datetime.datetime(2013, 12, 19, 20, 00),
-             datetime.datetime(2013, 12, 19, 21, 00)),
-        ]
+            'get_allocated_resource_ids')
+        allocated_get.return_value = ['host1']
+        free_get = self.patch(
+            self.db_utils,
+            'get_free_resource_ids')
+        free_get.return_value = ['host1']
         is_admin = self.patch(
             policy, 'enforce'
         )
@@ -2533,9 +2590,6 @@ class PhysicalHostPluginTestCase(tests.TestCase):
 
     @mock.patch.object(random.Random, "shuffle")
     def test_random_matching_hosts_allocated_hosts(self, mock_shuffle):
-        def host_allocation_get_all_by_values(**kwargs):
-            if kwargs['compute_host_id'] == 'host1':
-                return True
         self.cfg.CONF.set_override('randomize_host_selection', True,
                                    group=plugin.RESOURCE_TYPE)
         host_get = self.patch(
@@ -2546,17 +2600,14 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             {'id': 'host2'},
             {'id': 'host3'},
         ]
-        host_get = self.patch(
-            self.db_api,
-            'host_allocation_get_all_by_values')
-        host_get.side_effect = host_allocation_get_all_by_values
-        host_get = self.patch(
+        allocated_get = self.patch(
             self.db_utils,
-            'get_free_periods')
-        host_get.return_value = [
-            (datetime.datetime(2013, 12, 19, 20, 00),
-             datetime.datetime(2013, 12, 19, 21, 00)),
-        ]
+            'get_allocated_resource_ids')
+        allocated_get.return_value = ['host1']
+        free_get = self.patch(
+            self.db_utils,
+            'get_free_resource_ids')
+        free_get.return_value = ['host1']
         is_admin = self.patch(
             policy, 'enforce'
         )
@@ -2572,9 +2623,6 @@ class PhysicalHostPluginTestCase(tests.TestCase):
 
     @mock.patch.object(random.Random, "shuffle")
     def test_random_matching_hosts_allocated_cleaning_time(self, mock_shuffle):
-        def host_allocation_get_all_by_values(**kwargs):
-            if kwargs['compute_host_id'] == 'host1':
-                return True
         self.cfg.CONF.set_override('randomize_host_selection', True,
                                    group=plugin.RESOURCE_TYPE)
         self.cfg.CONF.set_override('cleaning_time', '5')
@@ -2586,19 +2634,14 @@ class PhysicalHostPluginTestCase(tests.TestCase):
             {'id': 'host2'},
             {'id': 'host3'},
         ]
-        host_get = self.patch(
-            self.db_api,
-            'host_allocation_get_all_by_values')
-        host_get.side_effect = host_allocation_get_all_by_values
-        host_get = self.patch(
+        allocated_get = self.patch(
             self.db_utils,
-            'get_free_periods')
-        host_get.return_value = [
-            (datetime.datetime(2013, 12, 19, 20, 00)
-             - datetime.timedelta(minutes=5),
-             datetime.datetime(2013, 12, 19, 21, 00)
-             + datetime.timedelta(minutes=5))
-        ]
+            'get_allocated_resource_ids')
+        allocated_get.return_value = ['host1']
+        free_get = self.patch(
+            self.db_utils,
+            'get_free_resource_ids')
+        free_get.return_value = ['host1']
         is_admin = self.patch(
             policy, 'enforce'
         )
@@ -2767,6 +2810,7 @@ class PhysicalHostMonitorPluginTestCase(tests.TestCase):
         self.cfg.CONF.set_override('enable_polling_monitor_dry_run', 'false', group='physical:host')
         self.patch(nova_client, 'Client')
         self.host_monitor_plugin = host_plugin.PhysicalHostMonitorPlugin()
+        self.host_monitor_plugin._host_states.clear()
 
     def test_notification_callback_disabled_true(self):
         failed_host = {'hypervisor_hostname': 'hypvsr1', 'id': '1', 'disabled': False}
@@ -2987,6 +3031,49 @@ class PhysicalHostMonitorPluginTestCase(tests.TestCase):
         result = self.host_monitor_plugin.poll_resource_failures()
         self.assertEqual(([], hosts), result)
 
+    def test_poll_resource_failures_unchanged(self):
+        hosts = [
+            {'id': '1',
+             'hypervisor_hostname': 'hypvsr1',
+             'reservable': True},
+        ]
+
+        host_get_all = self.patch(db_api,
+                                  'host_get_all_by_filters')
+        host_get_all.return_value = hosts
+        hypervisors_list = self.patch(
+            self.host_monitor_plugin.nova.hypervisors, 'list')
+        hypervisors_list.return_value = [
+            mock.MagicMock(id=1, state='down', status='enabled')]
+
+        result = self.host_monitor_plugin.poll_resource_failures()
+        self.assertEqual((hosts, []), result)
+        hypervisors_list.assert_called_with(detailed=False)
+
+        # The host was set as not reservable and its hypervisor is still down
+        failed_hosts = [dict(hosts[0], reservable=False)]
+        host_get_all.return_value = failed_hosts
+        result = self.host_monitor_plugin.poll_resource_failures()
+        self.assertEqual(([], []), result)
+
+        # The host was set as reservable again without its hypervisor changing
+        host_get_all.return_value = hosts
+        result = self.host_monitor_plugin.poll_resource_failures()
+        self.assertEqual((hosts, []), result)
+
+    def test_set_reservable_bulk(self):
+        hosts = [
+            {'id': '1', 'hypervisor_hostname': 'hypvsr1'},
+            {'id': '2', 'hypervisor_hostname': 'hypvsr2', 'disabled': True},
+            {'id': '3', 'hypervisor_hostname': 'hypvsr3'},
+        ]
+        host_bulk_update = self.patch(db_api, 'host_bulk_update')
+
+        self.host_monitor_plugin.set_reservable_bulk(hosts, False)
+
+        host_bulk_update.assert_called_once_with(['1', '3'],
+                                                 {'reservable': False})
+
     def test_heal(self):
         failed_hosts = [
             {'id': '1',
@@ -3024,14 +3111,11 @@ class PhysicalHostMonitorPluginTestCase(tests.TestCase):
         self.assertEqual(reservation_flags, result)
 
     def test_poll_resource_failures_aggregate_cleanup(self):
-        def fake_get_reservations_by_host_id(host_id):
-            host_reservations = {
-                1 : {'reservation_status': status.reservation.ERROR, 'reservation_id': 1},
-                2 : {'reservation_status': status.reservation.ACTIVE, 'reservation_id': 2},
-                # if the host has no reservations, it should be moved to freepool
-                3: None
-            }
-            return host_reservations[host_id]
+        host_reservations = {
+            1: {'reservation_status': status.reservation.ERROR, 'reservation_id': 1},
+            2: {'reservation_status': status.reservation.ACTIVE, 'reservation_id': 2},
+            # if the host has no reservations, it should be moved to freepool
+        }
 
         # Create a list of hosts
         host_in_errored_res = {
@@ -3056,39 +3140,62 @@ class PhysicalHostMonitorPluginTestCase(tests.TestCase):
             host_in_active_res,
             host_in_freepool,
         ]
-        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_host_id')
-        get_reservations.side_effect = fake_get_reservations_by_host_id
+        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_host_ids')
+        get_reservations.return_value = host_reservations
 
         # Create mock aggregate objects
-        aggregate1 = mock.MagicMock(id=1, hosts=[host_in_errored_res["hypervisor_hostname"]])
+        owner = {'blazar:owner': 'project'}
+        aggregate1 = mock.MagicMock(id=1, hosts=[host_in_errored_res["hypervisor_hostname"]],
+                                    metadata=owner)
         aggregate1.configure_mock(name="aggregate-1")
-        aggregate2 = mock.MagicMock(id=2, hosts=[host_in_active_res["hypervisor_hostname"]])
+        aggregate2 = mock.MagicMock(id=2, hosts=[host_in_active_res["hypervisor_hostname"]],
+                                    metadata=owner)
         aggregate2.configure_mock(name="aggregate-2")
-        freepool = mock.MagicMock(id=3, hosts=[host_in_freepool["hypervisor_hostname"]])
+        freepool = mock.MagicMock(id=3, hosts=[host_in_freepool["hypervisor_hostname"]],
+                                  metadata={})
         freepool.configure_mock(name="freepool")
-        freepool_get = self.patch(nova.ReservationPool, 'get_aggregate_from_name_or_id')
-        freepool_get.return_value = freepool
-        hosts_in_agg = self.patch(nova.ReservationPool, 'get_computehosts')
-        hosts_in_agg.return_value = None
 
-        list_aggregates = self.patch(
-            self.host_monitor_plugin.nova.aggregates, 'list'
-        )
+        aggregates = self.host_monitor_plugin.nova.aggregates
+        list_aggregates = self.patch(aggregates, 'list')
         list_aggregates.return_value = [aggregate1, aggregate2, freepool]
+        add_host = self.patch(aggregates, 'add_host')
+        remove_host = self.patch(aggregates, 'remove_host')
+        delete = self.patch(aggregates, 'delete')
         failed_hosts, recovered_hosts = self.host_monitor_plugin.poll_resource_failures()
 
         self.assertEqual(failed_hosts, [])
         self.assertEqual(recovered_hosts, [])
-        freepool.add_host.assert_has_calls([
-            mock.call(host_in_errored_res["hypervisor_hostname"]),
-        ])
-        aggregate1.remove_host.assert_called_with(host_in_errored_res["hypervisor_hostname"])
-        aggregate1.delete.assert_called_with()
+        get_reservations.assert_called_once_with([1, 2, 3])
+        add_host.assert_called_once_with(freepool.id, host_in_errored_res["hypervisor_hostname"])
+        remove_host.assert_called_once_with(aggregate1.id, host_in_errored_res["hypervisor_hostname"])
+        delete.assert_called_once_with(aggregate1.id)
 
-    def test_poll_resource_failures_agg_cleanup_dry_run(self):
-        def fake_get_reservations_by_host_id(host_id):
-            return {'reservation_status': status.reservation.ERROR, 'reservation_id': 1}
+    def test_poll_resource_failures_agg_cleanup_failed(self):
+        host = {'id': 1, 'hypervisor_hostname': 'host-1'}
+        hosts_get_all = self.patch(db_api, 'host_get_all_by_filters')
+        hosts_get_all.return_value = []
+        self.patch(db_api, 'host_list').return_value = [host]
+        self.patch(db_utils, 'get_most_recent_reservation_info_by_host_ids').return_value = {}
+
+        aggregate1 = mock.MagicMock(id=1, hosts=[host["hypervisor_hostname"]],
+                                    metadata={'blazar:owner': 'project'})
+        aggregate1.configure_mock(name="aggregate-1")
+        freepool = mock.MagicMock(id=3, hosts=[], metadata={})
+        freepool.configure_mock(name="freepool")
+
+        aggregates = self.host_monitor_plugin.nova.aggregates
+        self.patch(aggregates, 'list').return_value = [aggregate1, freepool]
+        self.patch(aggregates, 'remove_host').side_effect = nova_exceptions.NotFound(404)
+        add_host = self.patch(aggregates, 'add_host')
+        delete = self.patch(aggregates, 'delete')
+        failed_hosts, recovered_hosts = self.host_monitor_plugin.poll_resource_failures()
 
+        self.assertEqual([host], failed_hosts)
+        self.assertEqual([], recovered_hosts)
+        add_host.assert_not_called()
+        delete.assert_not_called()
+
+    def test_poll_resource_failures_agg_cleanup_dry_run(self):
         self.cfg.CONF.set_override('enable_polling_monitor_dry_run', 'true', group='physical:host')
 
         # Create a list of hosts
@@ -3099,27 +3206,27 @@ class PhysicalHostMonitorPluginTestCase(tests.TestCase):
         hosts_get_all.return_value = []
         hosts_list = self.patch(db_api, 'host_list')
         hosts_list.return_value = [host_in_errored_res,]
-        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_host_id')
-        get_reservations.side_effect = fake_get_reservations_by_host_id
+        get_reservations = self.patch(db_utils, 'get_most_recent_reservation_info_by_host_ids')
+        get_reservations.return_value = {
+            1: {'reservation_status': status.reservation.ERROR, 'reservation_id': 1}}
 
         # Create mock aggregate objects
-        aggregate1 = mock.MagicMock(id=1, hosts=[host_in_errored_res["hypervisor_hostname"]])
+        aggregate1 = mock.MagicMock(id=1, hosts=[host_in_errored_res["hypervisor_hostname"]],
+                                    metadata={'blazar:owner': 'project'})
         aggregate1.configure_mock(name="aggregate-1")
-        freepool = mock.MagicMock(id=3, hosts=[])
+        freepool = mock.MagicMock(id=3, hosts=[], metadata={})
         freepool.configure_mock(name="freepool")
-        freepool_get = self.patch(nova.ReservationPool, 'get_aggregate_from_name_or_id')
-        freepool_get.return_value = freepool
-        hosts_in_agg = self.patch(nova.ReservationPool, 'get_computehosts')
-        hosts_in_agg.return_value = None
 
-        list_aggregates = self.patch(
-            self.host_monitor_plugin.nova.aggregates, 'list'
-        )
+        aggregates = self.host_monitor_plugin.nova.aggregates
+        list_aggregates = self.patch(aggregates, 'list')
         list_aggregates.return_value = [aggregate1, freepool]
+        add_host = self.patch(aggregates, 'add_host')
+        remove_host = self.patch(aggregates, 'remove_host')
+        delete = self.patch(aggregates, 'delete')
         failed_hosts, recovered_hosts = self.host_monitor_plugin.poll_resource_failures()
 
         self.assertEqual(failed_hosts, [])
         self.assertEqual(recovered_hosts, [])
-        self.assertFalse(freepool.add_host.called)
-        self.assertFalse(aggregate1.remove_host.called)
-        self.assertFalse(aggregate1.delete.called)
\ No newline at end of file
+        self.assertFalse(add_host.called)
+        self.assertFalse(remove_host.called)
+        self.assertFalse(delete.called)
\ No newline at end of file
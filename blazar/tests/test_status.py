@@ -189,7 +189,7 @@ class LeaseStatusTestCase(tests.TestCase):
 
         dummy_start_lease(lease_id=self.lease_id)
 
-        lease_get.assert_called_with(self.lease_id)
+        lease_get.assert_called_with(self.lease_id, profile='summary')
         lease_update.assert_has_calls(
             [call(self.lease_id, {'status': status.LeaseStatus.STARTING}),
              call(self.lease_id, {'status': status.LeaseStatus.ACTIVE})])
@@ -214,7 +214,7 @@ class LeaseStatusTestCase(tests.TestCase):
                           dummy_start_lease,
                           lease_id=self.lease_id)
 
-        lease_get.assert_called_once_with(self.lease_id)
+        lease_get.assert_called_once_with(self.lease_id, profile='summary')
         lease_update.assert_not_called()
 
     def test_lease_status_func_raise_exception(self):
@@ -237,7 +237,7 @@ class LeaseStatusTestCase(tests.TestCase):
                           dummy_start_lease,
                           lease_id=self.lease_id)
 
-        lease_get.assert_called_once_with(self.lease_id)
+        lease_get.assert_called_once_with(self.lease_id, profile='summary')
         lease_update.assert_has_calls(
             [call(self.lease_id, {'status': status.LeaseStatus.STARTING}),
              call(self.lease_id, {'status': status.LeaseStatus.ERROR})])
@@ -271,7 +271,7 @@ class LeaseStatusTestCase(tests.TestCase):
                           dummy_start_lease,
                           lease_id=self.lease_id)
 
-        lease_get.assert_called_once_with(self.lease_id)
+        lease_get.assert_called_once_with(self.lease_id, profile='summary')
         lease_update.assert_has_calls(
             [call(self.lease_id, {'status': status.LeaseStatus.STARTING}),
              call(self.lease_id, {'status': status.LeaseStatus.PENDING})])
@@ -298,7 +298,7 @@ class LeaseStatusTestCase(tests.TestCase):
                           dummy_start_lease,
                           lease_id=self.lease_id)
 
-        lease_get.assert_called_with(self.lease_id)
+        lease_get.assert_called_with(self.lease_id, profile='summary')
         lease_update.assert_has_calls(
             [call(self.lease_id, {'status': status.LeaseStatus.STARTING}),
              call(self.lease_id, {'status': status.LeaseStatus.ERROR})])
@@ -321,7 +321,7 @@ class LeaseStatusTestCase(tests.TestCase):
 
         dummy_start_lease(lease_id=self.lease_id)
 
-        lease_get.assert_called_with(self.lease_id)
+        lease_get.assert_called_with(self.lease_id, profile='summary')
         lease_update.assert_called_once_with(
             self.lease_id, {'status': status.LeaseStatus.STARTING})
 
@@ -13,6 +13,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from unittest import mock
+
+import fixtures
+
+from blazar import context
 from blazar.manager import exceptions
 from blazar import tests
 from blazar.utils.openstack import base
@@ -107,3 +112,100 @@ class TestBaseStackUtils(tests.TestCase):
         self.assertRaises(exceptions.EndpointsNotFound, self.base.url_for,
                           service_catalog, self.service_type,
                           os_region_name='RegionTwo')
+
+
+class TestSessionCache(tests.TestCase):
+
+    def setUp(self):
+        super(TestSessionCache, self).setUp()
+        self.useFixture(fixtures.MockPatchObject(
+            base, 'SESSION_STATS', {'created': 0, 'hits': 0, 'expired': 0}))
+
+    def _get_session(self, username='admin', **kwargs):
+        return base.get_session(auth_url='http://keystone/v3',
+                                username=username, password='pass',
+                                user_domain_name='Default',
+                                project_domain_name='Default',
+                                project_name='admin', **kwargs)
+
+    def test_get_session_cached(self):
+        sess = self._get_session()
+
+        self.assertIs(sess, self._get_session())
+        self.assertIsNot(sess, self._get_session(username='other'))
+        self.assertIsNot(sess, self._get_session(trust_id='trust'))
+        self.assertEqual({'created': 3, 'hits': 1, 'expired': 0},
+                         base.SESSION_STATS)
+
+    def test_sessions_share_connections(self):
+        self.assertIs(self._get_session().session,
+                      self._get_session(username='other').session)
+
+    def test_get_session_expired(self):
+        sess = self._get_session()
+        sess.auth.auth_ref = mock.Mock()
+        sess.auth.auth_ref.will_expire_soon.return_value = True
+
+        self.assertIsNot(sess, self._get_session())
+        self.assertEqual(1, base.SESSION_STATS['expired'])
+
+    def test_get_session_lru(self):
+        self.useFixture(fixtures.MockPatchObject(base, 'SESSION_CACHE_SIZE',
+                                                 2))
+        sess = self._get_session(username='user1')
+        self._get_session(username='user2')
+        self._get_session(username='user1')
+        self._get_session(username='user3')
+
+        self.assertIs(sess, self._get_session(username='user1'))
+        self.assertEqual(3, base.SESSION_STATS['created'])
+        self._get_session(username='user2')
+        self.assertEqual(4, base.SESSION_STATS['created'])
+
+    def test_invalidate_session(self):
+        sess = self._get_session()
+
+        base.invalidate_session(sess)
+
+        self.assertIsNot(sess, self._get_session())
+
+
+class TestClientCache(tests.TestCase):
+
+    def setUp(self):
+        super(TestClientCache, self).setUp()
+        self.client_class = mock.Mock(side_effect=lambda **kw: mock.Mock())
+
+    def test_get_client_cached(self):
+        client = base.get_client(self.client_class, trust_id='trust')
+
+        self.assertIs(client, base.get_client(self.client_class,
+                                              trust_id='trust'))
+        self.assertIsNot(client, base.get_client(self.client_class))
+        self.client_class.assert_has_calls([mock.call(trust_id='trust'),
+                                            mock.call()])
+        self.assertEqual(2, self.client_class.call_count)
+
+    def test_get_client_per_context(self):
+        client = base.get_client(self.client_class)
+
+        with context.BlazarContext(global_request_id='req-1'):
+            request_client = base.get_client(self.client_class)
+            self.assertIsNot(client, request_client)
+            self.assertIs(request_client, base.get_client(self.client_class))
+
+    def test_get_client_lru(self):
+        self.useFixture(fixtures.MockPatchObject(base, 'CLIENT_CACHE_SIZE',
+                                                 1))
+        client = base.get_client(self.client_class, trust_id='trust1')
+        base.get_client(self.client_class, trust_id='trust2')
+
+        self.assertIsNot(client, base.get_client(self.client_class,
+                                                 trust_id='trust1'))
+
+    def test_invalidate_session_drops_clients(self):
+        client = base.get_client(self.client_class)
+
+        base.invalidate_session(mock.Mock())
+
+        self.assertIsNot(client, base.get_client(self.client_class))
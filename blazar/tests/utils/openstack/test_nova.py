@@ -139,6 +139,96 @@ class ReservationPoolTestCase(tests.TestCase):
             self.pool.get_aggregate_from_name_or_id(self.fake_aggregate),
             self.fake_aggregate)
 
+    def test_get_aggregate_from_name_or_id_cached(self):
+        self.nova.aggregates.list.return_value = [self.fake_aggregate,
+                                                  self.fake_freepool]
+
+        self.assertEqual(self.fake_aggregate,
+                         self.pool.get_aggregate_from_name_or_id('fooname'))
+        self.assertEqual(self.fake_freepool,
+                         self.pool.get_aggregate_from_name_or_id(
+                             self.freepool_name))
+        self.assertEqual(self.fake_aggregate,
+                         self.pool.get_aggregate_from_name_or_id(
+                             self.fake_aggregate.id))
+        self.nova.aggregates.list.assert_called_once_with()
+        self.nova.aggregates.get.assert_not_called()
+
+    def test_get_aggregate_from_name_or_id_cache_expired(self):
+        self.nova.aggregates.list.return_value = [self.fake_aggregate]
+        self.nova.aggregates.get.return_value = self.fake_aggregate
+        monotonic = self.patch(nova.time, 'monotonic')
+        monotonic.return_value = 100
+
+        self.pool.get_aggregate_from_name_or_id('fooname')
+        monotonic.return_value = 100 + CONF.nova.aggregate_cache_ttl
+        self.pool.get_aggregate_from_name_or_id('fooname')
+
+        self.nova.aggregates.list.assert_called_once_with()
+        self.nova.aggregates.get.assert_called_once_with(
+            self.fake_aggregate.id)
+
+    def test_get_aggregate_from_name_or_id_cache_disabled(self):
+        self.cfg.config(aggregate_cache_ttl=0, group='nova')
+        self.nova.aggregates.list.return_value = [self.fake_aggregate]
+
+        self.pool.get_aggregate_from_name_or_id('fooname')
+        self.pool.get_aggregate_from_name_or_id('fooname')
+
+        self.assertEqual(2, self.nova.aggregates.list.call_count)
+
+    def test_add_computehost_updates_cached_hosts(self):
+        self.nova.aggregates.list.return_value = [self.fake_aggregate,
+                                                  self.fake_freepool]
+        self.patch(self.nova, 'servers')
+
+        self.pool.add_computehost('fooname', 'host3')
+
+        self.assertEqual(['host1', 'host2', 'host3'],
+                         self.pool.get('fooname').hosts)
+        self.assertEqual([], self.pool.get(self.freepool_name).hosts)
+        self.nova.aggregates.list.assert_called_once_with()
+
+    def test_add_computehost_refreshes_stale_freepool(self):
+        fresh_freepool = AggregateFake(i=self.fake_freepool.id,
+                                       name=self.freepool_name,
+                                       hosts=['host3', 'host4'])
+        self.nova.aggregates.list.side_effect = [
+            [self.fake_aggregate, self.fake_freepool],
+            [self.fake_aggregate, fresh_freepool]]
+        self.patch(self.nova, 'servers')
+
+        self.pool.add_computehost('fooname', 'host4')
+
+        self.assertEqual(2, self.nova.aggregates.list.call_count)
+        self.nova.aggregates.add_host.assert_called_once_with(
+            self.fake_aggregate.id, 'host4')
+        self.nova.aggregates.remove_host.assert_called_once_with(
+            self.fake_freepool.id, 'host4')
+
+    def test_add_computehost_not_in_refreshed_freepool(self):
+        self.nova.aggregates.list.return_value = [self.fake_aggregate,
+                                                  self.fake_freepool]
+
+        self.assertRaises(manager_exceptions.HostNotInFreePool,
+                          self.pool.add_computehost, 'fooname', 'host4')
+
+        self.assertEqual(2, self.nova.aggregates.list.call_count)
+        self.nova.aggregates.add_host.assert_not_called()
+
+    def test_add_computehost_conflict_forgets_aggregate(self):
+        self.nova.aggregates.list.return_value = [self.fake_aggregate,
+                                                  self.fake_freepool]
+        self.nova.aggregates.add_host.side_effect = [
+            nova_exceptions.Conflict(409), None]
+        self.patch(self.nova, 'servers')
+
+        self.assertRaises(manager_exceptions.AggregateAlreadyHasHost,
+                          self.pool.add_computehost, 'fooname', 'host3')
+        self.pool.get('fooname')
+
+        self.assertEqual(2, self.nova.aggregates.list.call_count)
+
     def test_generate_aggregate_name(self):
         self.uuidgen = uuidgen
         self.patch(uuidgen, 'uuid4').return_value = 'foo'
@@ -290,22 +380,96 @@ class ReservationPoolTestCase(tests.TestCase):
         check.assert_called_once_with(self.fake_freepool.id, 'host2')
 
     def test_add_computehost_revert(self):
+        def add_host(agg_id, host):
+            if agg_id == self.fake_aggregate.id and host == 'host2':
+                raise nova_exceptions.NotFound(404)
+
         self._patch_get_aggregate_from_name_or_id()
+        self.patch(self.nova, 'servers')
+        self.fake_aggregate.hosts = []
         self.fake_freepool.hosts = ['host1', 'host2']
-        self.assertRaises(manager_exceptions.HostNotInFreePool,
+        self.nova.aggregates.add_host.side_effect = add_host
+        self.assertRaises(manager_exceptions.HostNotFound,
                           self.pool.add_computehost,
-                          'pool', ['host1', 'host2', 'host3'])
+                          'pool', ['host1', 'host2'])
 
         check0 = self.nova.aggregates.add_host
         check0.assert_has_calls([mock.call(self.fake_aggregate.id, 'host1'),
                                  mock.call(self.fake_aggregate.id, 'host2'),
                                  mock.call(self.fake_freepool.id, 'host1'),
-                                 mock.call(self.fake_freepool.id, 'host2')])
+                                 mock.call(self.fake_freepool.id, 'host2')],
+                                any_order=True)
         check1 = self.nova.aggregates.remove_host
         check1.assert_has_calls([mock.call(self.fake_freepool.id, 'host1'),
                                  mock.call(self.fake_freepool.id, 'host2'),
-                                 mock.call(self.fake_aggregate.id, 'host1'),
-                                 mock.call(self.fake_aggregate.id, 'host2')])
+                                 mock.call(self.fake_aggregate.id, 'host1')],
+                                any_order=True)
+        self.nova.servers.list.assert_not_called()
+
+    def test_add_computehost_some_not_in_freepool(self):
+        self._patch_get_aggregate_from_name_or_id()
+        self.fake_freepool.hosts = ['host1', 'host2']
+        self.assertRaises(manager_exceptions.HostNotInFreePool,
+                          self.pool.add_computehost,
+                          'pool', ['host1', 'host2', 'host3'])
+
+        self.nova.aggregates.add_host.assert_not_called()
+        self.nova.aggregates.remove_host.assert_not_called()
+
+    def test_reconcile(self):
+        self._patch_get_aggregate_from_name_or_id()
+        self.fake_freepool.hosts = ['host3', 'host4']
+
+        result = self.pool.reconcile(
+            {self.fake_aggregate.id: ['host2', 'host3']},
+            sources=[self.freepool_name])
+
+        self.nova.aggregates.remove_host.assert_called_once_with(
+            self.fake_freepool.id, 'host3')
+        self.nova.aggregates.add_host.assert_called_once_with(
+            self.fake_aggregate.id, 'host3')
+        self.assertTrue(result.succeeded)
+        self.assertEqual([(self.fake_aggregate.id, 'host3')], result.added)
+        self.assertEqual([(self.fake_freepool.id, 'host3')], result.removed)
+
+    def test_reconcile_dry_run(self):
+        self._patch_get_aggregate_from_name_or_id()
+
+        result = self.pool.reconcile({self.freepool_name: ['host1']},
+                                     sources=[self.fake_aggregate.id],
+                                     dry_run=True)
+
+        self.nova.aggregates.remove_host.assert_not_called()
+        self.nova.aggregates.add_host.assert_not_called()
+        self.assertEqual([(self.fake_freepool.id, 'host1')], result.added)
+        self.assertEqual([(self.fake_aggregate.id, 'host1')], result.removed)
+
+    def test_reconcile_retries(self):
+        self._patch_get_aggregate_from_name_or_id()
+        sleep = self.patch(nova.time, 'sleep')
+        self.nova.aggregates.add_host.side_effect = [
+            nova_exceptions.ClientException(500), None]
+
+        result = self.pool.reconcile({self.fake_aggregate.id: ['host3']})
+
+        self.assertTrue(result.succeeded)
+        self.assertEqual(2, self.nova.aggregates.add_host.call_count)
+        sleep.assert_called_once_with(1)
+
+    def test_reconcile_failed(self):
+        self._patch_get_aggregate_from_name_or_id()
+        self.patch(nova.time, 'sleep')
+        error = nova_exceptions.ClientException(500)
+        self.nova.aggregates.remove_host.side_effect = error
+
+        result = self.pool.reconcile({self.fake_aggregate.id: ['host3']},
+                                     sources=[self.fake_freepool.id])
+
+        self.assertFalse(result.succeeded)
+        self.assertEqual({'host3': error}, result.failed)
+        self.assertEqual(CONF.nova.aggregate_update_retries + 1,
+                         self.nova.aggregates.remove_host.call_count)
+        self.nova.aggregates.add_host.assert_not_called()
 
     def test_remove_computehost_from_freepool(self):
         self._patch_get_aggregate_from_name_or_id()
@@ -15,6 +15,7 @@ from unittest import mock
 
 from blazar import tests
 from blazar.tests import fake_requests
+from blazar.utils.openstack import base
 from blazar.utils.openstack import exceptions
 from blazar.utils.openstack import placement
 
@@ -37,12 +38,31 @@ class TestPlacementClient(tests.TestCase):
         self.cfg.config(os_auth_version='v3')
         self.cfg.config(os_region_name='region_foo')
         self.client = placement.BlazarPlacementClient()
+        self.addCleanup(base.clear_session_cache)
 
     def test_client_auth_url(self):
         client = self.client._create_client()
         self.assertEqual("http://foofoo:8080/identity/v3",
                          client.session.auth.auth_url)
 
+    def test_client_session_cached(self):
+        client = self.client._create_client()
+        other_client = placement.BlazarPlacementClient()._create_client()
+
+        self.assertIs(client.session, other_client.session)
+        self.assertIsNot(client.session,
+                         self.client._create_client(
+                             username='other').session)
+
+    @mock.patch('keystoneauth1.session.Session.request')
+    def test_client_session_invalidated(self, kss_req):
+        kss_req.return_value = fake_requests.FakeResponse(401)
+        session = self.client._create_client().session
+
+        self.client.get('/resource_providers')
+
+        self.assertIsNot(session, self.client._create_client().session)
+
     def _add_default_kwargs(self, kwargs):
         kwargs['endpoint_filter'] = {'service_type': 'placement',
                                      'interface': 'internal',
@@ -59,13 +59,14 @@ class TestTrusts(tests.TestCase):
         self.cfg.config(os_admin_project_name='admin')
         self.cfg.config(os_admin_username='admin')
         ctx = self.trusts.create_ctx_from_trust('1')
+        auth_ref = self.client().session.auth.get_auth_ref()
         fake_ctx_dict = {
-            'auth_token': self.client().session.get_token(),
+            'auth_token': auth_ref.auth_token,
             'domain': None,
             'global_request_id': self.context.current().global_request_id,
             'is_admin': False,
             'is_admin_project': True,
-            'project': self.client().session.get_project_id(),
+            'project': auth_ref.project_id,
             'project_domain': None,
             'read_only': False,
             'request_id': ctx.request_id,
@@ -78,6 +79,41 @@ class TestTrusts(tests.TestCase):
             'user_domain': None}
         self.assertDictContainsSubset(fake_ctx_dict, ctx.to_dict())
 
+    def test_create_ctx_from_trust_cached(self):
+        auth_ref = self.client().session.auth.get_auth_ref()
+        auth_ref.will_expire_soon.return_value = False
+        self.client.reset_mock()
+
+        self.trusts.create_ctx_from_trust('1')
+        ctx = self.trusts.create_ctx_from_trust('1')
+
+        self.client.assert_called_once_with(trust_id='1')
+        self.assertEqual(auth_ref.auth_token, ctx.auth_token)
+
+    def test_create_ctx_from_trust_expired(self):
+        auth_ref = self.client().session.auth.get_auth_ref()
+        auth_ref.will_expire_soon.return_value = True
+        self.client.reset_mock()
+
+        self.trusts.create_ctx_from_trust('1')
+        self.trusts.create_ctx_from_trust('1')
+
+        self.assertEqual(2, self.client.call_count)
+
+    def test_delete_trust_forgets_trust(self):
+        auth_ref = self.client().session.auth.get_auth_ref()
+        auth_ref.will_expire_soon.return_value = False
+        invalidate = self.patch(self.base, 'invalidate_session')
+        self.trusts.create_ctx_from_trust('1')
+        self.client.reset_mock()
+
+        self.trusts.delete_trust(mock.MagicMock(trust_id='1'))
+        self.trusts.create_ctx_from_trust('1')
+
+        invalidate.assert_called_once_with(self.client().session)
+        self.assertEqual([mock.call(trust_id='1'), mock.call(trust_id='1')],
+                         self.client.call_args_list[:2])
+
     def test_use_trust_auth_dict(self):
         def to_wrap(self, arg_to_update):
             return arg_to_update
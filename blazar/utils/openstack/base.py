@@ -13,6 +13,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import threading
+
 from keystoneauth1.access import create as create_access_info
 from keystoneauth1.identity import access
 from keystoneauth1.identity import v3
@@ -20,14 +23,32 @@ from keystoneauth1 import session
 from keystoneclient import client as keystone_client
 import netaddr
 from oslo_config import cfg
+from oslo_log import log as logging
+import requests
 
 from blazar import context
 from blazar.manager import exceptions
 
 CONF = cfg.CONF
+LOG = logging.getLogger(__name__)
 
+# Maximum number of authenticated sessions kept by get_session().
+SESSION_CACHE_SIZE = 128
 
-CONF = cfg.CONF
+_SESSIONS = collections.OrderedDict()
+_SESSIONS_LOCK = threading.Lock()
+# HTTP connection pools shared by all the Keystone sessions.
+_HTTP_SESSION = requests.Session()
+
+# Number of sessions created, returned from the cache and dropped because
+# their token expired.
+SESSION_STATS = {'created': 0, 'hits': 0, 'expired': 0}
+
+# Maximum number of clients kept by get_client().
+CLIENT_CACHE_SIZE = 128
+
+_CLIENTS = collections.OrderedDict()
+_CLIENTS_LOCK = threading.Lock()
 
 
 def get_os_auth_host(conf):
@@ -41,6 +62,98 @@ def get_os_auth_host(conf):
     return os_auth_host
 
 
+def _is_expired(sess):
+    auth_ref = getattr(sess.auth, 'auth_ref', None)
+    return auth_ref is not None and auth_ref.will_expire_soon()
+
+
+def get_session(**auth_kwargs):
+    """Return a Keystone session authenticated with password auth_kwargs.
+
+    Sessions are cached per identity, so that clients built from them reuse
+    the token until it expires, and they share the HTTP connection pools.
+    The least recently used sessions are dropped when there are more than
+    SESSION_CACHE_SIZE of them.
+    """
+    key = tuple(sorted(auth_kwargs.items()))
+    with _SESSIONS_LOCK:
+        sess = _SESSIONS.get(key)
+        if sess is not None and _is_expired(sess):
+            SESSION_STATS['expired'] += 1
+            del _SESSIONS[key]
+            sess = None
+
+        if sess is not None:
+            SESSION_STATS['hits'] += 1
+            _SESSIONS.move_to_end(key)
+            return sess
+
+        sess = session.Session(auth=v3.Password(**auth_kwargs),
+                               session=_HTTP_SESSION)
+        SESSION_STATS['created'] += 1
+        _SESSIONS[key] = sess
+        while len(_SESSIONS) > SESSION_CACHE_SIZE:
+            _SESSIONS.popitem(last=False)
+        LOG.debug('Created Keystone session for user %s.',
+                  auth_kwargs.get('username'))
+        return sess
+
+
+def invalidate_session(sess):
+    """Drop a session from the cache, e.g. when its credentials failed."""
+    with _SESSIONS_LOCK:
+        for key, cached in list(_SESSIONS.items()):
+            if cached is sess:
+                del _SESSIONS[key]
+    # NOTE: clients do not tell which session they use, so all of them are
+    # dropped. Invalid credentials are rare enough for this to be cheap.
+    clear_client_cache()
+
+
+def clear_session_cache():
+    with _SESSIONS_LOCK:
+        _SESSIONS.clear()
+    clear_client_cache()
+
+
+def get_client(client_class, **kwargs):
+    """Return a client_class client built with kwargs.
+
+    Clients are cached per keyword arguments, such as trust_id, and per
+    global request ID of the context, so that an operation builds its
+    clients once however many calls it makes, and requests stay traceable.
+    They are built on sessions from get_session(), which renew their token
+    when it expires. The least recently used clients are dropped when there
+    are more than CLIENT_CACHE_SIZE of them.
+    """
+    ctx = kwargs.get('ctx')
+    if ctx is None:
+        try:
+            ctx = context.current()
+        except RuntimeError:
+            pass
+    global_request_id = getattr(ctx, 'global_request_id', None)
+    key = (client_class, global_request_id,
+           tuple(sorted((k, v) for k, v in kwargs.items() if k != 'ctx')))
+
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is not None:
+            _CLIENTS.move_to_end(key)
+            return client
+
+        client = client_class(**kwargs)
+        _CLIENTS[key] = client
+        while len(_CLIENTS) > CLIENT_CACHE_SIZE:
+            _CLIENTS.popitem(last=False)
+        return client
+
+
+def clear_client_cache():
+    with _CLIENTS_LOCK:
+        _CLIENTS.clear()
+
+
 def client_kwargs(**_kwargs):
     kwargs = _kwargs.copy()
 
@@ -86,10 +199,7 @@ def client_kwargs(**_kwargs):
     else:
         auth_kwargs.update(project_name=project_name)
 
-    auth = v3.Password(**auth_kwargs)
-    sess = session.Session(auth=auth)
-
-    kwargs.setdefault('session', sess)
+    kwargs.setdefault('session', get_session(**auth_kwargs))
     kwargs.setdefault('region_name', region_name)
     return kwargs
 
@@ -119,7 +229,7 @@ def client_user_kwargs(**_kwargs):
     data = admin_ks_client.tokens.get_token_data(ctx.auth_token)
     access_info = create_access_info(body=data, auth_token=ctx.auth_token)
     auth = access.AccessInfoPlugin(access_info, auth_url=auth_url)
-    sess = session.Session(auth=auth)
+    sess = session.Session(auth=auth, session=_HTTP_SESSION)
 
     kwargs.setdefault('session', sess)
     kwargs.setdefault('region_name', region_name)
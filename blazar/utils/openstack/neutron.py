@@ -40,7 +40,14 @@ class BlazarNeutronClient(object):
 class NeutronClientWrapper(object):
     @property
     def neutron(self):
-        return BlazarNeutronClient()
+        return self.get_neutron()
+
+    def get_neutron(self, **kwargs):
+        """Return the cached neutron client for a trust or context.
+
+        :param kwargs: arguments of BlazarNeutronClient, e.g. trust_id or ctx
+        """
+        return base.get_client(BlazarNeutronClient, **kwargs)
 
 
 class FloatingIPPool(BlazarNeutronClient):
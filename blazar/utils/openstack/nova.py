@@ -14,6 +14,8 @@
 # limitations under the License.
 import uuid as uuidgen
 import concurrent.futures
+import threading
+import time
 
 from novaclient import client as nova_client
 from novaclient import exceptions as nova_exception
@@ -62,7 +64,22 @@ nova_opts = [
                 default=True,
                 help='A flag to store original availability zone'),
     cfg.StrOpt('endpoint_override',
-               help='Nova endpoint URL to use')
+               help='Nova endpoint URL to use'),
+    cfg.IntOpt('aggregate_cache_ttl',
+               default=10,
+               min=0,
+               help='Number of seconds the aggregates fetched from Nova are '
+                    'reused for. Set to 0 to fetch them on every lookup.'),
+    cfg.IntOpt('aggregate_update_workers',
+               default=8,
+               min=1,
+               help='Maximum number of hosts whose aggregate membership is '
+                    'changed concurrently.'),
+    cfg.IntOpt('aggregate_update_retries',
+               default=2,
+               min=0,
+               help='Number of times a change of aggregate membership is '
+                    'retried when Nova fails with an unexpected error.'),
 ]
 
 
@@ -98,38 +115,131 @@ class ServerManager(servers.ServerManager):
 class NovaClientWrapper(object):
     @property
     def nova(self):
-        nova = BlazarNovaClient(endpoint_override=CONF.nova.endpoint_override)
-        return nova
+        return self.get_nova()
+
+    def get_nova(self, **kwargs):
+        """Return the cached nova client for a trust or context.
+
+        :param kwargs: arguments of BlazarNovaClient, e.g. trust_id or ctx
+        """
+        kwargs.setdefault('endpoint_override', CONF.nova.endpoint_override)
+        return base.get_client(BlazarNovaClient, **kwargs)
+
+
+class ReconcileResult(object):
+    """Summary of the aggregate membership changes of a reconcile.
+
+    added and removed list the (aggregate id, host) changes that were made,
+    or that would be made by a dry run, and failed maps the hosts whose
+    changes could not be completed to the error raised by Nova.
+    """
+
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.failed = {}
+
+    @property
+    def succeeded(self):
+        return not self.failed
 
 
 class ReservationPool(NovaClientWrapper):
+    # Aggregates fetched from Nova, shared by all the pools of the process:
+    # aggregate ids by name, and aggregates with their expiry time by id.
+    _aggregate_ids = {}
+    _aggregates = {}
+    _aggregates_lock = threading.Lock()
+
     def __init__(self):
         super(ReservationPool, self).__init__()
         self.config = CONF.nova
         self.freepool_name = self.config.aggregate_freepool_name
 
+    @classmethod
+    def clear_aggregate_cache(cls):
+        with cls._aggregates_lock:
+            cls._aggregate_ids.clear()
+            cls._aggregates.clear()
+
+    def _cache_aggregate(self, aggregate):
+        if not self.config.aggregate_cache_ttl:
+            return
+        expires_at = time.monotonic() + self.config.aggregate_cache_ttl
+        with self._aggregates_lock:
+            self._aggregate_ids[aggregate.name] = aggregate.id
+            self._aggregates[aggregate.id] = (aggregate, expires_at)
+
+    def _cached_aggregate(self, agg_id):
+        with self._aggregates_lock:
+            aggregate, expires_at = self._aggregates.get(agg_id, (None, 0))
+        if expires_at > time.monotonic():
+            return aggregate
+        return None
+
+    def _forget_aggregate(self, agg_id):
+        """Drop an aggregate from the cache, so that it is fetched again."""
+        with self._aggregates_lock:
+            self._aggregates.pop(agg_id, None)
+            for name, cached_id in list(self._aggregate_ids.items()):
+                if cached_id == agg_id:
+                    del self._aggregate_ids[name]
+
+    def _update_cached_hosts(self, agg_id, added=(), removed=()):
+        """Apply host changes made in Nova to a cached aggregate.
+
+        The host list is replaced rather than changed in place, so that
+        callers iterating over the previous one are not affected.
+        """
+        with self._aggregates_lock:
+            aggregate = self._aggregates.get(agg_id, (None, 0))[0]
+            if aggregate is not None:
+                aggregate.hosts = [
+                    h for h in aggregate.hosts if h not in removed] + [
+                    h for h in added if h not in aggregate.hosts]
+
     def get_aggregate_from_name_or_id(self, aggregate_obj):
-        """Return an aggregate by name or an id."""
+        """Return an aggregate by name or an id.
+
+        Aggregates are cached for the aggregate_cache_ttl option, and all of
+        them are cached when one is looked up by an unknown name.
+        """
 
         aggregate = None
         agg_id = None
+        by_name = False
         try:
             agg_id = int(aggregate_obj)
         except (ValueError, TypeError):
             if hasattr(aggregate_obj, 'id') and aggregate_obj.id:
                 # pool is an aggregate
                 agg_id = aggregate_obj.id
+            else:
+                by_name = True
+                with self._aggregates_lock:
+                    agg_id = self._aggregate_ids.get(aggregate_obj)
 
         if agg_id is not None:
-            try:
-                aggregate = self.nova.aggregates.get(agg_id)
-            except nova_exception.NotFound:
+            aggregate = self._cached_aggregate(agg_id)
+            if aggregate is None:
+                try:
+                    aggregate = self.nova.aggregates.get(agg_id)
+                    self._cache_aggregate(aggregate)
+                except nova_exception.NotFound:
+                    self._forget_aggregate(agg_id)
+                    aggregate = None
+            if by_name and aggregate and aggregate.name != aggregate_obj:
+                # The aggregate was renamed since its id was cached.
+                with self._aggregates_lock:
+                    self._aggregate_ids.pop(aggregate_obj, None)
                 aggregate = None
-        else:
+
+        if aggregate is None and by_name:
             # FIXME(scroiset): can't get an aggregate by name
             # so iter over all aggregate and check for the good one
             all_aggregates = self.nova.aggregates.list()
             for agg in all_aggregates:
+                self._cache_aggregate(agg)
                 if aggregate_obj == agg.name:
                     aggregate = agg
         if aggregate:
@@ -166,6 +276,7 @@ class ReservationPool(NovaClientWrapper):
         else:
             metadata = {self.config.blazar_owner: project_id}
         self.nova.aggregates.set_metadata(agg, metadata)
+        self._forget_aggregate(agg.id)
 
         return agg
 
@@ -193,20 +304,27 @@ class ReservationPool(NovaClientWrapper):
             freepool_agg = self.get(self.freepool_name)
         except manager_exceptions.AggregateNotFound:
             raise manager_exceptions.NoFreePool()
+        changes = {}
         for host in hosts:
             LOG.debug("Removing host '%(host)s' from aggregate '%(id)s')",
                       {'host': host, 'id': agg.id})
-            self.nova.aggregates.remove_host(agg.id, host)
-
+            changes[host] = [('remove_host', agg.id)]
             if freepool_agg.id != agg.id and host not in freepool_agg.hosts:
-                self.nova.aggregates.add_host(freepool_agg.id, host)
+                changes[host].append(('add_host', freepool_agg.id))
+        result = self._apply_changes(changes)
+        for e in result.failed.values():
+            raise e
 
         self.nova.aggregates.delete(agg.id)
+        self._forget_aggregate(agg.id)
 
     def get_all(self):
         """Return all aggregate."""
 
-        return self.nova.aggregates.list()
+        aggregates = self.nova.aggregates.list()
+        for agg in aggregates:
+            self._cache_aggregate(agg)
+        return aggregates
 
     def get(self, pool):
         """return details for aggregate pool or raise AggregateNotFound."""
@@ -222,10 +340,130 @@ class ReservationPool(NovaClientWrapper):
         except manager_exceptions.AggregateNotFound:
             return []
 
+    def reconcile(self, desired, sources=(), dry_run=False):
+        """Move hosts into the aggregates they should be members of.
+
+        The changes are computed against the cached aggregates: a host is
+        added to its aggregate of desired unless it is already a member, and
+        removed from the other aggregates of desired and sources it is a
+        member of. The changes of a host are made in that order, removals
+        first, and hosts are processed concurrently, up to the
+        aggregate_update_workers option.
+
+        :param desired: dict of lists of host names, keyed by aggregate name
+            or id
+        :param sources: names or ids of the other aggregates hosts may be
+            moved out of
+        :param dry_run: only compute the changes, without making them
+        :return: a ReconcileResult
+        """
+
+        aggregates = {pool: self.get_aggregate_from_name_or_id(pool)
+                      for pool in list(desired) + list(sources)}
+        members = {agg.id: agg.hosts for agg in aggregates.values()}
+
+        changes = {}
+        for pool, hosts in desired.items():
+            target = aggregates[pool]
+            for host in hosts:
+                steps = [('remove_host', agg_id)
+                         for agg_id, agg_hosts in members.items()
+                         if agg_id != target.id and host in agg_hosts]
+                if host not in target.hosts:
+                    steps.append(('add_host', target.id))
+                if steps:
+                    changes[host] = steps
+
+        if dry_run:
+            result = ReconcileResult()
+            for host, steps in changes.items():
+                for action, agg_id in steps:
+                    if action == 'add_host':
+                        result.added.append((agg_id, host))
+                    else:
+                        result.removed.append((agg_id, host))
+            return result
+        return self._apply_changes(changes)
+
+    def _apply_changes(self, changes):
+        """Make aggregate membership changes, given as steps per host."""
+
+        result = ReconcileResult()
+        if not changes:
+            return result
+        nova = self.nova
+
+        def process_host(host):
+            for action, agg_id in changes[host]:
+                try:
+                    self._change_membership(nova, action, agg_id, host)
+                except Exception as e:
+                    LOG.warning('Failed to %(action)s %(host)s of aggregate '
+                                '%(id)s: %(error)s',
+                                {'action': action, 'host': host, 'id': agg_id,
+                                 'error': e})
+                    result.failed[host] = e
+                    return
+                if action == 'add_host':
+                    result.added.append((agg_id, host))
+                else:
+                    result.removed.append((agg_id, host))
+
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.config.aggregate_update_workers) as executor:
+            list(executor.map(process_host, changes))
+        return result
+
+    def _change_membership(self, nova, action, agg_id, host):
+        """Add a host to or remove it from an aggregate.
+
+        Errors other than NotFound, Conflict and BadRequest are retried up to
+        aggregate_update_retries times.
+        """
+
+        attempt = 0
+        while True:
+            try:
+                getattr(nova.aggregates, action)(agg_id, host)
+                break
+            except (nova_exception.NotFound, nova_exception.Conflict,
+                    nova_exception.BadRequest):
+                self._forget_aggregate(agg_id)
+                raise
+            except Exception as e:
+                if attempt >= self.config.aggregate_update_retries:
+                    self._forget_aggregate(agg_id)
+                    raise
+                attempt += 1
+                LOG.info('Retrying to %(action)s %(host)s of aggregate '
+                         '%(id)s after error: %(error)s',
+                         {'action': action, 'host': host, 'id': agg_id,
+                          'error': e})
+                time.sleep(attempt)
+
+        if action == 'add_host':
+            self._update_cached_hosts(agg_id, added=[host])
+        else:
+            self._update_cached_hosts(agg_id, removed=[host])
+
+    def _revert(self, result):
+        """Undo the changes of a reconcile, as far as possible."""
+
+        changes = {}
+        for agg_id, host in result.added:
+            changes.setdefault(host, []).append(('remove_host', agg_id))
+        for agg_id, host in result.removed:
+            changes.setdefault(host, []).append(('add_host', agg_id))
+        reverted = self._apply_changes(changes)
+        if reverted.failed:
+            LOG.error('Could not revert the aggregates of hosts %s',
+                      sorted(reverted.failed))
+
     def add_computehost(self, pool, hosts, stay_in=False):
         """Add compute host(s) to an aggregate.
 
         Each host must exist and be in the freepool, otherwise raise an error.
+        Preemptible instances running on the hosts are terminated.
 
         :param pool: Name or UUID of the pool to rattach the host
         :param hosts: Names (not UUID) of hosts to associate
@@ -238,8 +476,6 @@ class ReservationPool(NovaClientWrapper):
         if not isinstance(hosts, list):
             hosts = [hosts]
 
-        added_hosts = []
-        removed_hosts = []
         agg = self.get_aggregate_from_name_or_id(pool)
 
         try:
@@ -247,68 +483,64 @@ class ReservationPool(NovaClientWrapper):
         except manager_exceptions.AggregateNotFound:
             raise manager_exceptions.NoFreePool()
 
-        def process_host(host):
-            try:
-                if freepool_agg.id != agg.id and not stay_in:
-                    if host not in freepool_agg.hosts:
-                        raise manager_exceptions.HostNotInFreePool(
-                            host=host, freepool_name=freepool_agg.name)
-                    LOG.info("removing host '%(host)s' from freepool "
-                             "aggregate %(name)s",
-                             {'host': host, 'name': freepool_agg.name})
-                    try:
-                        self.remove_computehost(freepool_agg.id, host)
-                        removed_hosts.append(host)
-                    except nova_exception.NotFound:
-                        raise manager_exceptions.HostNotFound(host=host)
-
-                LOG.info("adding host '%(host)s' to aggregate %(id)s",
-                         {'host': host, 'id': agg.id})
+        sources = []
+        if freepool_agg.id != agg.id and not stay_in:
+            if any(host not in freepool_agg.hosts for host in hosts):
+                # NOTE: the cached freepool may be stale, check the hosts
+                # against the one in Nova before failing.
+                self._forget_aggregate(freepool_agg.id)
                 try:
-                    self.nova.aggregates.add_host(agg.id, host)
-                    added_hosts.append(host)
-                except nova_exception.NotFound:
+                    freepool_agg = self.get(self.freepool_name)
+                except manager_exceptions.AggregateNotFound:
+                    raise manager_exceptions.NoFreePool()
+            for host in hosts:
+                if host not in freepool_agg.hosts:
+                    raise manager_exceptions.HostNotInFreePool(
+                        host=host, freepool_name=freepool_agg.name)
+            sources.append(freepool_agg.id)
+
+        result = self.reconcile({agg.id: hosts}, sources=sources)
+        try:
+            for host, e in result.failed.items():
+                if isinstance(e, nova_exception.NotFound):
                     raise manager_exceptions.HostNotFound(host=host)
-                except nova_exception.Conflict as e:
+                if isinstance(e, nova_exception.Conflict):
                     raise manager_exceptions.AggregateAlreadyHasHost(
                         pool=pool, host=host, nova_exception=str(e))
-
-                # remove preemptible instances
-                for server in self.nova.servers.list(
-                        search_opts={"node": host, "all_tenants": 1}):
-                    try:
-                        LOG.info('Terminating preemptible instance %s (%s)',
-                                 server.name, server.id)
-                        self.nova.servers.delete(server=server)
-                    except nova_exception.NotFound:
-                        LOG.info('Could not find server %s, may have been '
-                                 'deleted concurrently.', server)
-                    except Exception as e:
-                        LOG.exception(
-                            'Failed to delete %s: %s.', server, str(e))
-            except Exception as e:
-                LOG.exception('Error processing host %s: %s', host, str(e))
                 raise e
-
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = executor.map(process_host, hosts)
-        try:
-            # exception will be raised when the value is retrieved from the iterator
-            results = list(futures)
-        except Exception as e:
-            if added_hosts:
-                LOG.warn('Removing hosts added to aggregate %s: %s',
-                         agg.id, added_hosts)
-                for host in added_hosts:
-                    self.nova.aggregates.remove_host(agg.id, host)
-            if removed_hosts:
-                LOG.warn('Adding hosts back to freepool: %s', removed_hosts)
-                for host in removed_hosts:
-                    self.nova.aggregates.add_host(freepool_agg.id, host)
-            raise e
+            self._terminate_preemptible_servers(hosts)
+        except Exception:
+            LOG.warn('Reverting the changes of aggregate %s: added %s, '
+                     'removed %s', agg.id, result.added, result.removed)
+            self._revert(result)
+            self._forget_aggregate(agg.id)
+            self._forget_aggregate(freepool_agg.id)
+            raise
 
         return self.get_aggregate_from_name_or_id(pool)
 
+    def _terminate_preemptible_servers(self, hosts):
+        """Delete the instances running on hosts."""
+
+        nova = self.nova
+
+        def process_host(host):
+            for server in nova.servers.list(
+                    search_opts={"node": host, "all_tenants": 1}):
+                try:
+                    LOG.info('Terminating preemptible instance %s (%s)',
+                             server.name, server.id)
+                    nova.servers.delete(server=server)
+                except nova_exception.NotFound:
+                    LOG.info('Could not find server %s, may have been '
+                             'deleted concurrently.', server)
+                except Exception as e:
+                    LOG.exception('Failed to delete %s: %s.', server, str(e))
+
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.config.aggregate_update_workers) as executor:
+            list(executor.map(process_host, hosts))
+
     def remove_all_computehosts(self, pool):
         """Remove all compute hosts attached to an aggregate."""
 
@@ -338,14 +570,18 @@ class ReservationPool(NovaClientWrapper):
                     return
             try:
                 self.nova.aggregates.remove_host(agg.id, host)
+                self._update_cached_hosts(agg.id, removed=[host])
             except nova_exception.ClientException:
+                self._forget_aggregate(agg.id)
                 hosts_failing_to_remove.append(host)
             if freepool_agg.id != agg.id and host not in freepool_agg.hosts:
                 # NOTE(sbauza) : We don't want to put again the host in
                 # freepool if the requested pool is the freepool...
                 try:
                     self.nova.aggregates.add_host(freepool_agg.id, host)
+                    self._update_cached_hosts(freepool_agg.id, added=[host])
                 except nova_exception.ClientException:
+                    self._forget_aggregate(freepool_agg.id)
                     hosts_failing_to_add.append(host)
         with concurrent.futures.ThreadPoolExecutor() as executor:
             executor.map(process_host, hosts)
@@ -366,7 +602,9 @@ class ReservationPool(NovaClientWrapper):
 
         agg = self.get_aggregate_from_name_or_id(pool)
 
-        return self.nova.aggregates.set_metadata(agg.id, metadata)
+        agg = self.nova.aggregates.set_metadata(agg.id, metadata)
+        self._forget_aggregate(agg.id)
+        return agg
 
     def remove_project(self, pool, project_id):
         """Remove a project from an aggregate."""
@@ -374,7 +612,9 @@ class ReservationPool(NovaClientWrapper):
         agg = self.get_aggregate_from_name_or_id(pool)
 
         metadata = {project_id: None}
-        return self.nova.aggregates.set_metadata(agg.id, metadata)
+        agg = self.nova.aggregates.set_metadata(agg.id, metadata)
+        self._forget_aggregate(agg.id)
+        return agg
 
 
 class NovaInventory(NovaClientWrapper):
@@ -12,8 +12,7 @@
 # limitations under the License.
 
 from keystoneauth1 import adapter
-from keystoneauth1.identity import v3
-from keystoneauth1 import session
+from keystoneauth1 import exceptions as ks_exc
 from oslo_config import cfg
 
 from blazar import context
@@ -76,13 +75,12 @@ class BlazarPlacementClient(object):
             if CONF.os_auth_version:
                 auth_url += "/%s" % CONF.os_auth_version
 
-        auth = v3.Password(auth_url=auth_url,
-                           username=username,
-                           password=password,
-                           project_name=project_name,
-                           user_domain_name=user_domain_name,
-                           project_domain_name=project_domain_name)
-        sess = session.Session(auth=auth)
+        sess = base.get_session(auth_url=auth_url,
+                                username=username,
+                                password=password,
+                                project_name=project_name,
+                                user_domain_name=user_domain_name,
+                                project_domain_name=project_domain_name)
         # Set accept header on every request to ensure we notify placement
         # service of our response body media type preferences.
         headers = {'accept': 'application/json'}
@@ -93,25 +91,31 @@ class BlazarPlacementClient(object):
         client = adapter.Adapter(sess, **kwargs)
         return client
 
-    def get(self, url, microversion=PLACEMENT_MICROVERSION):
+    def _request(self, method, url, **kwargs):
+        """Send a request, dropping the cached session on auth errors."""
         client = self._create_client()
-        return client.get(url, raise_exc=False,
-                          microversion=microversion)
+        try:
+            resp = client.request(url, method, raise_exc=False, **kwargs)
+        except ks_exc.Unauthorized:
+            base.invalidate_session(client.session)
+            raise
+        if resp.status_code == 401:
+            base.invalidate_session(client.session)
+        return resp
+
+    def get(self, url, microversion=PLACEMENT_MICROVERSION):
+        return self._request('GET', url, microversion=microversion)
 
     def post(self, url, data, microversion=PLACEMENT_MICROVERSION):
-        client = self._create_client()
-        return client.post(url, json=data, raise_exc=False,
-                           microversion=microversion)
+        return self._request('POST', url, json=data,
+                             microversion=microversion)
 
     def put(self, url, data, microversion=PLACEMENT_MICROVERSION):
-        client = self._create_client()
-        return client.put(url, json=data, raise_exc=False,
-                          microversion=microversion)
+        return self._request('PUT', url, json=data,
+                             microversion=microversion)
 
     def delete(self, url, microversion=PLACEMENT_MICROVERSION):
-        client = self._create_client()
-        return client.delete(url, raise_exc=False,
-                             microversion=microversion)
+        return self._request('DELETE', url, microversion=microversion)
 
     def _get_reservation_provider_name(self, host_name):
         """Get the name of a reservation provider from the host name.
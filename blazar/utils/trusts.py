@@ -13,15 +13,26 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import threading
+
 from oslo_config import cfg
 
 from blazar import context
+from blazar.utils.openstack import base
 from blazar.utils.openstack import keystone
 import functools
 
 
 CONF = cfg.CONF
 
+# Maximum number of trusts whose token is kept by create_ctx_from_trust().
+TRUST_CACHE_SIZE = 256
+
+# Trust-scoped auth, keyed by trust ID: (session, auth_ref).
+_TRUST_AUTH = collections.OrderedDict()
+_TRUST_AUTH_LOCK = threading.Lock()
+
 
 def create_trust():
     """Creates trust via Keystone API v3 to use in plugins."""
@@ -42,23 +53,59 @@ def delete_trust(lease):
     if lease.trust_id:
         client = keystone.BlazarKeystoneClient(trust_id=lease.trust_id)
         client.trusts.delete(lease.trust_id)
+        forget_trust(lease.trust_id)
+
+
+def forget_trust(trust_id):
+    """Drop the cached token and session of a trust."""
+    with _TRUST_AUTH_LOCK:
+        cached = _TRUST_AUTH.pop(trust_id, None)
+    if cached is not None:
+        base.invalidate_session(cached[0])
+
+
+def clear_trust_cache():
+    with _TRUST_AUTH_LOCK:
+        _TRUST_AUTH.clear()
+
+
+def _get_trust_auth(trust_id):
+    """Return the session and auth reference scoped to a trust.
+
+    They are cached per trust until the token is about to expire, so that
+    contexts for the same trust do not fetch a new token and service catalog
+    from Keystone.
+    """
+    with _TRUST_AUTH_LOCK:
+        cached = _TRUST_AUTH.get(trust_id)
+        if cached is not None and not cached[1].will_expire_soon():
+            _TRUST_AUTH.move_to_end(trust_id)
+            return cached
+
+    client = keystone.BlazarKeystoneClient(trust_id=trust_id)
+    session = client.session
+    cached = (session, session.auth.get_auth_ref(session))
+
+    with _TRUST_AUTH_LOCK:
+        _TRUST_AUTH[trust_id] = cached
+        _TRUST_AUTH.move_to_end(trust_id)
+        while len(_TRUST_AUTH) > TRUST_CACHE_SIZE:
+            _TRUST_AUTH.popitem(last=False)
+    return cached
 
 
 def create_ctx_from_trust(trust_id):
     """Return context built from given trust."""
     ctx = context.current()
-    client = keystone.BlazarKeystoneClient(trust_id=trust_id)
-    session = client.session
+    session, auth_ref = _get_trust_auth(trust_id)
 
     # use 'with ctx' statement in the place you need context from trust
     return context.BlazarContext(
         user_name=ctx.user_name,
         user_domain_name=ctx.user_domain_name,
-        auth_token=session.get_token(),
-        project_id=session.get_project_id(),
-        service_catalog=(
-            ctx.service_catalog or
-            session.auth.get_auth_ref(session).service_catalog),
+        auth_token=auth_ref.auth_token,
+        project_id=auth_ref.project_id,
+        service_catalog=ctx.service_catalog or auth_ref.service_catalog,
         request_id=ctx.request_id,
         global_request_id=ctx.global_request_id
     )